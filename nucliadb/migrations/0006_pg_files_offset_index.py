@@ -0,0 +1,34 @@
+# Copyright (C) 2021 Bosutech XXI S.L.
+#
+# nucliadb is offered under the AGPL v3.0 and as commercial software.
+# For commercial licensing, contact us at info@nuclia.com.
+#
+# AGPL:
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+from nucliadb.migrator.context import ExecutionContext
+from nucliadb_utils.storages.pg import PostgresStorage
+
+
+async def migrate(context: ExecutionContext) -> None:
+    """
+    Add and index the start offset of file parts stored in postgres.
+    """
+    if isinstance(context.blob_storage, PostgresStorage):
+        await context.blob_storage.add_offset_column()
+        await context.blob_storage.create_offset_index()
+
+
+async def migrate_kb(context: ExecutionContext, kbid: str) -> None:
+    ...
@@ -17,8 +17,11 @@
 # You should have received a copy of the GNU Affero General Public License
 # along with this program. If not, see <http://www.gnu.org/licenses/>.
 
+import asyncio
+import time
 from abc import ABCMeta, abstractmethod
-from typing import AsyncIterator, Optional
+from contextlib import contextmanager
+from typing import AsyncIterator, Iterator, Optional
 
 from nucliadb_protos.nodereader_pb2_grpc import NodeReaderStub
 from nucliadb_protos.nodewriter_pb2 import (
@@ -28,7 +31,13 @@ from nucliadb_protos.nodewriter_pb2 import (
 )
 from nucliadb_protos.nodewriter_pb2_grpc import NodeWriterStub
 
+from nucliadb.common.cluster.latency import LatencyWindow
 from nucliadb_protos import nodereader_pb2, noderesources_pb2, utils_pb2
+from nucliadb_telemetry import metrics
+
+NODE_IN_FLIGHT_REQUESTS = metrics.Gauge(
+    "nucliadb_node_in_flight_requests", labels={"node_id": ""}
+)
 
 
 class AbstractIndexNode(metaclass=ABCMeta):
@@ -48,6 +57,8 @@ class AbstractIndexNode(metaclass=ABCMeta):
         self.shard_count = shard_count
         self.dummy = dummy
         self.primary_id = primary_id
+        self.latencies = LatencyWindow()
+        self.in_flight = 0
 
     def __str__(self):
         return f"{self.__class__.__name__}({self.id}, {self.address})"
@@ -55,6 +66,30 @@ class AbstractIndexNode(metaclass=ABCMeta):
     def __repr__(self):
         return self.__str__()
 
+    @contextmanager
+    def track_request(self) -> Iterator[None]:
+        """
+        Account a request to the node while it is in flight and record its
+        latency when it succeeds. Used by the node selection policies.
+
+        Cancelled requests (hedged or timed out ones) are recorded too with the
+        time they were running, as a lower bound of the latency. Otherwise the
+        slowest requests of a node would never count.
+        """
+        self.in_flight += 1
+        NODE_IN_FLIGHT_REQUESTS.set(self.in_flight, labels={"node_id": self.id})
+        start = time.monotonic()
+        try:
+            yield
+        except asyncio.CancelledError:
+            self.latencies.observe(time.monotonic() - start)
+            raise
+        else:
+            self.latencies.observe(time.monotonic() - start)
+        finally:
+            self.in_flight -= 1
+            NODE_IN_FLIGHT_REQUESTS.set(self.in_flight, labels={"node_id": self.id})
+
     @property
     @abstractmethod
     def reader(self) -> NodeReaderStub:  # pragma: no cover
@@ -0,0 +1,67 @@
+# Copyright (C) 2021 Bosutech XXI S.L.
+#
+# nucliadb is offered under the AGPL v3.0 and as commercial software.
+# For commercial licensing, contact us at info@nuclia.com.
+#
+# AGPL:
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+import math
+from collections import deque
+from typing import Deque, Optional
+
+DEFAULT_WINDOW_SIZE = 500
+DEFAULT_EWMA_ALPHA = 0.3
+
+
+class LatencyWindow:
+    """
+    Rolling window with the latencies of the last queries answered by an
+    index node. Used to estimate how long a node usually takes to answer.
+
+    An exponentially weighted moving average is kept along the window, which
+    reacts faster to a node slowing down.
+    """
+
+    def __init__(
+        self, size: int = DEFAULT_WINDOW_SIZE, alpha: float = DEFAULT_EWMA_ALPHA
+    ):
+        self.samples: Deque[float] = deque(maxlen=size)
+        self.alpha = alpha
+        self.ewma: Optional[float] = None
+
+    def __len__(self) -> int:
+        return len(self.samples)
+
+    def observe(self, seconds: float) -> None:
+        self.samples.append(seconds)
+        if self.ewma is None:
+            self.ewma = seconds
+        else:
+            self.ewma = self.alpha * seconds + (1 - self.alpha) * self.ewma
+
+    def percentile(self, quantile: float) -> Optional[float]:
+        """
+        Returns the latency under which `quantile` of the observed queries
+        were answered or None if nothing has been observed yet.
+        """
+        if len(self.samples) == 0:
+            return None
+        ordered = sorted(self.samples)
+        index = max(math.ceil(quantile * len(ordered)) - 1, 0)
+        return ordered[min(index, len(ordered) - 1)]
+
+    def clear(self) -> None:
+        self.samples.clear()
+        self.ewma = None
@@ -19,7 +19,6 @@
 #
 import asyncio
 import logging
-import random
 import uuid
 from typing import Any, Awaitable, Callable, Optional
 
@@ -51,7 +50,9 @@ from nucliadb_utils.keys import KB_SHARDS
 from nucliadb_utils.utilities import get_indexing, get_storage
 
 from .index_node import IndexNode
+from .selection import select_node
 from .settings import settings
+from .standalone import grpc_node_binding
 from .standalone.index_node import ProxyStandaloneIndexNode
 from .standalone.utils import get_self, get_standalone_node_id
 
@@ -443,14 +444,23 @@ class StandaloneKBShardManager(KBShardManager):
         reindex_id: Optional[str] = None,
     ) -> None:
         index_node = None
-        for shardreplica in shard.replicas:
-            resource.shard_id = resource.resource.shard_id = shardreplica.shard.id
-            index_node = get_index_node(shardreplica.node)
-            if index_node is None:  # pragma: no cover
-                raise NodesUnsync(
-                    f"Node {shardreplica.node} is not found or not available"
-                )
-            await index_node.writer.SetResource(resource)  # type: ignore
+        # serialized once for all the replicas on this node
+        payload = grpc_node_binding.ResourcePayload(resource)
+        try:
+            for shardreplica in shard.replicas:
+                resource.shard_id = resource.resource.shard_id = shardreplica.shard.id
+                index_node = get_index_node(shardreplica.node)
+                if index_node is None:  # pragma: no cover
+                    raise NodesUnsync(
+                        f"Node {shardreplica.node} is not found or not available"
+                    )
+                writer = index_node.writer
+                if isinstance(writer, grpc_node_binding.StandaloneWriterWrapper):
+                    await writer.SetResourcePayload(payload, shardreplica.shard.id)
+                else:
+                    await writer.SetResource(resource)  # type: ignore
+        finally:
+            payload.close()
 
         if index_node is not None:
             asyncio.create_task(
@@ -464,10 +474,17 @@ def choose_node(
     shard: writer_pb2.ShardObject,
     target_replicas: Optional[list[str]] = None,
     read_only: bool = False,
+    exclude_nodes: Optional[list[str]] = None,
+    fastest: bool = False,
 ) -> tuple[AbstractIndexNode, str, str]:
     """
     Choose an arbitrary node storing `shard`.
+
+    The node is chosen with the configured selection policy. Nodes in
+    `exclude_nodes` are never chosen. With `fastest`, the node with the lowest
+    observed p90 latency is chosen instead.
     """
+    exclude_nodes = exclude_nodes or []
     preferred_nodes = []
     backend_nodes = []
     for shardreplica in shard.replicas:
@@ -475,7 +492,7 @@ def choose_node(
         replica_id = shardreplica.shard.id
 
         node = get_index_node(node_id)
-        if node is not None:
+        if node is not None and node_id not in exclude_nodes:
             if target_replicas and replica_id in target_replicas:
                 preferred_nodes.append((replica_id, node))
             else:
@@ -486,6 +503,8 @@ def choose_node(
                 read_replica_node = get_index_node(read_replica_node_id)
                 if read_replica_node is None:
                     continue
+                if read_replica_node_id in exclude_nodes:
+                    continue
                 if target_replicas and replica_id in target_replicas:
                     preferred_nodes.append((replica_id, read_replica_node))
                 else:
@@ -494,14 +513,23 @@ def choose_node(
     if len(preferred_nodes) == 0 and len(backend_nodes) == 0:
         raise NoHealthyNodeAvailable("Could not find a node to query")
 
+    candidates = preferred_nodes if len(preferred_nodes) > 0 else backend_nodes
     selected_node: AbstractIndexNode
-    if len(preferred_nodes) > 0:
-        replica_id, selected_node = random.choice(preferred_nodes)
+    if fastest:
+        replica_id, selected_node = min(candidates, key=_node_latency)
     else:
-        replica_id, selected_node = random.choice(backend_nodes)
+        replica_id, selected_node = select_node(
+            candidates, settings.node_selection_policy
+        )
     return selected_node, replica_id, selected_node.id
 
 
+def _node_latency(candidate: tuple[str, AbstractIndexNode]) -> float:
+    # nodes without observed latencies go first so they get some traffic
+    _, node = candidate
+    return node.latencies.percentile(0.9) or 0.0
+
+
 def check_enough_nodes():
     """
     It raises an exception if it can't find enough nodes for the configured replicas.
@@ -20,6 +20,7 @@
 import argparse
 import asyncio
 import logging
+import time
 from datetime import datetime
 from typing import Optional
 
@@ -53,6 +54,8 @@ async def create_rollover_shards(
     logger.warning("Creating rollover shards", extra={"kbid": kbid})
     sm = app_context.shard_manager
     cluster_datamanager = ClusterDataManager(app_context.kv_driver)
+    # progress of a previous rollover is not valid for new shards
+    await cluster_datamanager.delete_rollover_checkpoint(kbid)
 
     existing_rollover_shards = await cluster_datamanager.get_kb_rollover_shards(kbid)
     if existing_rollover_shards is not None:
@@ -123,17 +126,57 @@ def _get_shard(
     return None
 
 
-async def wait_for_node(app_context: ApplicationContext, node_id: str) -> None:
-    while True:
-        # get raw js client
-        js = getattr(app_context.nats_manager.js, "js", app_context.nats_manager.js)
-        consumer_info = await js.consumer_info(
-            const.Streams.INDEX.name, const.Streams.INDEX.group.format(node=node_id)
-        )
-        if consumer_info.num_pending < 5:
-            return
-        logger.info("Waiting for node to consume messages", extra={"node": node_id})
-        await asyncio.sleep(2)
+class NodeBackpressure:
+    """
+    Pauses writes to the nodes whose index queue is too long. The queue
+    depth of a node is fetched at most once every `check_interval` and
+    estimated from the writes sent in between.
+    """
+
+    def __init__(
+        self,
+        app_context: ApplicationContext,
+        max_pending: int,
+        check_interval: float = 1.0,
+    ):
+        self.app_context = app_context
+        self.max_pending = max_pending
+        self.check_interval = check_interval
+        self.pending: dict[str, tuple[float, int]] = {}
+        self.locks: dict[str, asyncio.Lock] = {}
+
+    async def get_pending(self, node_id: str) -> int:
+        async with self.locks.setdefault(node_id, asyncio.Lock()):
+            checked = self.pending.get(node_id)
+            if checked is None or time.monotonic() - checked[0] > self.check_interval:
+                # get raw js client
+                js = getattr(
+                    self.app_context.nats_manager.js,
+                    "js",
+                    self.app_context.nats_manager.js,
+                )
+                consumer_info = await js.consumer_info(
+                    const.Streams.INDEX.name,
+                    const.Streams.INDEX.group.format(node=node_id),
+                )
+                checked = (time.monotonic(), consumer_info.num_pending)
+                self.pending[node_id] = checked
+            return checked[1]
+
+    async def wait(self, shard: writer_pb2.ShardObject) -> None:
+        for replica in shard.replicas:
+            while await self.get_pending(replica.node) > self.max_pending:
+                logger.info(
+                    "Waiting for node to consume messages",
+                    extra={"node": replica.node},
+                )
+                await asyncio.sleep(self.check_interval)
+
+    def sent(self, shard: writer_pb2.ShardObject) -> None:
+        for replica in shard.replicas:
+            if replica.node in self.pending:
+                checked_at, pending = self.pending[replica.node]
+                self.pending[replica.node] = (checked_at, pending + 1)
 
 
 @backoff.on_exception(backoff.expo, (Exception,), max_tries=3)
@@ -173,7 +216,11 @@ async def index_rollover_shards(
     app_context: ApplicationContext, kbid: str
 ) -> dict[str, tuple[str, datetime]]:
     """
-    Indexes all data in a kb in rollover shards
+    Indexes all data in a kb in rollover shards.
+
+    Resource ids are looked up in batches and indexed by a bounded pool
+    of workers. Indexed resources are checkpointed, so an interrupted
+    rollover resumes where it stopped.
     """
     logger.warning("Indexing rollover shards", extra={"kbid": kbid})
 
@@ -186,48 +233,135 @@ async def index_rollover_shards(
     if rollover_shards is None:
         raise UnexpectedRolloverError(f"No rollover shards found for KB {kbid}")
 
-    indexed_resources = {}
-    wait_index_batch: list[writer_pb2.ShardObject] = []
-    # now index on all new shards only
-    async for resource_id in resources_datamanager.iterate_resource_ids(kbid):
-        shard_id = await resources_datamanager.get_resource_shard_id(kbid, resource_id)
-        if shard_id is None:
-            logger.error(
-                "Shard id not found for resource",
-                extra={"kbid": kbid, "resource_id": resource_id},
-            )
-            raise UnexpectedRolloverError("Shard id not found for resource")
+    state = await cluster_datamanager.get_rollover_state(kbid)
+    if state is None:
+        state = {
+            "total": await resources_datamanager.calculate_number_of_resources(kbid),
+            "indexed": 0,
+            "started_at": datetime.now().isoformat(),
+        }
+        await cluster_datamanager.set_rollover_state(kbid, state)
+    else:
+        logger.warning(
+            "Resuming rollover indexing",
+            extra={"kbid": kbid, "indexed": state["indexed"], "total": state["total"]},
+        )
 
-        shard = _get_shard(rollover_shards, shard_id)
-        if shard is None:  # pragma: no cover
-            logger.error(
-                "Shard not found for resource",
-                extra={"kbid": kbid, "resource_id": resource_id, "shard_id": shard_id},
-            )
-            raise UnexpectedRolloverError(
-                f"Shard {shard_id} not found. Was a new one created during migration?"
+    batch_size = settings.rollover_batch_size
+    concurrency = settings.rollover_max_concurrency
+    backpressure = NodeBackpressure(app_context, settings.rollover_node_max_pending)
+    queue: asyncio.Queue[
+        Optional[tuple[str, str, writer_pb2.ShardObject]]
+    ] = asyncio.Queue(maxsize=batch_size)
+    indexed_resources: dict[str, tuple[str, datetime]] = {}
+    checkpoint: dict[str, tuple[str, datetime]] = {}
+    checkpoint_lock = asyncio.Lock()
+    run_started = time.monotonic()
+    run_indexed = 0
+
+    async def save_checkpoint() -> None:
+        nonlocal checkpoint, run_indexed
+        async with checkpoint_lock:
+            to_save, checkpoint = checkpoint, {}
+            if len(to_save) == 0:
+                return
+            await cluster_datamanager.set_rollover_indexed(kbid, to_save)
+            run_indexed += len(to_save)
+            state["indexed"] += len(to_save)
+            state["updated_at"] = datetime.now().isoformat()
+            rate = run_indexed / max(time.monotonic() - run_started, 1e-3)
+            state["eta"] = max(state["total"] - state["indexed"], 0) / rate
+            await cluster_datamanager.set_rollover_state(kbid, state)
+            logger.warning(
+                "Rollover indexing progress",
+                extra={
+                    "kbid": kbid,
+                    "indexed": state["indexed"],
+                    "total": state["total"],
+                    "eta": int(state["eta"]),
+                },
             )
 
-        resource_index_message = await index_resource(
-            app_context, kbid, resource_id, shard
+    async def enqueue(resource_ids: list[str]) -> None:
+        shard_ids = await resources_datamanager.get_resource_shard_ids(
+            kbid, resource_ids
         )
-        if resource_index_message is None:
-            continue
-
-        indexed_resources[resource_id] = (
-            shard_id,
-            resource_index_message.metadata.modified.ToDatetime(),
+        already_indexed = await cluster_datamanager.get_rollover_indexed(
+            kbid, resource_ids
         )
-        wait_index_batch.append(shard)
+        for resource_id, shard_id, indexed in zip(
+            resource_ids, shard_ids, already_indexed
+        ):
+            if indexed is not None:
+                # indexed before the rollover was interrupted
+                indexed_resources[resource_id] = indexed
+                continue
+
+            if shard_id is None:
+                logger.error(
+                    "Shard id not found for resource",
+                    extra={"kbid": kbid, "resource_id": resource_id},
+                )
+                raise UnexpectedRolloverError("Shard id not found for resource")
 
-        if len(wait_index_batch) > 10:
-            node_ids = set()
-            for shard_batch in wait_index_batch:
-                for replica in shard_batch.replicas:
-                    node_ids.add(replica.node)
-            for node_id in node_ids:
-                await wait_for_node(app_context, node_id)
-            wait_index_batch = []
+            shard = _get_shard(rollover_shards, shard_id)  # type: ignore
+            if shard is None:  # pragma: no cover
+                logger.error(
+                    "Shard not found for resource",
+                    extra={
+                        "kbid": kbid,
+                        "resource_id": resource_id,
+                        "shard_id": shard_id,
+                    },
+                )
+                raise UnexpectedRolloverError(
+                    f"Shard {shard_id} not found. "
+                    "Was a new one created during migration?"
+                )
+            await queue.put((resource_id, shard_id, shard))
+
+    async def produce() -> None:
+        batch: list[str] = []
+        async for resource_id in resources_datamanager.iterate_resource_ids(kbid):
+            batch.append(resource_id)
+            if len(batch) >= batch_size:
+                await enqueue(batch)
+                batch = []
+        if len(batch) > 0:
+            await enqueue(batch)
+        for _ in range(concurrency):
+            await queue.put(None)
+
+    async def work() -> None:
+        while True:
+            item = await queue.get()
+            if item is None:
+                return
+            resource_id, shard_id, shard = item
+            await backpressure.wait(shard)
+            resource_index_message = await index_resource(
+                app_context, kbid, resource_id, shard
+            )
+            if resource_index_message is None:
+                continue
+            backpressure.sent(shard)
+
+            indexed = (shard_id, resource_index_message.metadata.modified.ToDatetime())
+            indexed_resources[resource_id] = indexed
+            checkpoint[resource_id] = indexed
+            if len(checkpoint) >= batch_size:
+                await save_checkpoint()
+
+    tasks = [asyncio.create_task(produce())]
+    tasks.extend(asyncio.create_task(work()) for _ in range(concurrency))
+    try:
+        await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+    await save_checkpoint()
 
     return indexed_resources
 
@@ -351,7 +485,7 @@ async def rollover_shards(app_context: ApplicationContext, kbid: str) -> None:
     This is a very expensive operation and should be done with care.
 
     Process:
-    - Create new shards
+    - Create new shards (or resume a previously interrupted rollover)
     - Index all resources into new shards
     - Cut over replicas to new shards
     - Validate that all resources are in the new shards
@@ -366,11 +500,19 @@ async def rollover_shards(app_context: ApplicationContext, kbid: str) -> None:
 
     logger.warning("Rolling over shards", extra={"kbid": kbid})
 
-    await create_rollover_shards(app_context, kbid)
+    cluster_datamanager = ClusterDataManager(app_context.kv_driver)
+    if (
+        await cluster_datamanager.get_kb_rollover_shards(kbid) is not None
+        and await cluster_datamanager.get_rollover_state(kbid) is not None
+    ):
+        logger.warning("Resuming interrupted rollover", extra={"kbid": kbid})
+    else:
+        await create_rollover_shards(app_context, kbid)
     indexed_resources = await index_rollover_shards(app_context, kbid)
     await cutover_shards(app_context, kbid)
     # we need to cut over BEFORE we validate the data
     await validate_indexed_data(app_context, kbid, indexed_resources)
+    await cluster_datamanager.delete_rollover_checkpoint(kbid)
 
     logger.warning("Finished rolling over shards", extra={"kbid": kbid})
 
@@ -0,0 +1,75 @@
+# Copyright (C) 2021 Bosutech XXI S.L.
+#
+# nucliadb is offered under the AGPL v3.0 and as commercial software.
+# For commercial licensing, contact us at info@nuclia.com.
+#
+# AGPL:
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+import random
+from typing import Callable, Sequence
+
+from nucliadb.common.cluster.base import AbstractIndexNode
+from nucliadb.common.cluster.settings import NodeSelectionPolicy
+
+# (replica shard id, node)
+Candidate = tuple[str, AbstractIndexNode]
+SelectionFunc = Callable[[Sequence[Candidate]], Candidate]
+
+
+def random_choice(candidates: Sequence[Candidate]) -> Candidate:
+    return random.choice(candidates)
+
+
+def least_in_flight(candidates: Sequence[Candidate]) -> Candidate:
+    return power_of_two_choices(candidates, lambda node: node.in_flight)
+
+
+def latency_ewma(candidates: Sequence[Candidate]) -> Candidate:
+    return power_of_two_choices(candidates, _latency_cost)
+
+
+def power_of_two_choices(
+    candidates: Sequence[Candidate], cost: Callable[[AbstractIndexNode], float]
+) -> Candidate:
+    """
+    Pick two random candidates and keep the one with the lowest cost. Unlike
+    always picking the cheapest candidate, this does not make every client
+    pile onto the same node while its stats are outdated.
+    """
+    if len(candidates) == 1:
+        return candidates[0]
+    first, second = random.sample(candidates, 2)
+    if cost(second[1]) < cost(first[1]):
+        return second
+    return first
+
+
+def _latency_cost(node: AbstractIndexNode) -> float:
+    # nodes nobody has queried yet are cheap so they get some traffic
+    ewma = node.latencies.ewma or 0.0
+    return ewma * (node.in_flight + 1)
+
+
+POLICIES: dict[NodeSelectionPolicy, SelectionFunc] = {
+    NodeSelectionPolicy.RANDOM: random_choice,
+    NodeSelectionPolicy.LEAST_IN_FLIGHT: least_in_flight,
+    NodeSelectionPolicy.LATENCY_EWMA: latency_ewma,
+}
+
+
+def select_node(
+    candidates: Sequence[Candidate], policy: NodeSelectionPolicy
+) -> Candidate:
+    return POLICIES[policy](candidates)
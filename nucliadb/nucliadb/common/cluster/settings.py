@@ -28,6 +28,13 @@ class ClusterDiscoveryMode(str, enum.Enum):
     SINGLE_NODE = "single_node"
 
 
+class NodeSelectionPolicy(str, enum.Enum):
+    RANDOM = "random"
+    # power of two choices: pick two random candidates and keep the best one
+    LEAST_IN_FLIGHT = "least_in_flight"
+    LATENCY_EWMA = "latency_ewma"
+
+
 class Settings(BaseSettings):
     data_path: str = "./data/node"
     standalone_mode: bool = False
@@ -69,6 +76,38 @@ class Settings(BaseSettings):
         description="Maximum number of paragraphs allowed on a single resource",
     )
 
+    node_selection_policy: NodeSelectionPolicy = Field(
+        default=NodeSelectionPolicy.RANDOM,
+        title="Node selection policy",
+        description="How to choose the replica to query for a shard. `least_in_flight` and "
+        "`latency_ewma` compare two random replicas by their in flight requests or by their "
+        "latency moving average weighted by in flight requests",
+    )
+
+    rollover_max_concurrency: int = Field(
+        default=10,
+        title="Rollover max concurrency",
+        description="Maximum number of resources indexed concurrently during a rollover",
+    )
+    rollover_batch_size: int = Field(
+        default=100,
+        title="Rollover batch size",
+        description="Number of resources to look up and checkpoint at once during a rollover",
+    )
+    rollover_node_max_pending: int = Field(
+        default=100,
+        title="Rollover node max pending",
+        description="Rollover pauses writing to a node while its index queue has more "
+        "pending messages than this",
+    )
+
+    standalone_spool_threshold: int = Field(
+        default=16 * 1024 * 1024,
+        title="Standalone spool threshold",
+        description="Resources larger than this number of bytes once serialized are "
+        "handed to the local index node through a memory mapped spool file",
+    )
+
     local_reader_threads: int = 5
     local_writer_threads: int = 5
 
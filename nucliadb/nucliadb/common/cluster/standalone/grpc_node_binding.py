@@ -22,9 +22,10 @@ from __future__ import annotations
 import asyncio
 import logging
 import os
+import tempfile
 import threading
 from concurrent.futures import ThreadPoolExecutor
-from typing import AsyncIterator
+from typing import AsyncIterator, Optional
 
 from nucliadb_protos.nodereader_pb2 import (
     DocumentItem,
@@ -287,6 +288,43 @@ async def Search(self, request: SearchRequest, retry: bool = False) -> SearchRes
             raise
 
 
+class ResourcePayload:
+    """
+    Resource serialized once and handed to the local index node for each of
+    its replicas, without going through the indexing storage.
+
+    Payloads larger than `standalone_spool_threshold` are written to a spool
+    file that the node maps in memory. Call `close` once it is indexed.
+    """
+
+    def __init__(self, resource: Resource):
+        self.resource = resource
+        self.data: Optional[bytes] = None
+        self.path: Optional[str] = None
+
+    def serialize(self) -> None:
+        if self.data is not None or self.path is not None:
+            return
+        data = self.resource.SerializeToString()
+        if len(data) <= settings.standalone_spool_threshold:
+            self.data = data
+            return
+        spool_path = os.path.join(settings.data_path, "spool")
+        os.makedirs(spool_path, exist_ok=True)
+        fd, self.path = tempfile.mkstemp(dir=spool_path, suffix=".pb")
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+
+    def close(self) -> None:
+        self.data = None
+        if self.path is not None:
+            try:
+                os.unlink(self.path)
+            except FileNotFoundError:  # pragma: no cover
+                pass
+            self.path = None
+
+
 class StandaloneWriterWrapper:
     writer: NodeWriter
 
@@ -381,6 +419,29 @@ class StandaloneWriterWrapper:
         op_status.ParseFromString(pb_bytes)
         return op_status
 
+    async def SetResourcePayload(
+        self, payload: ResourcePayload, shard_id: str
+    ) -> OpStatus:
+        loop = asyncio.get_running_loop()
+        resp = await loop.run_in_executor(
+            self.executor, self._set_resource_payload, payload, shard_id
+        )
+        pb_bytes = bytes(resp)
+        op_status = OpStatus()
+        op_status.ParseFromString(pb_bytes)
+        return op_status
+
+    def _set_resource_payload(self, payload: ResourcePayload, shard_id: str):
+        if not hasattr(self.writer, "set_resource_from_buffer"):  # pragma: no cover
+            # node binding without payload handoff support
+            resource = payload.resource
+            resource.shard_id = resource.resource.shard_id = shard_id
+            return self.writer.set_resource(resource.SerializeToString())
+        payload.serialize()
+        if payload.path is not None:
+            return self.writer.set_resource_from_file(payload.path, shard_id)
+        return self.writer.set_resource_from_buffer(payload.data, shard_id)
+
     async def RemoveResource(self, request: ResourceID) -> OpStatus:
         loop = asyncio.get_running_loop()
         resp = await loop.run_in_executor(
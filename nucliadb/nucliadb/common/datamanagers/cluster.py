@@ -17,8 +17,10 @@
 # You should have received a copy of the GNU Affero General Public License
 # along with this program. If not, see <http://www.gnu.org/licenses/>.
 #
+import json
 import logging
-from typing import Optional
+from datetime import datetime
+from typing import Any, Optional
 
 from nucliadb.common.maindb.driver import Driver
 from nucliadb_protos import writer_pb2
@@ -29,6 +31,9 @@ from .utils import get_kv_pb
 logger = logging.getLogger(__name__)
 
 KB_ROLLOVER_SHARDS = "/kbs/{kbid}/rollover-shards"
+KB_ROLLOVER_CHECKPOINT_BASE = "/kbs/{kbid}/rollover/"
+KB_ROLLOVER_STATE = KB_ROLLOVER_CHECKPOINT_BASE + "state"
+KB_ROLLOVER_INDEXED = KB_ROLLOVER_CHECKPOINT_BASE + "indexed/{rid}"
 
 
 class ClusterDataManager:
@@ -37,7 +42,7 @@ class ClusterDataManager:
 
     async def get_kb_shards(self, kbid: str) -> Optional[writer_pb2.Shards]:
         key = KB_SHARDS.format(kbid=kbid)
-        async with self.driver.transaction(wait_for_abort=False) as txn:
+        async with self.driver.transaction(wait_for_abort=False, read_only=True) as txn:
             return await get_kv_pb(txn, key, writer_pb2.Shards)
 
     async def update_kb_shards(self, kbid: str, kb_shards: writer_pb2.Shards) -> None:
@@ -48,7 +53,7 @@ class ClusterDataManager:
 
     async def get_kb_rollover_shards(self, kbid: str) -> Optional[writer_pb2.Shards]:
         key = KB_ROLLOVER_SHARDS.format(kbid=kbid)
-        async with self.driver.transaction(wait_for_abort=False) as txn:
+        async with self.driver.transaction(wait_for_abort=False, read_only=True) as txn:
             return await get_kv_pb(txn, key, writer_pb2.Shards)
 
     async def update_kb_rollover_shards(
@@ -75,3 +80,64 @@ class ClusterDataManager:
                     return shard
 
         return None
+
+    async def get_rollover_state(self, kbid: str) -> Optional[dict[str, Any]]:
+        key = KB_ROLLOVER_STATE.format(kbid=kbid)
+        async with self.driver.transaction(read_only=True) as txn:
+            payload = await txn.get(key)
+        if payload is None:
+            return None
+        return json.loads(payload)
+
+    async def set_rollover_state(self, kbid: str, state: dict[str, Any]) -> None:
+        key = KB_ROLLOVER_STATE.format(kbid=kbid)
+        async with self.driver.transaction() as txn:
+            await txn.set(key, json.dumps(state).encode())
+            await txn.commit()
+
+    async def get_rollover_indexed(
+        self, kbid: str, resource_ids: list[str]
+    ) -> list[Optional[tuple[str, datetime]]]:
+        """
+        Returns the shard and the modification date the resources were
+        indexed with during the current rollover, None if not indexed yet.
+        """
+        keys = [KB_ROLLOVER_INDEXED.format(kbid=kbid, rid=rid) for rid in resource_ids]
+        async with self.driver.transaction(read_only=True) as txn:
+            payloads = await txn.batch_get(keys)
+        result: list[Optional[tuple[str, datetime]]] = []
+        for payload in payloads:
+            if payload is None:
+                result.append(None)
+                continue
+            data = json.loads(payload)
+            result.append((data["shard"], datetime.fromisoformat(data["modified"])))
+        return result
+
+    async def set_rollover_indexed(
+        self, kbid: str, indexed: dict[str, tuple[str, datetime]]
+    ) -> None:
+        if len(indexed) == 0:
+            return
+        async with self.driver.transaction() as txn:
+            for rid, (shard_id, modified) in indexed.items():
+                await txn.set(
+                    KB_ROLLOVER_INDEXED.format(kbid=kbid, rid=rid),
+                    json.dumps(
+                        {"shard": shard_id, "modified": modified.isoformat()}
+                    ).encode(),
+                )
+            await txn.commit()
+
+    async def delete_rollover_checkpoint(
+        self, kbid: str, batch_size: int = 500
+    ) -> None:
+        prefix = KB_ROLLOVER_CHECKPOINT_BASE.format(kbid=kbid)
+        while True:
+            async with self.driver.transaction() as txn:
+                keys = [key async for key in txn.keys(prefix, count=batch_size)]
+                if len(keys) == 0:
+                    return
+                for key in keys:
+                    await txn.delete(key)
+                await txn.commit()
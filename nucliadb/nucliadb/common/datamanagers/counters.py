@@ -0,0 +1,268 @@
+# Copyright (C) 2021 Bosutech XXI S.L.
+#
+# nucliadb is offered under the AGPL v3.0 and as commercial software.
+# For commercial licensing, contact us at info@nuclia.com.
+#
+# AGPL:
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+import json
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Optional
+
+from nucliadb.common.maindb.driver import Driver, Transaction
+from nucliadb.common.maindb.exceptions import ConflictError
+
+# Counters are split by ingest partition so that consumers of different
+# partitions never write the same key. The total is the sum of all of them.
+KB_COUNTERS_BASE = "/kbs/{kbid}/counters/"
+KB_COUNTERS = KB_COUNTERS_BASE + "{partition}"
+# Written by the reconciliation job. Counters of a kb can only be trusted
+# once this key exists.
+KB_COUNTERS_RECONCILED = KB_COUNTERS_BASE + "reconciled"
+# Expiration time of the lease taken to reconcile the counters of a kb
+KB_COUNTERS_RECONCILE_LEASE = "/kbs/{kbid}/counters-lease"
+KB_RESOURCE_COUNTERS = "/kbs/{kbid}/r/{uuid}/counters"
+
+
+@dataclass
+class KBCounters:
+    resources: int = 0
+    fields: int = 0
+    paragraphs: int = 0
+
+    def __add__(self, other: "KBCounters") -> "KBCounters":
+        return KBCounters(
+            resources=self.resources + other.resources,
+            fields=self.fields + other.fields,
+            paragraphs=self.paragraphs + other.paragraphs,
+        )
+
+    def __sub__(self, other: "KBCounters") -> "KBCounters":
+        return KBCounters(
+            resources=self.resources - other.resources,
+            fields=self.fields - other.fields,
+            paragraphs=self.paragraphs - other.paragraphs,
+        )
+
+    def serialize(self) -> bytes:
+        return json.dumps(asdict(self)).encode()
+
+    @classmethod
+    def parse(cls, payload: bytes) -> "KBCounters":
+        return cls(**json.loads(payload))
+
+
+@dataclass
+class ResourceCounters:
+    """
+    Number of paragraphs of every field of a resource, by field key
+    (i.e: `t/text1`). Needed to compute deltas when fields are updated.
+    """
+
+    paragraphs: dict[str, int] = field(default_factory=dict)
+
+    def totals(self) -> KBCounters:
+        return KBCounters(
+            resources=1,
+            fields=len(self.paragraphs),
+            paragraphs=sum(self.paragraphs.values()),
+        )
+
+    def serialize(self) -> bytes:
+        return json.dumps(self.paragraphs).encode()
+
+    @classmethod
+    def parse(cls, payload: bytes) -> "ResourceCounters":
+        return cls(paragraphs=json.loads(payload))
+
+
+class CountersDataManager:
+    def __init__(self, driver: Driver):
+        self.driver = driver
+
+    async def get_counters(self, kbid: str) -> Optional[KBCounters]:
+        """
+        Returns None if counters of the kb have never been reconciled
+        """
+        async with self.driver.transaction(read_only=True) as txn:
+            return await CountersDataManager.get_kb_counters(txn, kbid)
+
+    async def snapshot_counters(self, kbid: str) -> KBCounters:
+        """
+        Sum of the partition counters of a kb, without the reconciled
+        correction. Taken before recalculating the counters to reconcile them.
+        """
+        async with self.driver.transaction(read_only=True) as txn:
+            return await CountersDataManager.sum_kb_counters(
+                txn, kbid, reconciled=False
+            )
+
+    @classmethod
+    async def get_kb_counters(cls, txn: Transaction, kbid: str) -> Optional[KBCounters]:
+        if await txn.get(KB_COUNTERS_RECONCILED.format(kbid=kbid)) is None:
+            return None
+        return await cls.sum_kb_counters(txn, kbid)
+
+    @classmethod
+    async def sum_kb_counters(
+        cls, txn: Transaction, kbid: str, reconciled: bool = True
+    ) -> KBCounters:
+        reconciled_key = KB_COUNTERS_RECONCILED.format(kbid=kbid)
+        keys = [
+            key
+            async for key in txn.keys(KB_COUNTERS_BASE.format(kbid=kbid), count=-1)
+            if reconciled or key != reconciled_key
+        ]
+        total = KBCounters()
+        for payload in await txn.batch_get(keys):
+            if payload is not None:
+                total += KBCounters.parse(payload)
+        return total
+
+    @classmethod
+    async def add_kb_counters(
+        cls, txn: Transaction, kbid: str, partition: str, delta: KBCounters
+    ) -> None:
+        if delta == KBCounters():
+            return
+        key = KB_COUNTERS.format(kbid=kbid, partition=partition)
+        payload = await txn.get(key)
+        current = KBCounters.parse(payload) if payload is not None else KBCounters()
+        await txn.set(key, (current + delta).serialize())
+
+    @classmethod
+    async def init_kb_counters(cls, txn: Transaction, kbid: str) -> None:
+        """
+        A brand new kb has nothing to reconcile
+        """
+        await txn.set(
+            KB_COUNTERS_RECONCILED.format(kbid=kbid), KBCounters().serialize()
+        )
+
+    @classmethod
+    async def get_resource_counters(
+        cls, txn: Transaction, kbid: str, uuid: str
+    ) -> Optional[ResourceCounters]:
+        payload = await txn.get(KB_RESOURCE_COUNTERS.format(kbid=kbid, uuid=uuid))
+        if payload is None:
+            return None
+        return ResourceCounters.parse(payload)
+
+    @classmethod
+    async def batch_get_resource_counters(
+        cls, txn: Transaction, kbid: str, uuids: list[str]
+    ) -> list[Optional[ResourceCounters]]:
+        payloads = await txn.batch_get(
+            [KB_RESOURCE_COUNTERS.format(kbid=kbid, uuid=uuid) for uuid in uuids]
+        )
+        return [
+            ResourceCounters.parse(payload) if payload is not None else None
+            for payload in payloads
+        ]
+
+    @classmethod
+    async def set_resource_counters(
+        cls, txn: Transaction, kbid: str, uuid: str, counters: ResourceCounters
+    ) -> None:
+        await txn.set(
+            KB_RESOURCE_COUNTERS.format(kbid=kbid, uuid=uuid), counters.serialize()
+        )
+
+    @classmethod
+    async def update_resource_counters(
+        cls,
+        txn: Transaction,
+        kbid: str,
+        uuid: str,
+        partition: str,
+        counters: ResourceCounters,
+        previous: Optional[ResourceCounters],
+        add_to_kb: bool = True,
+    ) -> KBCounters:
+        """
+        Store the counters of a resource and add the difference with
+        the previous ones to the counters of the kb, unless `add_to_kb` is
+        False. Returns the difference.
+        """
+        if previous is None:
+            delta = counters.totals()
+        else:
+            delta = counters.totals() - previous.totals()
+        await cls.set_resource_counters(txn, kbid, uuid, counters)
+        if add_to_kb:
+            await cls.add_kb_counters(txn, kbid, partition, delta)
+        return delta
+
+    @classmethod
+    async def remove_resource_counters(
+        cls,
+        txn: Transaction,
+        kbid: str,
+        uuid: str,
+        partition: str,
+        add_to_kb: bool = True,
+    ) -> KBCounters:
+        previous = await cls.get_resource_counters(txn, kbid, uuid)
+        if previous is None:
+            return KBCounters()
+        await txn.delete(KB_RESOURCE_COUNTERS.format(kbid=kbid, uuid=uuid))
+        delta = KBCounters() - previous.totals()
+        if add_to_kb:
+            await cls.add_kb_counters(txn, kbid, partition, delta)
+        return delta
+
+    async def acquire_reconcile_lease(self, kbid: str, duration: float) -> bool:
+        """
+        Take the right to reconcile the counters of a kb for `duration`
+        seconds, so a single ingest replica recalculates them. Concurrent
+        replicas may both win on drivers without write conflicts, which is
+        harmless as reconciling is idempotent.
+        """
+        key = KB_COUNTERS_RECONCILE_LEASE.format(kbid=kbid)
+        now = time.time()
+        try:
+            async with self.driver.transaction() as txn:
+                payload = await txn.get(key)
+                if payload is not None and float(payload) > now:
+                    return False
+                await txn.set(key, str(now + duration).encode())
+                await txn.commit()
+        except ConflictError:
+            return False
+        return True
+
+    async def reconcile(
+        self, kbid: str, expected: KBCounters, snapshot: KBCounters
+    ) -> KBCounters:
+        """
+        Repair the drift between the counters of a kb and the expected
+        (recalculated) values. The correction is stored on its own key so
+        partitions are not touched. Returns the change of the counters.
+
+        `snapshot` must be taken with `snapshot_counters` before recalculating
+        `expected`: the drift is measured against it so the changes committed
+        while recalculating are kept, as they are already in the partitions.
+        The correction is overwritten, not added, so reconciling twice with
+        the same values applies it once.
+        """
+        correction = expected - snapshot
+        async with self.driver.transaction() as txn:
+            reconciled_key = KB_COUNTERS_RECONCILED.format(kbid=kbid)
+            payload = await txn.get(reconciled_key)
+            previous = KBCounters.parse(payload) if payload else KBCounters()
+            await txn.set(reconciled_key, correction.serialize())
+            await txn.commit()
+        return correction - previous
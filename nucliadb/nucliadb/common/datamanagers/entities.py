@@ -67,7 +67,7 @@ class EntitiesDataManager:
 
     async def get_entities_groups(self, kbid: str) -> kb_pb2.EntitiesGroups:
         kbent = kb_pb2.EntitiesGroups()
-        async with self.driver.transaction() as txn:
+        async with self.driver.transaction(read_only=True) as txn:
             async for group in EntitiesDataManager.iterate_entities_groups(kbid, txn):
                 eg = await EntitiesDataManager.get_entities_group(kbid, group, txn)
                 if eg is None:
@@ -36,7 +36,7 @@ class KnowledgeBoxDataManager:
     async def get_config(
         self, kbid: str
     ) -> Optional[knowledgebox_pb2.KnowledgeBoxConfig]:
-        async with self.driver.transaction() as txn:
+        async with self.driver.transaction(read_only=True) as txn:
             return await self._get_config(txn, kbid)
 
     @classmethod
@@ -53,7 +53,7 @@ class KnowledgeBoxDataManager:
 
     async def get_shards_object(self, kbid: str) -> writer_pb2.Shards:
         key = KB_SHARDS.format(kbid=kbid)
-        async with self.driver.transaction() as txn:
+        async with self.driver.transaction(read_only=True) as txn:
             payload = await txn.get(key)
             if not payload:
                 raise ShardsNotFound(kbid)
@@ -35,7 +35,7 @@ class LabelsDataManager:
         """
         Get all labels for a knowledge box (from multiple labelsets)
         """
-        async with self.driver.transaction() as txn:
+        async with self.driver.transaction(read_only=True) as txn:
             return await LabelsDataManager.inner_get_labels(kbid, txn)
 
     @classmethod
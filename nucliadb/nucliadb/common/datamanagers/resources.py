@@ -21,6 +21,11 @@ from typing import AsyncGenerator, Optional
 
 import backoff
 
+from nucliadb.common.datamanagers.counters import (
+    CountersDataManager,
+    KBCounters,
+    ResourceCounters,
+)
 from nucliadb.common.maindb.driver import Driver
 from nucliadb.ingest.orm.knowledgebox import KB_RESOURCE_SHARD
 from nucliadb.ingest.orm.knowledgebox import KnowledgeBox as KnowledgeBoxORM
@@ -28,11 +33,14 @@ from nucliadb.ingest.orm.knowledgebox import KnowledgeBox as KnowledgeBoxORM
 # These should be refactored
 from nucliadb.ingest.orm.resource import KB_RESOURCE_SLUG, KB_RESOURCE_SLUG_BASE
 from nucliadb.ingest.orm.resource import Resource as ResourceORM
-from nucliadb_protos import noderesources_pb2, writer_pb2
+from nucliadb_protos import noderesources_pb2, resources_pb2, writer_pb2
 from nucliadb_utils.storages.storage import Storage
 
 KB_MATERIALIZED_RESOURCES_COUNT = "/kbs/{kbid}/materialized/resources/count"
 
+# Resources read at once when recalculating the counters of a kb
+COUNTERS_BATCH_SIZE = 500
+
 
 class ResourcesDataManager:
     def __init__(self, driver: Driver, storage: Storage):
@@ -42,7 +50,7 @@ class ResourcesDataManager:
     @backoff.on_exception(backoff.expo, (Exception,), max_tries=3)
     async def get_all_resource_slugs(self, kbid: str) -> list[str]:
         all_slugs = []
-        async with self.driver.transaction() as txn:
+        async with self.driver.transaction(read_only=True) as txn:
             async for key in txn.keys(
                 match=KB_RESOURCE_SLUG_BASE.format(kbid=kbid), count=-1
             ):
@@ -52,7 +60,7 @@ class ResourcesDataManager:
 
     @backoff.on_exception(backoff.expo, (Exception,), max_tries=3)
     async def get_resource_id_from_slug(self, kbid: str, slug: str) -> Optional[str]:
-        async with self.driver.transaction() as txn:
+        async with self.driver.transaction(read_only=True) as txn:
             rid = await txn.get(KB_RESOURCE_SLUG.format(kbid=kbid, slug=slug))
         if rid is not None:
             return rid.decode()
@@ -73,13 +81,22 @@ class ResourcesDataManager:
 
     @backoff.on_exception(backoff.expo, (Exception,), max_tries=3)
     async def get_resource_shard_id(self, kbid: str, rid: str) -> Optional[str]:
-        async with self.driver.transaction() as txn:
+        async with self.driver.transaction(read_only=True) as txn:
             shard = await txn.get(KB_RESOURCE_SHARD.format(kbid=kbid, uuid=rid))
             if shard is not None:
                 return shard.decode()
             else:
                 return None
 
+    @backoff.on_exception(backoff.expo, (Exception,), max_tries=3)
+    async def get_resource_shard_ids(
+        self, kbid: str, rids: list[str]
+    ) -> list[Optional[str]]:
+        keys = [KB_RESOURCE_SHARD.format(kbid=kbid, uuid=rid) for rid in rids]
+        async with self.driver.transaction(read_only=True) as txn:
+            shards = await txn.batch_get(keys)
+        return [shard.decode() if shard is not None else None for shard in shards]
+
     @backoff.on_exception(backoff.expo, (Exception,), max_tries=3)
     async def get_resource(self, kbid: str, rid: str) -> Optional[ResourceORM]:
         """
@@ -96,7 +113,7 @@ class ResourcesDataManager:
     async def get_resource_index_message(
         self, kbid: str, rid: str
     ) -> Optional[noderesources_pb2.Resource]:
-        async with self.driver.transaction() as txn:
+        async with self.driver.transaction(read_only=True) as txn:
             kb_orm = KnowledgeBoxORM(txn, self.storage, kbid)
             res = await kb_orm.get(rid)
             if res is None:
@@ -118,14 +135,14 @@ class ResourcesDataManager:
         it is not the source of truth for the value so it is not ideal
         to move it to the node.
         """
-        async with self.driver.transaction() as txn:
+        async with self.driver.transaction(read_only=True) as txn:
             return await txn.count(KB_RESOURCE_SLUG_BASE.format(kbid=kbid))
 
     async def get_number_of_resources(self, kbid: str) -> int:
         """
         Return cached number of resources in a knowledgebox.
         """
-        async with self.driver.transaction() as txn:
+        async with self.driver.transaction(read_only=True) as txn:
             raw_value = await txn.get(KB_MATERIALIZED_RESOURCES_COUNT.format(kbid=kbid))
             if raw_value is None:
                 return -1
@@ -138,6 +155,85 @@ class ResourcesDataManager:
             )
             await txn.commit()
 
+    async def calculate_counters(self, kbid: str) -> Optional[KBCounters]:
+        """
+        Recalculate the counters of a knowledgebox from the stored counters
+        of every resource, read in batches. Returns None if some resource
+        has no counters yet (i.e: created before counters existed and not
+        backfilled yet by the migration).
+
+        This is slow and only meant to reconcile the counters
+        maintained by the processor.
+        """
+        slugs = await self.get_all_resource_slugs(kbid)
+        total = KBCounters()
+        for start in range(0, len(slugs), COUNTERS_BATCH_SIZE):
+            batch = slugs[start : start + COUNTERS_BATCH_SIZE]
+            async with self.driver.transaction(read_only=True) as txn:
+                rids = await txn.batch_get(
+                    [KB_RESOURCE_SLUG.format(kbid=kbid, slug=slug) for slug in batch]
+                )
+                all_counters = await CountersDataManager.batch_get_resource_counters(
+                    txn, kbid, [rid.decode() for rid in rids if rid is not None]
+                )
+            for counters in all_counters:
+                if counters is None:
+                    return None
+                total += counters.totals()
+        return total
+
+    async def backfill_resource_counters(self, kbid: str) -> int:
+        """
+        Compute the counters of the resources created before counters
+        existed from their index message. Returns the number of resources
+        backfilled.
+
+        This downloads every field of those resources and is only meant
+        to be run once, by a migration.
+        """
+        backfilled = 0
+        async for rid in self.iterate_resource_ids(kbid):
+            async with self.driver.transaction() as txn:
+                if (
+                    await CountersDataManager.get_resource_counters(txn, kbid, rid)
+                    is not None
+                ):
+                    continue
+                resource = await KnowledgeBoxORM(txn, self.storage, kbid).get(rid)
+                if resource is None:
+                    continue
+                resource.replace_indexer(await resource.generate_index_message())
+                counters = await self.compute_resource_counters(resource)
+                await CountersDataManager.set_resource_counters(
+                    txn, kbid, rid, counters
+                )
+                await txn.commit()
+            backfilled += 1
+        return backfilled
+
+    @classmethod
+    async def compute_resource_counters(
+        cls, resource: ResourceORM, previous: Optional[ResourceCounters] = None
+    ) -> ResourceCounters:
+        """
+        Count the paragraphs of every field of the resource. Fields that are not
+        in the index message of the resource keep their previous count.
+        """
+        brain = resource.indexer.brain
+        counters = ResourceCounters()
+        for field_type, field_id in await resource.get_fields_ids():
+            field_key = resource.generate_field_id(
+                resources_pb2.FieldID(field_type=field_type, field=field_id)
+            )
+            if field_key in brain.paragraphs:
+                paragraphs = len(brain.paragraphs[field_key].paragraphs)
+            elif previous is not None:
+                paragraphs = previous.paragraphs.get(field_key, 0)
+            else:
+                paragraphs = 0
+            counters.paragraphs[field_key] = paragraphs
+        return counters
+
     async def get_broker_message(
         self, kbid: str, rid: str
     ) -> Optional[writer_pb2.BrokerMessage]:
@@ -145,7 +241,7 @@ class ResourcesDataManager:
         if resource is None:
             return None
 
-        async with self.driver.transaction() as txn:
+        async with self.driver.transaction(read_only=True) as txn:
             resource.disable_vectors = False
             resource.txn = txn
             bm = await resource.generate_broker_message()
@@ -37,7 +37,11 @@ class Transaction:
     async def commit(self):
         raise NotImplementedError()
 
-    async def batch_get(self, keys: List[str]):
+    async def batch_get(self, keys: List[str]) -> List[Optional[bytes]]:
+        """
+        Get the values of multiple keys at once. Values are returned
+        in the same order as the requested keys, `None` for missing keys.
+        """
         raise NotImplementedError()
 
     async def get(self, key: str) -> Optional[bytes]:
@@ -74,12 +78,16 @@ class Driver:
                 except Exception:
                     pass
 
-    async def begin(self) -> Transaction:
+    async def begin(self, read_only: bool = False) -> Transaction:
+        """
+        :param read_only: hint that the transaction will not write. Drivers
+                          may use it to avoid holding a server side transaction.
+        """
         raise NotImplementedError()
 
     @asynccontextmanager
     async def transaction(
-        self, wait_for_abort: bool = True
+        self, wait_for_abort: bool = True, read_only: bool = False
     ) -> AsyncGenerator[Transaction, None]:
         """
         Use to make sure transaction is always aborted.
@@ -87,11 +95,12 @@ class Driver:
         :param wait_for_abort: If True, wait for abort to finish before returning.
                                If False, abort is done in background (unless there
                                is an error)
+        :param read_only: If True, the transaction can not be used to write.
         """
         txn: Optional[Transaction] = None
         error: bool = False
         try:
-            txn = await self.begin()
+            txn = await self.begin(read_only=read_only)
             yield txn
         except Exception:
             error = True
@@ -19,3 +19,11 @@
 #
 class ConflictError(Exception):
     ...
+
+
+class ReadOnlyTransactionError(Exception):
+    ...
+
+
+class TransactionClosedError(Exception):
+    ...
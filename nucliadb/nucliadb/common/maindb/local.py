@@ -105,26 +105,8 @@ class LocalTransaction(Transaction):
         self.clean()
         self.open = False
 
-    async def batch_get(self, keys: List[str]):
-        results = []
-        for key in keys:
-            if key in self.deleted_keys:
-                raise KeyError(f"Not found {key}")
-
-            if key in self.modified_keys:
-                results.append(self.modified_keys[key])
-                keys.remove(key)
-
-            if key in self.visited_keys:
-                results.append(self.visited_keys[key])
-                keys.remove(key)
-
-        if len(keys) > 0:
-            for key in keys:
-                obj = await self.get(key)
-                if obj:
-                    results.append(obj)
-        return results
+    async def batch_get(self, keys: List[str]) -> List[Optional[bytes]]:
+        return [await self.get(key) for key in keys]
 
     async def get(self, key: str) -> Optional[bytes]:
         if key in self.deleted_keys:
@@ -216,7 +198,7 @@ class LocalDriver(Driver):
     async def finalize(self):
         pass
 
-    async def begin(self) -> LocalTransaction:
+    async def begin(self, read_only: bool = False) -> LocalTransaction:
         if self.url is None:
             raise AttributeError("Invalid url")
         return LocalTransaction(self.url, self)
@@ -20,11 +20,15 @@
 from __future__ import annotations
 
 import asyncio
-from typing import Any, AsyncGenerator, List, Optional
+from typing import Any, AsyncGenerator, Dict, List, Optional, Tuple, Union
 
 import asyncpg
 
 from nucliadb.common.maindb.driver import DEFAULT_SCAN_LIMIT, Driver, Transaction
+from nucliadb.common.maindb.exceptions import (
+    ReadOnlyTransactionError,
+    TransactionClosedError,
+)
 
 CREATE_TABLE = """
 CREATE TABLE IF NOT EXISTS resources (
@@ -33,6 +37,13 @@ CREATE TABLE IF NOT EXISTS resources (
 );
 """
 
+UPSERT = """
+INSERT INTO resources (key, value)
+VALUES ($1, $2)
+ON CONFLICT (key)
+DO UPDATE SET value = EXCLUDED.value
+"""
+
 
 class DataLayer:
     def __init__(self, connection: asyncpg.Connection):
@@ -47,22 +58,28 @@ class DataLayer:
 
     async def set(self, key: str, value: bytes) -> None:
         async with self.lock:
-            await self.connection.execute(
-                """
-INSERT INTO resources (key, value)
-VALUES ($1, $2)
-ON CONFLICT (key)
-DO UPDATE SET value = EXCLUDED.value
-""",
-                key,
-                value,
-            )
+            await self.connection.execute(UPSERT, key, value)
+
+    async def set_many(self, items: List[Tuple[str, bytes]]) -> None:
+        if len(items) == 0:
+            return
+        async with self.lock:
+            # executemany prepares the statement once and pipelines the rows
+            await self.connection.executemany(UPSERT, items)
 
     async def delete(self, key: str) -> None:
         async with self.lock:
             await self.connection.execute("DELETE FROM resources WHERE key = $1", key)
 
-    async def batch_get(self, keys: List[str]) -> List[bytes]:
+    async def delete_many(self, keys: List[str]) -> None:
+        if len(keys) == 0:
+            return
+        async with self.lock:
+            await self.connection.execute(
+                "DELETE FROM resources WHERE key = ANY($1)", keys
+            )
+
+    async def batch_get(self, keys: List[str]) -> List[Optional[bytes]]:
         async with self.lock:
             records = {
                 record["key"]: record["value"]
@@ -71,7 +88,7 @@ DO UPDATE SET value = EXCLUDED.value
                 )
             }
         # get sorted by keys
-        return [records[key] for key in keys]
+        return [records.get(key) for key in keys]
 
     async def scan_keys(
         self,
@@ -102,6 +119,11 @@ ORDER BY key
 
 
 class PGTransaction(Transaction):
+    """
+    Writes are buffered in memory and sent to the server in batches when
+    the transaction is committed (or before a query that needs to see them).
+    """
+
     driver: PGDriver
 
     def __init__(
@@ -117,39 +139,69 @@ class PGTransaction(Transaction):
         self.txn = txn
         self.driver = driver
         self.open = True
+        self.modified: Dict[str, Optional[bytes]] = {}
         self._lock = asyncio.Lock()
 
+    async def _release(self):
+        self.open = False
+        self.modified.clear()
+        await self.pool.release(self.connection)
+
     async def abort(self):
         async with self._lock:
             if self.open:
                 try:
                     await self.txn.rollback()
                 finally:
-                    self.open = False
-                    await self.connection.close()
+                    await self._release()
 
     async def commit(self):
         async with self._lock:
+            if not self.open:
+                # its connection was already released to the pool
+                raise TransactionClosedError("Transaction already committed or aborted")
             try:
+                await self._flush()
                 await self.txn.commit()
             except Exception:
                 await self.txn.rollback()
                 raise
             finally:
-                self.open = False
-                await self.connection.close()
+                await self._release()
+
+    async def _flush(self):
+        if len(self.modified) == 0:
+            return
+        to_set: List[Tuple[str, bytes]] = []
+        to_delete: List[str] = []
+        for key, value in self.modified.items():
+            if value is None:
+                to_delete.append(key)
+            else:
+                to_set.append((key, value))
+        # only the last operation on every key is kept, so the order
+        # between upserts and deletes does not matter
+        await self.data_layer.set_many(to_set)
+        await self.data_layer.delete_many(to_delete)
+        self.modified.clear()
 
-    async def batch_get(self, keys: List[str]):
-        return await self.data_layer.batch_get(keys)
+    async def batch_get(self, keys: List[str]) -> List[Optional[bytes]]:
+        pending = [key for key in keys if key not in self.modified]
+        fetched = dict(zip(pending, await self.data_layer.batch_get(pending)))
+        return [
+            self.modified[key] if key in self.modified else fetched[key] for key in keys
+        ]
 
     async def get(self, key: str) -> Optional[bytes]:
+        if key in self.modified:
+            return self.modified[key]
         return await self.data_layer.get(key)
 
     async def set(self, key: str, value: bytes):
-        await self.data_layer.set(key, value)
+        self.modified[key] = value
 
     async def delete(self, key: str):
-        await self.data_layer.delete(key)
+        self.modified[key] = None
 
     async def keys(
         self,
@@ -164,20 +216,87 @@ class PGTransaction(Transaction):
                 yield key
 
     async def count(self, match: str) -> int:
+        await self._flush()
         return await self.data_layer.count(match)
 
 
+class ReadOnlyPGTransaction(Transaction):
+    """
+    Does not hold a connection nor a server side transaction: every
+    operation borrows an autocommit connection from the pool.
+    """
+
+    driver: PGDriver
+
+    def __init__(self, pool: asyncpg.Pool, driver: PGDriver):
+        self.pool = pool
+        self.driver = driver
+        self.open = True
+
+    async def abort(self):
+        self.open = False
+
+    async def commit(self):
+        self.open = False
+
+    async def batch_get(self, keys: List[str]) -> List[Optional[bytes]]:
+        async with self.pool.acquire() as conn:
+            return await DataLayer(conn).batch_get(keys)
+
+    async def get(self, key: str) -> Optional[bytes]:
+        async with self.pool.acquire() as conn:
+            return await DataLayer(conn).get(key)
+
+    async def set(self, key: str, value: bytes):
+        raise ReadOnlyTransactionError(f"Can not set {key} in a read only transaction")
+
+    async def delete(self, key: str):
+        raise ReadOnlyTransactionError(
+            f"Can not delete {key} in a read only transaction"
+        )
+
+    async def keys(
+        self,
+        match: str,
+        count: int = DEFAULT_SCAN_LIMIT,
+        include_start: bool = True,
+    ):
+        # cursors can only be used inside a transaction
+        async with self.pool.acquire() as conn, conn.transaction():
+            dl = DataLayer(conn)
+            async for key in dl.scan_keys(match, count, include_start=include_start):
+                yield key
+
+    async def count(self, match: str) -> int:
+        async with self.pool.acquire() as conn:
+            return await DataLayer(conn).count(match)
+
+
 class PGDriver(Driver):
     pool: asyncpg.Pool
 
-    def __init__(self, url: str):
+    def __init__(
+        self,
+        url: str,
+        connection_pool_min_size: int = 10,
+        connection_pool_max_size: int = 10,
+        statement_cache_size: int = 100,
+    ):
         self.url = url
+        self.connection_pool_min_size = connection_pool_min_size
+        self.connection_pool_max_size = connection_pool_max_size
+        self.statement_cache_size = statement_cache_size
         self._lock = asyncio.Lock()
 
     async def initialize(self):
         async with self._lock:
             if self.initialized is False:
-                self.pool = await asyncpg.create_pool(self.url)
+                self.pool = await asyncpg.create_pool(
+                    self.url,
+                    min_size=self.connection_pool_min_size,
+                    max_size=self.connection_pool_max_size,
+                    statement_cache_size=self.statement_cache_size,
+                )
 
                 # check if table exists
                 try:
@@ -193,7 +312,11 @@ class PGDriver(Driver):
             await self.pool.close()
             self.initialized = False
 
-    async def begin(self) -> PGTransaction:
+    async def begin(
+        self, read_only: bool = False
+    ) -> Union[PGTransaction, ReadOnlyPGTransaction]:
+        if read_only:
+            return ReadOnlyPGTransaction(self.pool, driver=self)
         conn: asyncpg.Connection = await self.pool.acquire()
         txn = conn.transaction()
         await txn.start()
@@ -80,25 +80,27 @@ class RedisTransaction(Transaction):
         self.clean()
         self.open = False
 
-    async def batch_get(self, keys: List[str]):
-        results = []
+    async def batch_get(self, keys: List[str]) -> List[Optional[bytes]]:
+        results: Dict[str, Optional[bytes]] = {}
+        to_fetch: List[str] = []
         for key in keys:
             if key in self.deleted_keys:
-                raise KeyError(f"Not found {key}")
-
-            if key in self.modified_keys:
-                results.append(self.modified_keys[key])
-                keys.remove(key)
-
-            if key in self.visited_keys:
-                results.append(self.visited_keys[key])
-                keys.remove(key)
-
-        if len(keys) > 0:
-            bytes_keys: List[bytes] = [x.encode() for x in keys]
+                results[key] = None
+            elif key in self.modified_keys:
+                results[key] = self.modified_keys[key]
+            elif key in self.visited_keys:
+                results[key] = self.visited_keys[key]
+            else:
+                to_fetch.append(key)
+
+        if len(to_fetch) > 0:
+            bytes_keys: List[bytes] = [x.encode() for x in to_fetch]
             objs = await self.redis.mget(bytes_keys)
-            results.extend(objs)
-        return results
+            for key, obj in zip(to_fetch, objs):
+                results[key] = obj
+                if obj is not None:
+                    self.visited_keys[key] = obj
+        return [results[key] for key in keys]
 
     async def get(self, key: str) -> Optional[bytes]:
         if key in self.deleted_keys:
@@ -193,5 +195,5 @@ class RedisDriver(Driver):
             await self.redis.close()
             self.initialized = False
 
-    async def begin(self) -> RedisTransaction:
+    async def begin(self, read_only: bool = False) -> RedisTransaction:
         return RedisTransaction(self.redis, driver=self)
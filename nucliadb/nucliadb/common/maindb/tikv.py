@@ -80,10 +80,12 @@ class TiKVTransaction(Transaction):
                     raise
         self.open = False
 
-    async def batch_get(self, keys: List[str]):
+    async def batch_get(self, keys: List[str]) -> List[Optional[bytes]]:
         bytes_keys: List[bytes] = [x.encode() for x in keys]
         with tikv_observer({"type": "batch_get"}):
-            return await self.txn.batch_get(bytes_keys)
+            # tikv only returns the (key, value) pairs of existing keys
+            found = dict(await self.txn.batch_get(bytes_keys))
+        return [found.get(key) for key in bytes_keys]
 
     @backoff.on_exception(backoff.expo, (TimeoutError,), max_tries=2)
     async def get(self, key: str) -> Optional[bytes]:
@@ -248,7 +250,7 @@ class TiKVDriver(Driver):
     async def finalize(self):
         pass
 
-    async def begin(self) -> TiKVTransaction:
+    async def begin(self, read_only: bool = False) -> TiKVTransaction:
         if self.tikv is None:
             raise AttributeError()
         with tikv_observer({"type": "begin"}):
@@ -20,6 +20,8 @@
 import asyncio
 import logging
 import time
+from contextlib import AsyncExitStack
+from functools import partial
 from typing import Optional
 
 import backoff
@@ -37,7 +39,12 @@ from nucliadb.ingest.orm.processor import Processor, sequence_manager
 from nucliadb_telemetry import context, errors, metrics
 from nucliadb_utils import const
 from nucliadb_utils.cache.pubsub import PubSubDriver
-from nucliadb_utils.nats import MessageProgressUpdater, NatsConnectionManager
+from nucliadb_utils.nats import (
+    MessageProgressUpdater,
+    NatsConnectionManager,
+    SequenceTracker,
+    is_last_delivery,
+)
 from nucliadb_utils.settings import nats_consumer_settings
 from nucliadb_utils.storages.storage import Storage
 
@@ -66,6 +73,20 @@ consumer_observer = metrics.Observer(
 
 
 class IngestConsumer:
+    """
+    With `max_concurrency` > 1, messages of different resources are processed
+    concurrently while messages of the same resource keep their order. The
+    last seqid of the partition is then tracked by the consumer and only
+    advanced up to the lowest seqid for which all previous ones are done.
+
+    Otherwise, with `group_commit_max_messages` > 1, small autocommit messages
+    of different resources are grouped and applied in a single maindb
+    transaction. A group is committed when it is full, after
+    `group_commit_linger` seconds or before any message that can not be part
+    of it. If the group fails, its messages are processed one by one so
+    every failing message is deadlettered on its own.
+    """
+
     def __init__(
         self,
         driver: Driver,
@@ -73,6 +94,10 @@ class IngestConsumer:
         storage: Storage,
         nats_connection_manager: NatsConnectionManager,
         pubsub: Optional[PubSubDriver] = None,
+        max_concurrency: int = 1,
+        group_commit_max_messages: int = 1,
+        group_commit_linger: float = 0.05,
+        group_commit_max_message_size: int = 64 * 1024,
     ):
         self.driver = driver
         self.partition = partition
@@ -81,7 +106,22 @@ class IngestConsumer:
         self.initialized = False
 
         self.lock = asyncio.Lock()
-        self.processor = Processor(driver, storage, pubsub, partition)
+        self.processor = Processor(
+            driver, storage, pubsub, partition, defer_kb_counters=max_concurrency > 1
+        )
+
+        self.max_concurrency = max_concurrency
+        self.concurrency = asyncio.Semaphore(max_concurrency)
+        # last scheduled task of every (kbid, uuid)
+        self.resource_tasks: dict[tuple[str, str], asyncio.Task] = {}
+        self.sequence_tracker: Optional[SequenceTracker] = None
+        self.sequence_lock = asyncio.Lock()
+
+        self.group_commit_max_messages = group_commit_max_messages
+        self.group_commit_linger = group_commit_linger
+        self.group_commit_max_message_size = group_commit_max_message_size
+        self.group: list[tuple[Msg, BrokerMessage, int]] = []
+        self.group_linger_task: Optional[asyncio.Task] = None
 
     async def initialize(self):
         await self.setup_nats_subscription()
@@ -89,6 +129,8 @@ class IngestConsumer:
 
     async def setup_nats_subscription(self):
         last_seqid = await sequence_manager.get_last_seqid(self.driver, self.partition)
+        if self.max_concurrency > 1 and self.sequence_tracker is None:
+            self.sequence_tracker = SequenceTracker(last_seqid or 0)
         if last_seqid is None:
             last_seqid = 1
         subject = const.Streams.INGEST.subject.format(partition=self.partition)
@@ -103,7 +145,7 @@ class IngestConsumer:
                 deliver_policy=nats.js.api.DeliverPolicy.BY_START_SEQUENCE,
                 opt_start_seq=last_seqid,
                 ack_policy=nats.js.api.AckPolicy.EXPLICIT,
-                max_ack_pending=nats_consumer_settings.nats_max_ack_pending,
+                max_ack_pending=self.max_ack_pending,
                 max_deliver=nats_consumer_settings.nats_max_deliver,
                 ack_wait=nats_consumer_settings.nats_ack_wait,
                 idle_heartbeat=nats_consumer_settings.nats_idle_heartbeat,
@@ -113,9 +155,35 @@ class IngestConsumer:
             f"Subscribed to {subject} on stream {const.Streams.INGEST.name} from {last_seqid}"
         )
 
+    @property
+    def max_ack_pending(self) -> int:
+        """
+        NATS does not deliver more messages than these until they are ACKd,
+        so it must allow as many as the messages processed or grouped at
+        once. Their order is then kept by the consumer.
+        """
+        max_ack_pending = nats_consumer_settings.nats_max_ack_pending
+        if self.max_concurrency > 1:
+            max_ack_pending = max(max_ack_pending, self.max_concurrency)
+        elif self.group_commit_max_messages > 1:
+            max_ack_pending = max(max_ack_pending, self.group_commit_max_messages)
+        return max_ack_pending
+
     @backoff.on_exception(backoff.expo, (ConflictError,), max_tries=4)
     async def _process(self, pb: BrokerMessage, seqid: int):
-        await self.processor.process(pb, seqid, self.partition)
+        if self.sequence_tracker is None:
+            await self.processor.process(pb, seqid, self.partition)
+            return
+
+        # messages are processed concurrently, the sequence is checked
+        # and stored by the consumer instead of the processor
+        if self.sequence_tracker.is_processed(seqid):
+            raise SequenceOrderViolation(self.sequence_tracker.last_seqid)
+        await self.processor.process(pb, seqid, self.partition, transaction_check=False)
+
+    @backoff.on_exception(backoff.expo, (ConflictError,), max_tries=4)
+    async def _process_group(self, messages: list[tuple[BrokerMessage, int]]):
+        await self.processor.txn_group(messages, self.partition)
 
     async def get_broker_message(self, msg: Msg) -> BrokerMessage:
         pb_data = msg.data
@@ -139,6 +207,183 @@ class IngestConsumer:
                 logger.warning("Could not delete blob reference", exc_info=True)
 
     async def subscription_worker(self, msg: Msg):
+        if self.max_concurrency > 1:
+            await self.schedule_message(msg)
+            return
+
+        if self.group_commit_max_messages > 1:
+            await self.group_message(msg)
+            return
+
+        async with MessageProgressUpdater(
+            msg, nats_consumer_settings.nats_ack_wait * 0.66
+        ), self.lock:
+            await self.handle_message(msg)
+
+    def is_groupable(self, msg: Msg) -> bool:
+        if msg.headers is not None and msg.headers.get("X-MESSAGE-TYPE") == "PROXY":
+            return False
+        return len(msg.data) <= self.group_commit_max_message_size
+
+    async def group_message(self, msg: Msg) -> None:
+        """
+        Add the message to the current group, committing the group first if
+        the message can not be part of it.
+        """
+        pb = None
+        if self.is_groupable(msg):
+            try:
+                pb = BrokerMessage()
+                pb.ParseFromString(msg.data)
+            except Exception:
+                # let handle_message report it
+                pb = None
+
+        if pb is None or pb.type != BrokerMessage.MessageType.AUTOCOMMIT:
+            await self.flush_group()
+            async with MessageProgressUpdater(
+                msg, nats_consumer_settings.nats_ack_wait * 0.66
+            ), self.lock:
+                await self.handle_message(msg, pb)
+            return
+
+        if any(
+            (pb.kbid, pb.uuid) == (grouped.kbid, grouped.uuid)
+            for _, grouped, _ in self.group
+        ):
+            # messages of the same resource are applied on their own, in order
+            await self.flush_group()
+
+        seqid = int(msg.reply.split(".")[5])
+        self.group.append((msg, pb, seqid))
+        if len(self.group) >= self.group_commit_max_messages:
+            await self.flush_group()
+        elif self.group_linger_task is None:
+            self.group_linger_task = asyncio.create_task(self._linger_group())
+
+    async def _linger_group(self) -> None:
+        await asyncio.sleep(self.group_commit_linger)
+        self.group_linger_task = None
+        await self.flush_group()
+
+    async def flush_group(self) -> None:
+        if self.group_linger_task is not None:
+            self.group_linger_task.cancel()
+            self.group_linger_task = None
+
+        async with self.lock:
+            group, self.group = self.group, []
+            if len(group) == 0:
+                return
+            async with AsyncExitStack() as stack:
+                for msg, _, _ in group:
+                    await stack.enter_async_context(
+                        MessageProgressUpdater(
+                            msg, nats_consumer_settings.nats_ack_wait * 0.66
+                        )
+                    )
+                await self.handle_group(group)
+
+    async def handle_group(self, group: list[tuple[Msg, BrokerMessage, int]]):
+        if len(group) > 1:
+            start = time.monotonic()
+            try:
+                await self._process_group([(pb, seqid) for _, pb, seqid in group])
+            except Exception:
+                logger.warning(
+                    "Could not commit group of messages, processing them one by one",
+                    exc_info=True,
+                    extra={"partition": self.partition, "messages": len(group)},
+                )
+            else:
+                logger.info(
+                    f"Successfully processed group of {len(group)} messages. "
+                    f"nucliadb seqids: {group[0][2]}-{group[-1][2]}, "
+                    f"partition: {self.partition}, "
+                    f"total time: {time.monotonic() - start:.2f}s"
+                )
+                for msg, _, _ in group:
+                    await msg.ack()
+                return
+
+        for msg, pb, _ in group:
+            try:
+                await self.handle_message(msg, pb)
+            except Exception:
+                # already reported and not ACKd, it will be retried
+                pass
+
+    async def schedule_message(self, msg: Msg) -> None:
+        """
+        Process the message in a task once a concurrency slot is available
+        and previous messages of the same resource are done.
+        """
+        seqid = int(msg.reply.split(".")[5])
+        try:
+            pb = await self.get_broker_message(msg)
+        except Exception as e:
+            errors.capture_exception(e)
+            logger.exception(
+                "Could not read message. Message has not been ACKd and will be retried."
+            )
+            await msg.nak()
+            raise e
+
+        await self.concurrency.acquire()
+        key = (pb.kbid, pb.uuid)
+        if self.sequence_tracker is not None:
+            self.sequence_tracker.start(seqid)
+        task = asyncio.create_task(
+            self._run_scheduled(msg, pb, seqid, self.resource_tasks.get(key))
+        )
+        self.resource_tasks[key] = task
+        task.add_done_callback(partial(self._scheduled_done, key))
+
+    async def _run_scheduled(
+        self,
+        msg: Msg,
+        pb: BrokerMessage,
+        seqid: int,
+        previous: Optional[asyncio.Task],
+    ) -> None:
+        try:
+            if previous is not None:
+                await asyncio.wait([previous])
+            async with MessageProgressUpdater(
+                msg, nats_consumer_settings.nats_ack_wait * 0.66
+            ):
+                try:
+                    await self.handle_message(msg, pb)
+                except Exception:
+                    if not is_last_delivery(
+                        msg, nats_consumer_settings.nats_max_deliver
+                    ):
+                        # not ACKd: the message will be redelivered so the
+                        # seqid stays pending
+                        return
+                    # it will never be redelivered: its seqid is skipped, as
+                    # serial processing does when a later message is stored
+            await self.finish_seqid(seqid)
+        finally:
+            self.concurrency.release()
+
+    def _scheduled_done(self, key: tuple[str, str], task: asyncio.Task) -> None:
+        if self.resource_tasks.get(key) is task:
+            del self.resource_tasks[key]
+
+    async def finish_seqid(self, seqid: int) -> None:
+        if self.sequence_tracker is None:
+            return
+        if self.sequence_tracker.finish(seqid) is None:
+            return
+        async with self.sequence_lock:
+            # read it again, it may have advanced while waiting for the lock
+            last_seqid = self.sequence_tracker.last_seqid
+            async with self.driver.transaction() as txn:
+                await sequence_manager.set_last_seqid(txn, self.partition, last_seqid)
+                await txn.commit()
+
+    async def handle_message(self, msg: Msg, pb: Optional[BrokerMessage] = None):
         subject = msg.subject
         reply = msg.reply
         seqid = int(reply.split(".")[5])
@@ -148,90 +393,86 @@ class IngestConsumer:
         message_source = "<msg source not set>"
         start = time.monotonic()
 
-        async with MessageProgressUpdater(
-            msg, nats_consumer_settings.nats_ack_wait * 0.66
-        ), self.lock:
-            try:
+        try:
+            if pb is None:
                 pb = await self.get_broker_message(msg)
-                if pb.source == pb.MessageSource.PROCESSOR:
-                    message_source = "processing"
-                elif pb.source == pb.MessageSource.WRITER:
-                    message_source = "writer"
-                if pb.HasField("audit"):
-                    audit_time = pb.audit.when.ToDatetime().isoformat()
-                else:
-                    audit_time = ""
-
-                logger.debug(
-                    f"Received from {message_source} on {pb.kbid}/{pb.uuid} seq {seqid} partition {self.partition} at {time}"  # noqa
-                )
-                context.add_context({"kbid": pb.kbid, "rid": pb.uuid})
+            if pb.source == pb.MessageSource.PROCESSOR:
+                message_source = "processing"
+            elif pb.source == pb.MessageSource.WRITER:
+                message_source = "writer"
+            if pb.HasField("audit"):
+                audit_time = pb.audit.when.ToDatetime().isoformat()
+            else:
+                audit_time = ""
 
-                try:
-                    with consumer_observer(
-                        {
-                            "source": "writer"
-                            if pb.source == pb.MessageSource.WRITER
-                            else "processor"
-                        }
-                    ):
-                        await self._process(pb, seqid)
-                except SequenceOrderViolation as err:
-                    log_func = logger.error
-                    if seqid == err.last_seqid:  # pragma: no cover
-                        # Occasional retries of the last processed message may happen
-                        log_func = logger.warning
-                    log_func(
-                        f"Old txn: DISCARD (nucliadb seqid: {seqid}, partition: {self.partition}). Current seqid: {err.last_seqid}"  # noqa
-                    )
-                else:
-                    message_type_name = pb.MessageType.Name(pb.type)
-                    time_to_process = time.monotonic() - start
-                    log_level = (
-                        logging.INFO if time_to_process < 10 else logging.WARNING
-                    )
-                    logger.log(
-                        log_level,
-                        f"Successfully processed {message_type_name} message from \
-                            {message_source}. kb: {pb.kbid}, resource: {pb.uuid}, \
-                                nucliadb seqid: {seqid}, partition: {self.partition} as {audit_time}, \
-                                    total time: {time_to_process:.2f}s",
-                    )
-            except DeadletteredError as e:
-                # Messages that have been sent to deadletter at some point
-                # We don't want to process it again so it's ack'd
-                errors.capture_exception(e)
-                logger.info(
-                    f"An error happend while processing a message from {message_source}. "
-                    f"A copy of the message has been stored on {self.processor.storage.deadletter_bucket}. "
-                    f"Check sentry for more details: {str(e)}"
-                )
-                await msg.ack()
-            except (ShardsNotFound,) as e:
-                # Any messages that for some unexpected inconsistency have failed and won't be tried again
-                # as we cannot do anything about it
-                # - ShardsNotFound: /kb/{id}/shards key or the whole /kb/{kbid} is missing
-                errors.capture_exception(e)
-                logger.info(
-                    f"An error happend while processing a message from {message_source}. "
-                    f"This message has been dropped and won't be retried again"
-                    f"Check sentry for more details: {str(e)}"
-                )
-                await msg.ack()
-            except Exception as e:
-                # Unhandled exceptions that need to be retried after a small delay
-                errors.capture_exception(e)
-                logger.exception(
-                    f"An error happend while processing a message from {message_source}. "
-                    "Message has not been ACKd and will be retried. "
-                    f"Check sentry for more details: {str(e)}"
+            logger.debug(
+                f"Received from {message_source} on {pb.kbid}/{pb.uuid} seq {seqid} partition {self.partition} at {time}"  # noqa
+            )
+            context.add_context({"kbid": pb.kbid, "rid": pb.uuid})
+
+            try:
+                with consumer_observer(
+                    {
+                        "source": "writer"
+                        if pb.source == pb.MessageSource.WRITER
+                        else "processor"
+                    }
+                ):
+                    await self._process(pb, seqid)
+            except SequenceOrderViolation as err:
+                log_func = logger.error
+                if seqid == err.last_seqid:  # pragma: no cover
+                    # Occasional retries of the last processed message may happen
+                    log_func = logger.warning
+                log_func(
+                    f"Old txn: DISCARD (nucliadb seqid: {seqid}, partition: {self.partition}). Current seqid: {err.last_seqid}"  # noqa
                 )
-                await msg.nak()
-                raise e
             else:
-                # Successful processing
-                await msg.ack()
-                await self.clean_broker_message(msg)
+                message_type_name = pb.MessageType.Name(pb.type)
+                time_to_process = time.monotonic() - start
+                log_level = logging.INFO if time_to_process < 10 else logging.WARNING
+                logger.log(
+                    log_level,
+                    f"Successfully processed {message_type_name} message from \
+                        {message_source}. kb: {pb.kbid}, resource: {pb.uuid}, \
+                            nucliadb seqid: {seqid}, partition: {self.partition} as {audit_time}, \
+                                total time: {time_to_process:.2f}s",
+                )
+        except DeadletteredError as e:
+            # Messages that have been sent to deadletter at some point
+            # We don't want to process it again so it's ack'd
+            errors.capture_exception(e)
+            logger.info(
+                f"An error happend while processing a message from {message_source}. "
+                f"A copy of the message has been stored on {self.processor.storage.deadletter_bucket}. "
+                f"Check sentry for more details: {str(e)}"
+            )
+            await msg.ack()
+        except (ShardsNotFound,) as e:
+            # Any messages that for some unexpected inconsistency have failed and won't be tried again
+            # as we cannot do anything about it
+            # - ShardsNotFound: /kb/{id}/shards key or the whole /kb/{kbid} is missing
+            errors.capture_exception(e)
+            logger.info(
+                f"An error happend while processing a message from {message_source}. "
+                f"This message has been dropped and won't be retried again"
+                f"Check sentry for more details: {str(e)}"
+            )
+            await msg.ack()
+        except Exception as e:
+            # Unhandled exceptions that need to be retried after a small delay
+            errors.capture_exception(e)
+            logger.exception(
+                f"An error happend while processing a message from {message_source}. "
+                "Message has not been ACKd and will be retried. "
+                f"Check sentry for more details: {str(e)}"
+            )
+            await msg.nak()
+            raise e
+        else:
+            # Successful processing
+            await msg.ack()
+            await self.clean_broker_message(msg)
 
 
 class IngestProcessedConsumer(IngestConsumer):
@@ -273,3 +514,9 @@ class IngestProcessedConsumer(IngestConsumer):
         transaction ids from regular ingest writes and writes coming from processor.
         """
         await self.processor.process(pb, seqid, self.partition, transaction_check=False)
+
+    @backoff.on_exception(backoff.expo, (ConflictError,), max_tries=4)
+    async def _process_group(self, messages: list[tuple[BrokerMessage, int]]):
+        await self.processor.txn_group(
+            messages, self.partition, transaction_check=False
+        )
@@ -19,10 +19,12 @@
 #
 
 import logging
+import time
 import uuid
 from functools import partial
 
 from nucliadb.common.cluster.utils import get_shard_manager
+from nucliadb.common.datamanagers.counters import CountersDataManager, KBCounters
 from nucliadb.common.datamanagers.resources import ResourcesDataManager
 from nucliadb.common.maindb.driver import Driver
 from nucliadb_protos import writer_pb2
@@ -46,6 +48,10 @@ class MaterializerHandler:
     the data. The task will be scheduled with a delay to allow
     for multiple resources to be written but a single materialization
     will be done.
+
+    Counters of a kb are maintained by the processor; here they are only
+    reconciled, at most once every `reconcile_interval` seconds per kb and
+    by a single replica, the one taking the reconcile lease of the kb.
     """
 
     subscription_id: str
@@ -57,8 +63,12 @@ class MaterializerHandler:
         pubsub: PubSubDriver,
         storage: Storage,
         check_delay: float = 30.0,
+        reconcile_interval: float = 3600.0,
     ):
         self.resources_data_manager = ResourcesDataManager(driver, storage)
+        self.counters_data_manager = CountersDataManager(driver)
+        self.reconcile_interval = reconcile_interval
+        self.last_reconciled: dict[str, float] = {}
         self.pubsub = pubsub
         self.shard_manager = get_shard_manager()
         self.task_handler = DelayedTaskHandler(check_delay)
@@ -96,6 +106,43 @@ class MaterializerHandler:
 
     async def process(self, kbid: str) -> None:
         logger.info(f"Materializing knowledgebox", extra={"kbid": kbid})
+        # still used until the counters of the kb are reconciled
         await self.resources_data_manager.set_number_of_resources(
             kbid, await self.resources_data_manager.calculate_number_of_resources(kbid)
         )
+
+        last_reconciled = self.last_reconciled.get(kbid)
+        if (
+            last_reconciled is not None
+            and time.monotonic() - last_reconciled < self.reconcile_interval
+        ):
+            return
+        self.last_reconciled[kbid] = time.monotonic()
+        if await self.counters_data_manager.acquire_reconcile_lease(
+            kbid, self.reconcile_interval
+        ):
+            await self.reconcile_counters(kbid)
+
+    async def reconcile_counters(self, kbid: str) -> None:
+        logger.info(f"Reconciling knowledgebox counters", extra={"kbid": kbid})
+        snapshot = await self.counters_data_manager.snapshot_counters(kbid)
+        expected = await self.resources_data_manager.calculate_counters(kbid)
+        if expected is None:
+            logger.info(
+                "Knowledgebox has resources without counters, not reconciling",
+                extra={"kbid": kbid},
+            )
+            return
+        correction = await self.counters_data_manager.reconcile(
+            kbid, expected, snapshot
+        )
+        if correction != KBCounters():
+            logger.warning(
+                "Knowledgebox counters drifted",
+                extra={
+                    "kbid": kbid,
+                    "resources": correction.resources,
+                    "fields": correction.fields,
+                    "paragraphs": correction.paragraphs,
+                },
+            )
@@ -107,6 +107,12 @@ async def start_ingest_consumers(
             storage=storage,
             pubsub=pubsub,
             nats_connection_manager=nats_connection_manager,
+            max_concurrency=settings.consumer_max_concurrency,
+            group_commit_max_messages=settings.consumer_group_commit_max_messages,
+            group_commit_linger=settings.consumer_group_commit_linger,
+            group_commit_max_message_size=(
+                settings.consumer_group_commit_max_message_size
+            ),
         )
         await consumer.initialize()
 
@@ -146,6 +152,10 @@ async def start_ingest_processed_consumer(
         storage=storage,
         pubsub=pubsub,
         nats_connection_manager=nats_connection_manager,
+        max_concurrency=settings.consumer_max_concurrency,
+        group_commit_max_messages=settings.consumer_group_commit_max_messages,
+        group_commit_linger=settings.consumer_group_commit_linger,
+        group_commit_max_message_size=settings.consumer_group_commit_max_message_size,
     )
     await consumer.initialize()
 
@@ -189,7 +199,12 @@ async def start_materializer() -> Callable[[], Awaitable[None]]:
     pubsub = await get_pubsub()
     assert pubsub is not None, "Pubsub is not configured"
     storage = await get_storage(service_name=SERVICE_NAME)
-    materializer = MaterializerHandler(driver=driver, storage=storage, pubsub=pubsub)
+    materializer = MaterializerHandler(
+        driver=driver,
+        storage=storage,
+        pubsub=pubsub,
+        reconcile_interval=settings.counters_reconcile_interval,
+    )
     await materializer.initialize()
 
     return materializer.finalize
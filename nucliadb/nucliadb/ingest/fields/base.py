@@ -20,9 +20,13 @@
 from __future__ import annotations
 
 import enum
+import hashlib
+import json
 from datetime import datetime
 from typing import Any, Dict, List, Optional, Tuple, Type
+from uuid import uuid4
 
+from nucliadb_protos.noderesources_pb2 import Resource as PBBrainResource
 from nucliadb_protos.resources_pb2 import (
     CloudFile,
     ExtractedTextWrapper,
@@ -48,6 +52,8 @@ from nucliadb_utils.storages.storage import Storage, StorageField
 
 KB_RESOURCE_FIELD = "/kbs/{kbid}/r/{uuid}/f/{type}/{field}"
 KB_RESOURCE_ERROR = "/kbs/{kbid}/r/{uuid}/f/{type}/{field}/error"
+KB_RESOURCE_FIELD_REVISIONS = "/kbs/{kbid}/r/{uuid}/f/{type}/{field}/revisions"
+KB_RESOURCE_FIELD_INDEX_CACHE = "/kbs/{kbid}/r/{uuid}/f/{type}/{field}/index_cache"
 
 SUBFIELDFIELDS = ["l", "c"]
 
@@ -60,6 +66,7 @@ class FieldTypes(str, enum.Enum):
     FIELD_LARGE_METADATA = "large_metadata"
     THUMBNAIL = "thumbnail"
     QUESTION_ANSWERS = "question_answers"
+    INDEX_CACHE = "index_cache"
 
 
 class Field:
@@ -72,6 +79,7 @@ class Field:
     large_computed_metadata: Optional[LargeComputedMetadata]
     extracted_user_vectors: Optional[UserVectorSet]
     question_answers: Optional[QuestionAnswers]
+    revisions: Optional[Dict[str, str]]
 
     def __init__(
         self,
@@ -90,6 +98,7 @@ class Field:
         self.large_computed_metadata = None
         self.extracted_user_vectors = None
         self.question_answers = None
+        self.revisions = None
 
         self.id: str = id
         self.resource: Any = resource
@@ -149,6 +158,7 @@ class Field:
         field_base_key = KB_RESOURCE_FIELD.format(
             kbid=self.kbid, uuid=self.uuid, type=self.type, field=self.id
         )
+        await self.delete_index_cache()
         # Make sure we explicitly delete the field and any nested key
         keys_to_delete = []
         async for key in self.resource.txn.keys(field_base_key):
@@ -167,6 +177,23 @@ class Field:
         except KeyError:
             pass
 
+    async def delete_index_cache(self) -> None:
+        content_hash = await self.resource.txn.get(
+            KB_RESOURCE_FIELD_INDEX_CACHE.format(
+                kbid=self.kbid, uuid=self.uuid, type=self.type, field=self.id
+            )
+        )
+        if content_hash is None:
+            return
+        await self.delete_index_cache_payload(content_hash.decode())
+
+    async def delete_index_cache_payload(self, content_hash: str) -> None:
+        sf = self.get_index_cache_storage_field(content_hash)
+        try:
+            await self.storage.delete_upload(sf.key, sf.bucket)
+        except KeyError:
+            pass
+
     async def delete_extracted_text(self) -> None:
         sf = self.get_storage_field(FieldTypes.FIELD_TEXT)
         try:
@@ -209,6 +236,77 @@ class Field:
             error.SerializeToString(),
         )
 
+    async def get_revisions(self) -> Dict[str, str]:
+        if self.revisions is None:
+            payload = await self.resource.txn.get(
+                KB_RESOURCE_FIELD_REVISIONS.format(
+                    kbid=self.kbid, uuid=self.uuid, type=self.type, field=self.id
+                )
+            )
+            self.revisions = json.loads(payload) if payload is not None else {}
+        return self.revisions
+
+    async def set_revision(self, part: str) -> None:
+        """
+        Record that a part of the field used to index it has changed
+        """
+        revisions = dict(await self.get_revisions())
+        revisions[part] = uuid4().hex
+        await self.resource.txn.set(
+            KB_RESOURCE_FIELD_REVISIONS.format(
+                kbid=self.kbid, uuid=self.uuid, type=self.type, field=self.id
+            ),
+            json.dumps(revisions).encode(),
+        )
+        self.revisions = revisions
+
+    async def get_content_hash(self, *extra: str) -> Optional[str]:
+        """
+        Hash of the content the field is indexed from, None if it is not known
+        because the field was written before revisions were recorded.
+        """
+        revisions = await self.get_revisions()
+        if len(revisions) == 0:
+            return None
+        content = json.dumps([sorted(revisions.items()), extra])
+        return hashlib.md5(content.encode()).hexdigest()
+
+    def get_index_cache_storage_field(self, content_hash: str) -> StorageField:
+        return self.storage.file_extracted(
+            self.kbid,
+            self.uuid,
+            self.type,
+            self.id,
+            f"{FieldTypes.INDEX_CACHE.value}/{content_hash}",
+        )
+
+    async def get_index_cache(self, content_hash: str) -> Optional[PBBrainResource]:
+        sf = self.get_index_cache_storage_field(content_hash)
+        return await self.storage.download_pb(sf, PBBrainResource)
+
+    async def set_index_cache(
+        self, content_hash: str, brain: PBBrainResource
+    ) -> Optional[str]:
+        """
+        Store the index payload of the field. It is stored by content hash so
+        a payload is never used for a content it was not built from, even if
+        the transaction storing it is aborted.
+
+        Returns the content hash of the payload it replaces, to be deleted with
+        `delete_index_cache_payload` once the transaction is committed.
+        """
+        key = KB_RESOURCE_FIELD_INDEX_CACHE.format(
+            kbid=self.kbid, uuid=self.uuid, type=self.type, field=self.id
+        )
+        previous = await self.resource.txn.get(key)
+        await self.storage.upload_pb(
+            self.get_index_cache_storage_field(content_hash), brain
+        )
+        await self.resource.txn.set(key, content_hash.encode())
+        if previous is None or previous.decode() == content_hash:
+            return None
+        return previous.decode()
+
     async def get_question_answers(self) -> Optional[QuestionAnswers]:
         if self.question_answers is None:
             sf = self.get_storage_field(FieldTypes.QUESTION_ANSWERS)
@@ -267,6 +365,7 @@ class Field:
                 actual_payload.text = payload.body.text
             await self.storage.upload_pb(sf, actual_payload)
             self.extracted_text = actual_payload
+        await self.set_revision(FieldTypes.FIELD_TEXT.value)
 
     async def get_extracted_text(self, force=False) -> Optional[ExtractedText]:
         if self.extracted_text is None or force:
@@ -329,6 +428,7 @@ class Field:
                 actual_payload.vectors.CopyFrom(payload.vectors.vectors)
             await self.storage.upload_pb(sf, actual_payload)
             self.extracted_vectors = actual_payload
+        await self.set_revision(FieldTypes.FIELD_VECTORS.value)
         return vo, replace_field, replace_splits
 
     async def get_vectors(self, force=False) -> Optional[VectorObject]:
@@ -373,6 +473,7 @@ class Field:
             actual_payload = user_vectors.vectors
         await self.storage.upload_pb(sf, actual_payload)
         self.extracted_user_vectors = actual_payload
+        await self.set_revision(FieldTypes.USER_FIELD_VECTORS.value)
         return actual_payload, vectors_to_delete
 
     async def get_user_vectors(self, force=False) -> Optional[UserVectorSet]:
@@ -445,6 +546,7 @@ class Field:
             await self.storage.upload_pb(sf, actual_payload)
             self.computed_metadata = actual_payload
 
+        await self.set_revision(FieldTypes.FIELD_METADATA.value)
         return self.computed_metadata, replace_field, replace_splits
 
     async def get_field_metadata(
@@ -107,6 +107,7 @@ class File(Field):
         )
         await self.storage.upload_pb(sf, file_extracted_data)
         self.file_extracted_data = file_extracted_data
+        await self.set_revision(FILE_METADATA)
 
     async def get_file_extracted_data(self) -> Optional[FileExtractedData]:
         if self.file_extracted_data is None:
@@ -209,6 +209,21 @@ class ResourceBrain:
                 f"{self.rid}/{field_key}/{sentence_to_delete}"
             )
 
+    def apply_field_index(self, field_key: str, field_brain: PBBrainResource):
+        """
+        Apply the index payload of a single field, generated on its own
+        ResourceBrain
+        """
+        if field_key in field_brain.texts:
+            self.brain.texts[field_key].text = field_brain.texts[field_key].text
+        if field_key in field_brain.paragraphs:
+            for key, paragraph in field_brain.paragraphs[field_key].paragraphs.items():
+                self.brain.paragraphs[field_key].paragraphs[key].CopyFrom(paragraph)
+        self.brain.relations.extend(field_brain.relations)
+        for vectorset, vectors in field_brain.vectors.items():
+            for key, vector in vectors.vectors.items():
+                self.brain.vectors[vectorset].vectors[key].CopyFrom(vector)
+
     def delete_metadata(self, field_key: str, metadata: FieldComputedMetadata):
         for subfield, metadata_split in metadata.split_metadata.items():
             for paragraph in metadata_split.paragraphs:
@@ -39,6 +39,7 @@ from nucliadb.common.cluster.base import AbstractIndexNode
 from nucliadb.common.cluster.exceptions import ShardNotFound
 from nucliadb.common.cluster.manager import get_index_node
 from nucliadb.common.cluster.utils import get_shard_manager
+from nucliadb.common.datamanagers.counters import CountersDataManager
 from nucliadb.common.datamanagers.exceptions import KnowledgeBoxNotFound
 from nucliadb.common.datamanagers.kb import KnowledgeBoxDataManager
 from nucliadb.common.datamanagers.labels import KB_LABELSET, LabelsDataManager
@@ -207,6 +208,7 @@ class KnowledgeBox:
             ),
             config.SerializeToString(),
         )
+        await CountersDataManager.init_kb_counters(txn, uuid)
         # Create Storage
         storage = await get_storage(service_name=SERVICE_NAME)
 
@@ -25,10 +25,13 @@ import aiohttp.client_exceptions
 
 from nucliadb.common.cluster.settings import settings as cluster_settings
 from nucliadb.common.cluster.utils import get_shard_manager
+from nucliadb.common.datamanagers.counters import CountersDataManager, KBCounters
 from nucliadb.common.datamanagers.exceptions import KnowledgeBoxNotFound
 from nucliadb.common.datamanagers.kb import KnowledgeBoxDataManager
+from nucliadb.common.datamanagers.resources import ResourcesDataManager
 from nucliadb.common.maindb.driver import Driver, Transaction
 from nucliadb.common.maindb.exceptions import ConflictError
+from nucliadb.ingest.fields.base import Field
 from nucliadb.ingest.orm.exceptions import (
     DeadletteredError,
     KnowledgeBoxConflict,
@@ -38,7 +41,11 @@ from nucliadb.ingest.orm.exceptions import (
 from nucliadb.ingest.orm.knowledgebox import KnowledgeBox
 from nucliadb.ingest.orm.metrics import processor_observer
 from nucliadb.ingest.orm.processor import sequence_manager
-from nucliadb.ingest.orm.resource import Resource
+from nucliadb.ingest.orm.resource import (
+    FieldIndexPayload,
+    Resource,
+    delete_index_payloads,
+)
 from nucliadb_protos import (
     knowledgebox_pb2,
     noderesources_pb2,
@@ -100,6 +107,7 @@ class Processor:
         storage: Storage,
         pubsub: Optional[PubSubDriver] = None,
         partition: Optional[str] = None,
+        defer_kb_counters: bool = False,
     ):
         self.messages = {}
         self.driver = driver
@@ -108,6 +116,12 @@ class Processor:
         self.pubsub = pubsub
         self.shard_manager = get_shard_manager()
         self.kb_data_manager = KnowledgeBoxDataManager(driver)
+        # When messages are processed concurrently, transactions of different
+        # resources would overwrite each other's kb counters. Their changes
+        # are then applied after commit, one transaction at a time.
+        self.defer_kb_counters = defer_kb_counters
+        self.pending_kb_counters: Dict[Tuple[str, str], KBCounters] = {}
+        self.kb_counters_lock = asyncio.Lock()
 
     async def process(
         self,
@@ -166,6 +180,7 @@ class Processor:
 
         uuid = await self.get_resource_uuid(kb, message)
         shard_id = await kb.get_resource_shard_id(uuid)
+        counters_delta = KBCounters()
         if shard_id is None:
             logger.warning(f"Resource {uuid} does not exist")
         else:
@@ -177,6 +192,13 @@ class Processor:
                 shard, message.uuid, seqid, partition, message.kbid
             )
             try:
+                counters_delta = await CountersDataManager.remove_resource_counters(
+                    txn,
+                    message.kbid,
+                    uuid,
+                    partition,
+                    add_to_kb=not self.defer_kb_counters,
+                )
                 await kb.delete_resource(message.uuid)
             except Exception as exc:
                 await txn.abort()
@@ -192,6 +214,7 @@ class Processor:
             if transaction_check:
                 await sequence_manager.set_last_seqid(txn, partition, seqid)
             await txn.commit()
+            await self.add_deferred_kb_counters(message.kbid, partition, counters_delta)
         await self.notify_commit(
             partition=partition,
             seqid=seqid,
@@ -239,6 +262,7 @@ class Processor:
         resource: Optional[Resource] = None
         handled_exception = None
         created = False
+        index_payloads: List[FieldIndexPayload] = []
 
         try:
             for message in messages:
@@ -257,9 +281,16 @@ class Processor:
                 await resource.compute_global_tags(resource.indexer)
                 if message.reindex:
                     # when reindexing, let's just generate full new index message
-                    resource.replace_indexer(await resource.generate_index_message())
+                    (
+                        brain,
+                        index_payloads,
+                    ) = await resource.generate_index_message_with_payloads()
+                    resource.replace_indexer(brain)
 
             if resource and resource.modified:
+                counters_delta = await self.update_counters(
+                    txn, kbid, partition, resource
+                )
                 await self.index_resource(  # noqa
                     resource=resource,
                     txn=txn,
@@ -269,10 +300,13 @@ class Processor:
                     partition=partition,
                     kb=kb,
                 )
+                replaced_payloads = await resource.store_index_payloads(index_payloads)
 
                 if transaction_check:
                     await sequence_manager.set_last_seqid(txn, partition, seqid)
                 await txn.commit()
+                await self.add_deferred_kb_counters(kbid, partition, counters_delta)
+                await delete_index_payloads(replaced_payloads)
 
                 if created or resource.slug_modified:
                     await self.commit_slug(resource)
@@ -335,6 +369,181 @@ class Processor:
 
         return None
 
+    @processor_observer.wrap({"type": "txn_group"})
+    async def txn_group(
+        self,
+        messages: List[Tuple[writer_pb2.BrokerMessage, int]],
+        partition: str,
+        transaction_check: bool = True,
+    ) -> None:
+        """
+        Apply autocommit messages of different resources in a single maindb
+        transaction with a single seqid advance.
+
+        Nothing is committed if any message fails: the exception is raised so
+        the caller can process the messages one by one, which deadletters them
+        individually.
+        """
+        if len(messages) == 0:
+            return None
+
+        last_seqid = None
+        if transaction_check:
+            last_seqid = await sequence_manager.get_last_seqid(self.driver, partition)
+
+        txn = await self.driver.begin()
+        existing_kbs: Dict[str, bool] = {}
+        applied: List[Tuple[writer_pb2.BrokerMessage, int, Resource, bool]] = []
+        replaced_payloads: List[Tuple[Field, str]] = []
+        counters_deltas: List[Tuple[str, KBCounters]] = []
+        try:
+            for message, seqid in messages:
+                if last_seqid is not None and seqid <= last_seqid:
+                    logger.warning(
+                        "Old txn: DISCARD "
+                        f"(nucliadb seqid: {seqid}, partition: {partition})"
+                    )
+                    continue
+
+                kbid = message.kbid
+                if kbid not in existing_kbs:
+                    existing_kbs[kbid] = await KnowledgeBox.exist_kb(txn, kbid)
+                if not existing_kbs[kbid]:
+                    logger.warning(f"KB {kbid} is deleted: skiping txn")
+                    continue
+
+                kb = KnowledgeBox(txn, self.storage, kbid)
+                uuid = await self.get_resource_uuid(kb, message)
+                result = await self.apply_resource(message, kb)
+                if result is None:
+                    continue
+                resource, created = result
+                applied.append((message, seqid, resource, created))
+
+                await resource.compute_global_text()
+                await resource.compute_global_tags(resource.indexer)
+                index_payloads: List[FieldIndexPayload] = []
+                if message.reindex:
+                    (
+                        brain,
+                        index_payloads,
+                    ) = await resource.generate_index_message_with_payloads()
+                    resource.replace_indexer(brain)
+
+                if resource.modified:
+                    counters_delta = await self.update_counters(
+                        txn, kbid, partition, resource
+                    )
+                    counters_deltas.append((kbid, counters_delta))
+                    await self.index_resource(
+                        resource=resource,
+                        txn=txn,
+                        uuid=uuid,
+                        kbid=kbid,
+                        seqid=seqid,
+                        partition=partition,
+                        kb=kb,
+                    )
+                    replaced_payloads.extend(
+                        await resource.store_index_payloads(index_payloads)
+                    )
+
+            if transaction_check:
+                await sequence_manager.set_last_seqid(txn, partition, messages[-1][1])
+            await txn.commit()
+            for kbid, counters_delta in counters_deltas:
+                await self.add_deferred_kb_counters(kbid, partition, counters_delta)
+            await delete_index_payloads(replaced_payloads)
+
+            for message, seqid, resource, created in applied:
+                if not resource.modified:
+                    await self.notify_abort(
+                        partition=partition,
+                        seqid=seqid,
+                        multi=message.multiid,
+                        kbid=message.kbid,
+                        rid=resource.uuid,
+                    )
+                    continue
+                if created or resource.slug_modified:
+                    await self.commit_slug(resource)
+                await self.notify_commit(
+                    partition=partition,
+                    seqid=seqid,
+                    multi=message.multiid,
+                    message=message,
+                    write_type=writer_pb2.Notification.WriteType.CREATED
+                    if created
+                    else writer_pb2.Notification.WriteType.MODIFIED,
+                )
+        finally:
+            for _, _, resource, _ in applied:
+                resource.clean()
+            if txn.open:
+                await txn.abort()
+
+    @processor_observer.wrap({"type": "update_counters"})
+    async def update_counters(
+        self, txn: Transaction, kbid: str, partition: str, resource: Resource
+    ) -> KBCounters:
+        """
+        Counters are updated in the same transaction as the resource so
+        they stay exact. Any drift is repaired by the materializer.
+        Returns the change of the kb counters.
+        """
+        previous = await CountersDataManager.get_resource_counters(
+            txn, kbid, resource.uuid
+        )
+        counters = await ResourcesDataManager.compute_resource_counters(
+            resource, previous
+        )
+        return await CountersDataManager.update_resource_counters(
+            txn,
+            kbid,
+            resource.uuid,
+            partition,
+            counters,
+            previous,
+            add_to_kb=not self.defer_kb_counters,
+        )
+
+    async def add_deferred_kb_counters(
+        self, kbid: str, partition: str, delta: KBCounters
+    ) -> None:
+        """
+        Add the change of the kb counters of a committed transaction when
+        they are deferred. Changes queued while waiting for the lock are
+        applied together.
+        """
+        if not self.defer_kb_counters or delta == KBCounters():
+            return
+        key = (kbid, partition)
+        self.pending_kb_counters[key] = (
+            self.pending_kb_counters.get(key, KBCounters()) + delta
+        )
+        async with self.kb_counters_lock:
+            pending, self.pending_kb_counters = self.pending_kb_counters, {}
+            if len(pending) == 0:
+                return
+            try:
+                async with self.driver.transaction() as txn:
+                    for (
+                        pending_kbid,
+                        pending_partition,
+                    ), pending_delta in pending.items():
+                        await CountersDataManager.add_kb_counters(
+                            txn, pending_kbid, pending_partition, pending_delta
+                        )
+                    await txn.commit()
+            except Exception:
+                # the resource is already committed, the drift is repaired
+                # when the counters of the kb are reconciled
+                logger.warning(
+                    "Could not update kb counters",
+                    exc_info=True,
+                    extra={"kbids": sorted({kbid for kbid, _ in pending})},
+                )
+
     @processor_observer.wrap({"type": "index_resource"})
     async def index_resource(
         self,
@@ -20,11 +20,24 @@
 from __future__ import annotations
 
 import asyncio
+import enum
 import logging
 from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from functools import partial
-from typing import TYPE_CHECKING, Any, AsyncIterator, Optional, Tuple, Type
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Iterable,
+    Optional,
+    Tuple,
+    Type,
+)
 
+from nucliadb_protos.noderesources_pb2 import Resource as PBBrainResource
 from nucliadb_protos.resources_pb2 import AllFieldIDs as PBAllFieldIDs
 from nucliadb_protos.resources_pb2 import Basic
 from nucliadb_protos.resources_pb2 import Basic as PBBasic
@@ -50,7 +63,7 @@ from nucliadb_protos.resources_pb2 import Metadata as PBMetadata
 from nucliadb_protos.resources_pb2 import Origin as PBOrigin
 from nucliadb_protos.resources_pb2 import Paragraph, ParagraphAnnotation
 from nucliadb_protos.resources_pb2 import Relations as PBRelations
-from nucliadb_protos.resources_pb2 import UserVectorsWrapper
+from nucliadb_protos.resources_pb2 import UserFieldMetadata, UserVectorsWrapper
 from nucliadb_protos.train_pb2 import EnabledMetadata
 from nucliadb_protos.train_pb2 import Position as TrainPosition
 from nucliadb_protos.train_pb2 import (
@@ -64,7 +77,7 @@ from nucliadb_protos.utils_pb2 import Relation as PBRelation
 from nucliadb_protos.writer_pb2 import BrokerMessage
 
 from nucliadb.common.maindb.driver import Transaction
-from nucliadb.ingest.fields.base import Field
+from nucliadb.ingest.fields.base import KB_RESOURCE_FIELD, Field
 from nucliadb.ingest.fields.conversation import Conversation
 from nucliadb.ingest.fields.date import Datetime
 from nucliadb.ingest.fields.file import File
@@ -75,7 +88,8 @@ from nucliadb.ingest.fields.link import Link
 from nucliadb.ingest.fields.text import Text
 from nucliadb.ingest.orm.brain import FilePagePositions, ResourceBrain
 from nucliadb.ingest.orm.metrics import processor_observer
-from nucliadb.ingest.orm.utils import get_basic, set_basic
+from nucliadb.ingest.orm.utils import get_basic, get_basic_key, set_basic
+from nucliadb.ingest.settings import settings as ingest_settings
 from nucliadb_models.common import CloudLink
 from nucliadb_models.writer import GENERIC_MIME_TYPE
 from nucliadb_utils.storages.storage import Storage
@@ -133,6 +147,34 @@ PB_TEXT_FORMAT_TO_MIMETYPE = {
 BASIC_IMMUTABLE_FIELDS = ("icon",)
 
 
+class ResourcePart(str, enum.Enum):
+    """
+    Parts of a resource that can be loaded at once with `Resource.prefetch`
+    """
+
+    BASIC = "basic"
+    ORIGIN = "origin"
+    EXTRA = "extra"
+    RELATIONS = "relations"
+    VALUES = "values"
+    TEXT = "text"
+    METADATA = "metadata"
+    LARGE_METADATA = "large_metadata"
+    VECTORS = "vectors"
+    USER_VECTORS = "user_vectors"
+    QA = "qa"
+    FILE = "file"
+    LINK = "link"
+
+
+RESOURCE_PARTS = {
+    ResourcePart.BASIC,
+    ResourcePart.ORIGIN,
+    ResourcePart.EXTRA,
+    ResourcePart.RELATIONS,
+}
+
+
 class Resource:
     def __init__(
         self,
@@ -197,6 +239,124 @@ class Resource:
                 exists = False
         return exists
 
+    async def prefetch(
+        self,
+        parts: Iterable[ResourcePart],
+        field_types: Optional[Iterable[FieldType.ValueType]] = None,
+        max_concurrency: int = 10,
+    ) -> None:
+        """
+        Load the given parts of the resource and of its fields, optionally
+        only of fields of `field_types`, so the getters return them without
+        going to maindb or storage again.
+
+        Resource keys and the field ids are read with a single `batch_get`
+        and field values with another one. Blobs of the fields are downloaded
+        concurrently, at most `max_concurrency` at a time.
+        """
+        parts = set(parts)
+        if field_types is not None:
+            field_types = set(field_types)
+        field_parts = parts - RESOURCE_PARTS
+        kbid = self.kb.kbid
+
+        def parse(klass, attr):
+            def _parse(payload: Optional[bytes]):
+                if payload is not None:
+                    pb = klass()
+                    pb.ParseFromString(payload)
+                    setattr(self, attr, pb)
+
+            return _parse
+
+        def parse_basic(payload: Optional[bytes]):
+            self.basic = self.parse_basic(payload) if payload is not None else PBBasic()
+
+        def parse_all_fields(payload: Optional[bytes]):
+            if payload:
+                all_fields = PBAllFieldIDs()
+                all_fields.ParseFromString(payload)
+                self.all_fields_keys = [
+                    (f.field_type, f.field) for f in all_fields.fields
+                ]
+
+        loaders: list[Tuple[str, Callable[[Optional[bytes]], None]]] = []
+        if ResourcePart.BASIC in parts and self.basic is None:
+            loaders.append((get_basic_key(kbid, self.uuid), parse_basic))
+        for part, template, klass, attr in (
+            (ResourcePart.ORIGIN, KB_RESOURCE_ORIGIN, PBOrigin, "origin"),
+            (ResourcePart.EXTRA, KB_RESOURCE_EXTRA, PBExtra, "extra"),
+            (ResourcePart.RELATIONS, KB_RESOURCE_RELATIONS, PBRelations, "relations"),
+        ):
+            if part in parts and getattr(self, attr) is None:
+                key = template.format(kbid=kbid, uuid=self.uuid)
+                loaders.append((key, parse(klass, attr)))
+        if len(field_parts) > 0 and len(self.all_fields_keys) == 0:
+            key = KB_RESOURCE_ALL_FIELDS.format(kbid=kbid, uuid=self.uuid)
+            loaders.append((key, parse_all_fields))
+
+        if len(loaders) > 0:
+            payloads = await self.txn.batch_get([key for key, _ in loaders])
+            for (_, load), payload in zip(loaders, payloads):
+                load(payload)
+
+        if len(field_parts) == 0:
+            return
+
+        fields = [
+            await self.get_field(field_id, field_type, load=False)
+            for field_type, field_id in await self.get_fields_ids()
+            if field_types is None or field_type in field_types
+        ]
+
+        if ResourcePart.VALUES in parts:
+            # conversations are paginated and generic fields live in basic,
+            # they are still loaded by their getters
+            to_load = [
+                field
+                for field in fields
+                if field.value is None
+                and not isinstance(field, (Conversation, Generic))
+            ]
+            payloads = await self.txn.batch_get(
+                [
+                    KB_RESOURCE_FIELD.format(
+                        kbid=kbid, uuid=self.uuid, type=field.type, field=field.id
+                    )
+                    for field in to_load
+                ]
+            )
+            for field, payload in zip(to_load, payloads):
+                if payload is not None:
+                    field.value = field.pbklass()  # type: ignore
+                    field.value.ParseFromString(payload)
+
+        semaphore = asyncio.Semaphore(max_concurrency)
+
+        async def bounded(coro):
+            async with semaphore:
+                return await coro
+
+        downloads = []
+        for field in fields:
+            if ResourcePart.TEXT in parts:
+                downloads.append(field.get_extracted_text())
+            if ResourcePart.METADATA in parts:
+                downloads.append(field.get_field_metadata())
+            if ResourcePart.LARGE_METADATA in parts:
+                downloads.append(field.get_large_field_metadata())
+            if ResourcePart.VECTORS in parts:
+                downloads.append(field.get_vectors())
+            if ResourcePart.USER_VECTORS in parts:
+                downloads.append(field.get_user_vectors())
+            if ResourcePart.QA in parts:
+                downloads.append(field.get_question_answers())
+            if ResourcePart.FILE in parts and isinstance(field, File):
+                downloads.append(field.get_file_extracted_data())
+            if ResourcePart.LINK in parts and isinstance(field, Link):
+                downloads.append(field.get_link_extracted_data())
+        await asyncio.gather(*(bounded(download) for download in downloads))
+
     # Basic
     async def get_basic(self) -> Optional[PBBasic]:
         if self.basic is None:
@@ -358,57 +518,169 @@ class Resource:
         self.modified = True
         self.relations = relations
 
-    @processor_observer.wrap({"type": "generate_index_message"})
     async def generate_index_message(self) -> ResourceBrain:
+        brain, _ = await self.generate_index_message_with_payloads()
+        return brain
+
+    @processor_observer.wrap({"type": "generate_index_message"})
+    async def generate_index_message_with_payloads(
+        self,
+    ) -> Tuple[ResourceBrain, list[FieldIndexPayload]]:
+        """
+        Generate the index message of the resource without writing anything.
+        Also returns the index payloads of the fields that had to be generated
+        again, to be stored with `store_index_payloads` by callers that commit
+        the transaction.
+        """
+        payloads: list[FieldIndexPayload] = []
         brain = ResourceBrain(rid=self.uuid)
         origin = await self.get_origin()
         basic = await self.get_basic()
         if basic is not None:
             brain.set_resource_metadata(basic, origin)
-        await self.compute_global_tags(brain)
         fields = await self.get_fields(force=True)
+
+        content_hashes: dict[Tuple[FieldType.ValueType, str], Optional[str]] = {}
+        if ingest_settings.reindex_reuse_unchanged_fields:
+            for (type_id, field_id), field in fields.items():
+                user_field_metadata = get_user_field_metadata(basic, type_id, field_id)
+                content_hashes[(type_id, field_id)] = await field.get_content_hash(
+                    user_field_metadata.SerializeToString().hex()
+                    if user_field_metadata is not None
+                    else "",
+                    str(self.disable_vectors),
+                )
+
+        semaphore = asyncio.Semaphore(ingest_settings.reindex_max_concurrency)
+
+        async def bounded(coro):
+            async with semaphore:
+                return await coro
+
+        # stored index payloads of unchanged fields
+        cached: dict[Tuple[FieldType.ValueType, str], Optional[PBBrainResource]] = {}
+        cached_fields = [
+            (key, content_hash)
+            for key, content_hash in content_hashes.items()
+            if content_hash is not None
+        ]
+        for (key, _), field_brain in zip(
+            cached_fields,
+            await asyncio.gather(
+                *(
+                    bounded(fields[key].get_index_cache(content_hash))
+                    for key, content_hash in cached_fields
+                )
+            ),
+        ):
+            cached[key] = field_brain
+
+        # download everything needed to index the fields concurrently, the
+        # parts are kept by the field objects
+        await asyncio.gather(
+            *(
+                bounded(part)
+                for key, field in fields.items()
+                for part in self._get_field_index_parts(
+                    field, metadata_only=cached.get(key) is not None
+                )
+            )
+        )
+
+        await self.compute_global_tags(brain)
         for (type_id, field_id), field in fields.items():
-            fieldid = FieldID(field_type=type_id, field=field_id)  # type: ignore
-            await self.compute_global_text_field(fieldid, brain)
+            if not ingest_settings.reindex_reuse_unchanged_fields:
+                await self._generate_field_index_message(
+                    brain, type_id, field_id, field, basic
+                )
+                continue
 
-            field_metadata = await field.get_field_metadata()
-            field_key = self.generate_field_id(fieldid)
-            if field_metadata is not None:
-                page_positions: Optional[FilePagePositions] = None
-                if type_id == FieldType.FILE and isinstance(field, File):
-                    page_positions = await get_file_page_positions(field)
-
-                user_field_metadata = None
-                if basic is not None:
-                    user_field_metadata = next(
-                        (
-                            fm
-                            for fm in basic.fieldmetadata
-                            if fm.field.field == field_id
-                            and fm.field.field_type == type_id
-                        ),
-                        None,
-                    )
-                brain.apply_field_metadata(
-                    field_key,
-                    field_metadata,
-                    replace_field=[],
-                    replace_splits={},
-                    page_positions=page_positions,
-                    extracted_text=await field.get_extracted_text(),
-                    basic_user_field_metadata=user_field_metadata,
+            field_key = self.generate_field_id(
+                FieldID(field_type=type_id, field=field_id)  # type: ignore
+            )
+            field_brain = cached.get((type_id, field_id))
+            if field_brain is None:
+                field_resource_brain = ResourceBrain(rid=self.uuid)
+                await self._generate_field_index_message(
+                    field_resource_brain, type_id, field_id, field, basic
                 )
+                field_brain = field_resource_brain.brain
+                content_hash = content_hashes[(type_id, field_id)]
+                if content_hash is not None:
+                    payloads.append(FieldIndexPayload(field, content_hash, field_brain))
+            brain.apply_field_index(field_key, field_brain)
+        return brain, payloads
+
+    async def store_index_payloads(
+        self, payloads: list[FieldIndexPayload]
+    ) -> list[Tuple[Field, str]]:
+        """
+        Store the index payloads of the fields in the resource transaction.
+        Returns the payloads they replace, to be deleted with
+        `delete_index_payloads` once the transaction is committed.
+        """
+        replaced = []
+        for payload in payloads:
+            previous = await payload.field.set_index_cache(
+                payload.content_hash, payload.brain
+            )
+            if previous is not None:
+                replaced.append((payload.field, previous))
+        return replaced
+
+    def _get_field_index_parts(
+        self, field: Field, metadata_only: bool = False
+    ) -> list[Awaitable[Any]]:
+        parts: list[Awaitable[Any]] = [field.get_field_metadata()]
+        if metadata_only:
+            return parts
+        parts.append(field.get_extracted_text())
+        if isinstance(field, File):
+            parts.append(field.get_file_extracted_data())
+        if self.disable_vectors is False:
+            parts.append(field.get_vectors())
+            parts.append(field.get_user_vectors())
+        return parts
 
-            if self.disable_vectors is False:
-                vo = await field.get_vectors()
-                if vo is not None:
-                    brain.apply_field_vectors(field_key, vo, False, [])
+    async def _generate_field_index_message(
+        self,
+        brain: ResourceBrain,
+        type_id: FieldType.ValueType,
+        field_id: str,
+        field: Field,
+        basic: Optional[PBBasic],
+    ):
+        fieldid = FieldID(field_type=type_id, field=field_id)  # type: ignore
+        await self.compute_global_text_field(fieldid, brain)
 
-                vu = await field.get_user_vectors()
-                if vu is not None:
-                    vectors_to_delete = {}  # type: ignore
-                    brain.apply_user_vectors(field_key, vu, vectors_to_delete)  # type: ignore
-        return brain
+        field_metadata = await field.get_field_metadata()
+        field_key = self.generate_field_id(fieldid)
+        if field_metadata is not None:
+            page_positions: Optional[FilePagePositions] = None
+            if type_id == FieldType.FILE and isinstance(field, File):
+                page_positions = await get_file_page_positions(field)
+
+            brain.apply_field_metadata(
+                field_key,
+                field_metadata,
+                replace_field=[],
+                replace_splits={},
+                page_positions=page_positions,
+                extracted_text=await field.get_extracted_text(),
+                basic_user_field_metadata=get_user_field_metadata(
+                    basic, type_id, field_id
+                ),
+            )
+
+        if self.disable_vectors is False:
+            vo = await field.get_vectors()
+            if vo is not None:
+                brain.apply_field_vectors(field_key, vo, False, [])
+
+            vu = await field.get_user_vectors()
+            if vu is not None:
+                vectors_to_delete = {}  # type: ignore
+                brain.apply_user_vectors(field_key, vu, vectors_to_delete)  # type: ignore
 
     async def generate_field_vectors(
         self,
@@ -547,6 +819,21 @@ class Resource:
         bm = BrokerMessage()
         bm.kbid = self.kb.kbid
         bm.uuid = self.uuid
+        await self.prefetch(
+            [
+                ResourcePart.BASIC,
+                ResourcePart.ORIGIN,
+                ResourcePart.RELATIONS,
+                ResourcePart.VALUES,
+                ResourcePart.TEXT,
+                ResourcePart.METADATA,
+                ResourcePart.LARGE_METADATA,
+                ResourcePart.VECTORS,
+                ResourcePart.USER_VECTORS,
+                ResourcePart.FILE,
+                ResourcePart.LINK,
+            ]
+        )
         basic = await self.get_basic()
         if basic is not None:
             bm.basic.CopyFrom(basic)
@@ -1412,6 +1699,33 @@ async def get_file_page_positions(field: File) -> FilePagePositions:
     return positions
 
 
+@dataclass
+class FieldIndexPayload:
+    field: Field
+    content_hash: str
+    brain: PBBrainResource
+
+
+async def delete_index_payloads(payloads: list[Tuple[Field, str]]) -> None:
+    for field, content_hash in payloads:
+        await field.delete_index_cache_payload(content_hash)
+
+
+def get_user_field_metadata(
+    basic: Optional[PBBasic], type_id: FieldType.ValueType, field_id: str
+) -> Optional[UserFieldMetadata]:
+    if basic is None:
+        return None
+    return next(
+        (
+            fm
+            for fm in basic.fieldmetadata
+            if fm.field.field == field_id and fm.field.field_type == type_id
+        ),
+        None,
+    )
+
+
 def remove_field_classifications(basic: PBBasic, deleted_fields: list[FieldID]):
     """
     Clean classifications of fields that have been deleted
@@ -18,7 +18,7 @@
 # along with this program. If not, see <http://www.gnu.org/licenses/>.
 
 import urllib.parse
-from typing import Optional
+from typing import List, Optional
 
 from nucliadb_protos.resources_pb2 import (
     Basic,
@@ -52,12 +52,26 @@ async def set_basic(txn: Transaction, kbid: str, uuid: str, basic: Basic):
         )
 
 
-async def get_basic(txn: Transaction, kbid: str, uuid: str) -> Optional[bytes]:
+def get_basic_key(kbid: str, uuid: str) -> str:
     if ingest_settings.driver == "local":
-        raw_basic = await txn.get(KB_RESOURCE_BASIC_FS.format(kbid=kbid, uuid=uuid))
-    else:
-        raw_basic = await txn.get(KB_RESOURCE_BASIC.format(kbid=kbid, uuid=uuid))
-    return raw_basic
+        return KB_RESOURCE_BASIC_FS.format(kbid=kbid, uuid=uuid)
+    return KB_RESOURCE_BASIC.format(kbid=kbid, uuid=uuid)
+
+
+async def get_basic(txn: Transaction, kbid: str, uuid: str) -> Optional[bytes]:
+    return await txn.get(get_basic_key(kbid, uuid))
+
+
+async def batch_get_basic(
+    txn: Transaction, kbid: str, uuids: List[str]
+) -> List[Optional[bytes]]:
+    """
+    Get the basic of multiple resources in a single round trip.
+    Results are in the same order as `uuids`, `None` for missing resources.
+    """
+    if len(uuids) == 0:
+        return []
+    return await txn.batch_get([get_basic_key(kbid, uuid) for uuid in uuids])
 
 
 def set_title(writer: BrokerMessage, toprocess: PushPayload, title: str):
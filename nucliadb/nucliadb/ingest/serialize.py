@@ -19,7 +19,7 @@
 #
 
 import asyncio
-from typing import List, Optional
+from typing import Dict, List, Optional, Tuple
 
 import nucliadb_models as models
 from nucliadb.common.maindb.driver import Transaction
@@ -29,7 +29,10 @@ from nucliadb.ingest.fields.conversation import Conversation
 from nucliadb.ingest.fields.file import File
 from nucliadb.ingest.fields.link import Link
 from nucliadb.ingest.orm.knowledgebox import KnowledgeBox
+from nucliadb.ingest.orm.resource import RESOURCE_PARTS
 from nucliadb.ingest.orm.resource import Resource as ORMResource
+from nucliadb.ingest.orm.resource import ResourcePart
+from nucliadb.ingest.orm.utils import batch_get_basic
 from nucliadb_models.common import FIELD_TYPES_MAP, FieldTypeName
 from nucliadb_models.resource import (
     ConversationFieldData,
@@ -56,8 +59,33 @@ from nucliadb_models.resource import (
 )
 from nucliadb_models.search import ResourceProperties
 from nucliadb_models.vectors import UserVectorSet
+from nucliadb_telemetry import metrics
 from nucliadb_utils.utilities import get_storage
 
+serialize_observer = metrics.Observer(
+    "nucliadb_serialize_resource", labels={"type": ""}
+)
+
+RESOURCE_PROPERTY_PARTS = {
+    ResourceProperties.BASIC: ResourcePart.BASIC,
+    ResourceProperties.ORIGIN: ResourcePart.ORIGIN,
+    ResourceProperties.EXTRA: ResourcePart.EXTRA,
+    ResourceProperties.RELATIONS: ResourcePart.RELATIONS,
+    ResourceProperties.VALUES: ResourcePart.VALUES,
+}
+
+EXTRACTED_DATA_PARTS = {
+    ExtractedDataTypeName.TEXT: ResourcePart.TEXT,
+    ExtractedDataTypeName.METADATA: ResourcePart.METADATA,
+    ExtractedDataTypeName.SHORTENED_METADATA: ResourcePart.METADATA,
+    ExtractedDataTypeName.LARGE_METADATA: ResourcePart.LARGE_METADATA,
+    ExtractedDataTypeName.VECTOR: ResourcePart.VECTORS,
+    ExtractedDataTypeName.USERVECTORS: ResourcePart.USER_VECTORS,
+    ExtractedDataTypeName.QA: ResourcePart.QA,
+    ExtractedDataTypeName.FILE: ResourcePart.FILE,
+    ExtractedDataTypeName.LINK: ResourcePart.LINK,
+}
+
 
 async def set_resource_field_extracted_data(
     field: Field,
@@ -145,6 +173,71 @@ async def serialize(
         await txn.abort()
         return None
 
+    with serialize_observer({"type": "single"}):
+        resource = await serialize_resource(
+            orm_resource, show, field_type_filter, extracted
+        )
+    asyncio.create_task(txn.abort())
+    return resource
+
+
+async def serialize_resources(
+    kbid: str,
+    rids: List[str],
+    show: List[ResourceProperties],
+    field_type_filter: List[FieldTypeName],
+    extracted: List[ExtractedDataTypeName],
+    service_name: Optional[str] = None,
+    max_concurrency: int = 10,
+) -> Dict[str, Resource]:
+    """
+    Serialize multiple resources sharing a single read only transaction. The
+    basic of all of them is read at once and they are serialized concurrently,
+    at most `max_concurrency` at a time. Missing resources are not returned.
+    """
+    if len(rids) == 0:
+        return {}
+
+    storage = await get_storage(service_name=service_name)
+    driver = get_driver()
+    semaphore = asyncio.Semaphore(max_concurrency)
+    async with driver.transaction(read_only=True) as txn:
+        kb = KnowledgeBox(txn, storage, kbid)
+
+        async def _serialize(rid: str, raw_basic: bytes) -> Tuple[str, Resource]:
+            async with semaphore:
+                orm_resource = ORMResource(
+                    txn=txn,
+                    storage=storage,
+                    kb=kb,
+                    uuid=rid,
+                    basic=ORMResource.parse_basic(raw_basic),
+                    disable_vectors=False,
+                )
+                with serialize_observer({"type": "batch"}):
+                    resource = await serialize_resource(
+                        orm_resource, show, field_type_filter, extracted
+                    )
+                return rid, resource
+
+        rids = list(dict.fromkeys(rids))
+        raw_basics = await batch_get_basic(txn, kbid, rids)
+        serialized = await asyncio.gather(
+            *(
+                _serialize(rid, raw_basic)
+                for rid, raw_basic in zip(rids, raw_basics)
+                if raw_basic
+            )
+        )
+    return dict(serialized)
+
+
+async def serialize_resource(
+    orm_resource: ORMResource,
+    show: List[ResourceProperties],
+    field_type_filter: List[FieldTypeName],
+    extracted: List[ExtractedDataTypeName],
+) -> Resource:
     resource = Resource(id=orm_resource.uuid)
 
     include_values = ResourceProperties.VALUES in show
@@ -153,6 +246,20 @@ async def serialize(
         ResourceProperties.EXTRACTED in show and extracted is not []
     )
 
+    parts = {part for prop, part in RESOURCE_PROPERTY_PARTS.items() if prop in show}
+    if include_extracted_data:
+        parts.update(EXTRACTED_DATA_PARTS[name] for name in extracted)
+    if not field_type_filter:
+        parts &= RESOURCE_PARTS
+    await orm_resource.prefetch(
+        parts,
+        field_types=[
+            field_type
+            for field_type, name in FIELD_TYPES_MAP.items()
+            if name in field_type_filter
+        ],
+    )
+
     if ResourceProperties.BASIC in show:
         await orm_resource.get_basic()
 
@@ -437,7 +544,6 @@ async def serialize(
                             text=resource.data.generics[field.id].value
                         )
                     )
-    asyncio.create_task(txn.abort())
     return resource
 
 
@@ -78,5 +78,26 @@ async def test_materialize_kb_data(
         await mz.resources_data_manager.get_number_of_resources(knowledgebox_ingest)
         == count
     )
+    # resources were not written by the processor, they have no counters
+    # until they are backfilled by the migration
+    counters = await mz.counters_data_manager.get_counters(knowledgebox_ingest)
+    assert counters is not None
+    assert counters.resources == 0
+
+    backfilled = await mz.resources_data_manager.backfill_resource_counters(
+        knowledgebox_ingest
+    )
+    assert backfilled == count
+    await mz.reconcile_counters(knowledgebox_ingest)
+    counters = await mz.counters_data_manager.get_counters(knowledgebox_ingest)
+    assert counters is not None
+    assert counters.resources == count
+    assert counters.fields > 0
+
+    # a single replica reconciles the counters of a kb every interval
+    assert knowledgebox_ingest in mz.last_reconciled
+    assert not await mz.counters_data_manager.acquire_reconcile_lease(
+        knowledgebox_ingest, 1
+    )
 
     await mz.finalize()
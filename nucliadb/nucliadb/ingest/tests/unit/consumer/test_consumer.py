@@ -17,12 +17,14 @@
 # You should have received a copy of the GNU Affero General Public License
 # along with this program. If not, see <http://www.gnu.org/licenses/>.
 #
-from unittest.mock import AsyncMock, MagicMock, Mock
+import asyncio
+from unittest.mock import AsyncMock, MagicMock, Mock, patch
 
 import pytest
 from nucliadb_protos.writer_pb2 import BrokerMessage, BrokerMessageBlobReference
 
 from nucliadb.ingest.consumer.consumer import IngestConsumer
+from nucliadb_utils.nats import SequenceTracker
 
 
 @pytest.fixture()
@@ -67,3 +69,309 @@ async def test_clean_broker_message_proxied(consumer: IngestConsumer, storage):
     await consumer.clean_broker_message(msg)
 
     storage.del_stream_message.assert_awaited_once_with("storage_key")
+
+
+def _msg(seqid: int, bm: BrokerMessage, num_delivered: int = 1):
+    return Mock(
+        data=bm.SerializeToString(),
+        headers={},
+        reply=f"$JS.ACK.stream.consumer.{num_delivered}.{seqid}.1.1.1",
+        metadata=Mock(num_delivered=num_delivered),
+        ack=AsyncMock(),
+        nak=AsyncMock(),
+    )
+
+
+@pytest.fixture()
+def txn():
+    yield AsyncMock()
+
+
+@pytest.fixture()
+def concurrent_consumer(storage, txn):
+    driver = MagicMock()
+    driver.transaction.return_value.__aenter__.return_value = txn
+    consumer = IngestConsumer(driver, "partition", storage, None, max_concurrency=4)
+    consumer.sequence_tracker = SequenceTracker(0)
+    with patch(
+        "nucliadb.ingest.consumer.consumer.MessageProgressUpdater",
+        return_value=AsyncMock(),
+    ):
+        yield consumer
+
+
+@pytest.mark.asyncio
+async def test_concurrent_processing_keeps_resource_order(
+    concurrent_consumer: IngestConsumer, txn
+):
+    processed = []
+    running = set()
+    max_running = 0
+
+    async def process(pb, seqid, partition, transaction_check=True):
+        nonlocal max_running
+        assert transaction_check is False
+        # messages of the same resource never run concurrently
+        assert pb.uuid not in running
+        running.add(pb.uuid)
+        max_running = max(max_running, len(running))
+        await asyncio.sleep(0.01)
+        running.remove(pb.uuid)
+        processed.append((pb.uuid, seqid))
+
+    concurrent_consumer.processor.process = process  # type: ignore
+
+    messages = [
+        _msg(seqid, BrokerMessage(kbid="kbid", uuid=uuid))
+        for seqid, uuid in enumerate(["r1", "r2", "r1", "r3", "r1"], start=1)
+    ]
+    for msg in messages:
+        await concurrent_consumer.subscription_worker(msg)
+    await asyncio.gather(*concurrent_consumer.resource_tasks.values())
+
+    assert max_running > 1
+    assert [seqid for uuid, seqid in processed if uuid == "r1"] == [1, 3, 5]
+    for msg in messages:
+        msg.ack.assert_awaited_once()
+    assert concurrent_consumer.sequence_tracker.last_seqid == 5  # type: ignore
+    txn.set.assert_awaited_with("/internal/worker/partition", b"5")
+
+
+@pytest.mark.asyncio
+async def test_concurrent_processing_failed_message_holds_seqid(
+    concurrent_consumer: IngestConsumer,
+):
+    async def process(pb, seqid, partition, transaction_check=True):
+        if seqid == 2:
+            raise Exception("boom")
+
+    concurrent_consumer.processor.process = process  # type: ignore
+
+    messages = [
+        _msg(seqid, BrokerMessage(kbid="kbid", uuid=f"r{seqid}")) for seqid in (1, 2, 3)
+    ]
+    for msg in messages:
+        await concurrent_consumer.subscription_worker(msg)
+    await asyncio.gather(*concurrent_consumer.resource_tasks.values())
+
+    messages[1].nak.assert_awaited_once()
+    messages[2].ack.assert_awaited_once()
+    # seqid 2 will be redelivered, nothing after it can be stored yet
+    assert concurrent_consumer.sequence_tracker.last_seqid == 1  # type: ignore
+    assert concurrent_consumer.sequence_tracker.is_processed(3)  # type: ignore
+
+
+@pytest.mark.asyncio
+async def test_concurrent_processing_message_failed_for_good_skips_seqid(
+    concurrent_consumer: IngestConsumer, txn
+):
+    async def process(pb, seqid, partition, transaction_check=True):
+        if seqid == 2:
+            raise Exception("boom")
+
+    concurrent_consumer.processor.process = process  # type: ignore
+
+    messages = [
+        _msg(seqid, BrokerMessage(kbid="kbid", uuid=f"r{seqid}"), num_delivered)
+        for seqid, num_delivered in ((1, 1), (2, 10), (3, 1))
+    ]
+    with patch(
+        "nucliadb.ingest.consumer.consumer.nats_consumer_settings.nats_max_deliver",
+        10,
+    ):
+        for msg in messages:
+            await concurrent_consumer.subscription_worker(msg)
+        await asyncio.gather(*concurrent_consumer.resource_tasks.values())
+
+    messages[1].nak.assert_awaited_once()
+    # seqid 2 reached the max deliveries, it will never be redelivered
+    assert concurrent_consumer.sequence_tracker.last_seqid == 3  # type: ignore
+    assert not concurrent_consumer.sequence_tracker.pending  # type: ignore
+    txn.set.assert_awaited_with("/internal/worker/partition", b"3")
+
+
+@pytest.mark.asyncio
+async def test_concurrent_consumer_allows_max_concurrency_ack_pending(storage):
+    nats_connection_manager = MagicMock(subscribe=AsyncMock())
+    consumer = IngestConsumer(
+        None, "partition", storage, nats_connection_manager, max_concurrency=4
+    )
+    with patch(
+        "nucliadb.ingest.consumer.consumer.sequence_manager.get_last_seqid",
+        AsyncMock(return_value=None),
+    ):
+        await consumer.setup_nats_subscription()
+
+    config = nats_connection_manager.subscribe.call_args.kwargs["config"]
+    assert config.max_ack_pending == 4
+    assert consumer.processor.defer_kb_counters
+
+
+@pytest.fixture()
+def group_consumer(storage):
+    consumer = IngestConsumer(
+        MagicMock(),
+        "partition",
+        storage,
+        None,
+        group_commit_max_messages=3,
+        group_commit_linger=0.01,
+    )
+    consumer.processor.txn_group = AsyncMock()  # type: ignore
+    consumer.processor.process = AsyncMock()  # type: ignore
+    with patch(
+        "nucliadb.ingest.consumer.consumer.MessageProgressUpdater",
+        return_value=AsyncMock(),
+    ):
+        yield consumer
+
+
+@pytest.mark.asyncio
+async def test_group_commit(group_consumer: IngestConsumer):
+    messages = [
+        _msg(seqid, BrokerMessage(kbid="kbid", uuid=f"r{seqid}")) for seqid in (1, 2, 3)
+    ]
+    for msg in messages:
+        await group_consumer.subscription_worker(msg)
+
+    group_consumer.processor.txn_group.assert_awaited_once()  # type: ignore
+    txn_group = group_consumer.processor.txn_group
+    grouped, partition = txn_group.call_args.args  # type: ignore
+    assert [seqid for _, seqid in grouped] == [1, 2, 3]
+    assert partition == "partition"
+    group_consumer.processor.process.assert_not_awaited()  # type: ignore
+    for msg in messages:
+        msg.ack.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_group_commit_linger(group_consumer: IngestConsumer):
+    msg = _msg(1, BrokerMessage(kbid="kbid", uuid="r1"))
+    await group_consumer.subscription_worker(msg)
+    msg.ack.assert_not_awaited()
+
+    await asyncio.sleep(0.05)
+
+    # a group of one message is processed as usual
+    group_consumer.processor.process.assert_awaited_once()  # type: ignore
+    group_consumer.processor.txn_group.assert_not_awaited()  # type: ignore
+    msg.ack.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_group_commit_flushes_before_ungroupable_messages(
+    group_consumer: IngestConsumer,
+):
+    calls: list = []
+
+    async def txn_group(messages, partition, transaction_check=True):
+        calls.append([seqid for _, seqid in messages])
+
+    async def process(pb, seqid, partition, transaction_check=True):
+        calls.append(seqid)
+
+    group_consumer.processor.txn_group = txn_group  # type: ignore
+    group_consumer.processor.process = process  # type: ignore
+
+    messages = [
+        _msg(1, BrokerMessage(kbid="kbid", uuid="r1")),
+        _msg(2, BrokerMessage(kbid="kbid", uuid="r2")),
+        # same resource than a grouped message
+        _msg(3, BrokerMessage(kbid="kbid", uuid="r1")),
+        # not an autocommit message
+        _msg(
+            4,
+            BrokerMessage(
+                kbid="kbid", uuid="r3", type=BrokerMessage.MessageType.DELETE
+            ),
+        ),
+    ]
+    for msg in messages:
+        await group_consumer.subscription_worker(msg)
+
+    assert calls == [[1, 2], 3, 4]
+
+
+@pytest.mark.asyncio
+async def test_group_commit_failure_processes_messages_one_by_one(
+    group_consumer: IngestConsumer,
+):
+    group_consumer.processor.txn_group.side_effect = Exception("boom")  # type: ignore
+
+    async def process(pb, seqid, partition, transaction_check=True):
+        if seqid == 2:
+            raise Exception("boom")
+
+    group_consumer.processor.process = process  # type: ignore
+
+    messages = [
+        _msg(seqid, BrokerMessage(kbid="kbid", uuid=f"r{seqid}")) for seqid in (1, 2, 3)
+    ]
+    for msg in messages:
+        await group_consumer.subscription_worker(msg)
+
+    messages[0].ack.assert_awaited_once()
+    messages[1].ack.assert_not_awaited()
+    messages[1].nak.assert_awaited_once()
+    messages[2].ack.assert_awaited_once()
+
+
+async def _deliver(consumer: IngestConsumer, max_ack_pending: int, messages):
+    """
+    Deliver messages like NATS does: one after the other, and not more than
+    `max_ack_pending` of them until some are ACKd
+    """
+    pending: set = set()
+    acked = asyncio.Event()
+
+    def track_ack(msg):
+        async def ack():
+            pending.discard(msg)
+            acked.set()
+
+        msg.ack.side_effect = ack
+
+    for msg in messages:
+        track_ack(msg)
+        while len(pending) >= max_ack_pending:
+            acked.clear()
+            await asyncio.wait_for(acked.wait(), timeout=1)
+        pending.add(msg)
+        await consumer.subscription_worker(msg)
+
+
+@pytest.mark.asyncio
+async def test_group_commit_allows_group_ack_pending(storage):
+    nats_connection_manager = MagicMock(subscribe=AsyncMock())
+    consumer = IngestConsumer(
+        MagicMock(),
+        "partition",
+        storage,
+        nats_connection_manager,
+        group_commit_max_messages=3,
+        group_commit_linger=0.5,
+    )
+    consumer.processor.txn_group = AsyncMock()  # type: ignore
+    consumer.processor.process = AsyncMock()  # type: ignore
+    with patch(
+        "nucliadb.ingest.consumer.consumer.sequence_manager.get_last_seqid",
+        AsyncMock(return_value=None),
+    ):
+        await consumer.setup_nats_subscription()
+    config = nats_connection_manager.subscribe.call_args.kwargs["config"]
+    assert config.max_ack_pending == 3
+
+    messages = [
+        _msg(seqid, BrokerMessage(kbid="kbid", uuid=f"r{seqid}")) for seqid in (1, 2, 3)
+    ]
+    with patch(
+        "nucliadb.ingest.consumer.consumer.MessageProgressUpdater",
+        return_value=AsyncMock(),
+    ):
+        await _deliver(consumer, config.max_ack_pending, messages)
+
+    # the group is full before the linger time and committed at once
+    consumer.processor.txn_group.assert_awaited_once()  # type: ignore
+    consumer.processor.process.assert_not_awaited()  # type: ignore
+    for msg in messages:
+        msg.ack.assert_awaited_once()
@@ -31,6 +31,7 @@ from nucliadb_protos.resources_pb2 import (
     Paragraph,
     Sentence,
 )
+from nucliadb_protos.utils_pb2 import Vector, VectorObject
 
 from nucliadb.ingest.orm.brain import ResourceBrain, get_page_number
 from nucliadb_protos import resources_pb2
@@ -243,3 +244,36 @@ def test_set_resource_metadata_handles_timestamp_not_present():
     assert created > 0
     assert modified > 0
     assert modified >= created
+
+
+def test_apply_field_index():
+    rid = "rid"
+    field_key = "t/text"
+    metadata = FieldComputedMetadataWrapper()
+    metadata.metadata.metadata.paragraphs.append(Paragraph(start=0, end=10))
+    vectors = VectorObject()
+    vectors.vectors.vectors.append(
+        Vector(start=0, end=10, start_paragraph=0, end_paragraph=10, vector=[1, 2])
+    )
+
+    def apply(brain: ResourceBrain):
+        brain.apply_field_text(field_key, "some text")
+        brain.apply_field_metadata(
+            field_key,
+            metadata.metadata,
+            replace_field=[],
+            replace_splits={},
+            page_positions=None,
+            extracted_text=None,
+        )
+        brain.apply_field_vectors(field_key, vectors, False, [])
+
+    expected = ResourceBrain(rid=rid)
+    apply(expected)
+
+    field_brain = ResourceBrain(rid=rid)
+    apply(field_brain)
+    brain = ResourceBrain(rid=rid)
+    brain.apply_field_index(field_key, field_brain.brain)
+
+    assert brain.brain == expected.brain
@@ -17,14 +17,16 @@
 # You should have received a copy of the GNU Affero General Public License
 # along with this program. If not, see <http://www.gnu.org/licenses/>.
 
+import asyncio
 from unittest.mock import AsyncMock, MagicMock, Mock, patch
 
 import pytest
 
 from nucliadb.common.cluster.settings import settings as cluster_settings
+from nucliadb.common.datamanagers.counters import KBCounters
 from nucliadb.ingest.orm.exceptions import ResourceNotIndexable
 from nucliadb.ingest.orm.processor import Processor, validate_indexable_resource
-from nucliadb_protos import noderesources_pb2
+from nucliadb_protos import noderesources_pb2, writer_pb2
 
 
 @pytest.fixture()
@@ -115,6 +117,106 @@ async def test_mark_resource_error_skip_no_resource(
     txn.commit.assert_not_called()
 
 
+@pytest.fixture()
+def group_processor(processor: Processor):
+    driver = MagicMock()
+    driver.begin = AsyncMock(return_value=AsyncMock(open=True))
+    processor.driver = driver
+    processor.get_resource_uuid = AsyncMock(  # type: ignore
+        side_effect=lambda kb, bm: bm.uuid
+    )
+    processor.index_resource = AsyncMock()  # type: ignore
+    processor.update_counters = AsyncMock()  # type: ignore
+    processor.commit_slug = AsyncMock()  # type: ignore
+    processor.notify_commit = AsyncMock()  # type: ignore
+    processor.notify_abort = AsyncMock()  # type: ignore
+
+    def apply_resource(bm, kb, resource=None):
+        return (
+            MagicMock(
+                uuid=bm.uuid,
+                modified=True,
+                slug_modified=False,
+                compute_global_text=AsyncMock(),
+                compute_global_tags=AsyncMock(),
+            ),
+            False,
+        )
+
+    processor.apply_resource = AsyncMock(side_effect=apply_resource)  # type: ignore
+    with patch(
+        "nucliadb.ingest.orm.processor.KnowledgeBox.exist_kb",
+        AsyncMock(return_value=True),
+    ), patch(
+        "nucliadb.ingest.orm.processor.sequence_manager.get_last_seqid",
+        AsyncMock(return_value=1),
+    ):
+        yield processor
+
+
+async def test_txn_group(group_processor: Processor):
+    messages = [
+        (writer_pb2.BrokerMessage(kbid="kbid", uuid=f"r{seqid}"), seqid)
+        for seqid in (1, 2, 3)
+    ]
+    with patch(
+        "nucliadb.ingest.orm.processor.sequence_manager.set_last_seqid"
+    ) as set_last_seqid:
+        await group_processor.txn_group(messages, "partition")
+
+    txn = group_processor.driver.begin.return_value  # type: ignore
+    group_processor.driver.begin.assert_awaited_once()  # type: ignore
+    txn.commit.assert_awaited_once()
+    set_last_seqid.assert_awaited_once_with(txn, "partition", 3)
+    # seqid 1 was already processed
+    assert group_processor.index_resource.await_count == 2  # type: ignore
+    assert group_processor.notify_commit.await_count == 2  # type: ignore
+
+
+async def test_txn_group_commits_nothing_on_error(group_processor: Processor):
+    index_resource = group_processor.index_resource
+    index_resource.side_effect = [None, Exception("boom")]  # type: ignore
+    messages = [
+        (writer_pb2.BrokerMessage(kbid="kbid", uuid=f"r{seqid}"), seqid)
+        for seqid in (2, 3)
+    ]
+    with pytest.raises(Exception):
+        await group_processor.txn_group(messages, "partition")
+
+    txn = group_processor.driver.begin.return_value  # type: ignore
+    txn.commit.assert_not_awaited()
+    txn.abort.assert_awaited_once()
+    group_processor.notify_commit.assert_not_awaited()  # type: ignore
+
+
+async def test_deferred_kb_counters_are_applied_one_at_a_time(driver, sm):
+    processor = Processor(driver, None, defer_kb_counters=True)
+    applied = []
+
+    async def add_kb_counters(txn, kbid, partition, delta):
+        applied.append((kbid, partition, delta))
+        await asyncio.sleep(0.01)
+
+    with patch(
+        "nucliadb.ingest.orm.processor.CountersDataManager.add_kb_counters",
+        side_effect=add_kb_counters,
+    ):
+        await asyncio.gather(
+            *[
+                processor.add_deferred_kb_counters(
+                    "kbid", "partition", KBCounters(resources=1)
+                )
+                for _ in range(3)
+            ]
+        )
+
+    # changes queued while the first ones were applied are applied together
+    assert applied == [
+        ("kbid", "partition", KBCounters(resources=1)),
+        ("kbid", "partition", KBCounters(resources=2)),
+    ]
+
+
 def test_validate_indexable_resource():
     resource = noderesources_pb2.Resource()
     resource.paragraphs["test"].paragraphs["test"].sentences["test"].vector.append(1.0)
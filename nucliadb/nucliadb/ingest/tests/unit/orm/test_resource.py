@@ -17,9 +17,10 @@
 # You should have received a copy of the GNU Affero General Public License
 # along with this program. If not, see <http://www.gnu.org/licenses/>.
 #
-from unittest.mock import AsyncMock, MagicMock
+from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
+from nucliadb_protos.noderesources_pb2 import Resource as PBBrainResource
 from nucliadb_protos.resources_pb2 import (
     AllFieldIDs,
     Basic,
@@ -28,12 +29,19 @@ from nucliadb_protos.resources_pb2 import (
     FieldText,
     FieldType,
     FileExtractedData,
+    Origin,
     PagePositions,
 )
+from nucliadb_protos.utils_pb2 import ExtractedText
 from nucliadb_protos.writer_pb2 import BrokerMessage
 
+from nucliadb.ingest.fields.base import KB_RESOURCE_FIELD
 from nucliadb.ingest.orm.resource import (
+    KB_RESOURCE_ALL_FIELDS,
+    KB_RESOURCE_ORIGIN,
+    FieldIndexPayload,
     Resource,
+    ResourcePart,
     get_file_page_positions,
     get_text_field_mimetype,
     maybe_update_basic_icon,
@@ -41,6 +49,8 @@ from nucliadb.ingest.orm.resource import (
     maybe_update_basic_thumbnail,
     update_basic_languages,
 )
+from nucliadb.ingest.orm.utils import get_basic_key
+from nucliadb.ingest.settings import settings as ingest_settings
 
 
 @pytest.mark.asyncio
@@ -159,6 +169,9 @@ class Transaction:
     async def set(self, key, value):
         self.kv[key] = value
 
+    async def batch_get(self, keys):
+        return [self.kv.get(key) for key in keys]
+
 
 @pytest.fixture(scope="function")
 def txn():
@@ -265,3 +278,108 @@ async def test_apply_fields_calls_update_all_field_ids(txn, storage, kb):
     resource.update_all_field_ids.call_args[1]["deleted"] == [
         FieldID(field_type=FieldType.LAYOUT, field="to_delete"),
     ]
+
+
+async def test_generate_index_message_reuses_unchanged_fields(txn, storage, kb):
+    resource = Resource(txn, storage, kb, "rid")
+    resource.get_origin = AsyncMock(return_value=None)  # type: ignore
+    resource.get_basic = AsyncMock(return_value=None)  # type: ignore
+    resource.compute_global_tags = AsyncMock()  # type: ignore
+    resource._generate_field_index_message = AsyncMock()  # type: ignore
+
+    cached = PBBrainResource()
+    cached.texts["t/unchanged"].text = "cached text"
+    unchanged = MagicMock(
+        get_content_hash=AsyncMock(return_value="unchanged_hash"),
+        get_index_cache=AsyncMock(return_value=cached),
+        set_index_cache=AsyncMock(),
+    )
+    changed = MagicMock(
+        get_content_hash=AsyncMock(return_value="changed_hash"),
+        get_index_cache=AsyncMock(return_value=None),
+        set_index_cache=AsyncMock(),
+    )
+    for field in (unchanged, changed):
+        field.get_field_metadata = AsyncMock()
+        field.get_extracted_text = AsyncMock()
+        field.get_vectors = AsyncMock()
+        field.get_user_vectors = AsyncMock()
+    resource.get_fields = AsyncMock(  # type: ignore
+        return_value={
+            (FieldType.TEXT, "unchanged"): unchanged,
+            (FieldType.TEXT, "changed"): changed,
+        }
+    )
+
+    with patch.object(ingest_settings, "reindex_reuse_unchanged_fields", True):
+        brain, payloads = await resource.generate_index_message_with_payloads()
+
+    assert brain.brain.texts["t/unchanged"].text == "cached text"
+    # only the changed field is downloaded and generated again
+    unchanged.get_extracted_text.assert_not_awaited()
+    changed.get_extracted_text.assert_awaited_once()
+    resource._generate_field_index_message.assert_awaited_once()
+    # nothing is stored while generating the index message
+    unchanged.set_index_cache.assert_not_awaited()
+    changed.set_index_cache.assert_not_awaited()
+    assert [(p.field, p.content_hash) for p in payloads] == [(changed, "changed_hash")]
+
+
+async def test_store_index_payloads(txn, storage, kb):
+    resource = Resource(txn, storage, kb, "rid")
+    new = MagicMock(set_index_cache=AsyncMock(return_value=None))
+    updated = MagicMock(set_index_cache=AsyncMock(return_value="previous_hash"))
+    brain = PBBrainResource()
+
+    replaced = await resource.store_index_payloads(
+        [
+            FieldIndexPayload(new, "new_hash", brain),
+            FieldIndexPayload(updated, "updated_hash", brain),
+        ]
+    )
+
+    new.set_index_cache.assert_awaited_once_with("new_hash", brain)
+    updated.set_index_cache.assert_awaited_once_with("updated_hash", brain)
+    # replaced payloads are only deleted once the transaction is committed
+    assert replaced == [(updated, "previous_hash")]
+    updated.delete_index_cache_payload.assert_not_called()
+
+
+async def test_prefetch(txn, storage, kb):
+    kb.kbid = "kbid"
+    all_fields = AllFieldIDs()
+    all_fields.fields.append(FieldID(field_type=FieldType.TEXT, field="text"))
+    txn.kv = {
+        get_basic_key("kbid", "rid"): Basic(title="title").SerializeToString(),
+        KB_RESOURCE_ORIGIN.format(kbid="kbid", uuid="rid"): Origin(
+            source_id="source"
+        ).SerializeToString(),
+        KB_RESOURCE_ALL_FIELDS.format(
+            kbid="kbid", uuid="rid"
+        ): all_fields.SerializeToString(),
+        KB_RESOURCE_FIELD.format(
+            kbid="kbid", uuid="rid", type="t", field="text"
+        ): FieldText(body="body").SerializeToString(),
+    }
+    storage.download_pb.return_value = ExtractedText(text="extracted")
+    resource = Resource(txn, storage, kb, "rid")
+
+    await resource.prefetch(
+        [
+            ResourcePart.BASIC,
+            ResourcePart.ORIGIN,
+            ResourcePart.EXTRA,
+            ResourcePart.VALUES,
+            ResourcePart.TEXT,
+        ]
+    )
+
+    txn.get = AsyncMock()
+    storage.download_pb.reset_mock()
+    assert (await resource.get_basic()).title == "title"  # type: ignore
+    assert (await resource.get_origin()).source_id == "source"  # type: ignore
+    field = await resource.get_field("text", FieldType.TEXT)
+    assert (await field.get_value()).body == "body"
+    assert (await field.get_extracted_text()).text == "extracted"
+    txn.get.assert_not_awaited()
+    storage.download_pb.assert_not_awaited()
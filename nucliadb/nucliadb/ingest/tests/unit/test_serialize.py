@@ -0,0 +1,71 @@
+# Copyright (C) 2021 Bosutech XXI S.L.
+#
+# nucliadb is offered under the AGPL v3.0 and as commercial software.
+# For commercial licensing, contact us at info@nuclia.com.
+#
+# AGPL:
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+import asyncio
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from nucliadb.ingest import serialize
+
+pytestmark = pytest.mark.asyncio
+
+
+@pytest.fixture
+def txn():
+    yield AsyncMock()
+
+
+@pytest.fixture
+def driver(txn):
+    mock = MagicMock()
+    mock.transaction.return_value.__aenter__.return_value = txn
+    with patch.object(serialize, "get_driver", return_value=mock), patch.object(
+        serialize, "get_storage", AsyncMock()
+    ), patch.object(serialize.ORMResource, "parse_basic"):
+        yield mock
+
+
+async def test_serialize_resources(driver, txn):
+    running = 0
+    max_running = 0
+
+    async def serialize_resource(orm_resource, *args):
+        nonlocal running, max_running
+        running += 1
+        max_running = max(max_running, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+        return orm_resource.uuid
+
+    with patch.object(
+        serialize,
+        "batch_get_basic",
+        AsyncMock(return_value=[b"basic", None, b"basic", b"basic"]),
+    ) as batch_get_basic, patch.object(
+        serialize, "serialize_resource", side_effect=serialize_resource
+    ):
+        result = await serialize.serialize_resources(
+            "kbid", ["r1", "missing", "r2", "r3", "r1"], [], [], [], max_concurrency=2
+        )
+
+    assert result == {"r1": "r1", "r2": "r2", "r3": "r3"}
+    driver.transaction.assert_called_once_with(read_only=True)
+    batch_get_basic.assert_awaited_once_with(txn, "kbid", ["r1", "missing", "r2", "r3"])
+    assert max_running == 2
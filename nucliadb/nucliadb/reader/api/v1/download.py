@@ -17,6 +17,7 @@
 # You should have received a copy of the GNU Affero General Public License
 # along with this program. If not, see <http://www.gnu.org/licenses/>.
 #
+import os
 import urllib.parse
 from enum import Enum
 from typing import Optional, Tuple
@@ -25,8 +26,10 @@ from fastapi import HTTPException
 from fastapi.requests import Request
 from fastapi.responses import Response
 from fastapi_versioning import version
+from starlette.concurrency import run_in_threadpool
 from starlette.datastructures import Headers
-from starlette.responses import StreamingResponse
+from starlette.responses import FileResponse, StreamingResponse
+from starlette.types import Receive, Scope, Send
 
 from nucliadb.ingest.orm.resource import FIELD_TYPE_TO_ID
 from nucliadb.ingest.serialize import get_resource_uuid_by_slug
@@ -35,6 +38,7 @@ from nucliadb.reader.api.models import FIELD_NAMES_TO_PB_TYPE_MAP
 from nucliadb_models.common import FieldTypeName
 from nucliadb_models.resource import NucliaDBRoles
 from nucliadb_utils.authentication import requires_one
+from nucliadb_utils.storages import CHUNK_SIZE
 from nucliadb_utils.storages.storage import StorageField  # type: ignore
 from nucliadb_utils.utilities import get_storage
 
@@ -46,6 +50,73 @@ class DownloadType(Enum):
     FIELD = "field"
 
 
+class LocalFileResponse(FileResponse):
+    """
+    Serve `count` bytes from `offset` of a local file. Servers supporting the
+    zero copy send extension are handed the file to send it with sendfile,
+    otherwise it is read in large chunks.
+    """
+
+    chunk_size = CHUNK_SIZE
+
+    def __init__(
+        self, path: str, *, offset: int = 0, count: Optional[int] = None, **kwargs
+    ):
+        super().__init__(path, **kwargs)
+        self.offset = offset
+        self.count = count
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        file = await run_in_threadpool(open, self.path, "rb")
+        try:
+            stat_result = os.fstat(file.fileno())
+            self.set_stat_headers(stat_result)
+            count = self.count
+            if count is None:
+                count = stat_result.st_size - self.offset
+            await send(
+                {
+                    "type": "http.response.start",
+                    "status": self.status_code,
+                    "headers": self.raw_headers,
+                }
+            )
+            if "http.response.zerocopysend" in scope.get("extensions", {}):
+                await send(
+                    {
+                        "type": "http.response.zerocopysend",
+                        "file": file,
+                        "offset": self.offset,
+                        "count": count,
+                        "more_body": False,
+                    }
+                )
+            else:
+                offset = self.offset
+                end = self.offset + count
+                more_body = True
+                while more_body:
+                    chunk = await run_in_threadpool(
+                        os.pread,
+                        file.fileno(),
+                        min(self.chunk_size, end - offset),
+                        offset,
+                    )
+                    offset += len(chunk)
+                    more_body = len(chunk) > 0 and offset < end
+                    await send(
+                        {
+                            "type": "http.response.body",
+                            "body": chunk,
+                            "more_body": more_body,
+                        }
+                    )
+        finally:
+            file.close()
+        if self.background is not None:
+            await self.background()
+
+
 @api.get(
     f"/{KB_PREFIX}/{{kbid}}/{RSLUG_PREFIX}/{{rslug}}/{{field_type}}/{{field_id}}/download/extracted/{{download_field:path}}",  # noqa
     tags=["Resource fields"],
@@ -300,6 +371,8 @@ async def download_api(sf: StorageField, headers: Headers, inline: bool = False)
         "Content-Disposition": content_disposition,
     }
     download_headers = {}
+    offset = 0
+    count = None
     if "range" in headers and file_size > -1:
         range_request = headers["range"]
         try:
@@ -346,9 +419,27 @@ async def download_api(sf: StorageField, headers: Headers, inline: bool = False)
         extra_headers["Content-Length"] = f"{range_size}"
         extra_headers["Content-Range"] = f"bytes {start}-{end}/{file_size}"
         download_headers["Range"] = range_request
+        offset = start
+        count = range_size
+
+    local_path = sf.storage.get_local_path(sf.bucket, sf.key)
+    if local_path is not None:
+        return LocalFileResponse(
+            local_path,
+            offset=offset,
+            count=count,
+            status_code=status_code,
+            media_type=content_type,
+            headers=extra_headers,
+        )
 
     return StreamingResponse(
-        sf.storage.download(sf.bucket, sf.key, headers=download_headers),  # type: ignore
+        sf.storage.download(  # type: ignore
+            sf.bucket,
+            sf.key,
+            headers=download_headers,
+            size=file_size if file_size > -1 else None,
+        ),
         status_code=status_code,
         media_type=content_type,
         headers=extra_headers,
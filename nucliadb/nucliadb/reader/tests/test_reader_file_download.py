@@ -27,7 +27,11 @@ from nucliadb_protos.resources_pb2 import FieldType
 import nucliadb.ingest.tests.fixtures
 from nucliadb.ingest.orm.resource import Resource
 from nucliadb.ingest.tests.fixtures import TEST_CLOUDFILE, THUMBNAIL
-from nucliadb.reader.api.v1.download import parse_media_range, safe_http_header_encode
+from nucliadb.reader.api.v1.download import (
+    LocalFileResponse,
+    parse_media_range,
+    safe_http_header_encode,
+)
 from nucliadb.reader.api.v1.router import KB_PREFIX, RESOURCE_PREFIX, RSLUG_PREFIX
 from nucliadb_models.resource import NucliaDBRoles
 
@@ -271,3 +275,47 @@ def test_safe_http_header_encode(text):
     safe_text = safe_http_header_encode(text)
     # This is how startette encodes the headers
     safe_text.lower().encode("latin-1")
+
+
+async def send_local_file(response: LocalFileResponse, extensions=None):
+    messages = []
+
+    async def send(message):
+        messages.append(message)
+
+    scope = {"type": "http", "extensions": extensions or {}}
+    await response(scope, None, send)  # type: ignore
+    return messages
+
+
+@pytest.mark.asyncio
+async def test_local_file_response_reads_range(tmp_path):
+    path = tmp_path / "file"
+    path.write_bytes(b"0123456789")
+    response = LocalFileResponse(
+        str(path), offset=2, count=5, status_code=206, headers={"Content-Length": "5"}
+    )
+    response.chunk_size = 2
+
+    messages = await send_local_file(response)
+
+    assert messages[0]["status"] == 206
+    assert (b"content-length", b"5") in messages[0]["headers"]
+    assert [m["body"] for m in messages[1:]] == [b"23", b"45", b"6"]
+    assert [m["more_body"] for m in messages[1:]] == [True, True, False]
+
+
+@pytest.mark.asyncio
+async def test_local_file_response_zero_copy_send(tmp_path):
+    path = tmp_path / "file"
+    path.write_bytes(b"0123456789")
+    response = LocalFileResponse(str(path))
+
+    messages = await send_local_file(
+        response, extensions={"http.response.zerocopysend": {}}
+    )
+
+    assert (b"content-length", b"10") in messages[0]["headers"]
+    assert messages[1]["type"] == "http.response.zerocopysend"
+    assert messages[1]["offset"] == 0
+    assert messages[1]["count"] == 10
@@ -110,6 +110,9 @@ async def find_knowledgebox(
     with_duplicates: bool = fastapi_query(SearchParamDefaults.with_duplicates),
     with_synonyms: bool = fastapi_query(SearchParamDefaults.with_synonyms),
     autofilter: bool = fastapi_query(SearchParamDefaults.autofilter),
+    partial_results_timeout: Optional[float] = fastapi_query(
+        SearchParamDefaults.partial_results_timeout
+    ),
     x_ndb_client: NucliaDBClientType = Header(NucliaDBClientType.API),
     x_nucliadb_user: str = Header(""),
     x_forwarded_for: str = Header(""),
@@ -136,14 +139,16 @@ async def find_knowledgebox(
             with_duplicates=with_duplicates,
             with_synonyms=with_synonyms,
             autofilter=autofilter,
+            partial_results_timeout=partial_results_timeout,
         )
     except ValidationError as exc:
         detail = json.loads(exc.json())
         return HTTPClientError(status_code=422, detail=detail)
     try:
-        results, _ = await find(
+        results, incomplete = await find(
             kbid, item, x_ndb_client, x_nucliadb_user, x_forwarded_for
         )
+        response.status_code = 206 if incomplete else 200
         return results
     except KnowledgeBoxNotFound:
         return HTTPClientError(status_code=404, detail="Knowledge Box not found")
@@ -31,6 +31,7 @@ from nucliadb_protos.writer_pb2 import Shards
 from nucliadb.common.cluster.exceptions import ShardsNotFound
 from nucliadb.common.cluster.manager import choose_node
 from nucliadb.common.cluster.utils import get_shard_manager
+from nucliadb.common.datamanagers.counters import CountersDataManager
 from nucliadb.common.datamanagers.resources import ResourcesDataManager
 from nucliadb.common.maindb.utils import get_driver
 from nucliadb.search import logger
@@ -157,7 +158,10 @@ async def knowledgebox_counters(
 
     res_dm = ResourcesDataManager(get_driver(), await get_storage())
     try:
-        if len(shard_groups) <= 1:
+        kb_counters = await CountersDataManager(get_driver()).get_counters(kbid)
+        if kb_counters is not None:
+            resource_count = kb_counters.resources
+        elif len(shard_groups) <= 1:
             # for smaller kbs, this is faster and more up to date
             resource_count = await res_dm.calculate_number_of_resources(kbid)
         else:
@@ -111,7 +111,7 @@ async def get_resource_text_blocks(kbid: str, rid: str) -> TextBlocks:
     blocks = []
     driver = get_driver()
     storage = await get_storage(service_name=SERVICE_NAME)
-    async with driver.transaction() as txn:
+    async with driver.transaction(read_only=True) as txn:
         kb = KnowledgeBox(txn, storage, kbid)
         orm_resource = await kb.get(rid)
         if orm_resource is None:
@@ -119,7 +119,7 @@ async def resource_search(
     except InvalidQueryError as exc:
         return HTTPClientError(status_code=412, detail=str(exc))
 
-    results, incomplete_results, queried_nodes, queried_shards = await node_query(
+    results, incomplete_results, queried_nodes, queried_shards, _ = await node_query(
         kbid, Method.PARAGRAPH, pb_query, shards
     )
 
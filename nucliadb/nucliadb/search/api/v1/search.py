@@ -132,6 +132,9 @@ async def search_knowledgebox(
         SearchParamDefaults.extracted
     ),
     shards: List[str] = fastapi_query(SearchParamDefaults.shards),
+    partial_results_timeout: Optional[float] = fastapi_query(
+        SearchParamDefaults.partial_results_timeout
+    ),
     with_duplicates: bool = fastapi_query(SearchParamDefaults.with_duplicates),
     with_synonyms: bool = fastapi_query(SearchParamDefaults.with_synonyms),
     autofilter: bool = fastapi_query(SearchParamDefaults.autofilter),
@@ -164,6 +167,7 @@ async def search_knowledgebox(
             field_type_filter=field_type_filter,
             extracted=extracted,
             shards=shards,
+            partial_results_timeout=partial_results_timeout,
             with_duplicates=with_duplicates,
             with_synonyms=with_synonyms,
             autofilter=autofilter,
@@ -232,7 +236,7 @@ async def catalog(
         )
         pb_query, _, _ = await query_parser.parse()
 
-        (results, _, _, _) = await node_query(
+        (results, _, _, _, _) = await node_query(
             kbid,
             Method.SEARCH,
             pb_query,
@@ -353,8 +357,18 @@ async def search(
     )
     pb_query, incomplete_results, autofilters = await query_parser.parse()
 
-    results, query_incomplete_results, queried_nodes, queried_shards = await node_query(
-        kbid, Method.SEARCH, pb_query, target_replicas=item.shards
+    (
+        results,
+        query_incomplete_results,
+        queried_nodes,
+        queried_shards,
+        missing_shards,
+    ) = await node_query(
+        kbid,
+        Method.SEARCH,
+        pb_query,
+        target_replicas=item.shards,
+        partial_results_timeout=item.partial_results_timeout,
     )
 
     incomplete_results = incomplete_results or query_incomplete_results
@@ -389,5 +403,7 @@ async def search(
         search_results.nodes = queried_nodes
 
     search_results.shards = queried_shards
+    if missing_shards:
+        search_results.missing_shards = missing_shards
     search_results.autofilters = autofilters
     return search_results, incomplete_results
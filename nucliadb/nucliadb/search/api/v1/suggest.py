@@ -87,6 +87,9 @@ async def suggest_knowledgebox(
     x_forwarded_for: str = Header(""),
     debug: bool = fastapi_query(SearchParamDefaults.debug),
     highlight: bool = fastapi_query(SearchParamDefaults.highlight),
+    partial_results_timeout: Optional[float] = fastapi_query(
+        SearchParamDefaults.partial_results_timeout
+    ),
 ) -> Union[KnowledgeboxSuggestResults, HTTPClientError]:
     try:
         return await suggest(
@@ -108,6 +111,7 @@ async def suggest_knowledgebox(
             x_forwarded_for,
             debug,
             highlight,
+            partial_results_timeout,
         )
     except InvalidQueryError as exc:
         return HTTPClientError(status_code=412, detail=str(exc))
@@ -132,6 +136,7 @@ async def suggest(
     x_forwarded_for: str,
     debug: bool,
     highlight: bool,
+    partial_results_timeout: Optional[float] = None,
 ) -> KnowledgeboxSuggestResults:
     # We need the nodes/shards that are connected to the KB
     audit = get_audit()
@@ -149,8 +154,11 @@ async def suggest(
         range_modification_start,
         range_modification_end,
     )
-    results, incomplete_results, _, queried_shards = await node_query(
-        kbid, Method.SUGGEST, pb_query
+    results, incomplete_results, _, queried_shards, missing_shards = await node_query(
+        kbid,
+        Method.SUGGEST,
+        pb_query,
+        partial_results_timeout=partial_results_timeout,
     )
 
     # We need to merge
@@ -166,6 +174,8 @@ async def suggest(
     response.status_code = 206 if incomplete_results else 200
     if debug and queried_shards:
         search_results.shards = queried_shards
+    if missing_shards:
+        search_results.missing_shards = missing_shards
 
     if audit is not None:
         await audit.suggest(
@@ -22,6 +22,16 @@ from nucliadb.common.maindb.utils import setup_driver  # type: ignore
 from nucliadb.ingest.utils import start_ingest, stop_ingest
 from nucliadb.search import SERVICE_NAME
 from nucliadb.search.predict import start_predict_engine
+from nucliadb.search.search.cache import (
+    start_kb_metadata_cache,
+    start_query_embeddings_cache,
+    start_resource_parts_cache,
+    start_shard_result_cache,
+    stop_kb_metadata_cache,
+    stop_query_embeddings_cache,
+    stop_resource_parts_cache,
+    stop_shard_result_cache,
+)
 from nucliadb_telemetry.utils import clean_telemetry, setup_telemetry
 from nucliadb_utils.utilities import (
     Utility,
@@ -41,12 +51,20 @@ async def initialize() -> None:
 
     await setup_driver()
     await setup_cluster()
+    await start_resource_parts_cache()
+    await start_shard_result_cache()
+    start_query_embeddings_cache()
+    start_kb_metadata_cache()
 
     await start_audit_utility(SERVICE_NAME)
 
 
 async def finalize() -> None:
     await stop_ingest()
+    await stop_resource_parts_cache()
+    await stop_shard_result_cache()
+    stop_query_embeddings_cache()
+    stop_kb_metadata_cache()
     if get_utility(Utility.PARTITION):
         clean_utility(Utility.PARTITION)
     if get_utility(Utility.PREDICT):
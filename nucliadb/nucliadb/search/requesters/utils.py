@@ -19,7 +19,18 @@
 
 import asyncio
 from enum import Enum
-from typing import Any, List, Optional, Tuple, TypeVar, Union, overload
+from functools import partial
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    List,
+    Optional,
+    Tuple,
+    TypeVar,
+    Union,
+    overload,
+)
 
 from fastapi import HTTPException
 from grpc import StatusCode as GrpcStatusCode
@@ -37,10 +48,12 @@ from nucliadb_protos.nodereader_pb2 import (
 from nucliadb_protos.writer_pb2 import ShardObject as PBShardObject
 
 from nucliadb.common.cluster import manager as cluster_manager
-from nucliadb.common.cluster.exceptions import ShardsNotFound
+from nucliadb.common.cluster.base import AbstractIndexNode
+from nucliadb.common.cluster.exceptions import NoHealthyNodeAvailable, ShardsNotFound
 from nucliadb.common.cluster.utils import get_shard_manager
 from nucliadb.ingest.txn_utils import abort_transaction
 from nucliadb.search import logger
+from nucliadb.search.search.cache import ShardResultCache, get_shard_result_cache
 from nucliadb.search.search.shards import (
     query_paragraph_shard,
     query_shard,
@@ -48,7 +61,7 @@ from nucliadb.search.search.shards import (
     suggest_shard,
 )
 from nucliadb.search.settings import settings
-from nucliadb_telemetry import errors
+from nucliadb_telemetry import errors, metrics
 from nucliadb_utils import const
 from nucliadb_utils.utilities import has_feature
 
@@ -67,6 +80,20 @@ METHODS = {
     Method.RELATIONS: relations_shard,
 }
 
+RESPONSES = {
+    Method.SEARCH: SearchResponse,
+    Method.PARAGRAPH: ParagraphSearchResponse,
+    Method.SUGGEST: SuggestResponse,
+    Method.RELATIONS: RelationSearchResponse,
+}
+
+# result of a shard query that did not answer in time
+MISSING = object()
+
+HEDGED_REQUESTS = metrics.Counter(
+    "nucliadb_search_hedged_requests", labels={"type": ""}
+)
+
 REQUEST_TYPE = Union[
     SuggestRequest, ParagraphSearchRequest, SearchRequest, RelationSearchRequest
 ]
@@ -87,7 +114,10 @@ async def node_query(
     pb_query: SuggestRequest,
     target_replicas: Optional[list[str]] = None,
     read_only: bool = True,
-) -> Tuple[List[SuggestResponse], bool, List[Tuple[str, str, str]], List[str]]:
+    partial_results_timeout: Optional[float] = None,
+) -> Tuple[
+    List[SuggestResponse], bool, List[Tuple[str, str, str]], List[str], List[str]
+]:
     ...
 
 
@@ -98,7 +128,14 @@ async def node_query(
     pb_query: ParagraphSearchRequest,
     target_replicas: Optional[list[str]] = None,
     read_only: bool = True,
-) -> Tuple[List[ParagraphSearchResponse], bool, List[Tuple[str, str, str]], List[str]]:
+    partial_results_timeout: Optional[float] = None,
+) -> Tuple[
+    List[ParagraphSearchResponse],
+    bool,
+    List[Tuple[str, str, str]],
+    List[str],
+    List[str],
+]:
     ...
 
 
@@ -109,7 +146,10 @@ async def node_query(
     pb_query: SearchRequest,
     target_replicas: Optional[list[str]] = None,
     read_only: bool = True,
-) -> Tuple[List[SearchResponse], bool, List[Tuple[str, str, str]], List[str]]:
+    partial_results_timeout: Optional[float] = None,
+) -> Tuple[
+    List[SearchResponse], bool, List[Tuple[str, str, str]], List[str], List[str]
+]:
     ...
 
 
@@ -120,7 +160,14 @@ async def node_query(
     pb_query: RelationSearchRequest,
     target_replicas: Optional[list[str]] = None,
     read_only: bool = True,
-) -> Tuple[List[RelationSearchResponse], bool, List[Tuple[str, str, str]], List[str]]:
+    partial_results_timeout: Optional[float] = None,
+) -> Tuple[
+    List[RelationSearchResponse],
+    bool,
+    List[Tuple[str, str, str]],
+    List[str],
+    List[str],
+]:
     ...
 
 
@@ -130,7 +177,8 @@ async def node_query(
     pb_query: REQUEST_TYPE,
     target_replicas: Optional[list[str]] = None,
     read_only: bool = True,
-) -> Tuple[List[T], bool, List[Tuple[str, str, str]], List[str]]:
+    partial_results_timeout: Optional[float] = None,
+) -> Tuple[List[T], bool, List[Tuple[str, str, str]], List[str], List[str]]:
     read_only = read_only and has_feature(const.Features.READ_REPLICA_SEARCHES)
 
     shard_manager = get_shard_manager()
@@ -146,8 +194,14 @@ async def node_query(
     ops = []
     queried_shards = []
     queried_nodes = []
+    queried_shard_groups = []
+    missing_shards = []
     incomplete_results = False
 
+    shard_cache = get_shard_result_cache()
+    if shard_cache is not None:
+        serialized_query = pb_query.SerializeToString(deterministic=True)
+
     for shard_obj in shard_groups:
         try:
             node, shard_id, node_id = cluster_manager.choose_node(
@@ -155,14 +209,44 @@ async def node_query(
             )
         except KeyError:
             incomplete_results = True
+            missing_shards.append(shard_obj.shard)
+        except NoHealthyNodeAvailable:
+            if partial_results_timeout is None:
+                raise
+            # no replica of the shard can be queried: answer without it
+            incomplete_results = True
+            missing_shards.append(shard_obj.shard)
         else:
             if shard_id is not None:
                 # At least one node is alive for this shard group
                 # let's add it ot the query list if has a valid value
-                func = METHODS[method]
-                ops.append(func(node, shard_id, pb_query))  # type: ignore
+                query = partial(
+                    shard_query,
+                    method,
+                    shard_obj,
+                    node,
+                    shard_id,
+                    pb_query,
+                    read_only=read_only,
+                    target_replicas=target_replicas,
+                )
+                if shard_cache is None:
+                    ops.append(query())
+                else:
+                    ops.append(
+                        cached_shard_query(
+                            shard_cache,
+                            kbid,
+                            method,
+                            shard_obj.shard,
+                            shard_id,
+                            serialized_query,
+                            query,
+                        )
+                    )
                 queried_nodes.append((node.label, shard_id, node_id))
                 queried_shards.append(shard_id)
+                queried_shard_groups.append(shard_obj.shard)
 
     if not ops:
         await abort_transaction()
@@ -172,6 +256,45 @@ async def node_query(
             detail=f"No node found for any of this resources shards {kbid}",
         )
 
+    if partial_results_timeout is not None:
+        answered = await gather_partial_results(
+            ops, min(partial_results_timeout, settings.search_timeout)
+        )
+        results = [result for result in answered if result is not MISSING]
+        for index, result in reversed(list(enumerate(answered))):
+            if result is MISSING:
+                missing_shards.append(queried_shard_groups[index])
+                del queried_nodes[index]
+                del queried_shards[index]
+        if missing_shards:
+            incomplete_results = True
+            logger.warning(
+                "Returning partial results, some shards did not answer in time",
+                extra={"kbid": kbid, "missing_shards": missing_shards},
+            )
+        if not results:
+            results = [asyncio.TimeoutError()]
+
+    else:
+        results = await gather_results(ops, queried_nodes)
+
+    error = validate_node_query_results(results or [])
+    if error is not None:
+        await abort_transaction()
+        raise error
+
+    return (
+        results,
+        incomplete_results,
+        queried_nodes,
+        queried_shards,
+        missing_shards,
+    )
+
+
+async def gather_results(
+    ops: list[Awaitable[Any]], queried_nodes: list[Tuple[str, str, str]]
+) -> list[Any]:
     try:
         results = await asyncio.wait_for(  # type: ignore
             asyncio.gather(*ops, return_exceptions=True),  # type: ignore
@@ -184,7 +307,7 @@ async def node_query(
             if queried_node is None:
                 node_address = "unknown"
             else:
-                node_address = node.address
+                node_address = queried_node.address
             queried_nodes_details.append(
                 {
                     "id": node_id,
@@ -196,13 +319,147 @@ async def node_query(
             "Timeout while querying nodes", extra={"nodes": queried_nodes_details}
         )
         results = [exc]
+    return results
+
+
+async def gather_partial_results(
+    ops: list[Awaitable[Any]], timeout: float
+) -> list[Any]:
+    """
+    Wait up to `timeout` seconds for the shard queries. Queries that do not
+    answer in time are cancelled and their result is `MISSING`.
+    """
+    tasks = [asyncio.ensure_future(op) for op in ops]
+    try:
+        _, pending = await asyncio.wait(tasks, timeout=timeout)
+    except asyncio.CancelledError:
+        for task in tasks:
+            task.cancel()
+        raise
+    for task in pending:
+        task.cancel()
+    # let cancelled queries clean up (i.e. hedged requests) before going on
+    await asyncio.gather(*pending, return_exceptions=True)
+
+    results: list[Any] = []
+    for task in tasks:
+        if task in pending:
+            results.append(MISSING)
+        elif task.exception() is not None:
+            results.append(task.exception())
+        else:
+            results.append(task.result())
+    return results
 
-    error = validate_node_query_results(results or [])
-    if error is not None:
-        await abort_transaction()
-        raise error
 
-    return results, incomplete_results, queried_nodes, queried_shards
+async def cached_shard_query(
+    shard_cache: ShardResultCache,
+    kbid: str,
+    method: Method,
+    shard: str,
+    replica_shard: str,
+    serialized_query: bytes,
+    query: Callable[[], Awaitable[Any]],
+):
+    cached = shard_cache.get(kbid, shard, method.name, serialized_query)
+    if cached is not None:
+        response = RESPONSES[method]()
+        response.ParseFromString(cached)
+        return response
+
+    generation = shard_cache.generation(shard, replica_shard)
+    response = await query()
+    shard_cache.set(
+        shard,
+        replica_shard,
+        method.name,
+        serialized_query,
+        response.SerializeToString(),
+        generation,
+    )
+    return response
+
+
+async def shard_query(
+    method: Method,
+    shard_obj: PBShardObject,
+    node: AbstractIndexNode,
+    shard_id: str,
+    pb_query: REQUEST_TYPE,
+    read_only: bool = True,
+    target_replicas: Optional[list[str]] = None,
+):
+    """
+    Query a shard replica. With hedged requests enabled, if the replica does
+    not answer within the delay it usually takes, the query is also sent to
+    another replica of the shard. The first answer wins and the other query
+    is cancelled.
+    """
+    if not settings.hedged_requests_enabled:
+        return await _replica_query(method, node, shard_id, pb_query)
+
+    primary = asyncio.create_task(_replica_query(method, node, shard_id, pb_query))
+    try:
+        done, _ = await asyncio.wait({primary}, timeout=hedge_delay(node))
+        if done:
+            return primary.result()
+
+        try:
+            hedge_node, hedge_shard_id, _ = cluster_manager.choose_node(
+                shard_obj,
+                read_only=read_only,
+                target_replicas=target_replicas,
+                exclude_nodes=[node.id],
+                fastest=True,
+            )
+        except NoHealthyNodeAvailable:
+            return await primary
+
+        HEDGED_REQUESTS.inc({"type": "sent"})
+        hedge = asyncio.create_task(
+            _replica_query(method, hedge_node, hedge_shard_id, pb_query)
+        )
+        pending = {primary, hedge}
+        try:
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    if task.exception() is None:
+                        if task is hedge:
+                            HEDGED_REQUESTS.inc({"type": "won"})
+                        return task.result()
+            # both replicas failed, report the error of the original one
+            return primary.result()
+        finally:
+            for task in pending:
+                task.cancel()
+    finally:
+        if not primary.done():
+            primary.cancel()
+
+
+def hedge_delay(node: AbstractIndexNode) -> float:
+    """
+    Seconds to wait for a node before hedging the query to another replica
+    """
+    delay = None
+    if len(node.latencies) >= settings.hedged_requests_min_samples:
+        delay = node.latencies.percentile(settings.hedged_requests_percentile)
+    if delay is None:
+        return settings.hedged_requests_max_delay
+    return min(
+        max(delay, settings.hedged_requests_min_delay),
+        settings.hedged_requests_max_delay,
+    )
+
+
+async def _replica_query(
+    method: Method, node: AbstractIndexNode, shard_id: str, pb_query: REQUEST_TYPE
+):
+    with node.track_request():
+        return await METHODS[method](node, shard_id, pb_query)  # type: ignore
 
 
 def validate_node_query_results(results: list[Any]) -> Optional[HTTPException]:
@@ -18,18 +18,53 @@
 # along with this program. If not, see <http://www.gnu.org/licenses/>.
 
 import asyncio
+import hashlib
+import logging
+import time
+import uuid as uuid_lib
+from array import array
+from collections import OrderedDict
 from contextvars import ContextVar
-from typing import Dict, Optional
+from typing import (
+    Awaitable,
+    Callable,
+    Dict,
+    Generic,
+    Hashable,
+    List,
+    Optional,
+    Set,
+    Tuple,
+    Type,
+    TypeVar,
+)
 
 from lru import LRU  # type: ignore
+from nucliadb_protos.resources_pb2 import FieldComputedMetadata
+from nucliadb_protos.utils_pb2 import ExtractedText
+from nucliadb_protos.writer_pb2 import Notification
 
+from nucliadb.common.cluster.settings import in_standalone_mode
 from nucliadb.common.maindb.driver import Transaction
+from nucliadb.ingest.fields.base import Field
 from nucliadb.ingest.orm.knowledgebox import KnowledgeBox as KnowledgeBoxORM
 from nucliadb.ingest.orm.resource import Resource as ResourceORM
+from nucliadb.ingest.orm.utils import batch_get_basic, get_basic
 from nucliadb.ingest.txn_utils import get_transaction
 from nucliadb.search import SERVICE_NAME
+from nucliadb.search.settings import settings
 from nucliadb_telemetry import metrics
-from nucliadb_utils.utilities import get_storage
+from nucliadb_utils import const
+from nucliadb_utils.cache.pubsub import PubSubDriver
+from nucliadb_utils.utilities import (
+    clean_utility,
+    get_pubsub,
+    get_storage,
+    get_utility,
+    set_utility,
+)
+
+logger = logging.getLogger(__name__)
 
 rcache: ContextVar[Optional[Dict[str, ResourceORM]]] = ContextVar(
     "rcache", default=None
@@ -38,6 +73,657 @@ rcache: ContextVar[Optional[Dict[str, ResourceORM]]] = ContextVar(
 
 RESOURCE_LOCKS: Dict[str, asyncio.Lock] = LRU(1000)  # type: ignore
 RESOURCE_CACHE_OPS = metrics.Counter("nucliadb_resource_cache_ops", labels={"type": ""})
+RESOURCE_PARTS_CACHE_OPS = metrics.Counter(
+    "nucliadb_resource_parts_cache_ops", labels={"type": "", "part": ""}
+)
+RESOURCE_PARTS_CACHE_SIZE = metrics.Gauge(
+    "nucliadb_resource_parts_cache_size", labels={"type": ""}
+)
+
+SHARD_CACHE_OPS = metrics.Counter(
+    "nucliadb_shard_cache_ops", labels={"type": "", "kbid": ""}
+)
+QUERY_EMBEDDINGS_CACHE_OPS = metrics.Counter(
+    "nucliadb_query_embeddings_cache_ops", labels={"type": ""}
+)
+KB_METADATA_CACHE_OPS = metrics.Counter(
+    "nucliadb_kb_metadata_cache_ops", labels={"type": ""}
+)
+
+RESOURCE_PARTS_CACHE_UTIL = "resource_parts_cache"
+SHARD_RESULT_CACHE_UTIL = "shard_result_cache"
+QUERY_EMBEDDINGS_CACHE_UTIL = "query_embeddings_cache"
+KB_METADATA_CACHE_UTIL = "kb_metadata_cache"
+
+# number of invalidated resources whose generation is remembered
+MAX_TRACKED_GENERATIONS = 10_000
+
+PB = TypeVar("PB")
+G = TypeVar("G", bound=Hashable)
+S = TypeVar("S")
+
+
+class BytesLRUCache(Generic[G]):
+    """
+    LRU cache of serialized values bounded by number of entries and bytes,
+    where entries expire after `ttl` seconds.
+
+    Every entry belongs to a group (a resource, a shard...) so all the
+    entries of a group can be invalidated at once.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_entries: int,
+        max_bytes: int,
+        ttl: float,
+        on_evict: Optional[Callable[[G, str], None]] = None,
+    ):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.on_evict = on_evict
+        self.size = 0
+        self._values: OrderedDict[Tuple[G, str], Tuple[float, bytes]] = OrderedDict()
+        self._groups: Dict[G, Set[str]] = {}
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def get(self, group: G, key: str) -> Optional[bytes]:
+        item = self._values.get((group, key))
+        if item is None:
+            return None
+        expires, value = item
+        if expires < time.monotonic():
+            self._remove((group, key))
+            return None
+        self._values.move_to_end((group, key))
+        return value
+
+    def set(self, group: G, key: str, value: bytes) -> None:
+        if len(value) > self.max_bytes:
+            return
+        self._remove((group, key))
+        self._values[(group, key)] = (time.monotonic() + self.ttl, value)
+        self._groups.setdefault(group, set()).add(key)
+        self.size += len(value)
+        while len(self._values) > self.max_entries or self.size > self.max_bytes:
+            oldest = next(iter(self._values))
+            self._remove(oldest)
+            if self.on_evict is not None:
+                self.on_evict(*oldest)
+
+    def invalidate(self, group: G) -> bool:
+        keys = self._groups.pop(group, None)
+        if not keys:
+            return False
+        for key in keys:
+            item = self._values.pop((group, key), None)
+            if item is not None:
+                self.size -= len(item[1])
+        return True
+
+    def clear(self) -> None:
+        self._values.clear()
+        self._groups.clear()
+        self.size = 0
+
+    def _remove(self, item_key: Tuple[G, str]) -> None:
+        item = self._values.pop(item_key, None)
+        if item is None:
+            return
+        self.size -= len(item[1])
+        group, key = item_key
+        keys = self._groups.get(group)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._groups[group]
+
+
+class ResourcePartsCache:
+    """
+    Process wide LRU cache of hydrated resource parts (basic, extracted text,
+    field metadata...) keyed by `(kbid, rid, part)`.
+
+    Values are stored serialized so the cache can be bounded by bytes and
+    callers never share mutable protobuf objects. Entries expire after `ttl`
+    seconds and all parts of a resource are dropped whenever ingest publishes
+    a commit notification for it. Every resource has a generation that is
+    bumped on invalidation, so a part loaded while the resource was being
+    committed is never cached.
+    """
+
+    subscription_id: Optional[str] = None
+
+    def __init__(
+        self,
+        *,
+        max_entries: int,
+        max_bytes: int,
+        ttl: float,
+        pubsub: Optional[PubSubDriver] = None,
+    ):
+        self.pubsub = pubsub
+        self.values: BytesLRUCache[Tuple[str, str]] = BytesLRUCache(
+            max_entries=max_entries,
+            max_bytes=max_bytes,
+            ttl=ttl,
+            on_evict=self._on_evict,
+        )
+        # generation of the last invalidated resources, older resources share
+        # the generation of the last one forgotten
+        self.generations: OrderedDict[Tuple[str, str], int] = OrderedDict()
+        self._last_generation = 0
+        self._base_generation = 0
+
+    @property
+    def size(self) -> int:
+        return self.values.size
+
+    async def initialize(self) -> None:
+        if self.pubsub is None:
+            return
+        self.subscription_id = str(uuid_lib.uuid4())
+        await self.pubsub.subscribe(
+            handler=self.handle_message,
+            key=const.PubSubChannels.RESOURCE_NOTIFY.format(kbid="*"),
+            subscription_id=self.subscription_id,
+        )
+
+    async def finalize(self) -> None:
+        if self.pubsub is not None and self.subscription_id is not None:
+            await self.pubsub.unsubscribe(self.subscription_id)
+            self.subscription_id = None
+        self.clear()
+
+    async def handle_message(self, raw_data) -> None:
+        assert self.pubsub is not None
+        data = self.pubsub.parse(raw_data)
+        notification = Notification()
+        notification.ParseFromString(data)
+        if notification.action != Notification.Action.COMMIT:
+            return
+        self.invalidate(notification.kbid, notification.uuid)
+
+    def get(self, kbid: str, rid: str, part: str) -> Optional[bytes]:
+        value = self.values.get((kbid, rid), part)
+        if value is None:
+            RESOURCE_PARTS_CACHE_OPS.inc({"type": "miss", "part": _part_type(part)})
+        else:
+            RESOURCE_PARTS_CACHE_OPS.inc({"type": "hit", "part": _part_type(part)})
+        return value
+
+    def generation(self, kbid: str, rid: str) -> int:
+        return self.generations.get((kbid, rid), self._base_generation)
+
+    def set(
+        self,
+        kbid: str,
+        rid: str,
+        part: str,
+        value: bytes,
+        generation: Optional[int] = None,
+    ) -> None:
+        """
+        With `generation`, the part is only cached if the resource was not
+        invalidated since it was read.
+        """
+        if generation is not None and generation != self.generation(kbid, rid):
+            return
+        self.values.set((kbid, rid), part, value)
+        self._report_size()
+
+    def invalidate(self, kbid: str, rid: str) -> None:
+        self._last_generation += 1
+        self.generations[(kbid, rid)] = self._last_generation
+        self.generations.move_to_end((kbid, rid))
+        if len(self.generations) > MAX_TRACKED_GENERATIONS:
+            _, self._base_generation = self.generations.popitem(last=False)
+        if self.values.invalidate((kbid, rid)):
+            RESOURCE_PARTS_CACHE_OPS.inc({"type": "invalidate", "part": "resource"})
+            self._report_size()
+
+    def clear(self) -> None:
+        self.values.clear()
+        self._report_size()
+
+    def _on_evict(self, group: Tuple[str, str], part: str) -> None:
+        RESOURCE_PARTS_CACHE_OPS.inc({"type": "evict", "part": _part_type(part)})
+
+    def _report_size(self) -> None:
+        RESOURCE_PARTS_CACHE_SIZE.set(len(self.values), labels={"type": "entries"})
+        RESOURCE_PARTS_CACHE_SIZE.set(self.values.size, labels={"type": "bytes"})
+
+
+def _part_type(part: str) -> str:
+    # parts are named like `extracted_text/t/body`, only report the kind
+    return part.split("/", 1)[0]
+
+
+class ShardResultCache:
+    """
+    Process wide LRU cache of index node query responses keyed by
+    `(shard, method, serialized request)`.
+
+    Entries are grouped by logical shard: every replica of a shard answers
+    the same and a replica being indexed invalidates the whole group. Index
+    nodes publish every index message they apply on a per shard channel.
+    """
+
+    subscription_id: Optional[str] = None
+
+    def __init__(
+        self,
+        *,
+        max_entries: int,
+        max_bytes: int,
+        ttl: float,
+        pubsub: Optional[PubSubDriver] = None,
+    ):
+        self.pubsub = pubsub
+        self.values: BytesLRUCache[str] = BytesLRUCache(
+            max_entries=max_entries, max_bytes=max_bytes, ttl=ttl
+        )
+        # replica shard id -> logical shard id
+        self.replicas: Dict[str, str] = {}
+        # bumped on every invalidation so responses requested before
+        # a shard was indexed are not stored afterwards
+        self.generations: Dict[str, int] = {}
+
+    async def initialize(self) -> None:
+        if self.pubsub is None:
+            return
+        self.subscription_id = str(uuid_lib.uuid4())
+        await self.pubsub.subscribe(
+            handler=self.handle_message,
+            key=const.PubSubChannels.SHARD_INDEXED.format(shard="*"),
+            subscription_id=self.subscription_id,
+        )
+
+    async def finalize(self) -> None:
+        if self.pubsub is not None and self.subscription_id is not None:
+            await self.pubsub.unsubscribe(self.subscription_id)
+            self.subscription_id = None
+        self.values.clear()
+        self.replicas.clear()
+
+    async def handle_message(self, raw_data) -> None:
+        assert self.pubsub is not None
+        shard = self.pubsub.parse(raw_data).decode()
+        self.invalidate(shard)
+
+    def get(
+        self, kbid: str, shard: str, method: str, request: bytes
+    ) -> Optional[bytes]:
+        value = self.values.get(shard, self._key(method, request))
+        if value is None:
+            SHARD_CACHE_OPS.inc({"type": "miss", "kbid": kbid})
+        else:
+            SHARD_CACHE_OPS.inc({"type": "hit", "kbid": kbid})
+        return value
+
+    def generation(self, shard: str, replica_shard: str) -> int:
+        self.replicas[replica_shard] = shard
+        return self.generations.get(shard, 0)
+
+    def set(
+        self,
+        shard: str,
+        replica_shard: str,
+        method: str,
+        request: bytes,
+        value: bytes,
+        generation: int,
+    ) -> None:
+        self.replicas[replica_shard] = shard
+        if generation != self.generations.get(shard, 0):
+            # shard was indexed while the query was running
+            return
+        self.values.set(shard, self._key(method, request), value)
+
+    def invalidate(self, replica_shard: str) -> None:
+        shard = self.replicas.get(replica_shard, replica_shard)
+        self.generations[shard] = self.generations.get(shard, 0) + 1
+        self.values.invalidate(shard)
+
+    def _key(self, method: str, request: bytes) -> str:
+        return f"{method}/{hashlib.sha256(request).hexdigest()}"
+
+
+class QueryEmbeddingsCache:
+    """
+    Process wide LRU cache of the vectors predict computes for search
+    queries, keyed by `(kbid, normalized query)`.
+
+    Vectors are stored as float32 bytes. The semantic model of a KB is not
+    known here, so vectors are only kept for a short `ttl` to bound how long
+    vectors of a previous model can be served.
+    """
+
+    def __init__(self, *, max_entries: int, max_bytes: int, ttl: float):
+        self.values: BytesLRUCache[str] = BytesLRUCache(
+            max_entries=max_entries, max_bytes=max_bytes, ttl=ttl
+        )
+
+    def get(self, kbid: str, query: str) -> Optional[List[float]]:
+        payload = self.values.get(kbid, self._key(query))
+        if payload is None:
+            QUERY_EMBEDDINGS_CACHE_OPS.inc({"type": "miss"})
+            return None
+        QUERY_EMBEDDINGS_CACHE_OPS.inc({"type": "hit"})
+        vector = array("f")
+        vector.frombytes(payload)
+        return vector.tolist()
+
+    def set(self, kbid: str, query: str, vector: List[float]) -> None:
+        self.values.set(kbid, self._key(query), array("f", vector).tobytes())
+
+    def clear(self) -> None:
+        self.values.clear()
+
+    def _key(self, query: str) -> str:
+        normalized = " ".join(query.split())
+        return hashlib.sha256(normalized.encode()).hexdigest()
+
+
+class KBMetadataCache(Generic[S]):
+    """
+    Process wide cache of a snapshot of the configuration of every KB
+    (synonyms, labels, entities...) needed to parse search queries.
+
+    Snapshots are reloaded after `ttl` seconds. KB changes are written by
+    other processes, so the ttl bounds how long a change takes to be seen.
+    Until the reload finishes, the previous snapshot is served. Concurrent requests for a KB share the
+    same reload so a KB is never loaded more than once at a time.
+    """
+
+    def __init__(self, *, max_kbs: int, ttl: float):
+        self.ttl = ttl
+        # kbid -> (loaded at, version, snapshot)
+        self.snapshots: Dict[str, Tuple[float, int, S]] = LRU(max_kbs)
+        self.loading: Dict[str, asyncio.Task] = {}
+        self.versions: Dict[str, int] = {}
+
+    async def get(self, kbid: str, loader: Callable[[str], Awaitable[S]]) -> S:
+        item = self.snapshots.get(kbid)
+        if item is None:
+            KB_METADATA_CACHE_OPS.inc({"type": "miss"})
+            # shielded so a cancelled request does not cancel the load
+            # other requests are waiting for
+            return await asyncio.shield(self._reload(kbid, loader))
+
+        loaded_at, _, snapshot = item
+        if loaded_at + self.ttl < time.monotonic():
+            KB_METADATA_CACHE_OPS.inc({"type": "stale"})
+            task = self._reload(kbid, loader)
+            task.add_done_callback(self._log_reload_error)
+        else:
+            KB_METADATA_CACHE_OPS.inc({"type": "hit"})
+        return snapshot
+
+    def version(self, kbid: str) -> Optional[int]:
+        item = self.snapshots.get(kbid)
+        if item is None:
+            return None
+        return item[1]
+
+    def clear(self) -> None:
+        for task in self.loading.values():
+            task.cancel()
+        self.loading.clear()
+        self.snapshots.clear()
+
+    def _reload(
+        self, kbid: str, loader: Callable[[str], Awaitable[S]]
+    ) -> "asyncio.Task[S]":
+        task = self.loading.get(kbid)
+        if task is None:
+            task = asyncio.create_task(self._load(kbid, loader))
+            self.loading[kbid] = task
+        return task
+
+    async def _load(self, kbid: str, loader: Callable[[str], Awaitable[S]]) -> S:
+        try:
+            snapshot = await loader(kbid)
+            version = self.versions.get(kbid, 0) + 1
+            self.versions[kbid] = version
+            self.snapshots[kbid] = (time.monotonic(), version, snapshot)
+            return snapshot
+        finally:
+            self.loading.pop(kbid, None)
+
+    def _log_reload_error(self, task: asyncio.Task) -> None:
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning(
+                "Error reloading KB metadata, serving the previous snapshot",
+                exc_info=task.exception(),
+            )
+
+
+async def start_resource_parts_cache() -> Optional[ResourcePartsCache]:
+    if not settings.resource_cache_enabled:
+        return None
+
+    util = get_utility(RESOURCE_PARTS_CACHE_UTIL)
+    if util is not None:
+        return util
+
+    pubsub = await get_pubsub()
+    if pubsub is None:
+        logger.warning(
+            "Resource parts cache needs a pubsub to be invalidated, not enabling it"
+        )
+        return None
+
+    cache = ResourcePartsCache(
+        max_entries=settings.resource_cache_max_entries,
+        max_bytes=settings.resource_cache_max_bytes,
+        ttl=settings.resource_cache_ttl,
+        pubsub=pubsub,
+    )
+    await cache.initialize()
+    set_utility(RESOURCE_PARTS_CACHE_UTIL, cache)
+    return cache
+
+
+async def stop_resource_parts_cache() -> None:
+    cache: Optional[ResourcePartsCache] = get_utility(RESOURCE_PARTS_CACHE_UTIL)
+    if cache is None:
+        return
+    await cache.finalize()
+    clean_utility(RESOURCE_PARTS_CACHE_UTIL)
+
+
+def get_resource_parts_cache() -> Optional[ResourcePartsCache]:
+    return get_utility(RESOURCE_PARTS_CACHE_UTIL)
+
+
+async def start_shard_result_cache() -> Optional[ShardResultCache]:
+    if not settings.shard_cache_enabled:
+        return None
+
+    util = get_utility(SHARD_RESULT_CACHE_UTIL)
+    if util is not None:
+        return util
+
+    if in_standalone_mode():
+        logger.warning("Shard result cache is not available in standalone mode")
+        return None
+
+    pubsub = await get_pubsub()
+    if pubsub is None:
+        logger.warning(
+            "Shard result cache needs a pubsub to be invalidated, not enabling it"
+        )
+        return None
+
+    cache = ShardResultCache(
+        max_entries=settings.shard_cache_max_entries,
+        max_bytes=settings.shard_cache_max_bytes,
+        ttl=settings.shard_cache_ttl,
+        pubsub=pubsub,
+    )
+    await cache.initialize()
+    set_utility(SHARD_RESULT_CACHE_UTIL, cache)
+    return cache
+
+
+async def stop_shard_result_cache() -> None:
+    cache: Optional[ShardResultCache] = get_utility(SHARD_RESULT_CACHE_UTIL)
+    if cache is None:
+        return
+    await cache.finalize()
+    clean_utility(SHARD_RESULT_CACHE_UTIL)
+
+
+def get_shard_result_cache() -> Optional[ShardResultCache]:
+    return get_utility(SHARD_RESULT_CACHE_UTIL)
+
+
+def start_query_embeddings_cache() -> Optional[QueryEmbeddingsCache]:
+    if not settings.query_embeddings_cache_enabled:
+        return None
+
+    util = get_utility(QUERY_EMBEDDINGS_CACHE_UTIL)
+    if util is not None:
+        return util
+
+    cache = QueryEmbeddingsCache(
+        max_entries=settings.query_embeddings_cache_max_entries,
+        max_bytes=settings.query_embeddings_cache_max_bytes,
+        ttl=settings.query_embeddings_cache_ttl,
+    )
+    set_utility(QUERY_EMBEDDINGS_CACHE_UTIL, cache)
+    return cache
+
+
+def stop_query_embeddings_cache() -> None:
+    cache: Optional[QueryEmbeddingsCache] = get_utility(QUERY_EMBEDDINGS_CACHE_UTIL)
+    if cache is None:
+        return
+    cache.clear()
+    clean_utility(QUERY_EMBEDDINGS_CACHE_UTIL)
+
+
+def get_query_embeddings_cache() -> Optional[QueryEmbeddingsCache]:
+    return get_utility(QUERY_EMBEDDINGS_CACHE_UTIL)
+
+
+def start_kb_metadata_cache() -> Optional[KBMetadataCache]:
+    if not settings.kb_metadata_cache_enabled:
+        return None
+
+    util = get_utility(KB_METADATA_CACHE_UTIL)
+    if util is not None:
+        return util
+
+    cache: KBMetadataCache = KBMetadataCache(
+        max_kbs=settings.kb_metadata_cache_max_kbs,
+        ttl=settings.kb_metadata_cache_ttl,
+    )
+    set_utility(KB_METADATA_CACHE_UTIL, cache)
+    return cache
+
+
+def stop_kb_metadata_cache() -> None:
+    cache: Optional[KBMetadataCache] = get_utility(KB_METADATA_CACHE_UTIL)
+    if cache is None:
+        return
+    cache.clear()
+    clean_utility(KB_METADATA_CACHE_UTIL)
+
+
+def get_kb_metadata_cache() -> Optional[KBMetadataCache]:
+    return get_utility(KB_METADATA_CACHE_UTIL)
+
+
+async def get_cached_part(
+    kbid: str,
+    rid: str,
+    part: str,
+    pbklass: Type[PB],
+    loader: Callable[[], Awaitable[Optional[PB]]],
+) -> Optional[PB]:
+    """
+    Read a resource part from the process wide cache, falling back to
+    `loader` and storing its result when it is not cached.
+    """
+    cache = get_resource_parts_cache()
+    if cache is None:
+        return await loader()
+
+    payload = cache.get(kbid, rid, part)
+    if payload is not None:
+        pb = pbklass()
+        pb.ParseFromString(payload)  # type: ignore
+        return pb
+
+    generation = cache.generation(kbid, rid)
+    value = await loader()
+    if value is not None:
+        cache.set(
+            kbid, rid, part, value.SerializeToString(), generation  # type: ignore
+        )
+    return value
+
+
+async def get_field_extracted_text(field: Field) -> Optional[ExtractedText]:
+    if field.extracted_text is not None or get_resource_parts_cache() is None:
+        return await field.get_extracted_text()
+
+    field.extracted_text = await get_cached_part(
+        field.kbid,
+        field.uuid,
+        f"extracted_text/{field.type}/{field.id}",
+        ExtractedText,
+        field.get_extracted_text,
+    )
+    return field.extracted_text
+
+
+async def get_field_metadata(field: Field) -> Optional[FieldComputedMetadata]:
+    if field.computed_metadata is not None or get_resource_parts_cache() is None:
+        return await field.get_field_metadata()
+
+    field.computed_metadata = await get_cached_part(
+        field.kbid,
+        field.uuid,
+        f"field_metadata/{field.type}/{field.id}",
+        FieldComputedMetadata,
+        field.get_field_metadata,
+    )
+    return field.computed_metadata
+
+
+async def _get_orm_resource(
+    kbid: str, uuid: str, txn: Transaction
+) -> Optional[ResourceORM]:
+    storage = await get_storage(service_name=SERVICE_NAME)
+    kb = KnowledgeBoxORM(txn, storage, kbid)
+
+    cache = get_resource_parts_cache()
+    if cache is None:
+        return await kb.get(uuid)
+
+    raw_basic = cache.get(kbid, uuid, "basic")
+    if raw_basic is None:
+        generation = cache.generation(kbid, uuid)
+        raw_basic = await get_basic(txn, kbid, uuid)
+        if not raw_basic:
+            return None
+        cache.set(kbid, uuid, "basic", raw_basic, generation)
+
+    return ResourceORM(
+        txn=txn,
+        storage=storage,
+        kb=kb,
+        uuid=uuid,
+        basic=ResourceORM.parse_basic(raw_basic),
+        disable_vectors=False,
+    )
 
 
 def get_resource_cache(clear: bool = False) -> Dict[str, ResourceORM]:
@@ -63,9 +749,7 @@ async def get_resource_from_cache(
             RESOURCE_CACHE_OPS.inc({"type": "miss"})
             if txn is None:
                 txn = await get_transaction()
-            storage = await get_storage(service_name=SERVICE_NAME)
-            kb = KnowledgeBoxORM(txn, storage, kbid)
-            orm_resource = await kb.get(uuid)
+            orm_resource = await _get_orm_resource(kbid, uuid, txn)
         else:
             RESOURCE_CACHE_OPS.inc({"type": "hit"})
 
@@ -75,3 +759,65 @@ async def get_resource_from_cache(
             orm_resource = resource_cache.get(uuid)
 
     return orm_resource
+
+
+async def get_resources_from_cache(
+    kbid: str, uuids: List[str], txn: Optional[Transaction] = None
+) -> Dict[str, ResourceORM]:
+    """
+    Batched version of `get_resource_from_cache`: the basic of all the
+    resources not loaded yet is fetched with a single `batch_get`.
+    Resources that do not exist are not included in the result.
+    """
+    resource_cache = get_resource_cache()
+    parts_cache = get_resource_parts_cache()
+
+    result: Dict[str, ResourceORM] = {}
+    raw_basics: Dict[str, bytes] = {}
+    to_fetch: List[str] = []
+    generations: Dict[str, int] = {}
+    for uuid in uuids:
+        if uuid in resource_cache:
+            RESOURCE_CACHE_OPS.inc({"type": "hit"})
+            result[uuid] = resource_cache[uuid]
+            continue
+        RESOURCE_CACHE_OPS.inc({"type": "miss"})
+        raw_basic = None
+        if parts_cache is not None:
+            raw_basic = parts_cache.get(kbid, uuid, "basic")
+        if raw_basic is not None:
+            raw_basics[uuid] = raw_basic
+        else:
+            to_fetch.append(uuid)
+            if parts_cache is not None:
+                generations[uuid] = parts_cache.generation(kbid, uuid)
+
+    if len(raw_basics) == 0 and len(to_fetch) == 0:
+        return result
+
+    if txn is None:
+        txn = await get_transaction()
+    for uuid, raw_basic in zip(to_fetch, await batch_get_basic(txn, kbid, to_fetch)):
+        if not raw_basic:
+            continue
+        raw_basics[uuid] = raw_basic
+        if parts_cache is not None:
+            parts_cache.set(kbid, uuid, "basic", raw_basic, generations[uuid])
+
+    storage = await get_storage(service_name=SERVICE_NAME)
+    kb = KnowledgeBoxORM(txn, storage, kbid)
+    for uuid, raw_basic in raw_basics.items():
+        # another task may have loaded it while we were waiting
+        orm_resource = resource_cache.get(uuid)
+        if orm_resource is None:
+            orm_resource = ResourceORM(
+                txn=txn,
+                storage=storage,
+                kb=kb,
+                uuid=uuid,
+                basic=ResourceORM.parse_basic(raw_basic),
+                disable_vectors=False,
+            )
+            resource_cache[uuid] = orm_resource
+        result[uuid] = orm_resource
+    return result
@@ -115,7 +115,7 @@ async def get_chat_prompt_context(
     storage = await get_storage()
     # ordered dict that prevents duplicates pulled in through conversation expansion
     output = {}
-    async with driver.transaction() as txn:
+    async with driver.transaction(read_only=True) as txn:
         kb = KnowledgeBoxORM(txn, storage, kbid)
         for field_path, paragraph in ordered_paras:
             text = paragraph.text.strip()
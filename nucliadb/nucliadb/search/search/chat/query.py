@@ -175,6 +175,7 @@ async def get_relations_results(
         _,
         _,
         _,
+        _,
     ) = await node_query(
         kbid, Method.RELATIONS, relation_request, target_replicas=chat_request.shards
     )
@@ -25,13 +25,14 @@ from nucliadb_protos.resources_pb2 import Paragraph
 
 from nucliadb.ingest.orm.resource import KB_REVERSE
 from nucliadb.ingest.orm.resource import Resource as ResourceORM
-from nucliadb.ingest.serialize import serialize
+from nucliadb.ingest.serialize import serialize_resources
 from nucliadb.search import SERVICE_NAME, logger
+from nucliadb.search.settings import settings
 from nucliadb_models.common import FieldTypeName
 from nucliadb_models.resource import ExtractedDataTypeName, Resource
 from nucliadb_models.search import ResourceProperties
 
-from .cache import get_resource_from_cache
+from .cache import get_field_metadata, get_resource_from_cache
 
 rcache: ContextVar[Optional[Dict[str, ResourceORM]]] = ContextVar(
     "rcache", default=None
@@ -45,19 +46,15 @@ async def fetch_resources(
     field_type_filter: List[FieldTypeName],
     extracted: List[ExtractedDataTypeName],
 ) -> Dict[str, Resource]:
-    result = {}
-    for resource in resources:
-        serialization = await serialize(
-            kbid,
-            resource,
-            show,
-            field_type_filter=field_type_filter,
-            extracted=extracted,
-            service_name=SERVICE_NAME,
-        )
-        if serialization is not None:
-            result[resource] = serialization
-    return result
+    return await serialize_resources(
+        kbid,
+        resources,
+        show,
+        field_type_filter=field_type_filter,
+        extracted=extracted,
+        service_name=SERVICE_NAME,
+        max_concurrency=settings.fetch_resources_max_concurrency,
+    )
 
 
 async def get_paragraph_from_resource(
@@ -66,7 +63,7 @@ async def get_paragraph_from_resource(
     _, field_type, field = result.field.split("/")
     field_type_int = KB_REVERSE[field_type]
     field_obj = await orm_resource.get_field(field, field_type_int, load=False)
-    field_metadata = await field_obj.get_field_metadata()
+    field_metadata = await get_field_metadata(field_obj)
     paragraph = None
     if field_metadata:
         if result.split not in (None, ""):
@@ -109,7 +106,7 @@ async def get_labels_paragraph(result: ParagraphResult, kbid: str) -> List[str]:
     _, field_type, field = result.field.split("/")
     field_type_int = KB_REVERSE[field_type]
     field_obj = await orm_resource.get_field(field, field_type_int, load=False)
-    field_metadata = await field_obj.get_field_metadata()
+    field_metadata = await get_field_metadata(field_obj)
     if field_metadata:
         paragraph = None
         if result.split not in (None, ""):
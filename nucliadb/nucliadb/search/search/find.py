@@ -70,8 +70,18 @@ async def find(
         key_filters=item.resource_filters,
     )
     pb_query, incomplete_results, autofilters = await query_parser.parse()
-    results, query_incomplete_results, queried_nodes, queried_shards = await node_query(
-        kbid, Method.SEARCH, pb_query, target_replicas=item.shards
+    (
+        results,
+        query_incomplete_results,
+        queried_nodes,
+        queried_shards,
+        missing_shards,
+    ) = await node_query(
+        kbid,
+        Method.SEARCH,
+        pb_query,
+        target_replicas=item.shards,
+        partial_results_timeout=item.partial_results_timeout,
     )
     incomplete_results = incomplete_results or query_incomplete_results
 
@@ -103,5 +113,7 @@ async def find(
         search_results.nodes = queried_nodes
 
     search_results.shards = queried_shards
+    if missing_shards:
+        search_results.missing_shards = missing_shards
     search_results.autofilters = autofilters
     return search_results, incomplete_results
@@ -18,6 +18,8 @@
 # along with this program. If not, see <http://www.gnu.org/licenses/>.
 #
 import asyncio
+import heapq
+from itertools import islice
 from typing import Any, Dict, Iterator, List, Optional, Tuple, cast
 
 from nucliadb_protos.nodereader_pb2 import (
@@ -27,10 +29,11 @@ from nucliadb_protos.nodereader_pb2 import (
     SearchResponse,
 )
 
-from nucliadb.ingest.serialize import serialize
+from nucliadb.ingest.orm.resource import KB_REVERSE
+from nucliadb.ingest.orm.resource import Resource as ResourceORM
 from nucliadb.ingest.txn_utils import abort_transaction, get_transaction
-from nucliadb.search import SERVICE_NAME, logger
-from nucliadb.search.search.cache import get_resource_cache
+from nucliadb.search import logger
+from nucliadb.search.search.cache import get_resource_cache, get_resources_from_cache
 from nucliadb.search.search.merge import merge_relations_results
 from nucliadb_models.common import FieldTypeName
 from nucliadb_models.resource import ExtractedDataTypeName
@@ -47,6 +50,7 @@ from nucliadb_models.search import (
 from nucliadb_telemetry import metrics
 
 from . import paragraphs
+from .fetch import fetch_resources
 from .metrics import merge_observer
 
 FIND_FETCH_OPS_DISTRIBUTION = metrics.Histogram(
@@ -56,65 +60,65 @@ FIND_FETCH_OPS_DISTRIBUTION = metrics.Histogram(
 
 
 @merge_observer.wrap({"type": "set_text_value"})
-async def set_text_value(
-    kbid: str,
-    result_paragraph: TempFindParagraph,
+async def set_field_text_values(
+    orm_resource: ResourceORM,
+    field: str,
+    field_paragraphs: List[TempFindParagraph],
     max_operations: asyncio.Semaphore,
     highlight: bool = False,
     ematches: Optional[List[str]] = None,
-    extracted_text_cache: Optional[paragraphs.ExtractedTextCache] = None,
 ):
-    # TODO: Improve
-    await max_operations.acquire()
-    try:
-        assert result_paragraph.paragraph
-        assert result_paragraph.paragraph.position
-        result_paragraph.paragraph.text = await paragraphs.get_paragraph_text(
-            kbid=kbid,
-            rid=result_paragraph.rid,
-            field=result_paragraph.field,
-            start=result_paragraph.paragraph.position.start,
-            end=result_paragraph.paragraph.position.end,
-            split=result_paragraph.split,
-            highlight=highlight,
-            ematches=ematches,
-            matches=[],  # TODO
-            extracted_text_cache=extracted_text_cache,
+    """
+    Set the text of all the result paragraphs of a field. The field extracted
+    text is downloaded once and every paragraph is sliced from it.
+    """
+    async with max_operations:
+        _, field_type, field_id = field.split("/")
+        field_obj = await orm_resource.get_field(
+            field_id, KB_REVERSE[field_type], load=False
         )
-    finally:
-        max_operations.release()
+        for result_paragraph in field_paragraphs:
+            assert result_paragraph.paragraph
+            assert result_paragraph.paragraph.position
+            text = await paragraphs.get_paragraph_from_full_text(
+                field=field_obj,
+                start=result_paragraph.paragraph.position.start,
+                end=result_paragraph.paragraph.position.end,
+                split=result_paragraph.split,
+            )
+            if highlight:
+                text = paragraphs.highlight_paragraph(text, words=[], ematches=ematches)
+            result_paragraph.paragraph.text = text
 
 
 @merge_observer.wrap({"type": "set_resource_metadada_value"})
-async def set_resource_metadata_value(
+async def set_resources_metadata_values(
     kbid: str,
-    resource: str,
+    resources: List[str],
     show: List[ResourceProperties],
     field_type_filter: List[FieldTypeName],
     extracted: List[ExtractedDataTypeName],
     find_resources: Dict[str, FindResource],
-    max_operations: asyncio.Semaphore,
 ):
-    await max_operations.acquire()
-
-    try:
-        serialized_resource = await serialize(
-            kbid,
-            resource,
-            show,
-            field_type_filter=field_type_filter,
-            extracted=extracted,
-            service_name=SERVICE_NAME,
-        )
+    """
+    Serialize all the result resources at once, in a single transaction that
+    reads the basic metadata of all of them with one round trip.
+    """
+    serialized_resources = await fetch_resources(
+        resources,
+        kbid,
+        show,
+        field_type_filter=field_type_filter,
+        extracted=extracted,
+    )
+    for resource in resources:
+        serialized_resource = serialized_resources.get(resource)
         if serialized_resource is not None:
             find_resources[resource].updated_from(serialized_resource)
         else:
             logger.warning(f"Resource {resource} not found in {kbid}")
             find_resources.pop(resource, None)
 
-    finally:
-        max_operations.release()
-
 
 class Orderer:
     def __init__(self):
@@ -157,7 +161,8 @@ async def fetch_find_metadata(
     operations = []
     max_operations = asyncio.Semaphore(50)
     orderer = Orderer()
-    etcache = paragraphs.ExtractedTextCache()
+    # paragraphs are grouped by field so every extracted text is fetched once
+    fields_paragraphs: Dict[Tuple[str, str], List[TempFindParagraph]] = {}
     for result_paragraph in result_paragraphs:
         if result_paragraph.paragraph is not None:
             find_resource = find_resources.setdefault(
@@ -192,37 +197,46 @@ async def fetch_find_metadata(
                     )
                 )
 
-            operations.append(
-                asyncio.create_task(
-                    set_text_value(
-                        kbid=kbid,
-                        result_paragraph=result_paragraph,
-                        highlight=highlight,
-                        ematches=ematches,
-                        max_operations=max_operations,
-                        extracted_text_cache=etcache,
-                    )
-                )
-            )
+            fields_paragraphs.setdefault(
+                (result_paragraph.rid, result_paragraph.field), []
+            ).append(result_paragraph)
             resources.add(result_paragraph.rid)
-    etcache.clear()
 
     for order, (rid, field_id, paragraph_id) in enumerate(
         orderer.sorted_by_insertion()
     ):
         find_resources[rid].fields[field_id].paragraphs[paragraph_id].order = order
 
-    for resource in resources:
+    # all the resources basic are loaded with a single maindb round trip
+    orm_resources = await get_resources_from_cache(kbid, list(resources))
+    for (rid, field), field_paragraphs in fields_paragraphs.items():
+        orm_resource = orm_resources.get(rid)
+        if orm_resource is None:
+            logger.error(f"{kbid}/{rid}:{field} does not exist on DB")
+            continue
         operations.append(
             asyncio.create_task(
-                set_resource_metadata_value(
+                set_field_text_values(
+                    orm_resource=orm_resource,
+                    field=field,
+                    field_paragraphs=field_paragraphs,
+                    max_operations=max_operations,
+                    highlight=highlight,
+                    ematches=ematches,
+                )
+            )
+        )
+
+    if len(resources) > 0:
+        operations.append(
+            asyncio.create_task(
+                set_resources_metadata_values(
                     kbid=kbid,
-                    resource=resource,
+                    resources=list(resources),
                     show=show,
                     field_type_filter=field_type_filter,
                     extracted=extracted,
                     find_resources=find_resources,
-                    max_operations=max_operations,
                 )
             )
         )
@@ -235,6 +249,89 @@ async def fetch_find_metadata(
                 logger.error("Error fetching find metadata", exc_info=task.exception())
 
 
+def _iter_paragraphs(
+    paragraphs_shards: List[List[ParagraphResult]],
+) -> Iterator[TempFindParagraph]:
+    """
+    K-way merge of the bm25 results of all shards. Every shard returns its
+    results sorted by score, so the results are yielded sorted by score
+    without sorting them all.
+    """
+    seen = set()
+    for paragraph in heapq.merge(
+        *paragraphs_shards, key=lambda p: p.score.bm25, reverse=True
+    ):
+        if paragraph.paragraph in seen:
+            continue
+        seen.add(paragraph.paragraph)
+        yield TempFindParagraph(
+            paragraph_index=paragraph,
+            field=paragraph.field,
+            rid=paragraph.uuid,
+            score=paragraph.score.bm25,
+            start=paragraph.start,
+            split=paragraph.split,
+            end=paragraph.end,
+            id=paragraph.paragraph,
+        )
+
+
+def _iter_vectors(
+    vectors_shards: List[List[DocumentScored]], min_score: float
+) -> Iterator[TempFindParagraph]:
+    """
+    K-way merge of the vector results of all shards, sorted by score
+    """
+    seen = set()
+    for vector in heapq.merge(*vectors_shards, key=lambda v: v.score, reverse=True):
+        if vector.score < min_score:
+            continue
+        doc_id_split = vector.doc_id.id.split("/")
+        split = None
+        if len(doc_id_split) == 5:
+            rid, field_type, field, index, position = doc_id_split
+            paragraph_id = f"{rid}/{field_type}/{field}/{position}"
+        elif len(doc_id_split) == 6:
+            rid, field_type, field, split, index, position = doc_id_split
+            paragraph_id = f"{rid}/{field_type}/{field}/{split}/{position}"
+        else:
+            logger.warning(f"Skipping invalid doc_id: {vector.doc_id.id}")
+            continue
+        if paragraph_id in seen:
+            continue
+        seen.add(paragraph_id)
+        start, end = position.split("-")
+        yield TempFindParagraph(
+            vector_index=vector,
+            rid=rid,
+            field=f"/{field_type}/{field}",
+            score=vector.score,
+            start=int(start),
+            end=int(end),
+            split=split,
+            id=paragraph_id,
+        )
+
+
+def _interleave(
+    paragraphs: Iterator[TempFindParagraph], vectors: Iterator[TempFindParagraph]
+) -> Iterator[TempFindParagraph]:
+    # bm25 and vector scores are not comparable, a vector result is placed
+    # every two bm25 results starting at the second position
+    position = 0
+    while True:
+        if position % 3 == 1:
+            source, other = vectors, paragraphs
+        else:
+            source, other = paragraphs, vectors
+        item = next(source, None)
+        if item is None:
+            yield from other
+            return
+        yield item
+        position += 1
+
+
 @merge_observer.wrap({"type": "merge_paragraphs_vectors"})
 def merge_paragraphs_vectors(
     paragraphs_shards: List[List[ParagraphResult]],
@@ -243,60 +340,19 @@ def merge_paragraphs_vectors(
     page: int,
     min_score: float,
 ) -> Tuple[List[TempFindParagraph], bool]:
-    merged_paragrahs: List[TempFindParagraph] = []
-
-    # We assume that paragraphs_shards and vectors_shards are already ordered
-    for paragraphs_shard in paragraphs_shards:
-        for paragraph in paragraphs_shard:
-            merged_paragrahs.append(
-                TempFindParagraph(
-                    paragraph_index=paragraph,
-                    field=paragraph.field,
-                    rid=paragraph.uuid,
-                    score=paragraph.score.bm25,
-                    start=paragraph.start,
-                    split=paragraph.split,
-                    end=paragraph.end,
-                    id=paragraph.paragraph,
-                )
-            )
-
-    # merged_paragrahs.sort(key=lambda r: r.score, reverse=True)
-
-    nextpos = 1
-    for vectors_shard in vectors_shards:
-        for vector in vectors_shard:
-            if vector.score >= min_score:
-                doc_id_split = vector.doc_id.id.split("/")
-                split = None
-                if len(doc_id_split) == 5:
-                    rid, field_type, field, index, position = doc_id_split
-                    paragraph_id = f"{rid}/{field_type}/{field}/{position}"
-                elif len(doc_id_split) == 6:
-                    rid, field_type, field, split, index, position = doc_id_split
-                    paragraph_id = f"{rid}/{field_type}/{field}/{split}/{position}"
-                else:
-                    logger.warning(f"Skipping invalid doc_id: {vector.doc_id.id}")
-                    continue
-                start, end = position.split("-")
-                merged_paragrahs.insert(
-                    nextpos,
-                    TempFindParagraph(
-                        vector_index=vector,
-                        rid=rid,
-                        field=f"/{field_type}/{field}",
-                        score=vector.score,
-                        start=int(start),
-                        end=int(end),
-                        split=split,
-                        id=paragraph_id,
-                    ),
-                )
-                nextpos += 3
-
-    # merged_paragrahs.sort(key=lambda r: r.score, reverse=True)
     init_position = count * page
     end_position = init_position + count
+    # only the results up to the requested page (and one more to know if
+    # there is a next page) are merged
+    merged_paragrahs = list(
+        islice(
+            _interleave(
+                _iter_paragraphs(paragraphs_shards),
+                _iter_vectors(vectors_shards, min_score),
+            ),
+            end_position + 1,
+        )
+    )
     next_page = len(merged_paragrahs) > end_position
     merged_paragrahs = merged_paragrahs[init_position:end_position]
 
@@ -18,8 +18,10 @@
 # along with this program. If not, see <http://www.gnu.org/licenses/>.
 #
 import datetime
+import heapq
 import math
-from typing import Any, Dict, List, Optional, Tuple, Union
+from itertools import islice
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple, Union
 
 from nucliadb_protos.nodereader_pb2 import (
     DocumentResult,
@@ -83,6 +85,19 @@ def sort_results_by_score(results: Union[List[ParagraphResult], List[DocumentRes
     results.sort(key=lambda x: (x.score.bm25, x.score.booster), reverse=True)
 
 
+def paragraph_score(result: ParagraphResult) -> Bm25Score:
+    return (result.score.bm25, result.score.booster)
+
+
+def unique_paragraphs(results: Iterable[ParagraphResult]) -> Iterator[ParagraphResult]:
+    seen = set()
+    for result in results:
+        if result.paragraph in seen:
+            continue
+        seen.add(result.paragraph)
+        yield result
+
+
 async def text_score(
     item: Union[DocumentResult, ParagraphResult],
     sort_field: SortField,
@@ -368,16 +383,32 @@ async def merge_paragraph_results(
                     facets[key][facet_label] += facetresult.total
         if paragraph_response.next_page:
             next_page = True
-        for result in paragraph_response.results:
-            score = await text_score(result, sort.field, kbid)
-            if score is not None:
-                raw_paragraph_list.append((result, score))
         total += paragraph_response.total
 
-    raw_paragraph_list.sort(key=lambda x: x[1], reverse=(sort.order == SortOrder.DESC))
-
     skip = page * count
     end = skip + count
+    if sort.field == SortField.SCORE and sort.order == SortOrder.DESC:
+        # shards return their results sorted by score, a k-way merge of them
+        # up to the requested page is enough
+        merged = heapq.merge(
+            *[paragraph_response.results for paragraph_response in paragraph_responses],
+            key=paragraph_score,
+            reverse=True,
+        )
+        raw_paragraph_list = [
+            (result, paragraph_score(result))
+            for result in islice(unique_paragraphs(merged), end + 1)
+        ]
+    else:
+        for paragraph_response in paragraph_responses:
+            for result in unique_paragraphs(paragraph_response.results):
+                score = await text_score(result, sort.field, kbid)
+                if score is not None:
+                    raw_paragraph_list.append((result, score))
+        raw_paragraph_list.sort(
+            key=lambda x: x[1], reverse=(sort.order == SortOrder.DESC)
+        )
+
     length = len(raw_paragraph_list)
 
     if length > end:
@@ -30,6 +30,7 @@ from nucliadb.ingest.orm.resource import KB_REVERSE
 from nucliadb.ingest.orm.resource import Resource as ResourceORM
 from nucliadb_telemetry import metrics
 
+from . import cache as resource_cache
 from .cache import get_resource_from_cache
 
 logger = logging.getLogger(__name__)
@@ -89,7 +90,7 @@ async def get_field_extracted_text(
     field: Field, cache: Optional[ExtractedTextCache] = None
 ) -> Optional[ExtractedText]:
     if cache is None:
-        return await field.get_extracted_text()
+        return await resource_cache.get_field_extracted_text(field)
 
     key = f"{field.kbid}/{field.uuid}/{field.id}"
     extracted_text = cache.get_value(key)
@@ -105,7 +106,7 @@ async def get_field_extracted_text(
             return extracted_text
 
         EXTRACTED_CACHE_OPS.inc({"type": "miss"})
-        extracted_text = await field.get_extracted_text()
+        extracted_text = await resource_cache.get_field_extracted_text(field)
         if extracted_text is not None:
             # Only cache if we actually have extracted text
             cache.set_value(key, extracted_text)
@@ -199,7 +200,7 @@ async def get_text_sentence(
 
     field_type_int = KB_REVERSE[field_type]
     field_obj = await orm_resource.get_field(field, field_type_int, load=False)
-    extracted_text = await field_obj.get_extracted_text()
+    extracted_text = await resource_cache.get_field_extracted_text(field_obj)
     if extracted_text is None:
         logger.info(
             f"{rid} {field} {field_type_int} extracted_text does not exist on DB"
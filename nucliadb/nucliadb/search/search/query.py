@@ -18,8 +18,9 @@
 # along with this program. If not, see <http://www.gnu.org/licenses/>.
 #
 import asyncio
+from dataclasses import dataclass
 from datetime import datetime
-from typing import Awaitable, List, Optional, Tuple
+from typing import Any, Awaitable, Callable, List, Optional, Tuple
 
 from async_lru import alru_cache
 from nucliadb_protos.noderesources_pb2 import Resource
@@ -31,6 +32,10 @@ from nucliadb.common.maindb.utils import get_driver
 from nucliadb.ingest.orm.synonyms import Synonyms
 from nucliadb.search import logger
 from nucliadb.search.predict import PredictVectorMissing, SendToPredictError
+from nucliadb.search.search.cache import (
+    get_kb_metadata_cache,
+    get_query_embeddings_cache,
+)
 from nucliadb.search.search.filters import (
     has_classification_label_filters,
     record_filters_counter,
@@ -134,7 +139,9 @@ class QueryParser:
 
     def _get_default_min_score(self) -> Awaitable[float]:
         if self._min_score_task is None:  # pragma: no cover
-            self._min_score_task = asyncio.create_task(get_default_min_score(self.kbid))
+            self._min_score_task = asyncio.create_task(
+                get_kb_metadata(self.kbid, "default_min_score", get_default_min_score)
+            )
         return self._min_score_task
 
     def _get_converted_vectors(self) -> Awaitable[List[float]]:
@@ -154,26 +161,34 @@ class QueryParser:
     def _get_entities_meta_cache(self) -> Awaitable[EntitiesMetaCache]:
         if self._entities_meta_cache_task is None:
             self._entities_meta_cache_task = asyncio.create_task(
-                get_entities_meta_cache(self.kbid)
+                get_kb_metadata(
+                    self.kbid, "entities_meta_cache", get_entities_meta_cache
+                )
             )
         return self._entities_meta_cache_task
 
     def _get_deleted_entity_groups(self) -> Awaitable[list[str]]:
         if self._deleted_entities_groups_task is None:
             self._deleted_entities_groups_task = asyncio.create_task(
-                get_deleted_entity_groups(self.kbid)
+                get_kb_metadata(
+                    self.kbid, "deleted_entity_groups", get_deleted_entity_groups
+                )
             )
         return self._deleted_entities_groups_task
 
     def _get_synomyns(self) -> Awaitable[Optional[knowledgebox_pb2.Synonyms]]:
         if self._synonyms_task is None:
-            self._synonyms_task = asyncio.create_task(get_kb_synonyms(self.kbid))
+            self._synonyms_task = asyncio.create_task(
+                get_kb_metadata(self.kbid, "synonyms", get_kb_synonyms)
+            )
         return self._synonyms_task
 
     def _get_classification_labels(self) -> Awaitable[knowledgebox_pb2.Labels]:
         if self._get_classification_labels_task is None:
             self._get_classification_labels_task = asyncio.create_task(
-                get_classification_labels(self.kbid)
+                get_kb_metadata(
+                    self.kbid, "classification_labels", get_classification_labels
+                )
             )
         return self._get_classification_labels_task
 
@@ -449,7 +464,9 @@ async def paragraph_query_to_pb(
             field_labels = filters
             paragraph_labels: list[str] = []
             if has_classification_label_filters(filters):
-                classification_labels = await get_classification_labels(kbid)
+                classification_labels = await get_kb_metadata(
+                    kbid, "classification_labels", get_classification_labels
+                )
                 field_labels, paragraph_labels = split_labels_by_type(
                     filters, classification_labels
                 )
@@ -468,7 +485,16 @@ async def paragraph_query_to_pb(
 @query_parse_dependency_observer.wrap({"type": "convert_vectors"})
 async def convert_vectors(kbid: str, query: str) -> List[utils_pb2.RelationNode]:
     predict = get_predict()
-    return await predict.convert_sentence_to_vector(kbid, query)
+    cache = get_query_embeddings_cache()
+    if cache is None:
+        return await predict.convert_sentence_to_vector(kbid, query)
+
+    vector = cache.get(kbid, query)
+    if vector is None:
+        vector = await predict.convert_sentence_to_vector(kbid, query)
+        if vector:
+            cache.set(kbid, query, vector)
+    return vector  # type: ignore
 
 
 @query_parse_dependency_observer.wrap({"type": "detect_entities"})
@@ -604,6 +630,10 @@ async def get_kb_model_default_min_score(kbid: str) -> Optional[float]:
 
 @alru_cache(maxsize=None)
 async def get_default_min_score(kbid: str) -> float:
+    return await load_default_min_score(kbid)
+
+
+async def load_default_min_score(kbid: str) -> float:
     fallback = 0.7
     model_min_score = await get_kb_model_default_min_score(kbid)
     if model_min_score is not None:
@@ -614,21 +644,21 @@ async def get_default_min_score(kbid: str) -> float:
 @query_parse_dependency_observer.wrap({"type": "synonyms"})
 async def get_kb_synonyms(kbid: str) -> Optional[knowledgebox_pb2.Synonyms]:
     driver = get_driver()
-    async with driver.transaction() as txn:
+    async with driver.transaction(read_only=True) as txn:
         return await Synonyms(txn, kbid).get()
 
 
 @query_parse_dependency_observer.wrap({"type": "entities_meta_cache"})
 async def get_entities_meta_cache(kbid: str) -> EntitiesMetaCache:
     driver = get_driver()
-    async with driver.transaction() as txn:
+    async with driver.transaction(read_only=True) as txn:
         return await EntitiesDataManager.get_entities_meta_cache(kbid, txn)
 
 
 @query_parse_dependency_observer.wrap({"type": "deleted_entities_groups"})
 async def get_deleted_entity_groups(kbid: str) -> list[str]:
     driver = get_driver()
-    async with driver.transaction() as txn:
+    async with driver.transaction(read_only=True) as txn:
         return list(
             (await EntitiesDataManager.get_deleted_groups(kbid, txn)).entities_groups
         )
@@ -639,3 +669,54 @@ async def get_classification_labels(kbid: str) -> knowledgebox_pb2.Labels:
     driver = get_driver()
     ldm = LabelsDataManager(driver)
     return await ldm.get_labels(kbid)
+
+
+@dataclass
+class KBMetadata:
+    """
+    Snapshot of the configuration of a KB needed to parse its queries
+    """
+
+    synonyms: Optional[knowledgebox_pb2.Synonyms]
+    classification_labels: knowledgebox_pb2.Labels
+    entities_meta_cache: EntitiesMetaCache
+    deleted_entity_groups: list[str]
+    default_min_score: float
+
+
+@query_parse_dependency_observer.wrap({"type": "kb_metadata"})
+async def load_kb_metadata(kbid: str) -> KBMetadata:
+    (
+        synonyms,
+        classification_labels,
+        entities_meta_cache,
+        deleted_entity_groups,
+        default_min_score,
+    ) = await asyncio.gather(
+        get_kb_synonyms(kbid),
+        get_classification_labels(kbid),
+        get_entities_meta_cache(kbid),
+        get_deleted_entity_groups(kbid),
+        load_default_min_score(kbid),
+    )
+    return KBMetadata(
+        synonyms=synonyms,
+        classification_labels=classification_labels,
+        entities_meta_cache=entities_meta_cache,
+        deleted_entity_groups=deleted_entity_groups,
+        default_min_score=default_min_score,
+    )
+
+
+async def get_kb_metadata(
+    kbid: str, name: str, loader: Callable[[str], Awaitable[Any]]
+) -> Any:
+    """
+    Get a part of the KB configuration from the KB metadata cache or, when
+    it is not enabled, with its `loader`.
+    """
+    cache = get_kb_metadata_cache()
+    if cache is None:
+        return await loader(kbid)
+    snapshot = await cache.get(kbid, load_kb_metadata)
+    return getattr(snapshot, name)
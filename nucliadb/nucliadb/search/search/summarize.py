@@ -75,7 +75,7 @@ async def get_extracted_texts(
     tasks = []
 
     # Schedule getting extracted text for each field of each resource
-    async with driver.transaction() as txn:
+    async with driver.transaction(read_only=True) as txn:
         kb_orm = KnowledgeBox(txn, storage, kbid)
         for rid in set(resource_uuids):
             resource_orm = Resource(txn=txn, storage=storage, kb=kb_orm, uuid=rid)
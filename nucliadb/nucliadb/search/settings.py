@@ -18,11 +18,117 @@
 # along with this program. If not, see <http://www.gnu.org/licenses/>.
 #
 
+from pydantic import Field
+
 from nucliadb.ingest.settings import DriverSettings
 
 
 class Settings(DriverSettings):
     search_timeout: float = 10.0
 
+    resource_cache_enabled: bool = Field(
+        default=False,
+        description="Enable the process wide cache of resource parts (basic, extracted text, field metadata) "
+        "used to hydrate search results. Entries are invalidated with the ingest commit notifications, "
+        "so it requires a configured pubsub.",
+    )
+    resource_cache_max_entries: int = Field(
+        default=10_000,
+        description="Maximum number of resource parts kept in the resource cache",
+    )
+    resource_cache_max_bytes: int = Field(
+        default=256 * 1024 * 1024,
+        description="Maximum size in bytes of the serialized resource parts kept in the resource cache",
+    )
+    resource_cache_ttl: float = Field(
+        default=300.0,
+        description="Seconds a resource part is kept in the resource cache before being reloaded",
+    )
+
+    shard_cache_enabled: bool = Field(
+        default=False,
+        description="Cache the responses of index node queries per shard. Entries are invalidated "
+        "when the index nodes notify a shard has been indexed, so it requires a configured pubsub, "
+        "index nodes running with `PUBLISH_SHARD_INDEXED` enabled and it is not available in "
+        "standalone mode.",
+    )
+    shard_cache_max_entries: int = Field(
+        default=5_000,
+        description="Maximum number of shard query responses kept in the shard cache",
+    )
+    shard_cache_max_bytes: int = Field(
+        default=128 * 1024 * 1024,
+        description="Maximum size in bytes of the shard query responses kept in the shard cache",
+    )
+    shard_cache_ttl: float = Field(
+        default=60.0,
+        description="Seconds a shard query response is kept in the shard cache",
+    )
+
+    query_embeddings_cache_enabled: bool = Field(
+        default=False,
+        description="Cache the vectors predict computes for search queries, so repeated queries "
+        "do not need a round trip to predict",
+    )
+    query_embeddings_cache_max_entries: int = Field(
+        default=10_000,
+        description="Maximum number of query vectors kept in the query embeddings cache",
+    )
+    query_embeddings_cache_max_bytes: int = Field(
+        default=64 * 1024 * 1024,
+        description="Maximum size in bytes of the query vectors kept in the query embeddings cache",
+    )
+    query_embeddings_cache_ttl: float = Field(
+        default=300.0,
+        description="Seconds a query vector is kept in the query embeddings cache. Vectors are "
+        "not invalidated when the semantic model of a KB changes, so keep it short",
+    )
+
+    kb_metadata_cache_enabled: bool = Field(
+        default=False,
+        description="Keep in memory a snapshot of the configuration of every KB needed to parse "
+        "search queries (synonyms, labels, entities and default min score) instead of reading it "
+        "from maindb on every query",
+    )
+    kb_metadata_cache_max_kbs: int = Field(
+        default=1_000,
+        description="Maximum number of KBs kept in the KB metadata cache",
+    )
+    kb_metadata_cache_ttl: float = Field(
+        default=10.0,
+        description="Seconds after which a KB metadata snapshot is reloaded. "
+        "The previous snapshot is served while it is being reloaded",
+    )
+
+    hedged_requests_enabled: bool = Field(
+        default=False,
+        description="When a shard replica takes longer than usual to answer a query, send the same "
+        "query to another replica of the shard and keep the first answer",
+    )
+    hedged_requests_percentile: float = Field(
+        default=0.9,
+        description="Percentile of the latencies observed for a node used as the delay before "
+        "sending a hedged request to another replica",
+    )
+    hedged_requests_min_samples: int = Field(
+        default=20,
+        description="Minimum number of latencies observed for a node before using them to compute "
+        "the hedging delay. Until then, hedged_requests_max_delay is used",
+    )
+    hedged_requests_min_delay: float = Field(
+        default=0.02,
+        description="Minimum seconds to wait before sending a hedged request",
+    )
+    hedged_requests_max_delay: float = Field(
+        default=1.0,
+        description="Maximum seconds to wait before sending a hedged request",
+    )
+
+    fetch_resources_max_concurrency: int = Field(
+        default=10,
+        description="Maximum number of resources serialized concurrently to hydrate the "
+        "resources of a search response",
+    )
+
 
 settings = Settings()
@@ -17,13 +17,20 @@
 # You should have received a copy of the GNU Affero General Public License
 # along with this program. If not, see <http://www.gnu.org/licenses/>.
 
-from unittest.mock import Mock
+import asyncio
+from unittest.mock import AsyncMock, Mock, patch
 
+import pytest
 from fastapi import HTTPException
 from grpc import StatusCode
 from grpc.aio import AioRpcError  # type: ignore
+from nucliadb_protos.nodereader_pb2 import SearchRequest, SearchResponse
+from nucliadb_protos.writer_pb2 import ShardObject
 
+from nucliadb.common.cluster.exceptions import NoHealthyNodeAvailable
+from nucliadb.common.cluster.index_node import IndexNode
 from nucliadb.search.requesters import utils
+from nucliadb.search.search.cache import ShardResultCache
 
 
 def test_validate_node_query_results():
@@ -73,3 +80,230 @@ def test_validate_node_query_results_internal_unhandled():
     assert isinstance(result, HTTPException)
     assert result.status_code == 500
     assert result.detail == "There is something wrong with your query, my friend!"
+
+
+async def test_cached_shard_query():
+    shard_cache = ShardResultCache(max_entries=10, max_bytes=1024 * 1024, ttl=60)
+    response = SearchResponse()
+    response.paragraph.total = 5
+    query = AsyncMock(return_value=response)
+    pb_query = SearchRequest(body="query")
+    serialized_query = pb_query.SerializeToString(deterministic=True)
+
+    for _ in range(3):
+        result = await utils.cached_shard_query(
+            shard_cache,
+            "kbid",
+            utils.Method.SEARCH,
+            "shard",
+            "replica",
+            serialized_query,
+            query,
+        )
+        assert result.paragraph.total == 5
+
+    query.assert_awaited_once()
+
+
+@pytest.fixture()
+def hedged_requests():
+    with patch.object(utils.settings, "hedged_requests_enabled", True), patch.object(
+        utils.settings, "hedged_requests_max_delay", 0.01
+    ):
+        yield
+
+
+def _node(node_id: str) -> IndexNode:
+    return IndexNode(id=node_id, address="nohost", shard_count=0, dummy=True)
+
+
+async def test_shard_query_hedges_slow_replica(hedged_requests):
+    slow_node = _node("slow")
+    fast_node = _node("fast")
+    cancelled = asyncio.Event()
+
+    async def query_shard(node, shard_id, pb_query):
+        if node is slow_node:
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+        return SearchResponse(shard=shard_id)
+
+    with patch.dict(utils.METHODS, {utils.Method.SEARCH: query_shard}), patch.object(
+        utils.cluster_manager,
+        "choose_node",
+        return_value=(fast_node, "replica-fast", "fast"),
+    ) as choose_node:
+        result = await utils.shard_query(
+            utils.Method.SEARCH,
+            Mock(),
+            slow_node,
+            "replica-slow",
+            SearchRequest(body="query"),
+        )
+        await asyncio.wait_for(cancelled.wait(), timeout=1)
+
+    assert result.shard == "replica-fast"
+    assert choose_node.call_args.kwargs["exclude_nodes"] == ["slow"]
+    assert len(fast_node.latencies) == 1
+    assert len(slow_node.latencies) == 0
+
+
+async def test_shard_query_does_not_hedge_fast_replica(hedged_requests):
+    node = _node("node")
+    query_shard = AsyncMock(return_value=SearchResponse(shard="replica"))
+
+    with patch.dict(utils.METHODS, {utils.Method.SEARCH: query_shard}), patch.object(
+        utils.cluster_manager, "choose_node"
+    ) as choose_node:
+        result = await utils.shard_query(
+            utils.Method.SEARCH, Mock(), node, "replica", SearchRequest()
+        )
+
+    assert result.shard == "replica"
+    choose_node.assert_not_called()
+    assert len(node.latencies) == 1
+
+
+async def test_shard_query_hedge_failure_waits_for_original(hedged_requests):
+    slow_node = _node("slow")
+    failing_node = _node("failing")
+
+    async def query_shard(node, shard_id, pb_query):
+        if node is failing_node:
+            raise Exception("node down")
+        await asyncio.sleep(0.05)
+        return SearchResponse(shard=shard_id)
+
+    with patch.dict(utils.METHODS, {utils.Method.SEARCH: query_shard}), patch.object(
+        utils.cluster_manager,
+        "choose_node",
+        return_value=(failing_node, "replica-failing", "failing"),
+    ):
+        result = await utils.shard_query(
+            utils.Method.SEARCH, Mock(), slow_node, "replica-slow", SearchRequest()
+        )
+
+    assert result.shard == "replica-slow"
+
+
+def test_hedge_delay():
+    node = _node("node")
+    with patch.object(utils.settings, "hedged_requests_min_samples", 10):
+        assert utils.hedge_delay(node) == utils.settings.hedged_requests_max_delay
+        for i in range(10):
+            node.latencies.observe(0.1 * (i + 1) / 10)
+        assert utils.hedge_delay(node) == pytest.approx(0.09)
+
+
+async def test_gather_partial_results():
+    cancelled = asyncio.Event()
+
+    async def late():
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    async def failing():
+        raise ValueError()
+
+    async def answered():
+        return "result"
+
+    results = await utils.gather_partial_results(
+        [answered(), late(), failing()], timeout=0.05
+    )
+
+    assert results[0] == "result"
+    assert results[1] is utils.MISSING
+    assert isinstance(results[2], ValueError)
+    assert cancelled.is_set()
+
+
+async def test_node_query_partial_results():
+    nodes = {"shard-1": _node("node-1"), "shard-2": _node("node-2")}
+
+    def choose_node(shard_obj, **kwargs):
+        node = nodes[shard_obj.shard]
+        return node, f"{shard_obj.shard}-replica", node.id
+
+    async def query_shard(node, shard_id, pb_query):
+        if node.id == "node-2":
+            await asyncio.sleep(10)
+        return SearchResponse(shard=shard_id)
+
+    shard_manager = Mock()
+    shard_manager.get_shards_by_kbid = AsyncMock(
+        return_value=[ShardObject(shard="shard-1"), ShardObject(shard="shard-2")]
+    )
+    with patch.object(
+        utils, "get_shard_manager", return_value=shard_manager
+    ), patch.object(utils, "get_shard_result_cache", return_value=None), patch.object(
+        utils.cluster_manager, "choose_node", side_effect=choose_node
+    ), patch.object(
+        utils, "has_feature", return_value=False
+    ), patch.dict(
+        utils.METHODS, {utils.Method.SEARCH: query_shard}
+    ):
+        (
+            results,
+            incomplete_results,
+            queried_nodes,
+            queried_shards,
+            missing_shards,
+        ) = await utils.node_query(
+            "kbid", utils.Method.SEARCH, SearchRequest(), partial_results_timeout=0.05
+        )
+
+    assert [result.shard for result in results] == ["shard-1-replica"]
+    assert incomplete_results is True
+    assert queried_nodes == [("index-node", "shard-1-replica", "node-1")]
+    assert queried_shards == ["shard-1-replica"]
+    assert missing_shards == ["shard-2"]
+
+
+async def test_node_query_partial_results_no_healthy_node():
+    node = _node("node-1")
+
+    def choose_node(shard_obj, **kwargs):
+        if shard_obj.shard == "shard-2":
+            raise NoHealthyNodeAvailable()
+        return node, f"{shard_obj.shard}-replica", node.id
+
+    async def query_shard(node, shard_id, pb_query):
+        return SearchResponse(shard=shard_id)
+
+    shard_manager = Mock()
+    shard_manager.get_shards_by_kbid = AsyncMock(
+        return_value=[ShardObject(shard="shard-1"), ShardObject(shard="shard-2")]
+    )
+    with patch.object(
+        utils, "get_shard_manager", return_value=shard_manager
+    ), patch.object(utils, "get_shard_result_cache", return_value=None), patch.object(
+        utils.cluster_manager, "choose_node", side_effect=choose_node
+    ), patch.object(
+        utils, "has_feature", return_value=False
+    ), patch.dict(
+        utils.METHODS, {utils.Method.SEARCH: query_shard}
+    ):
+        with pytest.raises(NoHealthyNodeAvailable):
+            await utils.node_query("kbid", utils.Method.SEARCH, SearchRequest())
+
+        (
+            results,
+            incomplete_results,
+            _,
+            queried_shards,
+            missing_shards,
+        ) = await utils.node_query(
+            "kbid", utils.Method.SEARCH, SearchRequest(), partial_results_timeout=1
+        )
+
+    assert [result.shard for result in results] == ["shard-1-replica"]
+    assert incomplete_results is True
+    assert queried_shards == ["shard-1-replica"]
+    assert missing_shards == ["shard-2"]
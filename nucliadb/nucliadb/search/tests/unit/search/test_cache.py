@@ -0,0 +1,212 @@
+# Copyright (C) 2021 Bosutech XXI S.L.
+#
+# nucliadb is offered under the AGPL v3.0 and as commercial software.
+# For commercial licensing, contact us at info@nuclia.com.
+#
+# AGPL:
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+import asyncio
+from unittest import mock
+
+import pytest
+from nucliadb_protos.writer_pb2 import Notification
+
+from nucliadb.search.search.cache import (
+    KBMetadataCache,
+    QueryEmbeddingsCache,
+    ResourcePartsCache,
+    ShardResultCache,
+    get_cached_part,
+)
+
+
+def _cache(**kwargs) -> ResourcePartsCache:
+    params = dict(max_entries=10, max_bytes=1024, ttl=60)
+    params.update(kwargs)
+    return ResourcePartsCache(**params)  # type: ignore
+
+
+def test_resource_parts_cache_get_set():
+    cache = _cache()
+    assert cache.get("kbid", "rid", "basic") is None
+
+    cache.set("kbid", "rid", "basic", b"basic")
+    assert cache.get("kbid", "rid", "basic") == b"basic"
+    assert cache.get("kbid", "rid", "extracted_text/t/body") is None
+    assert cache.size == 5
+
+
+def test_resource_parts_cache_evicts_by_entries():
+    cache = _cache(max_entries=2)
+    cache.set("kbid", "rid1", "basic", b"1")
+    cache.set("kbid", "rid2", "basic", b"2")
+    # touch rid1 so rid2 is the least recently used
+    assert cache.get("kbid", "rid1", "basic") == b"1"
+    cache.set("kbid", "rid3", "basic", b"3")
+
+    assert cache.get("kbid", "rid2", "basic") is None
+    assert cache.get("kbid", "rid1", "basic") == b"1"
+    assert cache.get("kbid", "rid3", "basic") == b"3"
+
+
+def test_resource_parts_cache_evicts_by_bytes():
+    cache = _cache(max_bytes=10)
+    cache.set("kbid", "rid1", "basic", b"x" * 6)
+    cache.set("kbid", "rid2", "basic", b"x" * 6)
+
+    assert cache.get("kbid", "rid1", "basic") is None
+    assert cache.get("kbid", "rid2", "basic") == b"x" * 6
+    assert cache.size == 6
+
+    # values bigger than the cache are never stored
+    cache.set("kbid", "rid3", "basic", b"x" * 11)
+    assert cache.get("kbid", "rid3", "basic") is None
+
+
+def test_resource_parts_cache_ttl():
+    cache = _cache(ttl=10)
+    with mock.patch("nucliadb.search.search.cache.time.monotonic", return_value=0):
+        cache.set("kbid", "rid", "basic", b"basic")
+    with mock.patch("nucliadb.search.search.cache.time.monotonic", return_value=5):
+        assert cache.get("kbid", "rid", "basic") == b"basic"
+    with mock.patch("nucliadb.search.search.cache.time.monotonic", return_value=11):
+        assert cache.get("kbid", "rid", "basic") is None
+    assert cache.size == 0
+
+
+async def test_resource_parts_cache_invalidated_on_commit():
+    pubsub = mock.MagicMock()
+    pubsub.parse.side_effect = lambda msg: msg
+    cache = _cache(pubsub=pubsub)
+    cache.set("kbid", "rid", "basic", b"basic")
+    cache.set("kbid", "rid", "extracted_text/t/body", b"text")
+    cache.set("kbid", "other", "basic", b"other")
+
+    abort = Notification(
+        kbid="kbid", uuid="rid", action=Notification.Action.ABORT
+    ).SerializeToString()
+    await cache.handle_message(abort)
+    assert cache.get("kbid", "rid", "basic") == b"basic"
+
+    commit = Notification(
+        kbid="kbid", uuid="rid", action=Notification.Action.COMMIT
+    ).SerializeToString()
+    await cache.handle_message(commit)
+    assert cache.get("kbid", "rid", "basic") is None
+    assert cache.get("kbid", "rid", "extracted_text/t/body") is None
+    assert cache.get("kbid", "other", "basic") == b"other"
+    assert cache.size == len(b"other")
+
+
+def test_resource_parts_cache_skips_parts_read_before_invalidation():
+    cache = _cache()
+    generation = cache.generation("kbid", "rid")
+    cache.invalidate("kbid", "rid")
+    cache.set("kbid", "rid", "basic", b"stale", generation)
+    assert cache.get("kbid", "rid", "basic") is None
+
+    cache.set("kbid", "rid", "basic", b"basic", cache.generation("kbid", "rid"))
+    assert cache.get("kbid", "rid", "basic") == b"basic"
+
+
+async def test_get_cached_part_skips_part_committed_while_loading():
+    cache = _cache()
+
+    async def loader():
+        # commit notification received while the part is being loaded
+        cache.invalidate("kbid", "rid")
+        return Notification(kbid="kbid")
+
+    with mock.patch(
+        "nucliadb.search.search.cache.get_resource_parts_cache", return_value=cache
+    ):
+        value = await get_cached_part("kbid", "rid", "part", Notification, loader)
+
+    assert value == Notification(kbid="kbid")
+    assert cache.get("kbid", "rid", "part") is None
+
+
+async def test_shard_result_cache_invalidated_by_any_replica():
+    pubsub = mock.MagicMock()
+    pubsub.parse.side_effect = lambda msg: msg
+    cache = ShardResultCache(max_entries=10, max_bytes=1024, ttl=60, pubsub=pubsub)
+
+    generation = cache.generation("shard", "replica1")
+    cache.set("shard", "replica1", "SEARCH", b"query", b"response", generation)
+    cache.generation("shard", "replica2")
+    assert cache.get("kbid", "shard", "SEARCH", b"query") == b"response"
+    assert cache.get("kbid", "shard", "SEARCH", b"other") is None
+    assert cache.get("kbid", "shard", "SUGGEST", b"query") is None
+
+    await cache.handle_message(b"replica2")
+    assert cache.get("kbid", "shard", "SEARCH", b"query") is None
+
+
+def test_shard_result_cache_skips_responses_older_than_invalidation():
+    cache = ShardResultCache(max_entries=10, max_bytes=1024, ttl=60)
+
+    generation = cache.generation("shard", "replica")
+    # shard is indexed while the query is running
+    cache.invalidate("replica")
+    cache.set("shard", "replica", "SEARCH", b"query", b"response", generation)
+
+    assert cache.get("kbid", "shard", "SEARCH", b"query") is None
+
+
+def test_query_embeddings_cache():
+    cache = QueryEmbeddingsCache(max_entries=10, max_bytes=1024, ttl=60)
+    assert cache.get("kbid", "some query") is None
+
+    cache.set("kbid", "some query", [0.5, 0.25, -1.0])
+    # vectors are stored as float32 and queries normalized
+    assert cache.values.size == 12
+    assert cache.get("kbid", "  some   query ") == [0.5, 0.25, -1.0]
+    assert cache.get("other", "some query") is None
+
+
+async def test_kb_metadata_cache_single_flight():
+    cache: KBMetadataCache = KBMetadataCache(max_kbs=10, ttl=60)
+    loader = mock.AsyncMock(return_value="snapshot")
+
+    results = await asyncio.gather(*[cache.get("kbid", loader) for _ in range(5)])
+
+    assert results == ["snapshot"] * 5
+    loader.assert_awaited_once_with("kbid")
+    assert cache.version("kbid") == 1
+
+
+async def test_kb_metadata_cache_serves_stale_snapshot_while_reloading():
+    cache: KBMetadataCache = KBMetadataCache(max_kbs=10, ttl=60)
+    loader = mock.AsyncMock(side_effect=["old", "new"])
+    assert await cache.get("kbid", loader) == "old"
+
+    with mock.patch(
+        "nucliadb.search.search.cache.time.monotonic", return_value=10_000_000
+    ):
+        assert await cache.get("kbid", loader) == "old"
+        await cache.loading["kbid"]
+        assert await cache.get("kbid", loader) == "new"
+
+    assert loader.await_count == 2
+    assert cache.version("kbid") == 2
+
+
+async def test_kb_metadata_cache_failed_load_is_not_cached():
+    cache: KBMetadataCache = KBMetadataCache(max_kbs=10, ttl=60)
+    loader = mock.AsyncMock(side_effect=[Exception("maindb down"), "snapshot"])
+
+    with pytest.raises(Exception):
+        await cache.get("kbid", loader)
+    assert await cache.get("kbid", loader) == "snapshot"
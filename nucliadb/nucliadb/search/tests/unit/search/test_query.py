@@ -25,12 +25,16 @@ from nucliadb_protos.knowledgebox_pb2 import SemanticModelMetadata, Synonyms
 from nucliadb_protos.nodereader_pb2 import SearchRequest
 from nucliadb_protos.utils_pb2 import RelationNode, VectorSimilarity
 
+from nucliadb.search.search.cache import KBMetadataCache, QueryEmbeddingsCache
 from nucliadb.search.search.query import (
+    KBMetadata,
     QueryParser,
+    convert_vectors,
     get_default_min_score,
     get_kb_model_default_min_score,
     parse_entities_to_filters,
 )
+from nucliadb_models.search import SearchOptions
 
 QUERY_MODULE = "nucliadb.search.search.query"
 
@@ -187,3 +191,51 @@ class TestApplySynonymsToRequest:
 
         request.ClearField.assert_called_once_with("body")
         assert request.advanced_query == "planet OR earth OR globe"
+
+
+async def test_convert_vectors_uses_query_embeddings_cache():
+    cache = QueryEmbeddingsCache(max_entries=10, max_bytes=1024, ttl=60)
+    predict = Mock()
+    predict.convert_sentence_to_vector = AsyncMock(return_value=[0.5, 1.0])
+    with patch(f"{QUERY_MODULE}.get_predict", return_value=predict), patch(
+        f"{QUERY_MODULE}.get_query_embeddings_cache", return_value=cache
+    ):
+        assert await convert_vectors("kbid", "query") == [0.5, 1.0]
+        assert await convert_vectors("kbid", "query ") == [0.5, 1.0]
+
+    predict.convert_sentence_to_vector.assert_awaited_once_with("kbid", "query")
+
+
+async def test_query_parser_reads_kb_metadata_snapshot():
+    cache: KBMetadataCache = KBMetadataCache(max_kbs=10, ttl=60)
+    synonyms = Synonyms()
+    synonyms.terms["planet"].synonyms.extend(["earth"])
+    load_kb_metadata = AsyncMock(
+        return_value=KBMetadata(
+            synonyms=synonyms,
+            classification_labels=Mock(),
+            entities_meta_cache=Mock(),
+            deleted_entity_groups=[],
+            default_min_score=0.5,
+        )
+    )
+    with patch(f"{QUERY_MODULE}.get_kb_metadata_cache", return_value=cache), patch(
+        f"{QUERY_MODULE}.load_kb_metadata", load_kb_metadata
+    ):
+        for _ in range(3):
+            parser = QueryParser(
+                kbid="kbid",
+                features=[SearchOptions.PARAGRAPH],
+                query="planet",
+                filters=[],
+                faceted=[],
+                page_number=0,
+                page_size=20,
+                with_synonyms=True,
+            )
+            request, _, _ = await parser.parse()
+            assert request.min_score == 0.5
+            assert parser.min_score == 0.5
+            assert request.advanced_query == "planet OR earth"
+
+    load_kb_metadata.assert_awaited_once_with("kbid")
@@ -19,11 +19,22 @@
 #
 
 import random
+from unittest import mock
 
 from nucliadb_protos.nodereader_pb2 import DocumentScored, ParagraphResult
+from nucliadb_protos.utils_pb2 import ExtractedText
 
-from nucliadb.search.search.find_merge import Orderer, merge_paragraphs_vectors
-from nucliadb_models.search import SCORE_TYPE
+from nucliadb.search.search.find_merge import (
+    Orderer,
+    fetch_find_metadata,
+    merge_paragraphs_vectors,
+)
+from nucliadb_models.search import (
+    SCORE_TYPE,
+    FindParagraph,
+    TempFindParagraph,
+    TextPosition,
+)
 
 
 def test_orderer():
@@ -79,7 +90,7 @@ def test_merge_paragraphs_vectors():
     for i in range(5):
         score = max(5 / float(i + 1), 1)
         vr = DocumentScored()
-        vr.doc_id.id = f"id/vector/paragraph/{i}/0-2"
+        vr.doc_id.id = f"id/vector/paragraph/{i}/{i * 10}-{i * 10 + 2}"
         vr.score = score
         vr.metadata.position.start = 0
         vr.metadata.position.start = 2
@@ -110,3 +121,94 @@ def test_merge_paragraphs_vectors():
 
     # Check that the vector scores are different
     assert len(vector_scores) == 5
+
+
+def test_merge_paragraphs_vectors_sorted_and_deduplicated():
+    def paragraph(rid: str, score: float) -> ParagraphResult:
+        pr = ParagraphResult(uuid=rid, field="/a/title", start=0, end=10)
+        pr.score.bm25 = score
+        pr.paragraph = f"{rid}/a/title/0-10"
+        return pr
+
+    def vector(rid: str, index: int, score: float) -> DocumentScored:
+        vr = DocumentScored(score=score)
+        vr.doc_id.id = f"{rid}/a/title/{index}/0-10"
+        return vr
+
+    shard_1 = [paragraph("r1", 5), paragraph("r3", 3), paragraph("r1", 1)]
+    shard_2 = [paragraph("r2", 4), paragraph("r4", 2)]
+    vectors_1 = [vector("r5", 0, 0.9), vector("r5", 1, 0.8)]
+    vectors_2 = [vector("r6", 0, 0.95)]
+
+    merged, next_page = merge_paragraphs_vectors(
+        [shard_1, shard_2], [vectors_1, vectors_2], 3, 0, min_score=0.5
+    )
+    assert next_page
+    assert [p.rid for p in merged] == ["r1", "r6", "r2"]
+
+    merged, next_page = merge_paragraphs_vectors(
+        [shard_1, shard_2], [vectors_1, vectors_2], 3, 1, min_score=0.5
+    )
+    assert not next_page
+    # r1 and r5 are returned once, with their best score
+    assert [(p.rid, p.score) for p in merged] == [
+        ("r3", 3),
+        ("r5", 0.9),
+        ("r4", 2),
+    ]
+
+
+def _find_paragraph(rid: str, field: str, start: int, end: int) -> TempFindParagraph:
+    paragraph_id = f"{rid}{field}/{start}-{end}"
+    return TempFindParagraph(
+        rid=rid,
+        field=field,
+        score=1,
+        start=start,
+        end=end,
+        id=paragraph_id,
+        paragraph=FindParagraph(
+            score=1,
+            score_type=SCORE_TYPE.BM25,
+            text="",
+            id=paragraph_id,
+            position=TextPosition(index=0, start=start, end=end),
+        ),
+    )
+
+
+async def test_fetch_find_metadata_fetches_each_field_once():
+    field = mock.MagicMock()
+    field.get_extracted_text = mock.AsyncMock(
+        return_value=ExtractedText(text="Hello World!")
+    )
+    orm_resource = mock.MagicMock()
+    orm_resource.get_field = mock.AsyncMock(return_value=field)
+
+    result_paragraphs = [
+        _find_paragraph("rid1", "/t/text", 0, 5),
+        _find_paragraph("rid1", "/t/text", 6, 12),
+        _find_paragraph("rid2", "/t/text", 0, 5),
+    ]
+    get_resources = mock.AsyncMock(
+        return_value={"rid1": orm_resource, "rid2": orm_resource}
+    )
+    fetch_resources = mock.AsyncMock(return_value={})
+    with mock.patch(
+        "nucliadb.search.search.find_merge.get_resources_from_cache", get_resources
+    ), mock.patch(
+        "nucliadb.search.search.find_merge.fetch_resources", fetch_resources
+    ), mock.patch(
+        "nucliadb.search.search.cache.get_resource_parts_cache", return_value=None
+    ):
+        find_resources = {}  # type: ignore
+        await fetch_find_metadata(find_resources, result_paragraphs, "kbid", [], [], [])
+
+    # maindb is hit once for all resources and every field is fetched once
+    get_resources.assert_awaited_once()
+    assert sorted(get_resources.call_args[0][1]) == ["rid1", "rid2"]
+    assert orm_resource.get_field.await_count == 2
+    # and all the resources are serialized at once
+    fetch_resources.assert_awaited_once()
+    assert sorted(fetch_resources.call_args[0][0]) == ["rid1", "rid2"]
+    assert [p.paragraph.text for p in result_paragraphs] == ["Hello", "World!", "Hello"]
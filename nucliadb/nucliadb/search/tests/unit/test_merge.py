@@ -17,9 +17,13 @@
 # You should have received a copy of the GNU Affero General Public License
 # along with this program. If not, see <http://www.gnu.org/licenses/>.
 #
-from unittest.mock import patch
+from unittest.mock import AsyncMock, patch
 
+from nucliadb_protos.nodereader_pb2 import ParagraphResult, ParagraphSearchResponse
+
+from nucliadb.search.search import merge
 from nucliadb.search.search.merge import ResourceSearchResults, merge_paragraphs_results
+from nucliadb_models.search import SortField, SortOptions, SortOrder
 
 
 async def test_str_model():
@@ -32,3 +36,44 @@ async def test_str_model_fallback():
     with patch.object(ResourceSearchResults, "json", side_effect=Exception("ERROR")):
         res = await merge_paragraphs_results([], 1, 1, "kbid", [], [], [], False)
         assert "sentences=None" in str(res)
+
+
+def _paragraph(rid: str, score: float) -> ParagraphResult:
+    result = ParagraphResult(uuid=rid, field="/a/title", start=0, end=10)
+    result.paragraph = f"{rid}/a/title/0-10"
+    result.score.bm25 = score
+    return result
+
+
+async def test_merge_paragraph_results_by_score():
+    responses = [
+        ParagraphSearchResponse(
+            results=[_paragraph("r1", 5), _paragraph("r3", 3), _paragraph("r1", 5)],
+            total=3,
+        ),
+        ParagraphSearchResponse(
+            results=[_paragraph("r2", 4), _paragraph("r4", 2)], total=2
+        ),
+    ]
+    with patch.object(
+        merge, "get_paragraph_text", AsyncMock(return_value="")
+    ), patch.object(
+        merge, "get_labels_paragraph", AsyncMock(return_value=[])
+    ), patch.object(
+        merge, "get_seconds_paragraph", AsyncMock(return_value=None)
+    ):
+        resources: list[str] = []
+        paragraphs = await merge.merge_paragraph_results(
+            responses,
+            resources,
+            "kbid",
+            count=2,
+            page=0,
+            highlight=False,
+            sort=SortOptions(field=SortField.SCORE, order=SortOrder.DESC),
+        )
+
+    assert [paragraph.rid for paragraph in paragraphs.results] == ["r1", "r2"]
+    assert paragraphs.next_page
+    assert paragraphs.total == 5
+    assert resources == ["r1", "r2"]
@@ -145,8 +145,9 @@ async def driver_basic(driver: Driver):
     assert result == b"My title"
 
     result = await txn.batch_get(
-        ["/kbs/kb1/r/uuid1/text", "/internal/kbs/kb1/shards/shard1"]
+        ["/kbs/kb1/r/uuid1/text", "/i/do/not/exist", "/internal/kbs/kb1/shards/shard1"]
     )
+    assert result == [b"My title", None, b"node1"]
     await txn.abort()
 
     current_internal_kbs_keys = set()
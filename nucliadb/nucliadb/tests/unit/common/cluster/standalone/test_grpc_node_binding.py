@@ -0,0 +1,105 @@
+# Copyright (C) 2021 Bosutech XXI S.L.
+#
+# nucliadb is offered under the AGPL v3.0 and as commercial software.
+# For commercial licensing, contact us at info@nuclia.com.
+#
+# AGPL:
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+import os
+import tempfile
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from nucliadb.common.cluster.settings import Settings
+from nucliadb.common.cluster.standalone import grpc_node_binding
+from nucliadb_protos import noderesources_pb2, nodewriter_pb2
+
+pytestmark = pytest.mark.asyncio
+
+
+@pytest.fixture
+def cluster_settings():
+    settings = Settings()
+    with patch(
+        "nucliadb.common.cluster.standalone.grpc_node_binding.settings", settings
+    ), tempfile.TemporaryDirectory() as tmpdir:
+        settings.data_path = tmpdir
+        yield settings
+
+
+@pytest.fixture
+def writer(cluster_settings):
+    spooled = []
+
+    def set_resource_from_file(path, shard_id):
+        with open(path, "rb") as f:
+            spooled.append(f.read())
+        return nodewriter_pb2.OpStatus(shard_id=shard_id).SerializeToString()
+
+    node_writer = MagicMock()
+    node_writer.set_resource_from_buffer.side_effect = (
+        lambda data, shard_id: nodewriter_pb2.OpStatus(
+            shard_id=shard_id
+        ).SerializeToString()
+    )
+    node_writer.set_resource_from_file.side_effect = set_resource_from_file
+    node_writer.spooled = spooled
+    with patch(
+        "nucliadb.common.cluster.standalone.grpc_node_binding.NodeWriter",
+        return_value=node_writer,
+    ):
+        yield grpc_node_binding.StandaloneWriterWrapper()
+
+
+def get_resource() -> noderesources_pb2.Resource:
+    resource = noderesources_pb2.Resource()
+    resource.resource.uuid = "rid"
+    resource.texts["a/title"].text = "title"
+    return resource
+
+
+async def test_set_resource_payload(writer):
+    resource = get_resource()
+    payload = grpc_node_binding.ResourcePayload(resource)
+
+    for shard_id in ("shard1", "shard2"):
+        status = await writer.SetResourcePayload(payload, shard_id)
+        assert status.shard_id == shard_id
+    payload.close()
+
+    # serialized once and handed over in memory
+    calls = writer.writer.set_resource_from_buffer.call_args_list
+    assert [call.args for call in calls] == [
+        (resource.SerializeToString(), "shard1"),
+        (resource.SerializeToString(), "shard2"),
+    ]
+    writer.writer.set_resource_from_file.assert_not_called()
+
+
+async def test_set_resource_payload_spools_large_payloads(writer, cluster_settings):
+    cluster_settings.standalone_spool_threshold = 1
+    resource = get_resource()
+    payload = grpc_node_binding.ResourcePayload(resource)
+
+    await writer.SetResourcePayload(payload, "shard1")
+    path = payload.path
+    assert path is not None
+    assert os.path.exists(path)
+    payload.close()
+
+    assert writer.writer.spooled == [resource.SerializeToString()]
+    writer.writer.set_resource_from_buffer.assert_not_called()
+    assert not os.path.exists(path)
@@ -174,3 +174,37 @@ def test_choose_node():
         )
 
     manager.INDEX_NODES.clear()
+
+
+def test_choose_node_exclude_nodes_and_fastest():
+    manager.INDEX_NODES.clear()
+    for node_id in ("node-0", "node-1", "node-2"):
+        manager.add_index_node(
+            id=node_id,
+            address="nohost",
+            shard_count=0,
+            dummy=True,
+        )
+    shard = writer_pb2.ShardObject(
+        replicas=[
+            writer_pb2.ShardReplica(
+                shard=writer_pb2.ShardCreated(id=f"123-{i}"), node=f"node-{i}"
+            )
+            for i in range(3)
+        ]
+    )
+    manager.get_index_node("node-0").latencies.observe(0.1)  # type: ignore
+    manager.get_index_node("node-1").latencies.observe(0.5)  # type: ignore
+    manager.get_index_node("node-2").latencies.observe(0.2)  # type: ignore
+
+    _, replica_id, node_id = manager.choose_node(shard, fastest=True)
+    assert (replica_id, node_id) == ("123-0", "node-0")
+
+    _, replica_id, node_id = manager.choose_node(
+        shard, exclude_nodes=["node-0"], fastest=True
+    )
+    assert (replica_id, node_id) == ("123-2", "node-2")
+
+    with pytest.raises(NoHealthyNodeAvailable):
+        manager.choose_node(shard, exclude_nodes=["node-0", "node-1", "node-2"])
+    manager.INDEX_NODES.clear()
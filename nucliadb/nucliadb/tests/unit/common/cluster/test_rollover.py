@@ -17,6 +17,7 @@
 # You should have received a copy of the GNU Affero General Public License
 # along with this program. If not, see <http://www.gnu.org/licenses/>.
 #
+import asyncio
 from datetime import datetime
 from unittest.mock import ANY, AsyncMock, MagicMock, patch
 
@@ -75,6 +76,13 @@ def cluster_datamanager(shards):
     mock.update_kb_shards = AsyncMock()
     mock.delete_kb_rollover_shard = AsyncMock()
     mock.delete_kb_rollover_shards = AsyncMock()
+    mock.get_rollover_state = AsyncMock(return_value=None)
+    mock.set_rollover_state = AsyncMock()
+    mock.get_rollover_indexed = AsyncMock(
+        side_effect=lambda kbid, rids: [None] * len(rids)
+    )
+    mock.set_rollover_indexed = AsyncMock()
+    mock.delete_rollover_checkpoint = AsyncMock()
 
     with patch(
         "nucliadb.common.cluster.rollover.ClusterDataManager", return_value=mock
@@ -98,6 +106,12 @@ def resources_datamanager(resource_ids):
     mock.iterate_resource_ids = iterate_resource_ids
     mock.get_resource_shard_id = AsyncMock()
     mock.get_resource_shard_id.return_value = "1"
+    mock.get_resource_shard_ids = AsyncMock(
+        side_effect=lambda kbid, rids: [
+            mock.get_resource_shard_id.return_value for _ in rids
+        ]
+    )
+    mock.calculate_number_of_resources = AsyncMock(return_value=len(resource_ids))
 
     res = MagicMock()
 
@@ -128,7 +142,8 @@ def app_context(cluster_datamanager, resources_datamanager, available_nodes):
 
     consumer_info = MagicMock()
     consumer_info.delivered.stream_seq = 0
-    mock.nats_manager.js.consumer_info.return_value = consumer_info
+    consumer_info.num_pending = 0
+    mock.nats_manager.js.js.consumer_info = AsyncMock(return_value=consumer_info)
     yield mock
 
 
@@ -167,6 +182,71 @@ async def test_index_rollover_shards(
     ]
 
 
+async def test_index_rollover_shards_checkpoints_progress(
+    app_context, cluster_datamanager, resources_datamanager, shards, resource_ids
+):
+    cluster_datamanager.get_kb_rollover_shards.return_value = shards
+
+    await rollover.index_rollover_shards(app_context, "kbid")
+
+    checkpointed = {}
+    for call in cluster_datamanager.set_rollover_indexed.call_args_list:
+        checkpointed.update(call[0][1])
+    assert set(checkpointed.keys()) == set(resource_ids)
+    state = cluster_datamanager.set_rollover_state.call_args[0][1]
+    assert state["indexed"] == state["total"] == len(resource_ids)
+
+
+async def test_index_rollover_shards_resumes(
+    app_context, cluster_datamanager, resources_datamanager, shards, resource_ids
+):
+    cluster_datamanager.get_kb_rollover_shards.return_value = shards
+    cluster_datamanager.get_rollover_state.return_value = {
+        "total": len(resource_ids),
+        "indexed": 1,
+        "started_at": datetime.now().isoformat(),
+    }
+    cluster_datamanager.get_rollover_indexed.side_effect = lambda kbid, rids: [
+        ("1", datetime.now()) if rid == resource_ids[0] else None for rid in rids
+    ]
+
+    indexed_res = await rollover.index_rollover_shards(app_context, "kbid")
+
+    assert len(indexed_res) == len(resource_ids)
+    assert resources_datamanager.get_resource_index_message.await_count == (
+        len(resource_ids) - 1
+    )
+    cluster_datamanager.set_rollover_state.assert_awaited()
+    resources_datamanager.calculate_number_of_resources.assert_not_called()
+
+
+async def test_node_backpressure(app_context, shards):
+    consumer_info = MagicMock(num_pending=10)
+    app_context.nats_manager.js.js.consumer_info = AsyncMock(return_value=consumer_info)
+    backpressure = rollover.NodeBackpressure(
+        app_context, max_pending=10, check_interval=0.01
+    )
+    shard = writer_pb2.ShardObject(replicas=[writer_pb2.ShardReplica(node="node1")])
+
+    # under the limit
+    await backpressure.wait(shard)
+    assert await backpressure.get_pending("node1") == 10
+
+    # writes are accounted until the queue depth is checked again
+    backpressure.sent(shard)
+    _, pending = backpressure.pending["node1"]
+    assert pending == 11
+    # do not check the queue depth again for now
+    backpressure.pending["node1"] = (float("inf"), pending)
+    waiter = asyncio.create_task(backpressure.wait(shard))
+    await asyncio.sleep(0.05)
+    assert not waiter.done()
+
+    backpressure.pending.clear()
+    consumer_info.num_pending = 0
+    await asyncio.wait_for(waiter, timeout=1)
+
+
 async def test_index_rollover_shards_handles_missing_shards(
     app_context, cluster_datamanager, resources_datamanager, shards, resource_ids
 ):
@@ -0,0 +1,111 @@
+# Copyright (C) 2021 Bosutech XXI S.L.
+#
+# nucliadb is offered under the AGPL v3.0 and as commercial software.
+# For commercial licensing, contact us at info@nuclia.com.
+#
+# AGPL:
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+import asyncio
+from unittest.mock import patch
+
+import pytest
+
+from nucliadb.common.cluster import selection
+from nucliadb.common.cluster.index_node import IndexNode
+from nucliadb.common.cluster.settings import NodeSelectionPolicy
+
+
+def _candidates(count: int) -> list[tuple[str, IndexNode]]:
+    return [
+        (
+            f"replica-{i}",
+            IndexNode(id=f"node-{i}", address="nohost", shard_count=0, dummy=True),
+        )
+        for i in range(count)
+    ]
+
+
+@pytest.mark.parametrize("policy", list(NodeSelectionPolicy))
+def test_select_node_single_candidate(policy):
+    candidates = _candidates(1)
+    assert selection.select_node(candidates, policy) == candidates[0]
+
+
+def test_least_in_flight():
+    candidates = _candidates(2)
+    candidates[0][1].in_flight = 3
+    candidates[1][1].in_flight = 1
+    for _ in range(10):
+        assert (
+            selection.select_node(candidates, NodeSelectionPolicy.LEAST_IN_FLIGHT)
+            == candidates[1]
+        )
+
+
+def test_latency_ewma():
+    candidates = _candidates(2)
+    candidates[0][1].latencies.observe(0.1)
+    candidates[1][1].latencies.observe(0.3)
+    for _ in range(10):
+        assert (
+            selection.select_node(candidates, NodeSelectionPolicy.LATENCY_EWMA)
+            == candidates[0]
+        )
+
+    # in flight requests weight the observed latency
+    candidates[0][1].in_flight = 4
+    assert (
+        selection.select_node(candidates, NodeSelectionPolicy.LATENCY_EWMA)
+        == candidates[1]
+    )
+
+
+def test_power_of_two_choices_compares_two_random_candidates():
+    candidates = _candidates(3)
+    with patch.object(
+        selection.random, "sample", return_value=[candidates[2], candidates[1]]
+    ):
+        chosen = selection.power_of_two_choices(
+            candidates, lambda node: int(node.id.split("-")[1])
+        )
+    assert chosen == candidates[1]
+
+
+def test_track_request():
+    _, node = _candidates(1)[0]
+    with node.track_request():
+        assert node.in_flight == 1
+    assert node.in_flight == 0
+    assert len(node.latencies) == 1
+
+    # cancelled requests record their elapsed time as a lower bound
+    with pytest.raises(asyncio.CancelledError):
+        with node.track_request():
+            raise asyncio.CancelledError()
+    assert node.in_flight == 0
+    assert len(node.latencies) == 2
+
+    with pytest.raises(ValueError):
+        with node.track_request():
+            raise ValueError()
+    assert node.in_flight == 0
+    assert len(node.latencies) == 1
+
+    # cancelled requests record their elapsed time as a lower bound
+    with pytest.raises(asyncio.CancelledError):
+        with node.track_request():
+            raise asyncio.CancelledError()
+    assert node.in_flight == 0
+    assert len(node.latencies) == 2
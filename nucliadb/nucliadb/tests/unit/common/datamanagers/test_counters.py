@@ -0,0 +1,189 @@
+# Copyright (C) 2021 Bosutech XXI S.L.
+#
+# nucliadb is offered under the AGPL v3.0 and as commercial software.
+# For commercial licensing, contact us at info@nuclia.com.
+#
+# AGPL:
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+import time
+from typing import Optional
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from nucliadb.common.datamanagers.counters import (
+    CountersDataManager,
+    KBCounters,
+    ResourceCounters,
+)
+
+
+class InMemoryTransaction:
+    def __init__(self):
+        self.data: dict[str, bytes] = {}
+        self.open = True
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return self.data.get(key)
+
+    async def batch_get(self, keys: list[str]) -> list[Optional[bytes]]:
+        return [self.data.get(key) for key in keys]
+
+    async def set(self, key: str, value: bytes):
+        self.data[key] = value
+
+    async def delete(self, key: str):
+        self.data.pop(key, None)
+
+    async def keys(self, match: str, count: int = -1, include_start: bool = True):
+        for key in sorted(self.data):
+            if key.startswith(match):
+                yield key
+
+    async def commit(self):
+        self.open = False
+
+    async def abort(self):
+        self.open = False
+
+
+@pytest.fixture
+def txn():
+    yield InMemoryTransaction()
+
+
+@pytest.fixture
+def driver(txn):
+    mock = MagicMock()
+    mock.transaction.return_value.__aenter__.return_value = txn
+    yield mock
+
+
+async def test_counters_not_available_until_reconciled(txn):
+    await CountersDataManager.add_kb_counters(txn, "kbid", "1", KBCounters(resources=1))
+    assert await CountersDataManager.get_kb_counters(txn, "kbid") is None
+
+    await CountersDataManager.init_kb_counters(txn, "kbid")
+    assert await CountersDataManager.get_kb_counters(txn, "kbid") == KBCounters(
+        resources=1
+    )
+
+
+async def test_resource_counters_deltas(txn):
+    await CountersDataManager.init_kb_counters(txn, "kbid")
+
+    first = ResourceCounters(paragraphs={"a/title": 1, "t/text": 3})
+    await CountersDataManager.update_resource_counters(
+        txn, "kbid", "rid1", "1", first, None
+    )
+    second = ResourceCounters(paragraphs={"a/title": 1})
+    await CountersDataManager.update_resource_counters(
+        txn, "kbid", "rid2", "2", second, None
+    )
+    assert await CountersDataManager.get_kb_counters(txn, "kbid") == KBCounters(
+        resources=2, fields=3, paragraphs=5
+    )
+
+    # updating a resource only adds the difference
+    previous = await CountersDataManager.get_resource_counters(txn, "kbid", "rid1")
+    assert previous == first
+    updated = ResourceCounters(paragraphs={"a/title": 1, "t/text": 1, "u/link": 2})
+    await CountersDataManager.update_resource_counters(
+        txn, "kbid", "rid1", "1", updated, previous
+    )
+    assert await CountersDataManager.get_kb_counters(txn, "kbid") == KBCounters(
+        resources=2, fields=4, paragraphs=5
+    )
+
+    await CountersDataManager.remove_resource_counters(txn, "kbid", "rid1", "2")
+    assert await CountersDataManager.get_kb_counters(txn, "kbid") == KBCounters(
+        resources=1, fields=1, paragraphs=1
+    )
+    # removing an unknown resource does nothing
+    await CountersDataManager.remove_resource_counters(txn, "kbid", "rid1", "2")
+    assert await CountersDataManager.get_kb_counters(txn, "kbid") == KBCounters(
+        resources=1, fields=1, paragraphs=1
+    )
+
+
+async def test_reconcile(driver, txn):
+    dm = CountersDataManager(driver)
+    # partial counters from before the kb was ever reconciled are corrected
+    await CountersDataManager.add_kb_counters(txn, "kbid", "1", KBCounters(resources=1))
+    expected = KBCounters(resources=10, fields=20, paragraphs=30)
+    snapshot = await dm.snapshot_counters("kbid")
+    assert await dm.reconcile("kbid", expected, snapshot) == KBCounters(
+        resources=9, fields=20, paragraphs=30
+    )
+    assert await dm.get_counters("kbid") == expected
+
+    # drift is corrected without touching the partition counters
+    await CountersDataManager.add_kb_counters(
+        txn, "kbid", "1", KBCounters(resources=2, fields=2, paragraphs=2)
+    )
+    snapshot = await dm.snapshot_counters("kbid")
+    correction = await dm.reconcile("kbid", expected, snapshot)
+    assert correction == KBCounters(resources=-2, fields=-2, paragraphs=-2)
+    assert await dm.get_counters("kbid") == expected
+    snapshot = await dm.snapshot_counters("kbid")
+    assert await dm.reconcile("kbid", expected, snapshot) == KBCounters()
+
+
+async def test_reconcile_keeps_changes_committed_while_recalculating(driver, txn):
+    dm = CountersDataManager(driver)
+    await CountersDataManager.init_kb_counters(txn, "kbid")
+    await CountersDataManager.add_kb_counters(
+        txn, "kbid", "1", KBCounters(resources=2, fields=2, paragraphs=2)
+    )
+    snapshot = await dm.snapshot_counters("kbid")
+
+    # a resource is created while the counters are being recalculated
+    await CountersDataManager.add_kb_counters(
+        txn, "kbid", "2", KBCounters(resources=1, fields=1, paragraphs=1)
+    )
+    expected = KBCounters(resources=1, fields=1, paragraphs=1)
+
+    correction = await dm.reconcile("kbid", expected, snapshot)
+    assert correction == KBCounters(resources=-1, fields=-1, paragraphs=-1)
+    assert await dm.get_counters("kbid") == KBCounters(
+        resources=2, fields=2, paragraphs=2
+    )
+
+
+async def test_reconcile_is_idempotent(driver, txn):
+    dm = CountersDataManager(driver)
+    await CountersDataManager.add_kb_counters(txn, "kbid", "1", KBCounters(resources=3))
+    expected = KBCounters(resources=2)
+
+    # two replicas reconciling the kb at once
+    first = await dm.snapshot_counters("kbid")
+    second = await dm.snapshot_counters("kbid")
+    assert await dm.reconcile("kbid", expected, first) == KBCounters(resources=-1)
+    assert await dm.reconcile("kbid", expected, second) == KBCounters()
+    assert await dm.get_counters("kbid") == expected
+    # the correction is not part of the snapshot
+    assert await dm.snapshot_counters("kbid") == KBCounters(resources=3)
+
+
+async def test_reconcile_lease(driver):
+    dm = CountersDataManager(driver)
+    assert await dm.acquire_reconcile_lease("kbid", 60)
+    assert not await dm.acquire_reconcile_lease("kbid", 60)
+    assert await dm.acquire_reconcile_lease("other", 60)
+
+    with patch(
+        "nucliadb.common.datamanagers.counters.time.time", return_value=time.time() + 61
+    ):
+        assert await dm.acquire_reconcile_lease("kbid", 60)
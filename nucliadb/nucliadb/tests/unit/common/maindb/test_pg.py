@@ -0,0 +1,113 @@
+# Copyright (C) 2021 Bosutech XXI S.L.
+#
+# nucliadb is offered under the AGPL v3.0 and as commercial software.
+# For commercial licensing, contact us at info@nuclia.com.
+#
+# AGPL:
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from nucliadb.common.maindb.exceptions import (
+    ReadOnlyTransactionError,
+    TransactionClosedError,
+)
+from nucliadb.common.maindb.pg import PGTransaction, ReadOnlyPGTransaction
+
+
+@pytest.fixture
+def connection():
+    yield MagicMock(
+        execute=AsyncMock(),
+        executemany=AsyncMock(),
+        fetchval=AsyncMock(return_value=b"stored"),
+        fetch=AsyncMock(return_value=[{"key": "stored", "value": b"stored"}]),
+    )
+
+
+@pytest.fixture
+def pool(connection):
+    acquire = MagicMock()
+    acquire.return_value.__aenter__.return_value = connection
+    yield MagicMock(acquire=acquire, release=AsyncMock())
+
+
+async def test_writes_are_batched_on_commit(pool, connection):
+    inner_txn = MagicMock(commit=AsyncMock(), rollback=AsyncMock())
+    txn = PGTransaction(pool, connection, inner_txn, driver=None)  # type: ignore
+
+    await txn.set("a", b"1")
+    await txn.set("b", b"2")
+    await txn.delete("b")
+    await txn.delete("c")
+
+    # reads see the transaction's own writes without hitting the server
+    assert await txn.get("a") == b"1"
+    assert await txn.get("b") is None
+    assert await txn.batch_get(["a", "stored", "c"]) == [b"1", b"stored", None]
+    connection.executemany.assert_not_called()
+
+    await txn.commit()
+
+    connection.executemany.assert_awaited_once()
+    assert connection.executemany.call_args[0][1] == [("a", b"1")]
+    connection.execute.assert_awaited_once_with(
+        "DELETE FROM resources WHERE key = ANY($1)", ["b", "c"]
+    )
+    inner_txn.commit.assert_awaited_once()
+    pool.release.assert_awaited_once_with(connection)
+    assert not txn.open
+
+
+async def test_abort_releases_connection(pool, connection):
+    inner_txn = MagicMock(commit=AsyncMock(), rollback=AsyncMock())
+    txn = PGTransaction(pool, connection, inner_txn, driver=None)  # type: ignore
+
+    await txn.set("a", b"1")
+    await txn.abort()
+
+    connection.executemany.assert_not_called()
+    inner_txn.rollback.assert_awaited_once()
+    pool.release.assert_awaited_once_with(connection)
+
+
+async def test_commit_closed_transaction(pool, connection):
+    inner_txn = MagicMock(commit=AsyncMock(), rollback=AsyncMock())
+    txn = PGTransaction(pool, connection, inner_txn, driver=None)  # type: ignore
+
+    await txn.set("a", b"1")
+    await txn.abort()
+    with pytest.raises(TransactionClosedError):
+        await txn.commit()
+
+    connection.executemany.assert_not_called()
+    inner_txn.commit.assert_not_awaited()
+    pool.release.assert_awaited_once_with(connection)
+
+
+async def test_read_only_transaction(pool, connection):
+    txn = ReadOnlyPGTransaction(pool, driver=None)  # type: ignore
+
+    assert await txn.get("stored") == b"stored"
+    pool.acquire.assert_called_once()
+
+    with pytest.raises(ReadOnlyTransactionError):
+        await txn.set("a", b"1")
+    with pytest.raises(ReadOnlyTransactionError):
+        await txn.delete("a")
+
+    await txn.abort()
+    assert not txn.open
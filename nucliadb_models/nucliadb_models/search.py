@@ -50,6 +50,11 @@ class ModelParamDefaults:
         title="Minimum score",
         description="Minimum similarity score used to filter vector index search. Results with a lower score will be ignored.",  # noqa
     )
+    missing_shards = ParamDefault(
+        default=None,
+        title="Missing shards",
+        description="Shards that did not answer within the requested partial results timeout. Their results are not included in the response.",  # noqa
+    )
 
 
 class ResourceProperties(str, Enum):
@@ -250,6 +255,9 @@ class KnowledgeboxSearchResults(JsonBaseModel):
     relations: Optional[Relations] = None
     nodes: Optional[List[Tuple[str, str, str]]] = None
     shards: Optional[List[str]] = None
+    missing_shards: Optional[
+        List[str]
+    ] = ModelParamDefaults.missing_shards.to_pydantic_field()
     autofilters: List[str] = ModelParamDefaults.applied_autofilters.to_pydantic_field()
 
 
@@ -259,6 +267,9 @@ class KnowledgeboxSuggestResults(JsonBaseModel):
     paragraphs: Optional[Paragraphs] = None
     entities: Optional[RelatedEntities] = None
     shards: Optional[List[str]] = None
+    missing_shards: Optional[
+        List[str]
+    ] = ModelParamDefaults.missing_shards.to_pydantic_field()
 
 
 class KnowledgeboxCounters(BaseModel):
@@ -480,6 +491,12 @@ class SearchParamDefaults:
         title="Search features",
         description="List of search features to use. Each value corresponds to a lookup into on of the different indexes.",  # noqa
     )
+    partial_results_timeout = ParamDefault(
+        default=None,
+        title="Partial results timeout",
+        description="If set, seconds to wait for the shards of the Knowledge Box to answer. The results of the shards that answered in time are returned, the rest are listed in `missing_shards` and the response status is 206. If not set, the request fails when a shard does not answer.",  # noqa
+        gt=0,
+    )
     debug = ParamDefault(
         default=False,
         title="Debug mode",
@@ -595,6 +612,9 @@ class BaseSearchRequest(BaseModel):
         ExtractedDataTypeName
     ] = SearchParamDefaults.extracted.to_pydantic_field()
     shards: List[str] = SearchParamDefaults.shards.to_pydantic_field()
+    partial_results_timeout: Optional[
+        float
+    ] = SearchParamDefaults.partial_results_timeout.to_pydantic_field()
     vector: Optional[List[float]] = SearchParamDefaults.vector.to_pydantic_field()
     vectorset: Optional[str] = SearchParamDefaults.vectorset.to_pydantic_field()
     with_duplicates: bool = SearchParamDefaults.with_duplicates.to_pydantic_field()
@@ -852,6 +872,9 @@ class KnowledgeboxFindResults(JsonBaseModel):
     next_page: bool = False
     nodes: Optional[List[Tuple[str, str, str]]] = None
     shards: Optional[List[str]] = None
+    missing_shards: Optional[
+        List[str]
+    ] = ModelParamDefaults.missing_shards.to_pydantic_field()
     autofilters: List[str] = ModelParamDefaults.applied_autofilters.to_pydantic_field()
     min_score: float = ModelParamDefaults.min_score.to_pydantic_field()
 
@@ -22,6 +22,8 @@ import asyncio
 import uuid
 
 import pkg_resources
+from starlette.requests import Request
+from starlette.responses import JSONResponse
 
 from nucliadb_node import SERVICE_NAME, logger
 from nucliadb_node.pull import Worker
@@ -29,6 +31,7 @@ from nucliadb_node.service import start_grpc
 from nucliadb_node.settings import settings
 from nucliadb_node.writer import Writer
 from nucliadb_telemetry import errors
+from nucliadb_telemetry.fastapi import application_metrics
 from nucliadb_telemetry.logs import setup_logging
 from nucliadb_telemetry.utils import setup_telemetry
 from nucliadb_utils.fastapi.run import serve_metrics
@@ -61,6 +64,13 @@ async def start_worker(writer: Writer) -> Worker:
     return worker
 
 
+def indexing_status_endpoint(worker: Worker):
+    async def indexing_status(request: Request) -> JSONResponse:
+        return JSONResponse(worker.status())
+
+    return indexing_status
+
+
 async def main():
     writer = Writer(settings.writer_listen_address)
     worker = await start_worker(writer)
@@ -73,6 +83,8 @@ async def main():
 
     logger.info(f"======= Node sidecar started ======")
 
+    # per shard indexing queue status, served along with the metrics
+    application_metrics.add_route("/debug/indexing", indexing_status_endpoint(worker))
     metrics_server = await serve_metrics()
 
     finalizers = [
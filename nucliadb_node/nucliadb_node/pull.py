@@ -19,7 +19,9 @@
 
 import asyncio
 import time
-from typing import List, Optional
+from contextlib import contextmanager
+from functools import partial
+from typing import Any, Iterator, List, Optional
 
 import nats
 from grpc import StatusCode
@@ -36,7 +38,12 @@ from nucliadb_node.settings import indexing_settings, settings
 from nucliadb_node.writer import Writer
 from nucliadb_telemetry import errors, metrics
 from nucliadb_utils import const
-from nucliadb_utils.nats import MessageProgressUpdater, get_traced_jetstream
+from nucliadb_utils.nats import (
+    MessageProgressUpdater,
+    SequenceTracker,
+    get_traced_jetstream,
+    is_last_delivery,
+)
 from nucliadb_utils.settings import nats_consumer_settings
 from nucliadb_utils.storages.exceptions import IndexDataNotFound
 from nucliadb_utils.storages.storage import Storage
@@ -77,6 +84,59 @@ gc_observer = metrics.Observer(
         float("inf"),
     ],
 )
+indexing_phase_observer = metrics.Observer(
+    "node_indexing_phase",
+    labels={"phase": ""},
+    buckets=[
+        0.005,
+        0.01,
+        0.025,
+        0.05,
+        0.1,
+        0.5,
+        1.0,
+        2.5,
+        5.0,
+        10.0,
+        30.0,
+        60.0,
+        120.0,
+        float("inf"),
+    ],
+)
+indexing_payload_size = metrics.Histogram(
+    "node_indexing_payload_bytes",
+    buckets=[
+        1024,
+        10 * 1024,
+        100 * 1024,
+        1024 * 1024,
+        10 * 1024 * 1024,
+        50 * 1024 * 1024,
+        100 * 1024 * 1024,
+        250 * 1024 * 1024,
+        float("inf"),
+    ],
+)
+# messages received by the worker that are not done yet
+indexing_pending_messages = metrics.Gauge("node_indexing_pending_messages")
+# messages on the stream not yet delivered to the worker
+indexing_stream_pending = metrics.Gauge("node_indexing_stream_pending_messages")
+# time between a message being published and its processing
+indexing_lag = metrics.Gauge("node_indexing_lag_seconds")
+
+
+def record_lag(msg: Msg) -> None:
+    # JetStream reply subjects are $JS.ACK.<stream>.<consumer>.<delivered>
+    # .<stream seq>.<consumer seq>.<timestamp>.<pending>
+    tokens = msg.reply.split(".")
+    try:
+        timestamp = int(tokens[7]) / 1_000_000_000
+        pending = int(tokens[8])
+    except (IndexError, ValueError):
+        return
+    indexing_lag.set(max(time.time() - timestamp, 0))
+    indexing_stream_pending.set(pending)
 
 
 class IndexNodeError(Exception):
@@ -98,6 +158,37 @@ class ShardManager:
         self._gc_schedule_timer: Optional[asyncio.TimerHandle] = None
         self._gc_task: Optional[asyncio.Task] = None
 
+        # indexing stats, exposed on the debug endpoint
+        self.pending = 0
+        self.last_seqid: Optional[int] = None
+        self.indexed = 0
+        self.indexed_bytes = 0
+        self.last_indexed: Optional[float] = None
+        self.phase_times: dict[str, float] = {}
+
+    @contextmanager
+    def observe_phase(self, phase: str) -> Iterator[None]:
+        """
+        Time an indexing phase of this shard, keeping the last duration
+        """
+        start = time.monotonic()
+        try:
+            with indexing_phase_observer({"phase": phase}):
+                yield
+        finally:
+            self.phase_times[phase] = time.monotonic() - start
+
+    def status(self) -> dict[str, Any]:
+        return {
+            "pending": self.pending,
+            "last_seqid": self.last_seqid,
+            "indexed": self.indexed,
+            "indexed_bytes": self.indexed_bytes,
+            "last_indexed": self.last_indexed,
+            "phase_times": self.phase_times,
+            "gc_pending_changes": self._change_count,
+        }
+
     def shard_changed_event(self, delay: Optional[float] = None) -> None:
         """
         Signal shard has changed and should be garbage collected at some point
@@ -132,7 +223,7 @@ class ShardManager:
             logger.info("Running garbage collection", extra={"shard": self._shard_id})
             self._change_count = 0
             try:
-                with gc_observer():
+                with gc_observer(), self.observe_phase("gc"):
                     # NOTE: garbage collector may not run if the shard is busy. We currently don't do anything to retry.
                     await self._writer.garbage_collector(self._shard_id)
                     logger.info(
@@ -145,22 +236,43 @@ class ShardManager:
 
 
 class Worker:
+    """
+    With `max_concurrency` > 1, messages of different shards are indexed
+    concurrently while messages of the same shard keep their order. The
+    payload of a message is downloaded as soon as it is received, so it is
+    ready by the time the previous writes to its shard are done. The stored
+    seqid only advances up to the lowest one for which all previous ones are
+    done.
+    """
+
     subscriptions: List[Subscription]
     storage: Storage
 
-    def __init__(self, writer: Writer, node: str):
+    def __init__(
+        self, writer: Writer, node: str, max_concurrency: Optional[int] = None
+    ):
         self.writer = writer
         self.subscriptions = []
         self.node = node
         self.publisher = IndexedPublisher()
         self.load_seqid()
-        self.brain: Optional[Resource] = None
 
         self.shard_managers: dict[str, ShardManager] = {}
         # right now, only allow one gc at a time but
         # can be expanded to allow multiple if we want with a semaphore
         self.gc_lock = asyncio.Semaphore(1)
 
+        if max_concurrency is None:
+            max_concurrency = settings.indexing_max_concurrency
+        self.max_concurrency = max_concurrency
+        self.concurrency = asyncio.Semaphore(max_concurrency)
+        self.pending = 0
+        # last scheduled task of every shard
+        self.shard_tasks: dict[str, asyncio.Task] = {}
+        self.sequence_tracker: Optional[SequenceTracker] = None
+        if max_concurrency > 1:
+            self.sequence_tracker = SequenceTracker(self.last_seqid or 0)
+
     async def initialize(self):
         self.storage = await get_storage(service_name=SERVICE_NAME)
         await self.publisher.initialize()
@@ -261,16 +373,48 @@ class Worker:
             # First time the consumer is started
             self.last_seqid = None
 
-    async def set_resource(self, pb: IndexMessage) -> OpStatus:
-        self.brain = await self.storage.get_indexing(pb)
-        self.brain.shard_id = self.brain.resource.shard_id = pb.shard
-        logger.info(
-            f"Added {self.brain.resource.uuid} at {self.brain.shard_id} otx:{pb.txid}"
-        )
-        status = await self.writer.set_resource(self.brain)
+    def status(self) -> dict[str, Any]:
+        return {
+            "node": self.node,
+            "last_seqid": self.last_seqid,
+            "pending": self.pending,
+            "max_concurrency": self.max_concurrency,
+            "shards": {
+                shard_id: sm.status() for shard_id, sm in self.shard_managers.items()
+            },
+        }
+
+    def message_started(self, sm: ShardManager) -> None:
+        self.pending += 1
+        sm.pending += 1
+        indexing_pending_messages.set(self.pending)
+
+    def message_done(self, sm: ShardManager) -> None:
+        self.pending -= 1
+        sm.pending -= 1
+        indexing_pending_messages.set(self.pending)
+
+    async def get_indexing(self, pb: IndexMessage) -> Resource:
+        sm = self.get_shard_manager(pb.shard)
+        with sm.observe_phase("download"):
+            bytes_buffer = await self.storage.download_indexing(pb)
+        with sm.observe_phase("parse"), bytes_buffer.getbuffer() as data:
+            size = data.nbytes
+            brain = Resource()
+            brain.ParseFromString(data)
+        indexing_payload_size.observe(size)
+        sm.indexed_bytes += size
+        brain.shard_id = brain.resource.shard_id = pb.shard
+        return brain
+
+    async def set_resource(
+        self, pb: IndexMessage, brain: Optional[Resource] = None
+    ) -> OpStatus:
+        if brain is None:
+            brain = await self.get_indexing(pb)
+        logger.info(f"Added {brain.resource.uuid} at {brain.shard_id} otx:{pb.txid}")
+        status = await self.writer.set_resource(brain)
         logger.info(f"...done")
-        del self.brain
-        self.brain = None
         return status
 
     async def delete_resource(self, pb: IndexMessage) -> OpStatus:
@@ -280,10 +424,11 @@ class Worker:
         logger.info(f"...done")
         return status
 
-    @subscriber_observer.wrap()
     async def subscription_worker(self, msg: Msg):
-        subject = msg.subject
-        reply = msg.reply
+        if self.max_concurrency > 1:
+            await self.schedule_message(msg)
+            return
+
         seqid = int(msg.reply.split(".")[5])
         if self.last_seqid and self.last_seqid >= seqid:
             logger.warning(
@@ -294,6 +439,100 @@ class Worker:
 
         pb = IndexMessage()
         pb.ParseFromString(msg.data)
+        sm = self.get_shard_manager(pb.shard)
+        self.message_started(sm)
+        try:
+            async with MessageProgressUpdater(
+                msg, nats_consumer_settings.nats_ack_wait * 0.66
+            ):
+                await self.handle_message(msg, pb)
+        finally:
+            self.message_done(sm)
+
+    async def schedule_message(self, msg: Msg) -> None:
+        """
+        Process the message in a task once a concurrency slot is available
+        and previous messages of the same shard are done. The indexing
+        payload starts downloading right away.
+        """
+        assert self.sequence_tracker is not None
+        seqid = int(msg.reply.split(".")[5])
+        if self.sequence_tracker.is_processed(seqid):
+            last_seqid = self.sequence_tracker.last_seqid
+            logger.warning(
+                f"Skipping already processed message. Msg seqid {seqid} vs Last seqid {last_seqid}"
+            )
+            await msg.ack()
+            return
+
+        await self.concurrency.acquire()
+        pb = IndexMessage()
+        pb.ParseFromString(msg.data)
+        self.message_started(self.get_shard_manager(pb.shard))
+        prefetch = None
+        if pb.typemessage == TypeMessage.CREATION:
+            prefetch = asyncio.create_task(self.get_indexing(pb))
+        self.sequence_tracker.start(seqid)
+        task = asyncio.create_task(
+            self._run_scheduled(msg, pb, prefetch, self.shard_tasks.get(pb.shard))
+        )
+        self.shard_tasks[pb.shard] = task
+        task.add_done_callback(partial(self._scheduled_done, pb.shard))
+
+    async def _run_scheduled(
+        self,
+        msg: Msg,
+        pb: IndexMessage,
+        prefetch: Optional[asyncio.Task],
+        previous: Optional[asyncio.Task],
+    ) -> None:
+        try:
+            async with MessageProgressUpdater(
+                msg, nats_consumer_settings.nats_ack_wait * 0.66
+            ):
+                if previous is not None:
+                    await asyncio.wait([previous])
+                try:
+                    await self.handle_message(msg, pb, prefetch)
+                except Exception:
+                    if is_last_delivery(msg, nats_consumer_settings.nats_max_deliver):
+                        # it will never be redelivered: its seqid is skipped,
+                        # as serial indexing does when a later one is stored
+                        self.finish_seqid(int(msg.reply.split(".")[5]))
+                    # otherwise it is not ACKd and will be redelivered, so
+                    # the seqid stays pending
+        finally:
+            if prefetch is not None and not prefetch.done():  # pragma: no cover
+                prefetch.cancel()
+            self.message_done(self.get_shard_manager(pb.shard))
+            self.concurrency.release()
+
+    def _scheduled_done(self, shard: str, task: asyncio.Task) -> None:
+        if self.shard_tasks.get(shard) is task:
+            del self.shard_tasks[shard]
+
+    def finish_seqid(self, seqid: int) -> None:
+        if self.sequence_tracker is None:
+            self.store_seqid(seqid)
+            return
+        last_seqid = self.sequence_tracker.finish(seqid)
+        if last_seqid is not None:
+            self.store_seqid(last_seqid)
+
+    @subscriber_observer.wrap()
+    async def handle_message(
+        self,
+        msg: Msg,
+        pb: Optional[IndexMessage] = None,
+        prefetch: Optional[asyncio.Task] = None,
+    ):
+        subject = msg.subject
+        reply = msg.reply
+        seqid = int(msg.reply.split(".")[5])
+
+        if pb is None:
+            pb = IndexMessage()
+            pb.ParseFromString(msg.data)
         logger.info(
             "Message received",
             extra={
@@ -305,17 +544,23 @@ class Worker:
             },
         )
 
+        record_lag(msg)
         sm = self.get_shard_manager(pb.shard)
         start = time.time()
-        async with MessageProgressUpdater(
-            msg, nats_consumer_settings.nats_ack_wait * 0.66
-        ), sm.lock:
+        brain: Optional[Resource] = None
+        async with sm.lock:
             try:
                 status = None
                 if pb.typemessage == TypeMessage.CREATION:
-                    status = await self.set_resource(pb)
+                    if prefetch is not None:
+                        brain = await prefetch
+                    else:
+                        brain = await self.get_indexing(pb)
+                    with sm.observe_phase("index"):
+                        status = await self.set_resource(pb, brain)
                 elif pb.typemessage == TypeMessage.DELETION:
-                    status = await self.delete_resource(pb)
+                    with sm.observe_phase("delete"):
+                        status = await self.delete_resource(pb)
                 if status is not None and status.status != OpStatus.Status.OK:
                     raise IndexNodeError(status.detail)
                 sm.shard_changed_event()
@@ -329,8 +574,8 @@ class Worker:
                     )
                     if (
                         pb.typemessage == TypeMessage.CREATION
-                        and self.brain
-                        and self.brain.HasField("metadata")
+                        and brain is not None
+                        and brain.HasField("metadata")
                     ):
                         # Hard fail if we have the correct data
                         await msg.nak()
@@ -350,11 +595,18 @@ class Worker:
                 )
                 await msg.nak()
                 raise e
+            finally:
+                # do not keep the payload around while acking
+                brain = None
 
         try:
-            await msg.ack()
+            with sm.observe_phase("ack"):
+                await msg.ack()
             await self.publisher.indexed(pb)
-            self.store_seqid(seqid)
+            self.finish_seqid(seqid)
+            sm.last_seqid = seqid
+            sm.indexed += 1
+            sm.last_indexed = time.time()
         except Exception as e:  # pragma: no cover
             await msg.nak()
             errors.capture_exception(e)
@@ -372,6 +624,17 @@ class Worker:
                 },
             )
 
+    @property
+    def max_ack_pending(self) -> int:
+        """
+        NATS does not deliver more messages than these until they are ACKd,
+        so it must allow as many as the messages indexed at once.
+        """
+        max_ack_pending = nats_consumer_settings.nats_max_ack_pending
+        if self.max_concurrency > 1:
+            max_ack_pending = max(max_ack_pending, self.max_concurrency)
+        return max_ack_pending
+
     async def subscribe(self):
         logger.info(f"Last seqid {self.last_seqid}")
         try:
@@ -397,7 +660,7 @@ class Worker:
                 deliver_policy=nats.js.api.DeliverPolicy.BY_START_SEQUENCE,
                 opt_start_seq=self.last_seqid or 1,
                 ack_policy=nats.js.api.AckPolicy.EXPLICIT,
-                max_ack_pending=nats_consumer_settings.nats_max_ack_pending,
+                max_ack_pending=self.max_ack_pending,
                 max_deliver=nats_consumer_settings.nats_max_deliver,
                 ack_wait=nats_consumer_settings.nats_ack_wait,
                 idle_heartbeat=nats_consumer_settings.nats_idle_heartbeat,
@@ -418,6 +681,14 @@ class IndexedPublisher:
         await self.pubsub.finalize()
 
     async def indexed(self, indexpb: IndexMessage):
+        if settings.publish_shard_indexed:
+            # searchers drop the cached results of the shard with this, also
+            # for writes without partition like rollovers and reindexes
+            await self.pubsub.publish(
+                const.PubSubChannels.SHARD_INDEXED.format(shard=indexpb.shard),
+                indexpb.shard.encode(),
+            )
+
         if not indexpb.HasField("partition"):
             logger.warning(f"Could not publish message without partition")
             return
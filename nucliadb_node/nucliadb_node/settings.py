@@ -36,6 +36,14 @@ class Settings(BaseSettings):
 
     max_resources_before_gc: int = 1000
 
+    # maximum number of index messages processed at once. Messages of the
+    # same shard are always processed in order
+    indexing_max_concurrency: int = 1
+
+    # notify searchers when a shard is indexed so they can drop its cached
+    # results. Only needed when the search shard cache is enabled
+    publish_shard_indexed: bool = False
+
 
 settings = Settings()
 indexing_settings = utils_settings.IndexingSettings()
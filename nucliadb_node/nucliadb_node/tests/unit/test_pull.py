@@ -19,16 +19,19 @@
 #
 import asyncio
 import tempfile
+from io import BytesIO
 from unittest import mock
 from unittest.mock import AsyncMock, MagicMock, Mock, patch
 
 import pytest
 from nats.aio.client import Msg
+from nucliadb_protos.noderesources_pb2 import Resource
 from nucliadb_protos.nodewriter_pb2 import IndexMessage, OpStatus, TypeMessage
 
 from nucliadb_node.pull import IndexedPublisher, IndexNodeError, ShardManager, Worker
 from nucliadb_node.settings import settings
 from nucliadb_utils import const
+from nucliadb_utils.settings import nats_consumer_settings
 
 
 @pytest.fixture(autouse=True)
@@ -105,6 +108,7 @@ class TestIndexedPublisher:
         delpb.partition = "11"
         delpb.resource = "rid"
         delpb.kbid = "kbid"
+        delpb.shard = "shard"
         return delpb
 
     @pytest.mark.asyncio
@@ -117,6 +121,13 @@ class TestIndexedPublisher:
 
         pubsub.finalize.assert_awaited_once()
 
+    @pytest.fixture(scope="function")
+    def publish_shard_indexed(self):
+        previous = settings.publish_shard_indexed
+        settings.publish_shard_indexed = True
+        yield
+        settings.publish_shard_indexed = previous
+
     @pytest.mark.asyncio
     async def test_indexed(self, publisher, index_message, pubsub):
         await publisher.indexed(index_message)
@@ -125,6 +136,18 @@ class TestIndexedPublisher:
         pubsub.publish.assert_awaited_once()
         assert pubsub.publish.call_args[0][0] == channel
 
+    @pytest.mark.asyncio
+    async def test_indexed_publishes_shard(
+        self, publisher, index_message, pubsub, publish_shard_indexed
+    ):
+        await publisher.indexed(index_message)
+
+        shard_channel = const.PubSubChannels.SHARD_INDEXED.format(
+            shard=index_message.shard
+        )
+        assert pubsub.publish.await_count == 2
+        assert pubsub.publish.call_args_list[0][0] == (shard_channel, b"shard")
+
     @pytest.mark.asyncio
     async def test_indexed_skips_if_no_partition(
         self, publisher, index_message, pubsub
@@ -135,6 +158,19 @@ class TestIndexedPublisher:
 
         pubsub.publish.assert_not_awaited()
 
+    @pytest.mark.asyncio
+    async def test_indexed_publishes_shard_without_partition(
+        self, publisher, index_message, pubsub, publish_shard_indexed
+    ):
+        index_message.ClearField("partition")
+
+        await publisher.indexed(index_message)
+
+        shard_channel = const.PubSubChannels.SHARD_INDEXED.format(
+            shard=index_message.shard
+        )
+        pubsub.publish.assert_awaited_once_with(shard_channel, b"shard")
+
 
 class TestSubscriptionWorker:
     @pytest.fixture(scope="function")
@@ -162,10 +198,28 @@ class TestSubscriptionWorker:
             worker.store_seqid = Mock()
             yield worker
 
-    def get_msg(self, seqid):
+    @pytest.fixture(scope="function")
+    def concurrent_worker(self, settings, nats_conn):
+        writer = AsyncMock()
+        with mock.patch("nucliadb_node.pull.get_storage"):
+            worker = Worker(writer, "node", max_concurrency=2)
+            worker.storage = AsyncMock()
+            worker.storage.download_indexing.side_effect = lambda pb: BytesIO(
+                Resource(labels=["/l/label"]).SerializeToString()
+            )
+            worker.publisher = AsyncMock()
+            worker.store_seqid = Mock()
+            yield worker
+
+    def get_msg(self, seqid, shard=None):
         client = AsyncMock()
         reply = f"foo.bar.ba.blan.ca.{seqid}.bar"
-        msg = Msg(client, "subject", reply)
+        data = b""
+        if shard is not None:
+            data = IndexMessage(
+                shard=shard, typemessage=TypeMessage.CREATION
+            ).SerializeToString()
+        msg = Msg(client, "subject", reply, data)
         msg.ack = AsyncMock()
         return msg
 
@@ -179,6 +233,92 @@ class TestSubscriptionWorker:
         msg.ack.assert_awaited_once()
         worker.store_seqid.assert_not_called()
 
+    @pytest.mark.asyncio
+    async def test_indexes_shards_concurrently(self, concurrent_worker: Worker):
+        worker = concurrent_worker
+        release = asyncio.Event()
+
+        async def set_resource(brain):
+            if brain.shard_id == "shard1":
+                await release.wait()
+            return OpStatus(status=OpStatus.Status.OK)
+
+        worker.writer.set_resource.side_effect = set_resource  # type: ignore
+        msg1 = self.get_msg(seqid=1, shard="shard1")
+        msg2 = self.get_msg(seqid=2, shard="shard2")
+        await worker.subscription_worker(msg1)
+        await worker.subscription_worker(msg2)
+        await asyncio.sleep(0.1)
+
+        # shard2 is not blocked by shard1, but its seqid is not
+        # stored until the previous one is done
+        msg2.ack.assert_awaited_once()
+        msg1.ack.assert_not_awaited()
+        worker.store_seqid.assert_not_called()  # type: ignore
+
+        release.set()
+        await asyncio.sleep(0.1)
+
+        msg1.ack.assert_awaited_once()
+        worker.store_seqid.assert_called_once_with(2)  # type: ignore
+
+    @pytest.mark.asyncio
+    async def test_message_failed_for_good_skips_seqid(self, concurrent_worker: Worker):
+        worker = concurrent_worker
+
+        async def set_resource(brain):
+            if brain.shard_id == "shard1":
+                raise Exception("boom")
+            return OpStatus(status=OpStatus.Status.OK)
+
+        worker.writer.set_resource.side_effect = set_resource  # type: ignore
+        msg1 = self.get_msg(seqid=1, shard="shard1")
+        msg2 = self.get_msg(seqid=2, shard="shard2")
+        # last delivery of the message
+        msg1.reply = "$JS.ACK.stream.consumer.10.1.1.1.0"
+        msg1.nak = AsyncMock()  # type: ignore
+        with patch.object(nats_consumer_settings, "nats_max_deliver", 10):
+            await worker.subscription_worker(msg1)
+            await worker.subscription_worker(msg2)
+            await asyncio.sleep(0.1)
+
+        msg1.nak.assert_awaited_once()
+        # shard1 message will never be redelivered, its seqid is not pending
+        worker.store_seqid.assert_called_with(2)  # type: ignore
+        assert worker.sequence_tracker.pending == set()  # type: ignore
+
+    @pytest.mark.asyncio
+    async def test_status(self, concurrent_worker: Worker):
+        worker = concurrent_worker
+        worker.writer.set_resource.return_value = OpStatus(  # type: ignore
+            status=OpStatus.Status.OK
+        )
+        await worker.subscription_worker(self.get_msg(seqid=1, shard="shard1"))
+        await asyncio.sleep(0.1)
+
+        status = worker.status()
+        assert status["pending"] == 0
+        shard_status = status["shards"]["shard1"]
+        assert shard_status["pending"] == 0
+        assert shard_status["last_seqid"] == 1
+        assert shard_status["indexed"] == 1
+        assert shard_status["indexed_bytes"] == len(
+            Resource(labels=["/l/label"]).SerializeToString()
+        )
+        assert set(shard_status["phase_times"]) == {"download", "parse", "index", "ack"}
+
+    @pytest.mark.asyncio
+    async def test_subscribe_allows_max_concurrency_ack_pending(
+        self, concurrent_worker: Worker
+    ):
+        worker = concurrent_worker
+        worker.js = AsyncMock()
+        with patch.object(nats_consumer_settings, "nats_max_ack_pending", 1):
+            await worker.subscribe()
+
+        config = worker.js.subscribe.call_args.kwargs["config"]
+        assert config.max_ack_pending == 2
+
     @pytest.mark.asyncio
     async def test_reconnected_cb(self, worker: Worker):
         await worker.initialize()
@@ -59,6 +59,41 @@ impl NodeWriter {
             ))),
         }
     }
+
+    fn index_resource<'p>(&self, resource: Resource, py: Python<'p>) -> PyResult<&'p PyAny> {
+        let shard_id = resource.shard_id.clone();
+        let shard = self.obtain_shard(shard_id.clone())?;
+        let status = shard
+            .set_resource(&resource)
+            .and_then(|()| shard.get_opstatus());
+        match status {
+            Ok(mut status) => {
+                status.status = 0;
+                status.detail = "Success!".to_string();
+                Ok(PyList::new(py, status.encode_to_vec()))
+            }
+            Err(error) => {
+                let status = OpStatus {
+                    status: op_status::Status::Error as i32,
+                    detail: error.to_string(),
+                    field_count: 0_u64,
+                    shard_id,
+                    ..Default::default()
+                };
+                Ok(PyList::new(py, status.encode_to_vec()))
+            }
+        }
+    }
+}
+
+fn with_shard_id(mut resource: Resource, shard_id: Option<String>) -> Resource {
+    if let Some(shard_id) = shard_id {
+        if let Some(resource_id) = resource.resource.as_mut() {
+            resource_id.shard_id = shard_id.clone();
+        }
+        resource.shard_id = shard_id;
+    }
+    resource
 }
 
 #[pymethods]
@@ -145,28 +180,42 @@ impl NodeWriter {
     pub fn set_resource<'p>(&mut self, resource: RawProtos, py: Python<'p>) -> PyResult<&'p PyAny> {
         let resource =
             Resource::decode(&mut Cursor::new(resource)).expect("Error decoding arguments");
-        let shard_id = resource.shard_id.clone();
-        let shard = self.obtain_shard(shard_id.clone())?;
-        let status = shard
-            .set_resource(&resource)
-            .and_then(|()| shard.get_opstatus());
-        match status {
-            Ok(mut status) => {
-                status.status = 0;
-                status.detail = "Success!".to_string();
-                Ok(PyList::new(py, status.encode_to_vec()))
-            }
-            Err(error) => {
-                let status = OpStatus {
-                    status: op_status::Status::Error as i32,
-                    detail: error.to_string(),
-                    field_count: 0_u64,
-                    shard_id,
-                    ..Default::default()
-                };
-                Ok(PyList::new(py, status.encode_to_vec()))
-            }
-        }
+        self.index_resource(resource, py)
+    }
+
+    /// Same as `set_resource` but decodes the resource straight from the
+    /// bytes object, without copying it into a vector first. `shard_id`
+    /// overrides the shard stored in the payload, so one payload can be
+    /// indexed on every replica.
+    pub fn set_resource_from_buffer<'p>(
+        &mut self,
+        resource: &[u8],
+        shard_id: Option<String>,
+        py: Python<'p>,
+    ) -> PyResult<&'p PyAny> {
+        let resource = Resource::decode(resource).expect("Error decoding arguments");
+        self.index_resource(with_shard_id(resource, shard_id), py)
+    }
+
+    /// Same as `set_resource_from_buffer` but the payload is read from a
+    /// spool file, which is memory mapped instead of loaded.
+    pub fn set_resource_from_file<'p>(
+        &mut self,
+        path: String,
+        shard_id: Option<String>,
+        py: Python<'p>,
+    ) -> PyResult<&'p PyAny> {
+        let file = fs::File::open(&path).map_err(|error| {
+            IndexNodeException::new_err(format!("Error opening {path}: {error}"))
+        })?;
+        // Safety: spool files are private to the caller and not modified
+        // while they are being indexed
+        let payload = unsafe { memmap2::Mmap::map(&file) }.map_err(|error| {
+            IndexNodeException::new_err(format!("Error mapping {path}: {error}"))
+        })?;
+        let resource = Resource::decode(&payload[..]).expect("Error decoding arguments");
+        drop(payload);
+        self.index_resource(with_shard_id(resource, shard_id), py)
     }
 
     pub fn remove_resource<'p>(
@@ -20,6 +20,8 @@
 class PubSubChannels:
     # stream that ingest/node publishes to for information
     RESOURCE_NOTIFY = "notify.{kbid}"
+    # index nodes publish the index message of every change applied to a shard
+    SHARD_INDEXED = "indexed.{shard}"
 
 
 class Streams:
@@ -18,6 +18,7 @@
 # along with this program. If not, see <http://www.gnu.org/licenses/>.
 
 import asyncio
+import heapq
 import logging
 import time
 from functools import cached_property
@@ -47,6 +48,55 @@ def get_traced_jetstream(nc: NATSClient, service_name: str) -> JetStreamContext:
     return jetstream
 
 
+class SequenceTracker:
+    """
+    Keeps track of the sequence ids of a stream consumer that are processed
+    concurrently, to know up to which one all of them are done.
+    """
+
+    def __init__(self, last_seqid: int = 0):
+        # every seqid lower or equal than this one is done
+        self.last_seqid = last_seqid
+        self.pending: set[int] = set()
+        self.completed: set[int] = set()
+        self._completed_heap: list[int] = []
+
+    def start(self, seqid: int) -> None:
+        self.pending.add(seqid)
+
+    def finish(self, seqid: int) -> Optional[int]:
+        """
+        Mark a seqid as done. Returns the new last seqid if it advanced.
+        """
+        self.pending.discard(seqid)
+        if seqid > self.last_seqid and seqid not in self.completed:
+            self.completed.add(seqid)
+            heapq.heappush(self._completed_heap, seqid)
+
+        lowest_pending = min(self.pending, default=None)
+        advanced = None
+        while len(self._completed_heap) > 0 and (
+            lowest_pending is None or self._completed_heap[0] < lowest_pending
+        ):
+            advanced = heapq.heappop(self._completed_heap)
+            self.completed.discard(advanced)
+        if advanced is None:
+            return None
+        self.last_seqid = advanced
+        return advanced
+
+    def is_processed(self, seqid: int) -> bool:
+        return seqid <= self.last_seqid or seqid in self.completed
+
+
+def is_last_delivery(msg: Msg, max_deliver: int) -> bool:
+    """
+    Whether the message will not be redelivered if it is not ACKd, because
+    it has already been delivered `max_deliver` times.
+    """
+    return max_deliver > 0 and msg.metadata.num_delivered >= max_deliver
+
+
 class MessageProgressUpdater:
     """
     Context manager to send progress updates to NATS.
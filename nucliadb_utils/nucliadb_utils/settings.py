@@ -116,6 +116,52 @@ class StorageSettings(BaseSettings):
 
     driver_pg_url: Optional[str] = None  # match same env var for k/v storage
 
+    parallel_download_threshold: int = Field(
+        default=64 * 1024 * 1024,
+        description="Objects of at least this size in bytes are downloaded reading "
+        "several ranges at once. Disabled with 0",
+    )
+    parallel_download_part_size: int = Field(
+        default=8 * 1024 * 1024,
+        description="Size in bytes of the ranges read by parallel downloads",
+    )
+    parallel_download_max_concurrency: int = Field(
+        default=4,
+        description="Maximum number of ranges read at once by a parallel download",
+    )
+    upload_max_concurrency: int = Field(
+        default=4,
+        description="Maximum number of parts uploaded at once by multipart uploads",
+    )
+    upload_compose_threshold: int = Field(
+        default=32 * 1024 * 1024,
+        description="On GCS, uploads of at least this size in bytes are sent as "
+        "parts uploaded at once and composed on finish. Disabled with 0",
+    )
+
+    storage_cache_max_bytes: int = Field(
+        default=0,
+        description="Size in bytes of the in memory cache of small blobs read from "
+        "storage. Disabled with 0",
+    )
+    storage_cache_max_object_size: int = Field(
+        default=1024 * 1024,
+        description="Maximum size in bytes of a blob to be cached",
+    )
+    storage_cache_ttl: float = Field(
+        default=60.0,
+        description="Seconds a cached blob is served before reading it again. "
+        "Writes made by other processes are only seen after this time",
+    )
+    storage_cache_disk_path: Optional[str] = Field(
+        default=None,
+        description="Directory where blobs evicted from the in memory cache are kept",
+    )
+    storage_cache_disk_max_bytes: int = Field(
+        default=1024 * 1024 * 1024,
+        description="Size in bytes of the on disk blob cache",
+    )
+
 
 storage_settings = StorageSettings()
 
@@ -0,0 +1,298 @@
+# Copyright (C) 2021 Bosutech XXI S.L.
+#
+# nucliadb is offered under the AGPL v3.0 and as commercial software.
+# For commercial licensing, contact us at info@nuclia.com.
+#
+# AGPL:
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+from __future__ import annotations
+
+import hashlib
+import mmap
+import os
+import shutil
+import tempfile
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+
+from nucliadb_telemetry import metrics
+
+BLOB_CACHE_OPS = metrics.Counter(
+    "nucliadb_storage_blob_cache_ops", labels={"type": "", "tier": ""}
+)
+
+BlobKey = Tuple[str, str]
+
+# number of invalidated keys whose generation is remembered
+MAX_TRACKED_GENERATIONS = 10_000
+
+
+class _LRUTier:
+    """
+    Entries of a cache tier bounded by bytes that expire after `ttl` seconds.
+    Entries may hold their value or only account for its size.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int,
+        ttl: float,
+        on_expire: Optional[Callable[[BlobKey], None]] = None,
+    ):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.on_expire = on_expire
+        self.size = 0
+        self._entries: OrderedDict[
+            BlobKey, Tuple[float, int, Optional[bytes]]
+        ] = OrderedDict()
+
+    def get(self, key: BlobKey) -> Optional[Tuple[int, Optional[bytes]]]:
+        """
+        Returns the size and value of the entry, if it is cached.
+        """
+        item = self._entries.get(key)
+        if item is None:
+            return None
+        expires, size, value = item
+        if expires < time.monotonic():
+            self.remove(key)
+            if self.on_expire is not None:
+                self.on_expire(key)
+            return None
+        self._entries.move_to_end(key)
+        return size, value
+
+    def add(
+        self, key: BlobKey, size: int, value: Optional[bytes] = None
+    ) -> List[Tuple[BlobKey, Optional[bytes]]]:
+        """
+        Returns the entries evicted to make room for the new one.
+        """
+        self.remove(key)
+        self._entries[key] = (time.monotonic() + self.ttl, size, value)
+        self.size += size
+        evicted = []
+        while self.size > self.max_bytes:
+            oldest = next(iter(self._entries))
+            evicted.append((oldest, self._entries[oldest][2]))
+            self.remove(oldest)
+        return evicted
+
+    def remove(self, key: BlobKey) -> bool:
+        item = self._entries.pop(key, None)
+        if item is None:
+            return False
+        self.size -= item[1]
+        return True
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self.size = 0
+
+
+class BlobCache:
+    """
+    Read-through cache of small blobs, keyed by `(bucket, key)`.
+
+    The first tier is an in memory LRU bounded by bytes. Objects evicted from
+    it are kept, when configured, in a second tier of files on disk that are
+    read through memory maps. Files are written and removed by a background
+    thread, values being written are served from memory. Both tiers are local to the process, entries
+    expire after `ttl` seconds and are invalidated on every write or delete
+    made through the storage. Every key has a generation that is bumped on
+    invalidation, so a download that raced with a write is never cached.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_bytes: int,
+        max_object_size: int,
+        ttl: float,
+        disk_path: Optional[str] = None,
+        disk_max_bytes: int = 0,
+    ):
+        self.max_object_size = max_object_size
+        self.memory = _LRUTier(max_bytes, ttl)
+        # generation of the last invalidated keys, older keys share the
+        # generation of the last one forgotten
+        self._generations: OrderedDict[BlobKey, int] = OrderedDict()
+        self._last_generation = 0
+        self._base_generation = 0
+
+        self.disk: Optional[_LRUTier] = None
+        self.disk_path: Optional[str] = None
+        self._disk_executor: Optional[ThreadPoolExecutor] = None
+        # values scheduled to be written to disk and not written yet
+        self._disk_pending: Dict[BlobKey, bytes] = {}
+        self._disk_pending_lock = threading.Lock()
+        if disk_path is not None and disk_max_bytes > 0:
+            os.makedirs(disk_path, exist_ok=True)
+            # private to this process, files of previous runs may be stale
+            self.disk_path = tempfile.mkdtemp(dir=disk_path, prefix="blobs-")
+            self.disk = _LRUTier(disk_max_bytes, ttl, on_expire=self._remove_file)
+            # a single worker keeps writes and removals of a key in order
+            self._disk_executor = ThreadPoolExecutor(
+                max_workers=1, thread_name_prefix="blob-cache"
+            )
+            self._remove_disk_path = weakref.finalize(
+                self, shutil.rmtree, self.disk_path, True
+            )
+
+    def generation(self, bucket: str, key: str) -> int:
+        return self._generations.get((bucket, key), self._base_generation)
+
+    def get(self, bucket: str, key: str) -> Optional[bytes]:
+        blob_key = (bucket, key)
+        entry = self.memory.get(blob_key)
+        if entry is not None:
+            BLOB_CACHE_OPS.inc({"type": "hit", "tier": "memory"})
+            return entry[1]
+
+        if self.disk is not None and self.disk.get(blob_key) is not None:
+            with self._disk_pending_lock:
+                value = self._disk_pending.get(blob_key)
+            if value is None:
+                value = self._read_file(blob_key)
+            if value is not None:
+                BLOB_CACHE_OPS.inc({"type": "hit", "tier": "disk"})
+                self._set_memory(blob_key, value)
+                return value
+            self.disk.remove(blob_key)
+
+        BLOB_CACHE_OPS.inc({"type": "miss", "tier": ""})
+        return None
+
+    def set(
+        self, bucket: str, key: str, value: bytes, generation: Optional[int] = None
+    ) -> None:
+        """
+        Cache a downloaded value. With `generation`, the value is only cached
+        if the key was not invalidated since it was read.
+        """
+        if len(value) == 0 or len(value) > self.max_object_size:
+            return
+        if generation is not None and generation != self.generation(bucket, key):
+            return
+        self._set_memory((bucket, key), value)
+
+    def invalidate(self, bucket: str, key: str) -> None:
+        blob_key = (bucket, key)
+        self._last_generation += 1
+        self._generations[blob_key] = self._last_generation
+        self._generations.move_to_end(blob_key)
+        if len(self._generations) > MAX_TRACKED_GENERATIONS:
+            _, self._base_generation = self._generations.popitem(last=False)
+        removed = self.memory.remove(blob_key)
+        if self.disk is not None and self.disk.remove(blob_key):
+            self._remove_file(blob_key)
+            removed = True
+        if removed:
+            BLOB_CACHE_OPS.inc({"type": "invalidate", "tier": ""})
+
+    def clear(self) -> None:
+        self.memory.clear()
+        if self.disk is not None:
+            self.disk.clear()
+            with self._disk_pending_lock:
+                self._disk_pending.clear()
+            self._submit_disk(self._clear_files)
+
+    def flush(self) -> None:
+        """
+        Wait for the files scheduled to be written or removed.
+        """
+        if self._disk_executor is not None:
+            self._disk_executor.submit(lambda: None).result()
+
+    def finalize(self) -> None:
+        self.memory.clear()
+        if self.disk is not None:
+            self.disk.clear()
+            with self._disk_pending_lock:
+                self._disk_pending.clear()
+            assert self._disk_executor is not None
+            self._disk_executor.shutdown(wait=True)
+            self._remove_disk_path()
+
+    def _set_memory(self, blob_key: BlobKey, value: bytes) -> None:
+        for evicted, evicted_value in self.memory.add(blob_key, len(value), value):
+            if self.disk is not None and evicted_value is not None:
+                self._set_disk(evicted, evicted_value)
+
+    def _set_disk(self, blob_key: BlobKey, value: bytes) -> None:
+        assert self.disk is not None
+        with self._disk_pending_lock:
+            self._disk_pending[blob_key] = value
+        self._submit_disk(self._write_file, blob_key, value)
+        for evicted, _ in self.disk.add(blob_key, len(value)):
+            self._remove_file(evicted)
+
+    def _submit_disk(self, fn: Callable[..., None], *args) -> None:
+        assert self._disk_executor is not None
+        try:
+            self._disk_executor.submit(fn, *args)
+        except RuntimeError:
+            # finalized
+            pass
+
+    def _write_file(self, blob_key: BlobKey, value: bytes) -> None:
+        path = self._file_path(blob_key)
+        tmp_path = f"{path}.tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                f.write(value)
+            os.replace(tmp_path, path)
+        except OSError:
+            pass
+        finally:
+            with self._disk_pending_lock:
+                # the key may have been removed or set again meanwhile
+                if self._disk_pending.get(blob_key) is value:
+                    del self._disk_pending[blob_key]
+
+    def _read_file(self, blob_key: BlobKey) -> Optional[bytes]:
+        try:
+            with open(self._file_path(blob_key), "rb") as f:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                    return mapped[:]
+        except (OSError, ValueError):
+            return None
+
+    def _remove_file(self, blob_key: BlobKey) -> None:
+        with self._disk_pending_lock:
+            self._disk_pending.pop(blob_key, None)
+        self._submit_disk(self._delete_file, self._file_path(blob_key))
+
+    def _delete_file(self, path: str) -> None:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    def _clear_files(self) -> None:
+        assert self.disk_path is not None
+        shutil.rmtree(self.disk_path, ignore_errors=True)
+        os.makedirs(self.disk_path, exist_ok=True)
+
+    def _file_path(self, blob_key: BlobKey) -> str:
+        assert self.disk_path is not None
+        name = hashlib.sha256("/".join(blob_key).encode()).hexdigest()
+        return os.path.join(self.disk_path, name)
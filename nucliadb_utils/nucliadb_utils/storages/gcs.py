@@ -23,10 +23,11 @@ import asyncio
 import base64
 import json
 import socket
+from collections import deque
 from concurrent.futures import ThreadPoolExecutor
 from copy import deepcopy
 from datetime import datetime
-from typing import Any, AsyncIterator, Dict, List, Optional
+from typing import Any, AsyncIterator, Deque, Dict, List, Optional
 from urllib.parse import quote_plus
 
 import aiohttp
@@ -40,6 +41,7 @@ from nucliadb_protos.resources_pb2 import CloudFile
 from nucliadb_telemetry import metrics
 from nucliadb_telemetry.utils import setup_telemetry
 from nucliadb_utils import logger
+from nucliadb_utils.settings import storage_settings
 from nucliadb_utils.storages import CHUNK_SIZE
 from nucliadb_utils.storages.exceptions import (
     CouldNotCopyNotFound,
@@ -61,6 +63,11 @@ MB = 1024 * KB
 
 MIN_UPLOAD_SIZE = 256 * KB
 OBJECT_DATA_CHUNK_SIZE = 1 * MB
+COMPOSE_PART_SIZE = 8 * MB
+MAX_COMPOSE_PART_SIZE = 64 * MB
+MAX_COMPOSE_SOURCES = 32
+# components of a composite object, including those of composed sources
+MAX_COMPOSE_COMPONENTS = 1024
 
 
 DEFAULT_SCOPES = ["https://www.googleapis.com/auth/devstorage.read_write"]
@@ -101,8 +108,23 @@ RETRIABLE_EXCEPTIONS = (
 )
 
 
+def _compose_part_size(size: int) -> Optional[int]:
+    """
+    Size of the parts of an upload of `size` bytes so they are not more than
+    the components of a composite object. None if the upload can not be sent
+    as parts, because its size is unknown or its parts would be too big.
+    """
+    if size <= 0:
+        return None
+    part_size = max(COMPOSE_PART_SIZE, -(-size // MAX_COMPOSE_COMPONENTS))
+    if part_size > MAX_COMPOSE_PART_SIZE:
+        return None
+    return part_size
+
+
 class GCSStorageField(StorageField):
     storage: GCSStorage
+    parallel_download = True
 
     async def move(
         self,
@@ -241,6 +263,10 @@ class GCSStorageField(StorageField):
                 self.field.upload_uri, self.field.bucket_name
             )
 
+        if self.field is not None and len(self.field.parts) > 0:
+            # Parts of a previous upload
+            await self._delete_objects(list(self.field.parts))
+
         if self.field is not None and self.field.uri != "":
             field: CloudFile = CloudFile(
                 filename=cf.filename,
@@ -350,6 +376,28 @@ class GCSStorageField(StorageField):
             return call
 
     async def append(self, cf: CloudFile, iterable: AsyncIterator) -> int:
+        """
+        Resumable uploads only take chunks in sequence, so large uploads of
+        known size are sent instead as parts uploaded at once that are
+        composed on finish.
+        """
+        if self.field is None:
+            raise AttributeError()
+        if len(self.field.parts) > 0:
+            return await self._append_composed(cf, iterable)
+
+        threshold = storage_settings.upload_compose_threshold
+        if (
+            threshold <= 0
+            or storage_settings.upload_max_concurrency <= 1
+            or self.field.offset > 0
+            or self.field.size < threshold
+            or _compose_part_size(self.field.size) is None
+        ):
+            return await self._append_resumable(cf, iterable)
+        return await self._append_composed(cf, iterable)
+
+    async def _append_resumable(self, cf: CloudFile, iterable: AsyncIterator) -> int:
         if self.field is None:
             raise AttributeError()
         count = 0
@@ -371,6 +419,150 @@ class GCSStorageField(StorageField):
                 break
         return count
 
+    async def _append_composed(self, cf: CloudFile, iterable: AsyncIterator) -> int:
+        if self.field is None:
+            raise AttributeError()
+        field = self.field
+        compose_part_size = _compose_part_size(field.size) or COMPOSE_PART_SIZE
+        max_concurrency = max(storage_settings.upload_max_concurrency, 1)
+        pending: Deque[asyncio.Task] = deque()
+        # parts and offset confirmed by previous appends
+        confirmed_parts = len(field.parts)
+        confirmed_offset = field.offset
+
+        async def schedule(data: bytes):
+            if len(field.parts) >= MAX_COMPOSE_COMPONENTS:
+                raise GoogleCloudException(
+                    f"Upload is bigger than its size: {field.size}"
+                )
+            # parts are recorded as soon as they are scheduled so they can
+            # always be cleaned up
+            name = f"{field.upload_uri}.part-{len(field.parts)}"
+            field.parts.append(name)
+            field.offset += len(data)
+            pending.append(asyncio.create_task(self._upload_part(name, data)))
+            if len(pending) >= max_concurrency:
+                await pending.popleft()
+
+        count = 0
+        part: List[bytes] = []
+        part_size = 0
+        try:
+            async for chunk in iterable:
+                count += len(chunk)
+                part.append(chunk)
+                part_size += len(chunk)
+                if part_size >= compose_part_size:
+                    await schedule(b"".join(part))
+                    part = []
+                    part_size = 0
+            if part_size > 0:
+                await schedule(b"".join(part))
+            while len(pending) > 0:
+                await pending.popleft()
+        except BaseException:
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+            # only the parts of this append are dropped, so it can be retried
+            await self._delete_objects(list(field.parts[confirmed_parts:]))
+            del field.parts[confirmed_parts:]
+            field.offset = confirmed_offset
+            raise
+        return count
+
+    @backoff.on_exception(backoff.expo, RETRIABLE_EXCEPTIONS, max_tries=MAX_TRIES)
+    @storage_ops_observer.wrap({"type": "upload_part"})
+    async def _upload_part(self, name: str, data: bytes):
+        if self.field is None or self.storage.session is None:
+            raise AttributeError()
+
+        url = "{}&name={}".format(
+            self.storage._media_upload_url.format(bucket=self.field.bucket_name),
+            quote_plus(name),
+        )
+        headers = await self.storage.get_access_headers()
+        headers.update(
+            {
+                "Content-Type": "application/octet-stream",
+                "Content-Length": str(len(data)),
+            }
+        )
+        async with self.storage.session.post(url, headers=headers, data=data) as call:
+            if call.status != 200:
+                text = await call.text()
+                raise GoogleCloudException(f"{call.status}: {text}")
+
+    @backoff.on_exception(backoff.expo, RETRIABLE_EXCEPTIONS, max_tries=MAX_TRIES)
+    @storage_ops_observer.wrap({"type": "compose"})
+    async def _compose(self, sources: List[str], destination: str):
+        if self.field is None or self.storage.session is None:
+            raise AttributeError()
+
+        url = "{}/{}/o/{}/compose".format(
+            self.storage.object_base_url,
+            self.field.bucket_name,
+            quote_plus(destination),
+        )
+        data = {
+            "sourceObjects": [{"name": source} for source in sources],
+            "destination": {
+                "contentType": self.field.content_type,
+                "metadata": {
+                    "FILENAME": self.field.filename,
+                    "SIZE": str(self.field.size),
+                    "CONTENT_TYPE": self.field.content_type,
+                },
+            },
+        }
+        headers = await self.storage.get_access_headers()
+        async with self.storage.session.post(url, headers=headers, json=data) as call:
+            if call.status != 200:
+                text = await call.text()
+                raise GoogleCloudException(f"{call.status}: {text}")
+
+    async def _compose_parts(self):
+        """
+        Compose the uploaded parts into the upload object. A compose request
+        takes a limited number of sources, so many parts are composed in levels.
+        """
+        sources = list(self.field.parts)
+        intermediates = []
+        level = 0
+        try:
+            while len(sources) > MAX_COMPOSE_SOURCES:
+                groups = [
+                    sources[index : index + MAX_COMPOSE_SOURCES]
+                    for index in range(0, len(sources), MAX_COMPOSE_SOURCES)
+                ]
+                sources = [
+                    f"{self.field.upload_uri}.compose-{level}-{index}"
+                    for index in range(len(groups))
+                ]
+                intermediates.extend(sources)
+                await asyncio.gather(
+                    *[
+                        self._compose(group, name)
+                        for group, name in zip(groups, sources)
+                    ]
+                )
+                level += 1
+            await self._compose(sources, self.field.upload_uri)
+        finally:
+            await self._delete_objects(intermediates)
+
+    async def _delete_objects(self, names: List[str]):
+        results = await asyncio.gather(
+            *[
+                self.storage.delete_upload(name, self.field.bucket_name)
+                for name in names
+            ],
+            return_exceptions=True,
+        )
+        for name, result in zip(names, results):
+            if isinstance(result, Exception):
+                logger.warning(f"Could not delete upload part {name}: {result}")
+
     async def finish(self):
         if self.field.old_uri not in ("", None):
             # Already has a file
@@ -383,6 +575,9 @@ class GCSStorageField(StorageField):
                     f"Could not delete existing google cloud file "
                     f"with uri: {self.field.uri}: {e}"
                 )
+        if len(self.field.parts) > 0:
+            await self._compose_parts()
+            await self._delete_objects(list(self.field.parts))
         if self.field.upload_uri != self.key:
             await self.move(
                 self.field.upload_uri, self.key, self.field.bucket_name, self.bucket
@@ -490,6 +685,9 @@ class GCSStorage(Storage):
         self._upload_url = (
             url + "/upload/storage/v1/b/{bucket}/o?uploadType=resumable"
         )  # noqa
+        self._media_upload_url = (
+            url + "/upload/storage/v1/b/{bucket}/o?uploadType=media"
+        )
         self.object_base_url = url + "/storage/v1/b"
         self._client = None
 
@@ -540,6 +738,7 @@ class GCSStorage(Storage):
     async def delete_upload(self, uri: str, bucket_name: str):
         if self.session is None:
             raise AttributeError()
+        self.invalidate_blob(bucket_name, uri)
         if uri:
             url = "{}/{}/o/{}".format(
                 self.object_base_url, bucket_name, quote_plus(uri)
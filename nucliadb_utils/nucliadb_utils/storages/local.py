@@ -19,12 +19,14 @@
 #
 from __future__ import annotations
 
+import asyncio
 import glob
 import json
+import mmap
 import os
 import shutil
 from datetime import datetime
-from typing import Any, AsyncIterator, Dict, Optional
+from typing import Any, AsyncIterator, Dict, Optional, Type
 
 import aiofiles
 from nucliadb_protos.resources_pb2 import CloudFile
@@ -234,6 +236,12 @@ class LocalStorage(Storage):
     def get_file_path(self, bucket: str, key: str):
         return f"{self.get_bucket_path(bucket)}/{key}"
 
+    def get_local_path(self, bucket: str, key: str) -> Optional[str]:
+        path = self.get_file_path(bucket, key)
+        if not os.path.isfile(path):
+            return None
+        return path
+
     async def create_kb(self, kbid: str):
         bucket = self.get_bucket_name(kbid)
         path = self.get_bucket_path(bucket)
@@ -255,6 +263,7 @@ class LocalStorage(Storage):
         return deleted
 
     async def delete_upload(self, uri: str, bucket_name: str):
+        self.invalidate_blob(bucket_name, uri)
         file_path = self.get_file_path(bucket_name, uri)
         if os.path.exists(file_path):
             os.remove(file_path)
@@ -275,7 +284,11 @@ class LocalStorage(Storage):
             yield item
 
     async def download(
-        self, bucket_name: str, key: str, headers: Optional[Dict[str, str]] = None
+        self,
+        bucket_name: str,
+        key: str,
+        headers: Optional[Dict[str, str]] = None,
+        size: Optional[int] = None,
     ):
         key_path = self.get_file_path(bucket_name, key)
         if not os.path.exists(key_path):
@@ -288,3 +301,31 @@ class LocalStorage(Storage):
                     break
                 else:
                     yield body
+
+    async def download_pb(self, sf: StorageField, PBKlass: Type):
+        """
+        Parse the message straight from a memory map of the file, off the
+        event loop as reading and parsing are blocking. Messages of cached
+        buckets are read through the blob cache instead.
+        """
+        if self.is_blob_cached(sf.bucket):
+            return await super().download_pb(sf, PBKlass)
+
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            None, self._read_pb, sf.bucket, sf.key, PBKlass
+        )
+
+    def _read_pb(self, bucket: str, key: str, PBKlass: Type):
+        path = self.get_local_path(bucket, key)
+        if path is None:
+            return None
+
+        with open(path, "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return None
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                pb = PBKlass()
+                with memoryview(data) as view:
+                    pb.ParseFromString(view)
+                return pb
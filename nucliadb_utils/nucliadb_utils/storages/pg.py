@@ -21,17 +21,26 @@ from __future__ import annotations
 
 import asyncio
 import uuid
-from typing import Any, AsyncIterator, Optional, TypedDict
+from contextlib import suppress
+from typing import Any, AsyncIterator, Optional, TypedDict, cast
 
 import asyncpg
 from nucliadb_protos.resources_pb2 import CloudFile
 
+from nucliadb_utils.settings import storage_settings
 from nucliadb_utils.storages import CHUNK_SIZE
 from nucliadb_utils.storages.storage import Storage, StorageField
 
+# Parts fetched at once when streaming a file
+CHUNKS_BATCH_SIZE = 4
+
 # Table design notes
 # - No foreign key constraints ON PURPOSE
 # - No cascade handling ON PURPOSE
+# - start_offset is the position of a part in its file so range reads can seek
+#   to their first part. Parts stored before it existed have it NULL.
+# - On existing tables, start_offset and its index are added by a migration,
+#   altering the table here would lock the parts table on every initialize.
 CREATE_TABLE = """
 CREATE TABLE IF NOT EXISTS kb_files (
     kb_id TEXT,
@@ -47,11 +56,14 @@ CREATE TABLE IF NOT EXISTS kb_files_fileparts (
     file_id TEXT,
     part_id INTEGER,
     size INTEGER,
+    start_offset BIGINT,
     data BYTEA,
     PRIMARY KEY(kb_id, file_id, part_id)
 );
 """
 
+OFFSET_INDEX = "kb_files_fileparts_offset"
+
 
 class FileInfo(TypedDict):
     filename: str
@@ -69,6 +81,10 @@ class Chunk(ChunkInfo):
     data: bytes
 
 
+class ChunkOffset(ChunkInfo):
+    start_offset: int
+
+
 class PostgresFileDataLayer:
     """
     Responsible for interating with the database and
@@ -140,14 +156,13 @@ WHERE kb_id = $1 AND file_id = $2
         async with self.connection.transaction():
             await self.connection.execute(
                 """
-INSERT INTO kb_files_fileparts (kb_id, file_id, part_id, data, size)
-VALUES (
+INSERT INTO kb_files_fileparts (kb_id, file_id, part_id, start_offset, data, size)
+SELECT
     $1, $2,
-    (
-        SELECT COALESCE(MAX(part_id), 0) + 1
-        FROM kb_files_fileparts WHERE kb_id = $1 AND file_id = $2
-    ),
-    $3, $4)
+    COALESCE(MAX(part_id), 0) + 1,
+    COALESCE(SUM(size), 0),
+    $3::bytea, $4::integer
+FROM kb_files_fileparts WHERE kb_id = $1 AND file_id = $2
 """,
                 kb_id,
                 file_id,
@@ -250,8 +265,8 @@ WHERE kb_id = $3 AND file_id = $4
 
             await self.connection.execute(
                 """
-INSERT INTO kb_files_fileparts (kb_id, file_id, part_id, data, size)
-SELECT $1, $2, part_id, data, size
+INSERT INTO kb_files_fileparts (kb_id, file_id, part_id, start_offset, data, size)
+SELECT $1, $2, part_id, start_offset, data, size
 FROM kb_files_fileparts
 WHERE kb_id = $3 AND file_id = $4
 """,
@@ -304,81 +319,158 @@ WHERE kb_id = $1
                     key=record["file_id"],
                 )
 
+    async def fetch_chunks(
+        self,
+        bucket: str,
+        key: str,
+        *,
+        from_part_id: int,
+        limit: int,
+        part_ids: Optional[list[int]] = None,
+        end: Optional[int] = None,
+    ) -> list[Chunk]:
+        query = """
+select part_id, size, data
+from kb_files_fileparts
+where kb_id = $1 and file_id = $2 and part_id >= $3
+"""
+        args: list[Any] = [bucket, key, from_part_id, limit]
+        if part_ids is not None:
+            args.append(part_ids)
+            query += f" and part_id = ANY(${len(args)})"
+        if end is not None:
+            # parts without an offset are never skipped
+            args.append(end)
+            query += f" and coalesce(start_offset, 0) < ${len(args)}"
+        query += " order by part_id limit $4"
+        records = await self.connection.fetch(query, *args)
+        return [
+            Chunk(
+                part_id=record["part_id"],
+                size=record["size"],
+                data=record["data"],
+            )
+            for record in records
+        ]
+
     async def iterate_chunks(
-        self, bucket: str, key: str, part_ids: Optional[list[int]] = None
+        self,
+        bucket: str,
+        key: str,
+        part_ids: Optional[list[int]] = None,
+        *,
+        from_part_id: int = 0,
+        end: Optional[int] = None,
     ) -> AsyncIterator[Chunk]:
-        chunks = await self.get_chunks_info(bucket, key, part_ids=part_ids)
-        for chunk in chunks:
-            # who knows how long a download for one of these chunks could be,
-            # so let's not try to keep a txn or cursor open.
-            data_chunk = await self.connection.fetchrow(
-                """
-select data
-from kb_files_fileparts
-where kb_id = $1 and file_id = $2 and part_id = $3
-""",
+        # who knows how long a download for one of these chunks could be,
+        # so let's not try to keep a txn or cursor open. Chunks are fetched
+        # in batches instead, the next one while the current one is consumed.
+        batch_size = CHUNKS_BATCH_SIZE
+        next_batch: Optional[asyncio.Task] = asyncio.create_task(
+            self.fetch_chunks(
                 bucket,
                 key,
-                chunk["part_id"],
-            )
-            yield Chunk(
-                part_id=chunk["part_id"],
-                size=chunk["size"],
-                data=data_chunk["data"],
+                from_part_id=from_part_id,
+                limit=batch_size,
+                part_ids=part_ids,
+                end=end,
             )
-
-    async def iterate_range(
-        self, *, kb_id: str, file_id: str, start: int, end: int
-    ) -> AsyncIterator[bytes]:
-        chunks = await self.get_chunks_info(
+        )
+        try:
+            while next_batch is not None:
+                chunks = await next_batch
+                next_batch = None
+                if len(chunks) == batch_size:
+                    next_batch = asyncio.create_task(
+                        self.fetch_chunks(
+                            bucket,
+                            key,
+                            from_part_id=chunks[-1]["part_id"] + 1,
+                            limit=batch_size,
+                            part_ids=part_ids,
+                            end=end,
+                        )
+                    )
+                for chunk in chunks:
+                    yield chunk
+        finally:
+            if next_batch is not None:
+                # the connection must be idle before it is released
+                next_batch.cancel()
+                with suppress(asyncio.CancelledError, Exception):
+                    await next_batch
+
+    async def get_start_chunk(
+        self, kb_id: str, file_id: str, start: int
+    ) -> Optional[ChunkOffset]:
+        """
+        Find the part holding the byte at `start`, seeking it by offset.
+        """
+        record = await self.connection.fetchrow(
+            """
+select part_id, size, start_offset
+from kb_files_fileparts
+where kb_id = $1 and file_id = $2 and start_offset <= $3
+order by start_offset desc, part_id desc
+limit 1
+""",
             kb_id,
             file_id,
+            start,
         )
-
-        # First off, find start part and position
-        elapsed = 0
-        start_part_id = None
-        start_pos = -1
-        for chunk in chunks:
-            if elapsed + chunk["size"] > start:
-                start_part_id = chunk["part_id"]
-                start_pos = start - elapsed
-                break
-            else:
-                elapsed += chunk["size"]
-
-        if start_part_id is None:
-            return
-
-        # Now, iterate through the chunks and yield the data
-        read_bytes = 0
-        while read_bytes < end - start:
-            data_chunk = await self.connection.fetchrow(
+        if record is None:
+            # parts appended before offsets were stored
+            record = await self.connection.fetchrow(
                 """
-select data
-from kb_files_fileparts
-where kb_id = $1 and file_id = $2 and part_id = $3
+select part_id, size, start_offset
+from (
+    select part_id, size, sum(size) over (order by part_id) - size as start_offset
+    from kb_files_fileparts
+    where kb_id = $1 and file_id = $2
+) parts
+where start_offset + size > $3
+order by part_id
+limit 1
 """,
                 kb_id,
                 file_id,
-                start_part_id,
+                start,
             )
-            if data_chunk is None:
-                return
+        if record is None or record["start_offset"] + record["size"] <= start:
+            return None
+        return ChunkOffset(
+            part_id=record["part_id"],
+            size=record["size"],
+            start_offset=record["start_offset"],
+        )
 
-            data = data_chunk["data"][
-                start_pos : min(
-                    start_pos + ((end - start) - read_bytes), len(data_chunk["data"])
-                )
-            ]
+    async def iterate_range(
+        self, *, kb_id: str, file_id: str, start: int, end: int
+    ) -> AsyncIterator[bytes]:
+        if end <= start:
+            return
+
+        start_chunk = await self.get_start_chunk(kb_id, file_id, start)
+        if start_chunk is None:
+            return
+
+        start_pos = start - start_chunk["start_offset"]
+        read_bytes = 0
+        async for chunk in self.iterate_chunks(
+            kb_id, file_id, from_part_id=start_chunk["part_id"], end=end
+        ):
+            data = chunk["data"][start_pos : start_pos + (end - start) - read_bytes]
             read_bytes += len(data)
-            yield data
+            if len(data) > 0:
+                yield data
+            if read_bytes >= end - start:
+                return
             start_pos = 0
-            start_part_id += 1
 
 
 class PostgresStorageField(StorageField):
     storage: PostgresStorage
+    parallel_download = True
 
     async def move(
         self,
@@ -553,6 +645,35 @@ class PostgresStorage(Storage):
             await self.pool.close()
             self.initialized = False
 
+    async def add_offset_column(self):
+        """
+        Add the start offset of parts to tables created before it existed.
+        """
+        async with self.pool.acquire() as conn:
+            await conn.execute(
+                "ALTER TABLE kb_files_fileparts "
+                "ADD COLUMN IF NOT EXISTS start_offset BIGINT"
+            )
+
+    async def create_offset_index(self):
+        """
+        Build the index range reads seek parts with, without blocking writes.
+        """
+        async with self.pool.acquire() as conn:
+            valid = await conn.fetchval(
+                "SELECT indisvalid FROM pg_index WHERE indexrelid = to_regclass($1)",
+                OFFSET_INDEX,
+            )
+            if valid is False:
+                # left behind by an interrupted build
+                await conn.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {OFFSET_INDEX}")
+            await conn.execute(
+                f"""
+CREATE INDEX CONCURRENTLY IF NOT EXISTS {OFFSET_INDEX}
+ON kb_files_fileparts (kb_id, file_id, start_offset)
+"""
+            )
+
     def get_bucket_name(self, kbid: str):
         return kbid
 
@@ -567,6 +688,7 @@ class PostgresStorage(Storage):
             return await dl.delete_kb(kbid), False
 
     async def delete_upload(self, uri: str, bucket_name: str):
+        self.invalidate_blob(bucket_name, uri)
         async with self.pool.acquire() as conn:
             dl = PostgresFileDataLayer(conn)
             await dl.delete_file(bucket_name, uri)
@@ -582,8 +704,23 @@ class PostgresStorage(Storage):
                 yield {"name": file_data["key"]}
 
     async def download(
-        self, bucket_name: str, key: str, headers: Optional[dict[str, str]] = None
+        self,
+        bucket_name: str,
+        key: str,
+        headers: Optional[dict[str, str]] = None,
+        size: Optional[int] = None,
     ) -> AsyncIterator[bytes]:
+        field = self.field_klass(storage=self, bucket=bucket_name, fullkey=key)
+        if self.use_parallel_download(field, headers, size):
+            async for data in field.iter_data_parallel(
+                0,
+                cast(int, size),
+                storage_settings.parallel_download_part_size,
+                storage_settings.parallel_download_max_concurrency,
+            ):
+                yield data
+            return
+
         async with self.pool.acquire() as conn:
             dl = PostgresFileDataLayer(conn)
             async for chunk in dl.iterate_chunks(bucket_name, key):
@@ -19,9 +19,11 @@
 #
 from __future__ import annotations
 
+import asyncio
+from collections import deque
 from contextlib import AsyncExitStack
 from datetime import datetime
-from typing import Any, AsyncIterator, Optional
+from typing import Any, AsyncIterator, Deque, List, Optional
 
 import aiobotocore  # type: ignore
 import aiohttp
@@ -31,6 +33,7 @@ from aiobotocore.session import AioSession, get_session  # type: ignore
 from nucliadb_protos.resources_pb2 import CloudFile
 
 from nucliadb_utils import logger
+from nucliadb_utils.settings import storage_settings
 from nucliadb_utils.storages.storage import Storage, StorageField
 
 MB = 1024 * 1024
@@ -58,6 +61,7 @@ POLICY_DELETE = {
 
 class S3StorageField(StorageField):
     storage: S3Storage
+    parallel_download = True
 
     @backoff.on_exception(backoff.expo, RETRIABLE_EXCEPTIONS, max_tries=MAX_TRIES)
     async def _download(self, uri, bucket, **kwargs):
@@ -161,34 +165,68 @@ class S3StorageField(StorageField):
         )
 
     async def append(self, cf: CloudFile, iterable: AsyncIterator) -> int:
+        """
+        Parts are uploaded while the next ones are being read, with up to
+        `upload_max_concurrency` parts in flight.
+        """
         size = 0
         if self.field is None:
             raise AttributeError("No field configured")
+        field = self.field
+
+        max_concurrency = max(storage_settings.upload_max_concurrency, 1)
+        pending: Deque[asyncio.Task] = deque()
+
+        async def wait_oldest():
+            part = await pending.popleft()
+            field.parts.append(part["ETag"])
+
+        async def schedule(data: bytes):
+            # part numbers are assigned in order, so the etags can be collected
+            # in order too by always waiting for the oldest pending part
+            part_number = field.offset
+            field.offset += 1
+            pending.append(
+                asyncio.create_task(self._upload_part(cf, data, part_number))
+            )
+            if len(pending) >= max_concurrency:
+                await wait_oldest()
 
-        upload_chunk = b""  # s3 strict about chunk size
-        async for chunk in iterable:
-            size += len(chunk)
-            upload_chunk += chunk
-            if len(upload_chunk) >= MIN_UPLOAD_SIZE:
-                part = await self._upload_part(cf, upload_chunk)
-                self.field.parts.append(part["ETag"])
-                self.field.offset += 1
-                upload_chunk = b""
-        if len(upload_chunk) > 0:
-            part = await self._upload_part(cf, upload_chunk)
-            self.field.parts.append(part["ETag"])
-            self.field.offset += 1
+        upload_chunk: List[bytes] = []  # s3 strict about chunk size
+        upload_chunk_size = 0
+        try:
+            async for chunk in iterable:
+                size += len(chunk)
+                upload_chunk.append(chunk)
+                upload_chunk_size += len(chunk)
+                if upload_chunk_size >= MIN_UPLOAD_SIZE:
+                    await schedule(b"".join(upload_chunk))
+                    upload_chunk = []
+                    upload_chunk_size = 0
+            if upload_chunk_size > 0:
+                await schedule(b"".join(upload_chunk))
+            while len(pending) > 0:
+                await wait_oldest()
+        except BaseException:
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+            # Only the parts with a known etag count as uploaded
+            field.offset = len(field.parts) + 1
+            raise
 
         return size
 
     @backoff.on_exception(backoff.expo, RETRIABLE_EXCEPTIONS, max_tries=MAX_TRIES)
-    async def _upload_part(self, cf: CloudFile, data: bytes):
+    async def _upload_part(
+        self, cf: CloudFile, data: bytes, part_number: Optional[int] = None
+    ):
         if self.field is None:
             raise AttributeError("No field configured")
         return await self.storage._s3aioclient.upload_part(
             Bucket=self.field.bucket_name,
             Key=self.field.upload_uri,
-            PartNumber=self.field.offset,
+            PartNumber=part_number or self.field.offset,
             UploadId=self.field.resumable_uri,
             Body=data,
         )
@@ -377,6 +415,7 @@ class S3Storage(Storage):
         await self._exit_stack.__aexit__(None, None, None)
 
     async def delete_upload(self, uri: str, bucket: str):
+        self.invalidate_blob(bucket, uri)
         if uri:
             try:
                 await self._s3aioclient.delete_object(Bucket=bucket, Key=uri)
@@ -20,13 +20,16 @@
 from __future__ import annotations
 
 import abc
+import asyncio
 import hashlib
 import uuid
+from collections import deque
 from io import BytesIO
 from typing import (
     Any,
     AsyncGenerator,
     AsyncIterator,
+    Deque,
     Dict,
     List,
     Optional,
@@ -42,7 +45,9 @@ from nucliadb_protos.resources_pb2 import CloudFile
 from nucliadb_protos.writer_pb2 import BrokerMessage
 
 from nucliadb_utils import logger
+from nucliadb_utils.settings import storage_settings
 from nucliadb_utils.storages import CHUNK_SIZE
+from nucliadb_utils.storages.blob_cache import BlobCache
 from nucliadb_utils.storages.exceptions import IndexDataNotFound, InvalidCloudFile
 from nucliadb_utils.utilities import get_local_storage, get_nuclia_storage
 
@@ -64,6 +69,8 @@ class StorageField:
     bucket: str
     key: str
     field: Optional[CloudFile] = None
+    # whether reading ranges concurrently is faster than a single stream
+    parallel_download: bool = False
 
     def __init__(
         self,
@@ -90,6 +97,33 @@ class StorageField:
         raise NotImplementedError()
         yield b""  # pragma: no cover
 
+    async def iter_data_parallel(
+        self, start: int, end: int, part_size: int, max_concurrency: int
+    ) -> AsyncIterator[bytes]:
+        """
+        Iterate through the data from `start` to `end`, reading up to
+        `max_concurrency` ranges of `part_size` bytes at once.
+        Ranges are yielded in order.
+        """
+
+        async def read_part(part_start: int, part_end: int) -> bytes:
+            return b"".join(
+                [chunk async for chunk in self.read_range(part_start, part_end)]
+            )
+
+        pending: Deque[asyncio.Task] = deque()
+        next_start = start
+        try:
+            while next_start < end or len(pending) > 0:
+                while next_start < end and len(pending) < max_concurrency:
+                    part_end = min(next_start + part_size, end)
+                    pending.append(asyncio.create_task(read_part(next_start, part_end)))
+                    next_start = part_end
+                yield await pending.popleft()
+        finally:
+            for task in pending:
+                task.cancel()
+
     async def delete(self) -> bool:
         deleted = False
         if self.field is not None:
@@ -143,6 +177,21 @@ class Storage:
     indexing_bucket: Optional[str] = None
     cached_buckets: List[str] = []
     chunk_size = CHUNK_SIZE
+    blob_cache: Optional[BlobCache] = None
+
+    def invalidate_blob(self, bucket: str, key: str) -> None:
+        """
+        Drop a blob from the cache, to be called whenever it is written or deleted
+        """
+        if self.blob_cache is not None:
+            self.blob_cache.invalidate(bucket, key)
+
+    def is_blob_cached(self, bucket: str) -> bool:
+        # indexing payloads and dead letters are only read once
+        return self.blob_cache is not None and bucket not in (
+            self.indexing_bucket,
+            self.deadletter_bucket,
+        )
 
     async def delete_resource(self, kbid: str, uuid: str):
         # Delete all keys inside a resource
@@ -227,7 +276,7 @@ class Storage:
             response.partition = partition
         return response
 
-    async def get_indexing(self, payload: IndexMessage) -> BrainResource:
+    async def download_indexing(self, payload: IndexMessage) -> BytesIO:
         if self.indexing_bucket is None:
             raise AttributeError()
         if payload.storage_key:
@@ -248,9 +297,14 @@ class Storage:
         bytes_buffer = await self.downloadbytes(self.indexing_bucket, key)
         if bytes_buffer.getbuffer().nbytes == 0:
             raise IndexDataNotFound(f'Indexing data not found for key "{key}"')
+        return bytes_buffer
+
+    async def get_indexing(self, payload: IndexMessage) -> BrainResource:
+        bytes_buffer = await self.download_indexing(payload)
         pb = BrainResource()
-        pb.ParseFromString(bytes_buffer.read())
-        bytes_buffer.flush()
+        # parse the downloaded buffer in place instead of copying it
+        with bytes_buffer.getbuffer() as data:
+            pb.ParseFromString(data)
         return pb
 
     async def delete_indexing(
@@ -424,37 +478,91 @@ class Storage:
     async def uploaditerator(
         self, iterator: AsyncIterator, destination: StorageField, origin: CloudFile
     ) -> CloudFile:
-        return await destination.upload(iterator, origin)
+        try:
+            return await destination.upload(iterator, origin)
+        finally:
+            self.invalidate_blob(destination.bucket, destination.key)
 
     async def download(
-        self, bucket: str, key: str, headers: Optional[Dict[str, str]] = None
+        self,
+        bucket: str,
+        key: str,
+        headers: Optional[Dict[str, str]] = None,
+        size: Optional[int] = None,
     ):
+        """
+        With the `size` of the object, large objects are downloaded reading
+        several ranges at once.
+        """
         destination: StorageField = self.field_klass(
             storage=self, bucket=bucket, fullkey=key
         )
         if headers is None:
             headers = {}
 
+        if self.use_parallel_download(destination, headers, size):
+            iterator = destination.iter_data_parallel(
+                0,
+                cast(int, size),
+                storage_settings.parallel_download_part_size,
+                storage_settings.parallel_download_max_concurrency,
+            )
+        else:
+            iterator = destination.iter_data(headers=headers)
+
         try:
-            async for data in destination.iter_data(headers=headers):
+            async for data in iterator:
                 yield data
         except KeyError:
             yield None
 
+    def use_parallel_download(
+        self,
+        field: StorageField,
+        headers: Optional[Dict[str, str]],
+        size: Optional[int],
+    ) -> bool:
+        return (
+            field.parallel_download
+            and size is not None
+            and (headers is None or "Range" not in headers)
+            and storage_settings.parallel_download_threshold > 0
+            and size >= storage_settings.parallel_download_threshold
+        )
+
+    def get_local_path(self, bucket: str, key: str) -> Optional[str]:
+        """
+        Path of the object when it is stored in the local filesystem, so it
+        can be served straight from the file instead of through `download`.
+        """
+        return None
+
     async def downloadbytes(self, bucket: str, key: str) -> BytesIO:
+        blob_cache = self.blob_cache if self.is_blob_cached(bucket) else None
+        if blob_cache is not None:
+            value = blob_cache.get(bucket, key)
+            if value is not None:
+                return BytesIO(value)
+            generation = blob_cache.generation(bucket, key)
+
         result = BytesIO()
         async for data in self.download(bucket, key):
             if data is not None:
                 result.write(data)
 
         result.seek(0)
+        if (
+            blob_cache is not None
+            and result.getbuffer().nbytes <= blob_cache.max_object_size
+        ):
+            blob_cache.set(bucket, key, result.getvalue(), generation)
         return result
 
     async def downloadbytescf(self, cf: CloudFile) -> BytesIO:  # pragma: no cover
         # this is covered by other tests
         result = BytesIO()
         if cf.source == self.source:
-            async for data in self.download(cf.bucket_name, cf.uri):
+            async for data in self.download(cf.bucket_name, cf.uri, size=cf.size):
                 if data is not None:
                     result.write(data)
         elif cf.source == CloudFile.FLAPS:
@@ -476,7 +584,7 @@ class Storage:
     ) -> AsyncGenerator[bytes, None]:  # pragma: no cover
         # this is covered by other tests
         if cf.source == self.source:
-            async for data in self.download(cf.bucket_name, cf.uri):
+            async for data in self.download(cf.bucket_name, cf.uri, size=cf.size):
                 if data is not None:
                     yield data
         elif cf.source == CloudFile.FLAPS:
@@ -500,7 +608,8 @@ class Storage:
             return None
 
         pb = PBKlass()
-        pb.ParseFromString(payload.read())
+        with payload.getbuffer() as data:
+            pb.ParseFromString(data)
         return pb
 
     async def delete_upload(self, uri: str, bucket_name: str):
@@ -520,14 +629,21 @@ class Storage:
         raise NotImplementedError()
 
     async def copy(self, file: CloudFile, destination: StorageField):
-        await destination.copy(
-            file.uri, destination.key, file.bucket_name, destination.bucket
-        )
+        try:
+            await destination.copy(
+                file.uri, destination.key, file.bucket_name, destination.bucket
+            )
+        finally:
+            self.invalidate_blob(destination.bucket, destination.key)
 
     async def move(self, file: CloudFile, destination: StorageField):
-        await destination.move(
-            file.uri, destination.key, file.bucket_name, destination.bucket
-        )
+        try:
+            await destination.move(
+                file.uri, destination.key, file.bucket_name, destination.bucket
+            )
+        finally:
+            self.invalidate_blob(file.bucket_name, file.uri)
+            self.invalidate_blob(destination.bucket, destination.key)
 
     async def create_kb(self, kbid: str) -> bool:
         raise NotImplementedError()
@@ -0,0 +1,145 @@
+# Copyright (C) 2021 Bosutech XXI S.L.
+#
+# nucliadb is offered under the AGPL v3.0 and as commercial software.
+# For commercial licensing, contact us at info@nuclia.com.
+#
+# AGPL:
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+import os
+import threading
+from unittest.mock import patch
+
+import pytest
+
+from nucliadb_utils.storages.blob_cache import BlobCache
+
+
+@pytest.fixture
+def cache():
+    yield BlobCache(max_bytes=10, max_object_size=5, ttl=60)
+
+
+@pytest.fixture
+def disk_cache(tmp_path):
+    cache = BlobCache(
+        max_bytes=10,
+        max_object_size=5,
+        ttl=60,
+        disk_path=str(tmp_path),
+        disk_max_bytes=10,
+    )
+    yield cache
+    cache.finalize()
+
+
+def test_get_set(cache: BlobCache):
+    assert cache.get("bucket", "key") is None
+    cache.set("bucket", "key", b"value")
+    assert cache.get("bucket", "key") == b"value"
+
+
+def test_skips_empty_and_large_objects(cache: BlobCache):
+    cache.set("bucket", "empty", b"")
+    cache.set("bucket", "large", b"too large")
+    assert cache.get("bucket", "empty") is None
+    assert cache.get("bucket", "large") is None
+
+
+def test_evicts_least_recently_used(cache: BlobCache):
+    cache.set("bucket", "key1", b"11111")
+    cache.set("bucket", "key2", b"22222")
+    cache.get("bucket", "key1")
+    cache.set("bucket", "key3", b"33333")
+
+    assert cache.get("bucket", "key1") == b"11111"
+    assert cache.get("bucket", "key2") is None
+    assert cache.get("bucket", "key3") == b"33333"
+    assert cache.memory.size == 10
+
+
+def test_expires(cache: BlobCache):
+    cache.set("bucket", "key", b"value")
+    with patch("nucliadb_utils.storages.blob_cache.time.monotonic", return_value=1e12):
+        assert cache.get("bucket", "key") is None
+    assert cache.memory.size == 0
+
+
+def test_invalidate(cache: BlobCache):
+    cache.set("bucket", "key", b"value")
+    cache.invalidate("bucket", "key")
+    assert cache.get("bucket", "key") is None
+
+
+def test_does_not_cache_values_read_before_invalidation(cache: BlobCache):
+    generation = cache.generation("bucket", "key")
+    cache.invalidate("bucket", "key")
+    cache.set("bucket", "key", b"stale", generation)
+    assert cache.get("bucket", "key") is None
+
+    cache.set("bucket", "key", b"value", cache.generation("bucket", "key"))
+    assert cache.get("bucket", "key") == b"value"
+
+
+def test_disk_tier(disk_cache: BlobCache):
+    disk_cache.set("bucket", "key1", b"11111")
+    disk_cache.set("bucket", "key2", b"22222")
+    disk_cache.set("bucket", "key3", b"33333")
+
+    # evicted from memory but kept on disk
+    assert disk_cache.disk is not None
+    assert disk_cache.disk.size == 5
+    assert disk_cache.get("bucket", "key1") == b"11111"
+
+    disk_cache.invalidate("bucket", "key2")
+    disk_cache.invalidate("bucket", "key1")
+    assert disk_cache.get("bucket", "key1") is None
+    assert disk_cache.disk.size == 0
+
+
+def test_disk_tier_serves_values_being_written(disk_cache: BlobCache):
+    assert disk_cache._disk_executor is not None
+    written = threading.Event()
+    disk_cache._disk_executor.submit(written.wait)
+    try:
+        disk_cache.set("bucket", "key1", b"11111")
+        disk_cache.set("bucket", "key2", b"22222")
+        disk_cache.set("bucket", "key3", b"33333")
+        assert disk_cache.disk_path is not None
+        assert os.listdir(disk_cache.disk_path) == []
+        assert disk_cache.get("bucket", "key1") == b"11111"
+    finally:
+        written.set()
+
+    # key1 was read back to memory, evicting key2 to disk
+    disk_cache.flush()
+    assert len(os.listdir(disk_cache.disk_path)) == 2
+    assert disk_cache._disk_pending == {}
+
+
+def test_finalize_removes_disk_files(tmp_path):
+    cache = BlobCache(
+        max_bytes=5,
+        max_object_size=5,
+        ttl=60,
+        disk_path=str(tmp_path),
+        disk_max_bytes=10,
+    )
+    cache.set("bucket", "key1", b"11111")
+    cache.set("bucket", "key2", b"22222")
+    cache.flush()
+    assert len(os.listdir(cache.disk_path)) == 1
+
+    cache.finalize()
+    assert os.listdir(tmp_path) == []
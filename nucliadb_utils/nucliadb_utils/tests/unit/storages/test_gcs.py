@@ -18,15 +18,21 @@
 # along with this program. If not, see <http://www.gnu.org/licenses/>.
 
 import unittest
-from unittest.mock import call
+from unittest.mock import AsyncMock, call
 
 import aiohttp
 import pytest
+from nucliadb_protos.resources_pb2 import CloudFile
 
 from nucliadb_utils.storages.gcs import (
+    COMPOSE_PART_SIZE,
+    MAX_COMPOSE_COMPONENTS,
+    MAX_COMPOSE_PART_SIZE,
+    MB,
     GCSStorageField,
     GoogleCloudException,
     ReadingResponseContentException,
+    _compose_part_size,
 )
 
 
@@ -81,3 +87,110 @@ async def test_iter_data_reading_content_error_is_not_retried(storage_field):
             pass
 
     storage_field._inner_iter_data.await_count == 1
+
+
+async def iter_chunks(count, size):
+    for index in range(count):
+        yield bytes([index]) * size
+
+
+@pytest.fixture(scope="function")
+def upload_field(storage_field):
+    storage_field.field = CloudFile(
+        upload_uri="upload", bucket_name="bucket", source=CloudFile.GCS
+    )
+    storage_field._upload_part = AsyncMock()
+    with unittest.mock.patch(
+        "nucliadb_utils.storages.gcs.storage_settings",
+        upload_compose_threshold=4 * MB,
+        upload_max_concurrency=2,
+    ):
+        yield storage_field
+
+
+async def test_append_uploads_large_files_as_parts(upload_field):
+    upload_field.field.size = 20 * MB
+    upload_field._append_resumable = AsyncMock()
+
+    count = await upload_field.append(CloudFile(), iter_chunks(20, MB))
+
+    assert count == 20 * MB
+    assert upload_field.field.offset == 20 * MB
+    assert list(upload_field.field.parts) == [
+        "upload.part-0",
+        "upload.part-1",
+        "upload.part-2",
+    ]
+    uploaded = [c.args for c in upload_field._upload_part.await_args_list]
+    assert [name for name, _ in uploaded] == list(upload_field.field.parts)
+    assert b"".join(data for _, data in uploaded) == b"".join(
+        [bytes([index]) * MB for index in range(20)]
+    )
+    upload_field._append_resumable.assert_not_awaited()
+
+
+async def test_append_uploads_small_files_resumable(upload_field):
+    received = []
+
+    async def append_resumable(cf, iterable):
+        async for chunk in iterable:
+            received.append(chunk)
+        return sum(len(chunk) for chunk in received)
+
+    upload_field._append_resumable = append_resumable
+
+    upload_field.field.size = 3 * MB
+    count = await upload_field.append(CloudFile(), iter_chunks(3, MB))
+
+    assert count == 3 * MB
+    assert received == [bytes([index]) * MB for index in range(3)]
+    assert len(upload_field.field.parts) == 0
+    upload_field._upload_part.assert_not_awaited()
+
+
+async def test_append_failure_keeps_parts_of_previous_appends(upload_field):
+    upload_field.field.size = 40 * MB
+    upload_field._delete_objects = AsyncMock()
+    await upload_field.append(CloudFile(), iter_chunks(20, MB))
+
+    async def upload_part(name, data):
+        if name == "upload.part-4":
+            raise GoogleCloudException("error")
+
+    upload_field._upload_part.side_effect = upload_part
+    with pytest.raises(GoogleCloudException):
+        await upload_field.append(CloudFile(), iter_chunks(20, MB))
+
+    assert upload_field.field.offset == 20 * MB
+    assert list(upload_field.field.parts) == [
+        "upload.part-0",
+        "upload.part-1",
+        "upload.part-2",
+    ]
+    deleted = upload_field._delete_objects.await_args.args[0]
+    assert deleted[:2] == ["upload.part-3", "upload.part-4"]
+    assert "upload.part-0" not in deleted
+
+
+@pytest.mark.parametrize(
+    "size", [0, 2 * MAX_COMPOSE_COMPONENTS * MAX_COMPOSE_PART_SIZE]
+)
+async def test_append_uploads_files_of_unknown_or_huge_size_resumable(
+    upload_field, size
+):
+    upload_field.field.size = size
+    upload_field._append_resumable = AsyncMock()
+
+    await upload_field.append(CloudFile(), iter_chunks(20, MB))
+
+    upload_field._append_resumable.assert_awaited_once()
+    upload_field._upload_part.assert_not_awaited()
+
+
+def test_compose_part_size_keeps_parts_within_components():
+    assert _compose_part_size(20 * MB) == COMPOSE_PART_SIZE
+    size = 20 * MAX_COMPOSE_COMPONENTS * MB + 1
+    part_size = _compose_part_size(size)
+    assert part_size is not None
+    assert part_size > 20 * MB
+    assert -(-size // part_size) <= MAX_COMPOSE_COMPONENTS
@@ -0,0 +1,74 @@
+# Copyright (C) 2021 Bosutech XXI S.L.
+#
+# nucliadb is offered under the AGPL v3.0 and as commercial software.
+# For commercial licensing, contact us at info@nuclia.com.
+#
+# AGPL:
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+import os
+
+import pytest
+from nucliadb_protos.resources_pb2 import CloudFile
+
+from nucliadb_utils.storages.blob_cache import BlobCache
+from nucliadb_utils.storages.local import LocalStorage, LocalStorageField
+
+
+@pytest.fixture
+def storage(tmp_path):
+    yield LocalStorage(str(tmp_path))
+
+
+def write_file(storage: LocalStorage, key: str, data: bytes):
+    path = storage.get_file_path("bucket", key)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(data)
+
+
+@pytest.mark.asyncio
+async def test_download_pb(storage: LocalStorage):
+    cf = CloudFile(uri="uri", filename="filename", size=10)
+    write_file(storage, "key", cf.SerializeToString())
+    sf = LocalStorageField(storage, "bucket", "key")
+
+    assert await storage.download_pb(sf, CloudFile) == cf
+
+
+@pytest.mark.asyncio
+async def test_download_pb_empty_or_missing(storage: LocalStorage):
+    write_file(storage, "empty", b"")
+
+    for key in ("empty", "missing"):
+        sf = LocalStorageField(storage, "bucket", key)
+        assert await storage.download_pb(sf, CloudFile) is None
+        assert (storage.get_local_path("bucket", key) is None) == (key == "missing")
+
+
+@pytest.mark.asyncio
+async def test_download_pb_blob_cache(storage: LocalStorage):
+    storage.blob_cache = BlobCache(max_bytes=1024, max_object_size=1024, ttl=60)
+    cf = CloudFile(uri="uri", filename="filename", size=10)
+    write_file(storage, "key", cf.SerializeToString())
+    sf = LocalStorageField(storage, "bucket", "key")
+
+    assert await storage.download_pb(sf, CloudFile) == cf
+    assert storage.blob_cache.get("bucket", "key") == cf.SerializeToString()
+
+    # served from the cache until invalidated
+    write_file(storage, "key", CloudFile(uri="updated").SerializeToString())
+    assert await storage.download_pb(sf, CloudFile) == cf
+    storage.invalidate_blob("bucket", "key")
+    assert await storage.download_pb(sf, CloudFile) == CloudFile(uri="updated")
@@ -76,25 +76,22 @@ def storage_field(storage):
 
 
 @pytest.fixture
-def chunk_info():
+def chunk_offsets():
     yield [
         {
-            "filename": "filename",
-            "size": 5,
-            "content_type": "content_type",
             "part_id": 0,
+            "size": 5,
+            "start_offset": 0,
         },
         {
-            "filename": "filename",
-            "size": 5,
-            "content_type": "content_type",
             "part_id": 1,
+            "size": 5,
+            "start_offset": 5,
         },
         {
-            "filename": "filename",
-            "size": 5,
-            "content_type": "content_type",
             "part_id": 2,
+            "size": 5,
+            "start_offset": 10,
         },
     ]
 
@@ -263,10 +260,14 @@ class TestPostgresFileDataLayer:
         connection.cursor.assert_called_once_with(ANY, "kb_id", "prefix%")
 
     async def test_iterate_range(
-        self, data_layer: pg.PostgresFileDataLayer, connection, chunk_info, chunk_data
+        self,
+        data_layer: pg.PostgresFileDataLayer,
+        connection,
+        chunk_offsets,
+        chunk_data,
     ):
-        connection.fetch.return_value = chunk_info
-        connection.fetchrow.side_effect = chunk_data
+        connection.fetchrow.return_value = chunk_offsets[0]
+        connection.fetch.return_value = chunk_data
 
         chunks = []
         async for chunk in data_layer.iterate_range(
@@ -277,10 +278,14 @@ class TestPostgresFileDataLayer:
         assert chunks == [b"a1", b"dat"]
 
     async def test_iterate_range_start_part(
-        self, data_layer: pg.PostgresFileDataLayer, connection, chunk_info, chunk_data
+        self,
+        data_layer: pg.PostgresFileDataLayer,
+        connection,
+        chunk_offsets,
+        chunk_data,
     ):
-        connection.fetch.return_value = chunk_info
-        connection.fetchrow.side_effect = chunk_data
+        connection.fetchrow.return_value = chunk_offsets[0]
+        connection.fetch.return_value = chunk_data
 
         chunks = []
         async for chunk in data_layer.iterate_range(
@@ -291,10 +296,14 @@ class TestPostgresFileDataLayer:
         assert chunks == [b"data1"]
 
     async def test_iterate_range_middle_part(
-        self, data_layer: pg.PostgresFileDataLayer, connection, chunk_info, chunk_data
+        self,
+        data_layer: pg.PostgresFileDataLayer,
+        connection,
+        chunk_offsets,
+        chunk_data,
     ):
-        connection.fetch.return_value = chunk_info
-        connection.fetchrow.side_effect = chunk_data[1:]
+        connection.fetchrow.return_value = chunk_offsets[1]
+        connection.fetch.return_value = chunk_data[1:]
 
         chunks = []
         async for chunk in data_layer.iterate_range(
@@ -305,10 +314,14 @@ class TestPostgresFileDataLayer:
         assert chunks == [b"data2"]
 
     async def test_iterate_range_end_part(
-        self, data_layer: pg.PostgresFileDataLayer, connection, chunk_info, chunk_data
+        self,
+        data_layer: pg.PostgresFileDataLayer,
+        connection,
+        chunk_offsets,
+        chunk_data,
     ):
-        connection.fetch.return_value = chunk_info
-        connection.fetchrow.side_effect = chunk_data[2:]
+        connection.fetchrow.return_value = chunk_offsets[2]
+        connection.fetch.return_value = chunk_data[2:]
 
         chunks = []
         async for chunk in data_layer.iterate_range(
@@ -319,10 +332,14 @@ class TestPostgresFileDataLayer:
         assert chunks == [b"data3"]
 
     async def test_iterate_range_cross_all(
-        self, data_layer: pg.PostgresFileDataLayer, connection, chunk_info, chunk_data
+        self,
+        data_layer: pg.PostgresFileDataLayer,
+        connection,
+        chunk_offsets,
+        chunk_data,
     ):
-        connection.fetch.return_value = chunk_info
-        connection.fetchrow.side_effect = chunk_data
+        connection.fetchrow.return_value = chunk_offsets[0]
+        connection.fetch.return_value = chunk_data
 
         chunks = []
         async for chunk in data_layer.iterate_range(
@@ -332,6 +349,82 @@ class TestPostgresFileDataLayer:
 
         assert chunks == [b"ta1", b"data2", b"dat"]
 
+    async def test_iterate_range_seeks_start_part(
+        self,
+        data_layer: pg.PostgresFileDataLayer,
+        connection,
+        chunk_offsets,
+        chunk_data,
+    ):
+        connection.fetchrow.return_value = chunk_offsets[1]
+        connection.fetch.return_value = chunk_data[1:]
+
+        chunks = []
+        async for chunk in data_layer.iterate_range(
+            kb_id="kb_id", file_id="file_id", start=7, end=12
+        ):
+            chunks.append(chunk)
+
+        assert chunks == [b"ta2", b"da"]
+        connection.fetchrow.assert_awaited_once_with(ANY, "kb_id", "file_id", 7)
+        connection.fetch.assert_awaited_once_with(
+            ANY, "kb_id", "file_id", 1, pg.CHUNKS_BATCH_SIZE, 12
+        )
+
+    async def test_iterate_range_without_offsets(
+        self,
+        data_layer: pg.PostgresFileDataLayer,
+        connection,
+        chunk_offsets,
+        chunk_data,
+    ):
+        connection.fetchrow.side_effect = [None, chunk_offsets[1]]
+        connection.fetch.return_value = chunk_data[1:]
+
+        chunks = []
+        async for chunk in data_layer.iterate_range(
+            kb_id="kb_id", file_id="file_id", start=5, end=10
+        ):
+            chunks.append(chunk)
+
+        assert chunks == [b"data2"]
+        assert connection.fetchrow.await_count == 2
+
+    async def test_iterate_range_past_end(
+        self,
+        data_layer: pg.PostgresFileDataLayer,
+        connection,
+        chunk_offsets,
+    ):
+        connection.fetchrow.return_value = chunk_offsets[2]
+
+        chunks = []
+        async for chunk in data_layer.iterate_range(
+            kb_id="kb_id", file_id="file_id", start=20, end=25
+        ):
+            chunks.append(chunk)
+
+        assert chunks == []
+        connection.fetch.assert_not_awaited()
+
+    async def test_iterate_chunks_batches(
+        self, data_layer: pg.PostgresFileDataLayer, connection, chunk_data
+    ):
+        connection.fetch.side_effect = [chunk_data[:2], chunk_data[2:]]
+
+        with patch("nucliadb_utils.storages.pg.CHUNKS_BATCH_SIZE", 2):
+            chunks = [
+                chunk async for chunk in data_layer.iterate_chunks("kb_id", "file_id")
+            ]
+
+        assert chunks == chunk_data
+        connection.fetch.assert_has_awaits(
+            [
+                call(ANY, "kb_id", "file_id", 0, 2),
+                call(ANY, "kb_id", "file_id", 2, 2),
+            ]
+        )
+
 
 class TestPostgresStorageField:
     @pytest.fixture()
@@ -402,13 +495,11 @@ class TestPostgresStorageField:
         self,
         storage_field: pg.PostgresStorageField,
         connection,
-        chunk_info,
         chunk_data,
         field,
     ):
         storage_field.field = field
-        connection.fetch.return_value = chunk_info
-        connection.fetchrow.side_effect = chunk_data
+        connection.fetch.return_value = chunk_data
 
         chunks = []
         async for chunk in storage_field.iter_data():
@@ -420,13 +511,13 @@ class TestPostgresStorageField:
         self,
         storage_field: pg.PostgresStorageField,
         connection,
-        chunk_info,
+        chunk_offsets,
         chunk_data,
         field,
     ):
         storage_field.field = field
-        connection.fetch.return_value = chunk_info
-        connection.fetchrow.side_effect = chunk_data
+        connection.fetchrow.return_value = chunk_offsets[0]
+        connection.fetch.return_value = chunk_data
 
         chunks = []
         async for chunk in storage_field.read_range(0, 15):
@@ -498,6 +589,37 @@ class TestPostgresStorage:
 
         assert pool.acquire.call_count == 1
         assert connection.execute.call_count == 1
+        assert "ALTER TABLE" not in connection.execute.await_args.args[0]
+
+    async def test_add_offset_column(self, storage: pg.PostgresStorage, connection):
+        await storage.add_offset_column()
+
+        connection.execute.assert_awaited_once()
+        assert "ADD COLUMN IF NOT EXISTS start_offset" in (
+            connection.execute.await_args.args[0]
+        )
+
+    async def test_create_offset_index(self, storage: pg.PostgresStorage, connection):
+        connection.fetchval.return_value = None
+
+        await storage.create_offset_index()
+
+        connection.execute.assert_awaited_once()
+        assert "CONCURRENTLY" in connection.execute.await_args.args[0]
+
+    async def test_create_offset_index_drops_invalid_index(
+        self, storage: pg.PostgresStorage, connection
+    ):
+        connection.fetchval.return_value = False
+
+        await storage.create_offset_index()
+
+        assert connection.execute.await_count == 2
+        assert (
+            connection.execute.await_args_list[0]
+            .args[0]
+            .startswith("DROP INDEX CONCURRENTLY")
+        )
 
     async def test_finalize(self, storage: pg.PostgresStorage, pool):
         await storage.finalize()
@@ -549,11 +671,8 @@ class TestPostgresStorage:
 
         assert chunks == [{"name": "file_id1"}, {"name": "file_id2"}]
 
-    async def test_download(
-        self, storage: pg.PostgresStorage, connection, chunk_info, chunk_data
-    ):
-        connection.fetch.return_value = chunk_info
-        connection.fetchrow.side_effect = chunk_data
+    async def test_download(self, storage: pg.PostgresStorage, connection, chunk_data):
+        connection.fetch.return_value = chunk_data
 
         chunks = []
         async for chunk in storage.download("kb_id", "file_id"):
@@ -17,6 +17,7 @@
 # You should have received a copy of the GNU Affero General Public License
 # along with this program. If not, see <http://www.gnu.org/licenses/>.
 
+import asyncio
 from unittest.mock import AsyncMock, MagicMock
 
 import pytest
@@ -25,6 +26,7 @@ from nucliadb_protos.noderesources_pb2 import ResourceID
 from nucliadb_protos.nodewriter_pb2 import IndexMessage
 from nucliadb_protos.resources_pb2 import CloudFile
 
+from nucliadb_utils.storages.blob_cache import BlobCache
 from nucliadb_utils.storages.storage import Storage, StorageField
 
 
@@ -54,6 +56,38 @@ class TestStorageField:
         assert storage_field.build_cf() == cf
 
 
+class RangeStorageField(StorageField):
+    parallel_download = True
+    data = bytes(range(256)) * 4
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.reading = 0
+        self.max_reading = 0
+
+    async def read_range(self, start: int, end: int):
+        self.reading += 1
+        self.max_reading = max(self.max_reading, self.reading)
+        await asyncio.sleep(0.01)
+        self.reading -= 1
+        yield self.data[start:end]
+
+
+@pytest.mark.asyncio
+async def test_iter_data_parallel():
+    field = RangeStorageField(AsyncMock(), "bucket", "fullkey")
+    chunks = [
+        chunk
+        async for chunk in field.iter_data_parallel(
+            0, len(field.data), part_size=100, max_concurrency=3
+        )
+    ]
+
+    assert b"".join(chunks) == field.data
+    assert len(chunks) == 11
+    assert field.max_reading == 3
+
+
 class StorageTest(Storage):
     def __init__(self):
         self.source = 0
@@ -121,6 +155,24 @@ class TestStorage:
         im.storage_key = "index/kb/uuid/1"
         assert isinstance(await storage.get_indexing(im), BrainResource)
 
+    @pytest.mark.asyncio
+    async def test_downloadbytes_blob_cache(self, storage: StorageTest):
+        storage.blob_cache = BlobCache(max_bytes=1024, max_object_size=1024, ttl=60)
+        expected = BrainResource(labels=["label"]).SerializeToString()
+        assert (await storage.downloadbytes("bucket", "key")).read() == expected
+
+        async def download(bucket_name, uri):
+            yield b"updated"
+
+        storage.download = download  # type: ignore
+        assert (await storage.downloadbytes("bucket", "key")).read() == expected
+        # indexing payloads are not cached
+        await storage.downloadbytes("indexing_bucket", "key")
+        assert storage.blob_cache.get("indexing_bucket", "key") is None
+
+        storage.invalidate_blob("bucket", "key")
+        assert (await storage.downloadbytes("bucket", "key")).read() == b"updated"
+
     @pytest.mark.asyncio
     async def test_delete_indexing(self, storage: StorageTest):
         im = IndexMessage()
@@ -149,3 +149,39 @@ async def test_message_progress_updater_does_not_update_ack():
         await asyncio.sleep(0.07)
 
     in_progress.assert_not_awaited()
+
+
+def test_is_last_delivery():
+    msg = MagicMock()
+    msg.metadata.num_delivered = 3
+
+    assert nats.is_last_delivery(msg, 3)
+    assert not nats.is_last_delivery(msg, 4)
+    # unlimited deliveries
+    assert not nats.is_last_delivery(msg, -1)
+
+
+def test_sequence_tracker_advances_on_contiguous_seqids():
+    tracker = nats.SequenceTracker(last_seqid=10)
+    for seqid in (12, 15, 20):
+        tracker.start(seqid)
+
+    # 15 is done but 12 is still pending
+    assert tracker.finish(15) is None
+    assert tracker.last_seqid == 10
+    assert tracker.is_processed(15)
+    assert not tracker.is_processed(12)
+
+    assert tracker.finish(12) == 15
+    assert tracker.is_processed(14)
+
+    assert tracker.finish(20) == 20
+    assert tracker.last_seqid == 20
+    assert tracker.pending == set()
+
+
+def test_sequence_tracker_ignores_old_seqids():
+    tracker = nats.SequenceTracker(last_seqid=10)
+    tracker.start(5)
+    assert tracker.finish(5) is None
+    assert tracker.last_seqid == 10
@@ -162,6 +162,17 @@ async def get_storage(
             "Invalid storage settings, please configure FILE_BACKEND"
         )
 
+    if storage_settings.storage_cache_max_bytes > 0:
+        from nucliadb_utils.storages.blob_cache import BlobCache
+
+        MAIN[Utility.STORAGE].blob_cache = BlobCache(
+            max_bytes=storage_settings.storage_cache_max_bytes,
+            max_object_size=storage_settings.storage_cache_max_object_size,
+            ttl=storage_settings.storage_cache_ttl,
+            disk_path=storage_settings.storage_cache_disk_path,
+            disk_max_bytes=storage_settings.storage_cache_disk_max_bytes,
+        )
+
     return MAIN[Utility.STORAGE]
 
 